@@ -0,0 +1,145 @@
+"""Synthetic GeoTIFF stacks shared by the I/O benchmark suites.
+
+The stacks are written once per suite in `setup_cache` (for every image size,
+with the largest number of dates), and each parameter combination uses the
+first `nslc` dates.
+"""
+
+import datetime
+import itertools
+import tempfile
+from pathlib import Path
+
+import numpy as np
+
+from dolphin import io
+from dolphin.utils import format_dates
+
+# Parameters shared by the suites
+SIZES = [512, 1024]
+NSLCS = [10, 20]
+THREADS = [1, 4]
+
+EPSG = 32615
+PIXEL_SIZE = (30.0, -30.0)
+START_DATE = datetime.datetime(2022, 1, 1)
+DATE_SPACING = datetime.timedelta(days=12)
+# Number of nearest-neighbor interferograms per date
+MAX_BANDWIDTH = 3
+
+
+def data_dir(size: int) -> Path:
+    return Path(f"data_{size}")
+
+
+def make_output_dir(prefix: str) -> Path:
+    """Make a new directory for one run's outputs, so no outputs are reused."""
+    return Path(tempfile.mkdtemp(prefix=prefix, dir="."))
+
+
+def get_geotransform(offset: int = 0) -> list[float]:
+    x0 = 500_000.0 + offset * PIXEL_SIZE[0]
+    y0 = 4_000_000.0 + offset * PIXEL_SIZE[1]
+    return [x0, PIXEL_SIZE[0], 0.0, y0, 0.0, PIXEL_SIZE[1]]
+
+
+def _write(arr: np.ndarray, filename: Path, offset: int = 0) -> Path:
+    io.write_arr(
+        arr=arr,
+        output_name=filename,
+        geotransform=get_geotransform(offset),
+        projection=EPSG,
+        options=io.DEFAULT_TIFF_OPTIONS,
+    )
+    return filename
+
+
+def _get_dates(nslc: int) -> list[datetime.datetime]:
+    return [START_DATE + i * DATE_SPACING for i in range(nslc)]
+
+
+def _get_pairs(nslc: int) -> list[tuple[int, int]]:
+    return [
+        (i, j)
+        for i, j in itertools.combinations(range(nslc), 2)
+        if j - i <= MAX_BANDWIDTH
+    ]
+
+
+def make_slc_stack(size: int, nslc: int = max(NSLCS)) -> None:
+    """Write `nslc` complex SLCs of random speckle with a slow phase ramp."""
+    out_dir = data_dir(size) / "slcs"
+    out_dir.mkdir(parents=True, exist_ok=True)
+    rng = np.random.default_rng(1234)
+    rows, cols = np.ogrid[:size, :size]
+    for i, d in enumerate(_get_dates(nslc)):
+        ramp = 0.01 * i * (rows + cols) / size
+        speckle = rng.normal(size=(size, size)) + 1j * rng.normal(size=(size, size))
+        slc = (speckle * np.exp(1j * ramp)).astype(np.complex64)
+        _write(slc, out_dir / f"{d:%Y%m%d}.slc.tif")
+
+
+def make_ifg_network(size: int, nslc: int = max(NSLCS)) -> None:
+    """Write wrapped, unwrapped and correlation rasters of a small-baseline network.
+
+    Also writes the single-reference unwrapped phase (for velocity estimation).
+    """
+    out_dir = data_dir(size)
+    for name in ["ifgs", "unw", "cor", "timeseries"]:
+        (out_dir / name).mkdir(parents=True, exist_ok=True)
+
+    rng = np.random.default_rng(1234)
+    rows, cols = np.ogrid[:size, :size]
+    bowl = np.exp(-((rows - size / 2) ** 2 + (cols - size / 2) ** 2) / (size / 4) ** 2)
+    dates = _get_dates(nslc)
+    phases = [
+        (5 * i / nslc * bowl + rng.normal(scale=0.3, size=(size, size))).astype(
+            np.float32
+        )
+        for i in range(nslc)
+    ]
+    for i, j in _get_pairs(nslc):
+        name = format_dates(dates[i], dates[j])
+        unw = phases[j] - phases[i]
+        _write(
+            np.exp(1j * unw).astype(np.complex64),
+            out_dir / f"ifgs/{name}.int.tif",
+        )
+        _write(unw, out_dir / f"unw/{name}.unw.tif")
+        cor = rng.uniform(0.2, 1.0, size=(size, size)).astype(np.float32)
+        _write(cor, out_dir / f"cor/{name}.cor.tif")
+    for j in range(1, nslc):
+        name = format_dates(dates[0], dates[j])
+        _write(phases[j] - phases[0], out_dir / f"timeseries/{name}.tif")
+
+
+def make_tiles(size: int, num_tiles: int = 4) -> None:
+    """Write overlapping georeferenced tiles (like neighboring bursts) to merge."""
+    out_dir = data_dir(size) / "tiles"
+    out_dir.mkdir(parents=True, exist_ok=True)
+    rng = np.random.default_rng(1234)
+    for i in range(num_tiles):
+        tile = rng.normal(size=(size, size)).astype(np.float32)
+        # Offset each tile by a fraction of the size in x and y
+        _write(tile, out_dir / f"tile_{i}.tif", offset=i * size // 3)
+
+
+def get_slc_files(size: int, nslc: int) -> list[Path]:
+    return sorted((data_dir(size) / "slcs").glob("*.slc.tif"))[:nslc]
+
+
+def get_network_files(size: int, nslc: int, name: str) -> list[Path]:
+    """Get the "ifgs", "unw" or "cor" files using only the first `nslc` dates."""
+    dates = _get_dates(nslc)
+    return [
+        next((data_dir(size) / name).glob(f"{format_dates(dates[i], dates[j])}.*"))
+        for i, j in _get_pairs(nslc)
+    ]
+
+
+def get_timeseries_files(size: int, nslc: int) -> list[Path]:
+    return sorted((data_dir(size) / "timeseries").glob("*.tif"))[: nslc - 1]
+
+
+def get_tile_files(size: int) -> list[Path]:
+    return sorted((data_dir(size) / "tiles").glob("tile_*.tif"))
@@ -0,0 +1,168 @@
+"""Benchmarks of stitching, correlation, similarity and interferogram filtering."""
+
+import shutil
+from pathlib import Path
+
+from dolphin import goldstein, interpolate, io, similarity, stitching, utils
+from dolphin.interferogram import estimate_interferometric_correlations
+
+from ._data import (
+    NSLCS,
+    SIZES,
+    THREADS,
+    get_network_files,
+    get_tile_files,
+    make_ifg_network,
+    make_output_dir,
+    make_tiles,
+)
+
+
+class MergeImagesBenchmark:
+    """Benchmark stitching overlapping georeferenced tiles."""
+
+    params = (SIZES, [None, {"x": 6, "y": 3}])
+    param_names = ["size", "strides"]
+    number = 1
+    timeout = 600
+
+    def setup_cache(self):
+        for size in SIZES:
+            make_tiles(size)
+
+    def setup(self, size, strides):
+        self.tile_files = get_tile_files(size)
+        self.out_dirs: list[Path] = []
+
+    def teardown(self, size, strides):
+        for d in self.out_dirs:
+            shutil.rmtree(d, ignore_errors=True)
+
+    def _run(self, strides):
+        out_dir = make_output_dir("merged_")
+        self.out_dirs.append(out_dir)
+        stitching.merge_images(
+            self.tile_files,
+            outfile=out_dir / "merged.tif",
+            strides=strides,
+            out_nodata=0,
+        )
+
+    def time_merge_images(self, size, strides):
+        self._run(strides)
+
+    def peakmem_merge_images(self, size, strides):
+        self._run(strides)
+
+
+class InterferometricCorrelationBenchmark:
+    """Benchmark the correlation estimates for a network of interferograms."""
+
+    params = (SIZES, NSLCS, THREADS)
+    param_names = ["size", "nslc", "threads"]
+    number = 1
+    timeout = 600
+
+    def setup_cache(self):
+        for size in SIZES:
+            make_ifg_network(size)
+
+    def setup(self, size, nslc, threads):
+        self.ifg_files = get_network_files(size, nslc, "ifgs")
+        self.out_dirs: list[Path] = []
+
+    def teardown(self, size, nslc, threads):
+        for d in self.out_dirs:
+            shutil.rmtree(d, ignore_errors=True)
+
+    def _run(self, threads):
+        # Outputs are written next to the inputs, and existing ones are skipped,
+        # so link the interferograms into a new directory for each run
+        out_dir = make_output_dir("cor_")
+        self.out_dirs.append(out_dir)
+        links = []
+        for f in self.ifg_files:
+            link = out_dir / f.name
+            link.symlink_to(f.resolve())
+            links.append(link)
+        estimate_interferometric_correlations(
+            links, window_size=(11, 11), num_workers=threads
+        )
+
+    def time_estimate_interferometric_correlations(self, size, nslc, threads):
+        self._run(threads)
+
+    def peakmem_estimate_interferometric_correlations(self, size, nslc, threads):
+        self._run(threads)
+
+
+class SimilarityBenchmark:
+    """Benchmark the phase similarity raster from a stack of interferograms."""
+
+    params = (SIZES, NSLCS, THREADS)
+    param_names = ["size", "nslc", "threads"]
+    number = 1
+    timeout = 600
+
+    def setup_cache(self):
+        for size in SIZES:
+            make_ifg_network(size)
+
+    def setup(self, size, nslc, threads):
+        utils.set_num_threads(threads)
+        self.ifg_files = get_network_files(size, nslc, "ifgs")
+        self.out_dirs: list[Path] = []
+
+    def teardown(self, size, nslc, threads):
+        for d in self.out_dirs:
+            shutil.rmtree(d, ignore_errors=True)
+
+    def _run(self, threads):
+        out_dir = make_output_dir("similarity_")
+        self.out_dirs.append(out_dir)
+        similarity.create_similarities(
+            self.ifg_files,
+            output_file=out_dir / "similarity.tif",
+            num_threads=threads,
+            add_overviews=False,
+        )
+
+    def time_create_similarities(self, size, nslc, threads):
+        self._run(threads)
+
+    def peakmem_create_similarities(self, size, nslc, threads):
+        self._run(threads)
+
+
+class FilteringBenchmark:
+    """Benchmark Goldstein filtering and PS-weighted interpolation of one ifg."""
+
+    params = (SIZES, THREADS)
+    param_names = ["size", "threads"]
+    number = 1
+    timeout = 600
+
+    def setup_cache(self):
+        for size in SIZES:
+            make_ifg_network(size)
+
+    def setup(self, size, threads):
+        utils.set_num_threads(threads)
+        ifg_file = get_network_files(size, 2, "ifgs")[0]
+        cor_file = get_network_files(size, 2, "cor")[0]
+        self.ifg = io.load_gdal(ifg_file)
+        self.weights = io.load_gdal(cor_file)
+        # Compile the numba functions outside of the timing
+        interpolate(self.ifg[:64, :64], self.weights[:64, :64])
+
+    def time_goldstein(self, size, threads):
+        goldstein(self.ifg, alpha=0.5)
+
+    def peakmem_goldstein(self, size, threads):
+        goldstein(self.ifg, alpha=0.5)
+
+    def time_interpolate(self, size, threads):
+        interpolate(self.ifg, self.weights, weight_cutoff=0.6)
+
+    def peakmem_interpolate(self, size, threads):
+        interpolate(self.ifg, self.weights, weight_cutoff=0.6)
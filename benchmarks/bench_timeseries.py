@@ -0,0 +1,101 @@
+"""Benchmarks of the network inversion and velocity estimation on GeoTIFFs."""
+
+import shutil
+from pathlib import Path
+
+from dolphin import utils
+from dolphin._types import ReferencePoint
+from dolphin.timeseries import InversionMethod, create_velocity, invert_unw_network
+
+from ._data import (
+    NSLCS,
+    SIZES,
+    THREADS,
+    get_network_files,
+    get_timeseries_files,
+    make_ifg_network,
+    make_output_dir,
+)
+
+REFERENCE = ReferencePoint(row=10, col=10)
+
+
+class InvertNetworkBenchmark:
+    """Benchmark the inversion of a small-baseline network of unwrapped ifgs."""
+
+    params = (SIZES, NSLCS, THREADS, [InversionMethod.L1, InversionMethod.L2])
+    param_names = ["size", "nslc", "threads", "method"]
+    number = 1
+    timeout = 1200
+
+    def setup_cache(self):
+        for size in SIZES:
+            make_ifg_network(size)
+
+    def setup(self, size, nslc, threads, method):
+        utils.set_num_threads(threads)
+        self.unw_files = get_network_files(size, nslc, "unw")
+        self.cor_files = get_network_files(size, nslc, "cor")
+        self.out_dirs: list[Path] = []
+
+    def teardown(self, size, nslc, threads, method):
+        for d in self.out_dirs:
+            shutil.rmtree(d, ignore_errors=True)
+
+    def _run(self, threads, method):
+        out_dir = make_output_dir("inversion_")
+        self.out_dirs.append(out_dir)
+        invert_unw_network(
+            unw_file_list=self.unw_files,
+            reference=REFERENCE,
+            output_dir=out_dir,
+            cor_file_list=self.cor_files,
+            method=method,
+            num_threads=threads,
+            add_overviews=False,
+        )
+
+    def time_invert_unw_network(self, size, nslc, threads, method):
+        self._run(threads, method)
+
+    def peakmem_invert_unw_network(self, size, nslc, threads, method):
+        self._run(threads, method)
+
+
+class VelocityBenchmark:
+    """Benchmark the per-pixel velocity fit."""
+
+    params = (SIZES, NSLCS, THREADS)
+    param_names = ["size", "nslc", "threads"]
+    number = 1
+    timeout = 600
+
+    def setup_cache(self):
+        for size in SIZES:
+            make_ifg_network(size)
+
+    def setup(self, size, nslc, threads):
+        utils.set_num_threads(threads)
+        self.timeseries_files = get_timeseries_files(size, nslc)
+        self.out_dirs: list[Path] = []
+
+    def teardown(self, size, nslc, threads):
+        for d in self.out_dirs:
+            shutil.rmtree(d, ignore_errors=True)
+
+    def _run(self, threads):
+        out_dir = make_output_dir("velocity_")
+        self.out_dirs.append(out_dir)
+        create_velocity(
+            unw_file_list=self.timeseries_files,
+            output_file=out_dir / "velocity.tif",
+            reference=REFERENCE,
+            num_threads=threads,
+            add_overviews=False,
+        )
+
+    def time_create_velocity(self, size, nslc, threads):
+        self._run(threads)
+
+    def peakmem_create_velocity(self, size, nslc, threads):
+        self._run(threads)
@@ -0,0 +1,131 @@
+"""Benchmarks of the PS and wrapped phase steps on GeoTIFF stacks."""
+
+import shutil
+from pathlib import Path
+
+from opera_utils import get_dates
+
+from dolphin import io, ps, utils
+from dolphin.stack import MiniStackInfo
+from dolphin.workflows import ShpMethod, single
+
+from ._data import (
+    NSLCS,
+    SIZES,
+    THREADS,
+    data_dir,
+    get_slc_files,
+    make_output_dir,
+    make_slc_stack,
+)
+
+HALF_WINDOW_DICT = {"x": 11, "y": 5}
+STRIDES_DICT = {"x": 6, "y": 3}
+
+
+def _create_ps(reader, like_filename, num_threads, out_dir=None):
+    if out_dir is None:
+        out_dir = make_output_dir("ps_")
+    ps.create_ps(
+        reader=reader,
+        output_file=out_dir / "ps_pixels.tif",
+        output_amp_mean_file=out_dir / "amp_mean.tif",
+        output_amp_dispersion_file=out_dir / "amp_dispersion.tif",
+        like_filename=like_filename,
+        num_read_threads=num_threads,
+    )
+    return out_dir
+
+
+def _get_amp_dir(size: int, nslc: int) -> Path:
+    return data_dir(size) / f"amp_{nslc}"
+
+
+class CreatePsBenchmark:
+    """Benchmark the amplitude dispersion and PS selection step."""
+
+    params = (SIZES, NSLCS, THREADS)
+    param_names = ["size", "nslc", "threads"]
+    number = 1
+    timeout = 600
+
+    def setup_cache(self):
+        for size in SIZES:
+            make_slc_stack(size)
+
+    def setup(self, size, nslc, threads):
+        utils.set_num_threads(threads)
+        self.slc_files = get_slc_files(size, nslc)
+        out_dir = make_output_dir("stack_")
+        self.reader = io.VRTStack(self.slc_files, outfile=out_dir / "stack.vrt")
+        self.out_dirs = [out_dir]
+
+    def teardown(self, size, nslc, threads):
+        for d in self.out_dirs:
+            shutil.rmtree(d, ignore_errors=True)
+
+    def time_create_ps(self, size, nslc, threads):
+        self.out_dirs.append(_create_ps(self.reader, self.slc_files[0], threads))
+
+    def peakmem_create_ps(self, size, nslc, threads):
+        self.out_dirs.append(_create_ps(self.reader, self.slc_files[0], threads))
+
+
+class WrappedPhaseSingleBenchmark:
+    """Benchmark phase linking of one ministack, from reading SLCs to writing."""
+
+    params = (SIZES, NSLCS, THREADS)
+    param_names = ["size", "nslc", "threads"]
+    number = 1
+    timeout = 1200
+
+    def setup_cache(self):
+        for size in SIZES:
+            make_slc_stack(size)
+            # The SHP search uses the amplitude statistics from the PS step,
+            # which are made here so they don't count towards the benchmarks
+            for nslc in NSLCS:
+                slc_files = get_slc_files(size, nslc)
+                amp_dir = _get_amp_dir(size, nslc)
+                amp_dir.mkdir(exist_ok=True)
+                vrt = io.VRTStack(slc_files, outfile=amp_dir / "stack.vrt")
+                _create_ps(vrt, slc_files[0], max(THREADS), out_dir=amp_dir)
+
+    def setup(self, size, nslc, threads):
+        utils.set_num_threads(threads)
+        slc_files = get_slc_files(size, nslc)
+        self.vrt_file = _get_amp_dir(size, nslc) / "stack.vrt"
+        self.ministack = MiniStackInfo(
+            file_list=slc_files,
+            dates=[get_dates(f) for f in slc_files],
+            is_compressed=[False] * len(slc_files),
+        )
+        self.amp_mean_file = _get_amp_dir(size, nslc) / "amp_mean.tif"
+        self.amp_dispersion_file = _get_amp_dir(size, nslc) / "amp_dispersion.tif"
+        self.out_dirs: list[Path] = []
+
+    def teardown(self, size, nslc, threads):
+        for d in self.out_dirs:
+            shutil.rmtree(d, ignore_errors=True)
+
+    def _run(self, threads):
+        out_dir = make_output_dir("single_")
+        self.out_dirs.append(out_dir)
+        single.run_wrapped_phase_single(
+            slc_vrt_file=self.vrt_file,
+            ministack=self.ministack,
+            output_folder=out_dir,
+            half_window=HALF_WINDOW_DICT,
+            strides=STRIDES_DICT,
+            amp_mean_file=self.amp_mean_file,
+            amp_dispersion_file=self.amp_dispersion_file,
+            shp_method=ShpMethod.GLRT,
+            block_shape=(512, 512),
+            num_read_threads=threads,
+        )
+
+    def time_run_wrapped_phase_single(self, size, nslc, threads):
+        self._run(threads)
+
+    def peakmem_run_wrapped_phase_single(self, size, nslc, threads):
+        self._run(threads)
@@ -0,0 +1,409 @@
+#!/usr/bin/env python
+"""Measure how `displacement.run` scales with the parallelism settings.
+
+Sweeps `worker_settings.n_parallel_bursts`, `worker_settings.threads_per_worker`
+and `timeseries_options.num_parallel_blocks` on a synthetic multi-burst stack
+(made with `dolphin.phase_link.simulate`), running each setting in a new
+process.
+
+Two sweeps are supported:
+
+- "strong": the same dataset (the largest number of bursts) for every setting,
+- "weak": the number of bursts grows with `n_parallel_bursts`, so each burst
+  worker always has the same amount of work.
+
+Each run's throughput is reported in pixels * dates per second, along with the
+parallel efficiency relative to the least parallel setting: the throughput
+speedup divided by the increase in the number of workers
+(`n_parallel_bursts * threads_per_worker`, times `num_parallel_blocks` when
+the time series inversion is run).
+An efficiency well below 1 points to GIL contention, oversubscription between
+the JAX/numba/BLAS thread pools, or saturated I/O; rerun with `--profile` to
+get the per-stage statistics of each run.
+
+`num_parallel_blocks` is only used by the time series inversion, which needs
+unwrapped interferograms, so pass `--unwrap-method` to include it.
+
+Example
+-------
+    python benchmarks/scaling.py --work-dir scaling --bursts 1 2 4 --threads 1 4
+"""
+
+from __future__ import annotations
+
+import argparse
+import csv
+import datetime
+import itertools
+import os
+import subprocess
+import sys
+import time
+from dataclasses import asdict, dataclass
+from pathlib import Path
+from typing import Optional, Sequence
+
+import numpy as np
+
+from dolphin import io, utils
+from dolphin.phase_link import simulate
+from dolphin.workflows.config import DisplacementWorkflow
+
+BURST_ID_TEMPLATE = "t042_{:06d}_iw2"
+FIRST_BURST = 88_900
+START_DATE = datetime.datetime(2022, 1, 1)
+DATE_SPACING = datetime.timedelta(days=12)
+EPSG = 32615
+PIXEL_SIZE = (5.0, -10.0)
+# Fraction of rows which neighboring bursts share
+BURST_OVERLAP = 0.1
+
+
+@dataclass
+class ScalingResult:
+    """Timing of one `displacement.run` with one parallelism setting."""
+
+    n_parallel_bursts: int
+    threads_per_worker: int
+    num_parallel_blocks: int
+    num_bursts: int
+    num_workers: int
+    """Workers used: `n_parallel_bursts * threads_per_worker`, times
+    `num_parallel_blocks` if the time series inversion was run."""
+    wall_seconds: float
+    peak_rss_mb: float
+    """Peak resident memory of the largest process of the run."""
+    throughput: float
+    """Pixels * dates processed per second."""
+    speedup: float = 1.0
+    """Throughput relative to the least parallel setting."""
+    efficiency: float = 1.0
+    """Speedup divided by the increase in the number of workers."""
+
+
+def make_dataset(
+    out_dir: Path,
+    num_bursts: int,
+    nslc: int,
+    shape: tuple[int, int],
+) -> dict[str, list[Path]]:
+    """Write a stack of simulated SLC GeoTIFFs for each of `num_bursts` bursts.
+
+    The SLCs have a decorrelating coherence matrix from `simulate.simulate_coh`
+    and a growing Gaussian deformation signal. Bursts are stacked in the
+    y-direction, overlapping by `BURST_OVERLAP` of their rows.
+    Existing files are reused.
+
+    Returns
+    -------
+    dict[str, list[Path]]
+        Mapping of burst ID to the SLC files of that burst.
+
+    """
+    out_dir.mkdir(parents=True, exist_ok=True)
+    rows, cols = shape
+    dates = [START_DATE + i * DATE_SPACING for i in range(nslc)]
+    y_step = round(rows * (1 - BURST_OVERLAP)) * PIXEL_SIZE[1]
+
+    burst_files: dict[str, list[Path]] = {}
+    for b in range(num_bursts):
+        burst_id = BURST_ID_TEMPLATE.format(FIRST_BURST + b)
+        files = [out_dir / f"{burst_id}_{d:%Y%m%d}.tif" for d in dates]
+        burst_files[burst_id] = files
+        if all(f.exists() for f in files):
+            continue
+
+        print(f"Simulating {nslc} SLCs of shape {shape} for {burst_id}")
+        coh_matrix, _ = simulate.simulate_coh(
+            num_acq=nslc, gamma_inf=0.3, gamma0=0.99, Tau0=72
+        )
+        samples = simulate.simulate_neighborhood_stack(
+            coh_matrix, neighbor_samples=rows * cols
+        ).reshape(nslc, rows, cols)
+        defo = simulate.make_defo_stack((nslc, rows, cols), sigma=rows / 6)
+        slcs = (samples * np.exp(1j * 5 * defo)).astype(np.complex64)
+
+        y0 = 4_000_000.0 + b * y_step
+        geotransform = [500_000.0, PIXEL_SIZE[0], 0.0, y0, 0.0, PIXEL_SIZE[1]]
+        for f, slc in zip(files, slcs):
+            io.write_arr(
+                arr=slc,
+                output_name=f,
+                geotransform=geotransform,
+                projection=EPSG,
+                options=io.DEFAULT_TIFF_OPTIONS,
+            )
+    return burst_files
+
+
+def run_setting(
+    run_dir: Path,
+    slc_files: Sequence[Path],
+    n_parallel_bursts: int,
+    threads_per_worker: int,
+    num_parallel_blocks: int,
+    unwrap_method: Optional[str] = None,
+    profile: bool = False,
+) -> tuple[float, float]:
+    """Run `displacement.run` in a new process.
+
+    Returns
+    -------
+    wall_seconds : float
+        Wall time of the run, including starting the process.
+    peak_rss_mb : float
+        Peak resident memory of the largest process of the run.
+
+    """
+    run_dir.mkdir(parents=True, exist_ok=True)
+    cfg = DisplacementWorkflow(
+        cslc_file_list=list(slc_files),
+        work_directory=run_dir,
+        worker_settings={
+            "n_parallel_bursts": n_parallel_bursts,
+            "threads_per_worker": threads_per_worker,
+            "enable_profiling": profile,
+        },
+        timeseries_options={"num_parallel_blocks": num_parallel_blocks},
+        unwrap_options=(
+            {"run_unwrap": False}
+            if unwrap_method is None
+            else {"unwrap_method": unwrap_method}
+        ),
+    )
+    config_file = run_dir / "dolphin_config.yaml"
+    cfg.to_yaml(config_file)
+
+    t0 = time.perf_counter()
+    proc = subprocess.Popen(
+        [sys.executable, "-m", "dolphin", "run", str(config_file)],
+        stdout=subprocess.DEVNULL,
+    )
+    # Use `wait4` to get the memory use of this run alone
+    _, status, rusage = os.wait4(proc.pid, 0)
+    wall_seconds = time.perf_counter() - t0
+    if os.waitstatus_to_exitcode(status) != 0:
+        msg = f"displacement.run failed for {config_file}"
+        raise RuntimeError(msg)
+    # ru_maxrss is in KB on Linux, bytes on macOS
+    scale = 2**20 if sys.platform == "darwin" else 2**10
+    return wall_seconds, rusage.ru_maxrss / scale
+
+
+def run_sweep(
+    work_dir: Path,
+    bursts: Sequence[int],
+    threads: Sequence[int],
+    blocks: Sequence[int],
+    mode: str = "strong",
+    nslc: int = 15,
+    shape: tuple[int, int] = (1024, 1024),
+    unwrap_method: Optional[str] = None,
+    profile: bool = False,
+) -> list[ScalingResult]:
+    """Run `displacement.run` for every combination of the parallelism settings.
+
+    Parameters
+    ----------
+    work_dir : Path
+        Directory for the simulated SLCs and each run's outputs.
+    bursts : Sequence[int]
+        Values of `n_parallel_bursts` to run.
+    threads : Sequence[int]
+        Values of `threads_per_worker` to run.
+    blocks : Sequence[int]
+        Values of `num_parallel_blocks` to run.
+    mode : str
+        "strong" to process `max(bursts)` bursts in every run, or "weak" to
+        process `n_parallel_bursts` bursts. Default is "strong".
+    nslc : int
+        Number of SLC dates per burst. Default is 15.
+    shape : tuple[int, int]
+        (rows, cols) of each burst. Default is (1024, 1024).
+    unwrap_method : str, optional
+        Unwrapping method. If None (default), the unwrapping and time series
+        steps are skipped.
+    profile : bool
+        Save the per-stage statistics of each run. Default is False.
+
+    Returns
+    -------
+    list[ScalingResult]
+        One result per setting, with the speedup and efficiency filled in.
+
+    """
+    if mode not in ("strong", "weak"):
+        msg = f"mode must be 'strong' or 'weak', got {mode!r}"
+        raise ValueError(msg)
+    if unwrap_method is None and len(blocks) > 1:
+        print("Warning: num_parallel_blocks has no effect without --unwrap-method")
+    burst_files = make_dataset(work_dir / "slcs", max(bursts), nslc, shape)
+    burst_ids = list(burst_files)
+
+    results = []
+    for n_bursts, n_threads, n_blocks in itertools.product(bursts, threads, blocks):
+        num_bursts = max(bursts) if mode == "strong" else n_bursts
+        slc_files = list(
+            itertools.chain.from_iterable(
+                burst_files[b] for b in burst_ids[:num_bursts]
+            )
+        )
+        run_dir = work_dir / f"{mode}_b{n_bursts}_t{n_threads}_k{n_blocks}"
+        print(
+            f"Running {num_bursts} bursts with n_parallel_bursts={n_bursts},"
+            f" threads_per_worker={n_threads}, num_parallel_blocks={n_blocks}"
+        )
+        wall_seconds, peak_rss_mb = run_setting(
+            run_dir,
+            slc_files,
+            n_parallel_bursts=n_bursts,
+            threads_per_worker=n_threads,
+            num_parallel_blocks=n_blocks,
+            unwrap_method=unwrap_method,
+            profile=profile,
+        )
+        pixel_dates = num_bursts * shape[0] * shape[1] * nslc
+        results.append(
+            ScalingResult(
+                n_parallel_bursts=n_bursts,
+                threads_per_worker=n_threads,
+                num_parallel_blocks=n_blocks,
+                num_bursts=num_bursts,
+                num_workers=n_bursts * n_threads * (n_blocks if unwrap_method else 1),
+                wall_seconds=wall_seconds,
+                peak_rss_mb=peak_rss_mb,
+                throughput=pixel_dates / wall_seconds,
+            )
+        )
+
+    _add_efficiency(results)
+    return results
+
+
+def _add_efficiency(results: Sequence[ScalingResult]) -> None:
+    baseline = min(results, key=lambda r: (r.num_workers, -r.throughput))
+    for r in results:
+        r.speedup = r.throughput / baseline.throughput
+        r.efficiency = r.speedup / (r.num_workers / baseline.num_workers)
+
+
+def write_report(results: Sequence[ScalingResult], out_dir: Path, mode: str) -> Path:
+    """Save the results as a CSV file, a Markdown table and a plot.
+
+    Returns
+    -------
+    Path
+        The Markdown report.
+
+    """
+    rows = [asdict(r) for r in results]
+    with open(out_dir / f"scaling_{mode}.csv", "w", newline="") as f:
+        writer = csv.DictWriter(f, fieldnames=list(rows[0]))
+        writer.writeheader()
+        writer.writerows(rows)
+
+    header = (
+        "| bursts | threads | blocks | workers | wall (s) | peak RSS (MB)"
+        " | pixels*dates/s | speedup | efficiency |"
+    )
+    lines = [
+        f"# {mode.capitalize()} scaling of `displacement.run`",
+        "",
+        f"{utils.get_cpu_count()} CPUs available.",
+        "",
+        header,
+        "|" + "---|" * header.count(" | ") + "---|",
+    ]
+    for r in sorted(results, key=lambda r: (r.num_workers, r.n_parallel_bursts)):
+        lines.append(
+            f"| {r.n_parallel_bursts} | {r.threads_per_worker}"
+            f" | {r.num_parallel_blocks} | {r.num_workers} | {r.wall_seconds:.1f}"
+            f" | {r.peak_rss_mb:.0f} | {r.throughput:.3g} | {r.speedup:.2f}"
+            f" | {r.efficiency:.2f} |"
+        )
+    report_file = out_dir / f"scaling_{mode}.md"
+    report_file.write_text("\n".join(lines) + "\n")
+
+    try:
+        _plot(results, out_dir / f"scaling_{mode}.png", mode)
+    except ImportError:
+        print("matplotlib is not installed, skipping the plot")
+    return report_file
+
+
+def _plot(results: Sequence[ScalingResult], filename: Path, mode: str) -> None:
+    import matplotlib.pyplot as plt
+
+    fig, (ax_tp, ax_eff) = plt.subplots(ncols=2, figsize=(11, 4.5))
+    # One line per (threads, blocks), across n_parallel_bursts
+    groups: dict[tuple[int, int], list[ScalingResult]] = {}
+    for r in results:
+        groups.setdefault((r.threads_per_worker, r.num_parallel_blocks), []).append(r)
+    for (n_threads, n_blocks), unsorted_group in sorted(groups.items()):
+        group = sorted(unsorted_group, key=lambda r: r.num_workers)
+        workers = [r.num_workers for r in group]
+        label = f"threads={n_threads}, blocks={n_blocks}"
+        ax_tp.plot(workers, [r.throughput for r in group], "o-", label=label)
+        ax_eff.plot(workers, [r.efficiency for r in group], "o-", label=label)
+
+    ax_eff.axhline(1.0, color="k", ls="--", lw=1, label="ideal")
+    for ax in (ax_tp, ax_eff):
+        ax.set_xscale("log", base=2)
+        ax.set_xlabel("workers")
+    ax_tp.set_yscale("log")
+    ax_tp.set_ylabel("pixels * dates / s")
+    ax_eff.set_ylabel("parallel efficiency")
+    ax_eff.set_ylim(0, 1.2)
+    ax_eff.legend(fontsize="small")
+    fig.suptitle(f"{mode.capitalize()} scaling of displacement.run")
+    fig.tight_layout()
+    fig.savefig(filename, dpi=120)
+    plt.close(fig)
+
+
+def main(args: Optional[Sequence[str]] = None) -> None:
+    parser = argparse.ArgumentParser(
+        description=__doc__.split("\n")[0],
+        formatter_class=argparse.ArgumentDefaultsHelpFormatter,
+    )
+    parser.add_argument("--work-dir", type=Path, default=Path("scaling"))
+    parser.add_argument("--mode", choices=["strong", "weak"], default="strong")
+    parser.add_argument(
+        "--bursts", type=int, nargs="+", default=[1, 2, 4], help="n_parallel_bursts"
+    )
+    parser.add_argument(
+        "--threads", type=int, nargs="+", default=[1, 2, 4], help="threads_per_worker"
+    )
+    parser.add_argument(
+        "--blocks", type=int, nargs="+", default=[4], help="num_parallel_blocks"
+    )
+    parser.add_argument("--nslc", type=int, default=15, help="SLC dates per burst")
+    parser.add_argument(
+        "--shape", type=int, nargs=2, default=[1024, 1024], help="Burst rows, cols"
+    )
+    parser.add_argument(
+        "--unwrap-method",
+        help="Unwrap and invert the network with this method (default: skip)",
+    )
+    parser.add_argument(
+        "--profile", action="store_true", help="Save per-stage profiles of each run"
+    )
+    parsed = parser.parse_args(args)
+
+    results = run_sweep(
+        parsed.work_dir,
+        bursts=parsed.bursts,
+        threads=parsed.threads,
+        blocks=parsed.blocks,
+        mode=parsed.mode,
+        nslc=parsed.nslc,
+        shape=tuple(parsed.shape),
+        unwrap_method=parsed.unwrap_method,
+        profile=parsed.profile,
+    )
+    report_file = write_report(results, parsed.work_dir, parsed.mode)
+    print(report_file.read_text())
+
+
+if __name__ == "__main__":
+    main()
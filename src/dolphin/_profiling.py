@@ -0,0 +1,274 @@
+"""Per-stage profiling of wall time, CPU time, I/O, memory, and block counts.
+
+Profiling is off by default, and the instrumented code paths only pay for a
+flag check. When enabled (e.g. with `WorkerSettings.enable_profiling`):
+
+- each pipeline stage is logged through the `dolphin` logger, so the JSON log
+  file gets one record per stage with its statistics under the `profile` key;
+- every stage and block function call is recorded as a Chrome trace event,
+  which can be saved with `write_trace` and opened in Perfetto or
+  chrome://tracing.
+
+Statistics are for the whole process: I/O counters and CPU time include all
+threads which ran during a stage, and the peak memory is the process's
+high-water mark (with the increase during the stage recorded separately).
+Work done in child processes is only recorded if profiling is also enabled
+there (e.g. each burst of `wrapped_phase.run` writes its own trace).
+"""
+
+from __future__ import annotations
+
+import json
+import logging
+import os
+import threading
+import time
+from collections.abc import Callable, Iterator
+from contextlib import contextmanager
+from dataclasses import asdict, dataclass, field
+from functools import wraps
+from pathlib import Path
+from typing import Optional
+
+from dolphin._types import P, PathOrStr, T
+from dolphin.utils import get_max_memory_usage
+
+__all__ = [
+    "StageStats",
+    "disable_profiling",
+    "enable_profiling",
+    "is_profiling",
+    "log_summary",
+    "profile",
+    "stage",
+    "write_trace",
+]
+
+logger = logging.getLogger(__name__)
+
+
+@dataclass
+class StageStats:
+    """Statistics recorded for one run of a stage or block function."""
+
+    name: str
+    category: str
+    wall_seconds: float = 0.0
+    cpu_seconds: float = 0.0
+    bytes_read: Optional[int] = None
+    """Bytes read by the process during the stage (None if unavailable)."""
+    bytes_written: Optional[int] = None
+    """Bytes written by the process during the stage (None if unavailable)."""
+    peak_rss_mb: float = 0.0
+    """Peak resident memory of the process so far, at the end of the stage.
+
+    This is the process-wide high-water mark (`ru_maxrss`), so it includes
+    the memory of earlier stages and of other threads.
+    """
+    peak_rss_increase_mb: float = 0.0
+    """Increase of `peak_rss_mb` during the stage.
+
+    Nonzero only for the stages which raised the process's high-water mark.
+    """
+    blocks: int = 0
+    """Number of block function calls which finished during the stage."""
+    counts: dict[str, float] = field(default_factory=dict)
+    """Extra counters added with `add`."""
+
+    def add(self, **counts: float) -> None:
+        """Add to custom counters (e.g. `stats.add(pixels=1000)`)."""
+        for key, value in counts.items():
+            self.counts[key] = self.counts.get(key, 0) + value
+
+
+class _Profiler:
+    def __init__(self):
+        self.enabled = False
+        self._lock = threading.Lock()
+        self.reset()
+
+    def reset(self) -> None:
+        with self._lock:
+            self.num_blocks = 0
+            self._origin = time.perf_counter()
+            self._events: list[dict] = []
+            self._totals: dict[tuple[str, str], dict[str, float]] = {}
+
+    def record(self, stats: StageStats, start: float) -> None:
+        event = {
+            "name": stats.name,
+            "cat": stats.category,
+            "ph": "X",
+            "ts": (start - self._origin) * 1e6,
+            "dur": stats.wall_seconds * 1e6,
+            "pid": os.getpid(),
+            "tid": threading.get_ident(),
+            "args": {
+                k: v for k, v in asdict(stats).items() if k not in ("name", "category")
+            },
+        }
+        with self._lock:
+            if stats.category == "block":
+                self.num_blocks += 1
+            self._events.append(event)
+            totals = self._totals.setdefault(
+                (stats.category, stats.name),
+                {"calls": 0, "wall_seconds": 0.0, "cpu_seconds": 0.0},
+            )
+            totals["calls"] += 1
+            totals["wall_seconds"] += stats.wall_seconds
+            totals["cpu_seconds"] += stats.cpu_seconds
+
+
+_PROFILER = _Profiler()
+
+
+def enable_profiling(reset: bool = False) -> None:
+    """Turn on recording of stage statistics and trace events.
+
+    Parameters
+    ----------
+    reset : bool
+        Discard the events and totals recorded so far (e.g. by an earlier
+        workflow run in the same process). Default is False.
+
+    """
+    if reset:
+        _PROFILER.reset()
+    _PROFILER.enabled = True
+
+
+def disable_profiling() -> None:
+    """Turn off recording. Already recorded events are kept."""
+    _PROFILER.enabled = False
+
+
+def is_profiling() -> bool:
+    """Check if profiling is enabled."""
+    return _PROFILER.enabled
+
+
+@contextmanager
+def stage(name: str, category: str = "stage") -> Iterator[StageStats]:
+    """Record the statistics of the code run inside the context.
+
+    Parameters
+    ----------
+    name : str
+        Name of the stage (e.g. "phase_linking").
+    category : str
+        "stage" for pipeline steps, which are also logged when they finish,
+        or "block" for functions called once per block, which are only
+        recorded in the trace and the summary.
+        Default is "stage".
+
+    Yields
+    ------
+    StageStats
+        The statistics, filled in when the context exits.
+
+    """
+    stats = StageStats(name=name, category=category)
+    if not _PROFILER.enabled:
+        yield stats
+        return
+
+    io_start = _read_io_counters()
+    rss_start = get_max_memory_usage(units="MB", children=False)
+    blocks_start = _PROFILER.num_blocks
+    cpu_start = time.process_time()
+    start = time.perf_counter()
+    try:
+        yield stats
+    finally:
+        stats.wall_seconds = time.perf_counter() - start
+        stats.cpu_seconds = time.process_time() - cpu_start
+        io_end = _read_io_counters()
+        if io_start is not None and io_end is not None:
+            stats.bytes_read = io_end[0] - io_start[0]
+            stats.bytes_written = io_end[1] - io_start[1]
+        stats.peak_rss_mb = get_max_memory_usage(units="MB", children=False)
+        stats.peak_rss_increase_mb = stats.peak_rss_mb - rss_start
+        stats.blocks = _PROFILER.num_blocks - blocks_start
+        _PROFILER.record(stats, start)
+        if category == "stage":
+            logger.info(
+                f"{name} finished in {stats.wall_seconds:.2f} s"
+                f" ({stats.cpu_seconds:.2f} s CPU, {stats.blocks} blocks)",
+                extra={"profile": asdict(stats)},
+            )
+
+
+def profile(
+    name: Optional[str] = None, category: str = "block"
+) -> Callable[[Callable[P, T]], Callable[P, T]]:
+    """Decorate a function to record each call as a `stage`.
+
+    Parameters
+    ----------
+    name : str, optional
+        Name to record the calls under. Default is the function's name.
+    category : str
+        Category of the calls, "block" (default) or "stage".
+
+    Usage
+    -----
+    @profile("ps")
+    def calc_ps_block(...):
+        ...
+
+    """
+
+    def decorator(f: Callable[P, T]) -> Callable[P, T]:
+        stage_name = name or f.__name__
+
+        @wraps(f)
+        def wrapper(*args: P.args, **kwargs: P.kwargs) -> T:
+            if not _PROFILER.enabled:
+                return f(*args, **kwargs)
+            with stage(stage_name, category=category):
+                return f(*args, **kwargs)
+
+        return wrapper
+
+    return decorator
+
+
+def log_summary() -> None:
+    """Log the total time spent in each recorded stage and block function."""
+    with _PROFILER._lock:
+        totals = dict(_PROFILER._totals)
+    for (category, name), total in sorted(
+        totals.items(), key=lambda item: -item[1]["wall_seconds"]
+    ):
+        logger.info(
+            f"{category} {name}: {int(total['calls'])} calls,"
+            f" {total['wall_seconds']:.2f} s total"
+            f" ({total['cpu_seconds']:.2f} s CPU)",
+            extra={"profile_summary": {"name": name, "category": category, **total}},
+        )
+
+
+def write_trace(filename: PathOrStr) -> Path:
+    """Save the recorded events as a Chrome trace (Perfetto) JSON file."""
+    with _PROFILER._lock:
+        events = list(_PROFILER._events)
+    out = Path(filename)
+    with open(out, "w") as f:
+        json.dump({"traceEvents": events, "displayTimeUnit": "ms"}, f)
+    logger.info(f"Saved {len(events)} profiling events to {out}")
+    return out
+
+
+def _read_io_counters() -> Optional[tuple[int, int]]:
+    """Get the (bytes read, bytes written) by this process so far.
+
+    Uses the `rchar`/`wchar` counts from /proc, so includes reads served by
+    the page cache. Returns None on systems without /proc.
+    """
+    try:
+        with open("/proc/self/io") as f:
+            counters = dict(line.split(": ") for line in f.read().splitlines())
+        return int(counters["rchar"]), int(counters["wchar"])
+    except (OSError, KeyError, ValueError):
+        return None
@@ -1,11 +1,15 @@
 from typing import Any
 
-from .ionosphere import estimate_ionospheric_delay
-from .troposphere import estimate_tropospheric_delay
+from .corrections import apply_corrections
+from .ionosphere import estimate_ionospheric_delay, get_ionospheric_delays
+from .troposphere import estimate_tropospheric_delay, get_tropospheric_delays
 
 __all__ = [
+    "apply_corrections",
     "estimate_ionospheric_delay",
     "estimate_tropospheric_delay",
+    "get_ionospheric_delays",
+    "get_tropospheric_delays",
 ]
 
 
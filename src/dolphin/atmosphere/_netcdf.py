@@ -1,12 +1,16 @@
 from __future__ import annotations
 
 import datetime
+import hashlib
 import itertools
 import logging
 import multiprocessing as mp
+import shutil
+import tempfile
 from collections import defaultdict
+from concurrent.futures import ProcessPoolExecutor
 from pathlib import Path
-from typing import Iterable, Optional, Union
+from typing import Iterable, Optional, Sequence, Union
 
 import numpy as np
 import xarray
@@ -14,13 +18,17 @@ from pyproj import CRS, Transformer
 from scipy.interpolate import RegularGridInterpolator as Interpolator
 
 from dolphin._types import Filename, TropoModel
+from dolphin.utils import DummyProcessPoolExecutor
 
 logger = logging.getLogger(__name__)
 
 ###########
 # Mostly inherited from RAiDER
 
-__all__ = ["delay_from_netcdf"]
+__all__ = ["delay_from_netcdf", "get_processed_file", "preprocess_netcdf_files"]
+
+DEFAULT_CACHE_DIR = Path(tempfile.gettempdir()) / "dolphin_weather_models"
+"""Where converted weather model files are stored, if no `cache_dir` is given."""
 
 
 def delay_from_netcdf(
@@ -30,6 +38,7 @@ def delay_from_netcdf(
     height_levels: Optional[list[float]],
     out_proj: Union[int, str] = 4326,
     weather_model: TropoModel = TropoModel.ECMWF,
+    cache_dir: Optional[Filename] = None,
 ):
     """Calculate integrated delays on query points.
 
@@ -48,6 +57,10 @@ def delay_from_netcdf(
         (optional) EPSG code for output projection
     weather_model: TropoModel
         weather model  (ECMWF or HRES)
+    cache_dir: Filename
+        (optional) directory of converted weather model files, used if
+        `weather_model_file` has not been pre-processed.
+        Default is `DEFAULT_CACHE_DIR`.
 
     Returns
     -------
@@ -56,22 +69,7 @@ def delay_from_netcdf(
 
     """
     # Load CRS from weather model file
-    with xarray.load_dataset(weather_model_file) as ds:
-        # The dataset in the original netcdf that is download includes:
-        # t, z, q and lnsp
-        # The converted netcdf to the format usable for our purpose consists of
-        # calculated datasets of hydro and wet. so in the following we check for
-        # the netcdf file to include those data and if not, we convert it
-        if "hydro" in ds:
-            wmodel_file = weather_model_file
-        else:
-            wmodel_file = convert_netcdf(
-                weather_model_file=weather_model_file,
-                lat_lon_bounds=SNWE,
-                weather_model_output_dir="./tmp",
-                weather_model=weather_model,
-            )
-
+    with xarray.open_dataset(weather_model_file) as ds:
         try:
             wm_proj = CRS.from_wkt(ds["proj"].attrs["crs_wkt"])
         except KeyError:
@@ -81,8 +79,15 @@ def delay_from_netcdf(
             )
             wm_proj = CRS.from_epsg(4326)
 
+    wmodel_file = get_processed_file(
+        weather_model_file,
+        lat_lon_bounds=SNWE,
+        cache_dir=cache_dir,
+        weather_model=weather_model,
+    )
+
     # get heights
-    with xarray.load_dataset(wmodel_file) as ds:
+    with xarray.open_dataset(wmodel_file) as ds:
         wm_levels = ds.z.values
 
     if height_levels is None:
@@ -95,6 +100,132 @@ def delay_from_netcdf(
     return ds
 
 
+def get_processed_file(
+    weather_model_file: Filename,
+    lat_lon_bounds: tuple[float, float, float, float],
+    cache_dir: Optional[Filename] = None,
+    weather_model: TropoModel = TropoModel.ECMWF,
+) -> Path:
+    """Get the pre-processed version of a weather model file, converting it once.
+
+    Conversions are stored in `cache_dir` under a hash of the file contents,
+    the bounds and the weather model, so each raw file is converted once and
+    later calls (or other runs sharing `cache_dir`) reuse the result.
+
+    Parameters
+    ----------
+    weather_model_file: Filename
+        The raw ECMWF/HRES NetCDF weather model file, or an already
+        pre-processed one (which is returned as is).
+    lat_lon_bounds: tuple[float, float, float, float]
+        SNWE bounding box to clip the weather model to.
+    cache_dir: Filename
+        (optional) directory of converted files. Default is `DEFAULT_CACHE_DIR`.
+    weather_model: TropoModel
+        weather model  (ECMWF or HRES)
+
+    Returns
+    -------
+    Path
+        The pre-processed NetCDF file, with the `hydro` and `wet` delays.
+
+    """
+    # The dataset in the original netcdf that is download includes:
+    # t, z, q and lnsp
+    # The converted netcdf to the format usable for our purpose consists of
+    # calculated datasets of hydro and wet. so in the following we check for
+    # the netcdf file to include those data and if not, we convert it
+    with xarray.open_dataset(weather_model_file) as ds:
+        if "hydro" in ds:
+            return Path(weather_model_file)
+
+    cache_dir = Path(cache_dir) if cache_dir is not None else DEFAULT_CACHE_DIR
+    key = _get_cache_key(weather_model_file, lat_lon_bounds, weather_model)
+    out_dir = cache_dir / key
+    existing = sorted(out_dir.glob("*.nc"))
+    if existing:
+        logger.debug(f"Using converted {existing[0]} for {weather_model_file}")
+        return existing[0]
+
+    # Convert into a temporary directory, then rename it into place, so an
+    # interrupted or concurrent conversion never leaves a partial entry
+    cache_dir.mkdir(parents=True, exist_ok=True)
+    temp_dir = Path(tempfile.mkdtemp(prefix=f"{key}.", dir=cache_dir))
+    try:
+        output_file = convert_netcdf(
+            weather_model_file=weather_model_file,
+            lat_lon_bounds=lat_lon_bounds,
+            weather_model_output_dir=temp_dir,
+            weather_model=weather_model,
+        )
+        try:
+            temp_dir.rename(out_dir)
+        except OSError:
+            # Another process finished the same conversion first
+            logger.debug(f"{out_dir} already exists, discarding {temp_dir}")
+    finally:
+        shutil.rmtree(temp_dir, ignore_errors=True)
+    return out_dir / Path(output_file).name
+
+
+def preprocess_netcdf_files(
+    weather_model_files: Sequence[Filename],
+    lat_lon_bounds: tuple[float, float, float, float],
+    cache_dir: Optional[Filename] = None,
+    weather_model: TropoModel = TropoModel.ECMWF,
+    num_workers: int = 4,
+) -> dict[Filename, Path]:
+    """Convert several weather model files (e.g. dates) concurrently.
+
+    Parameters
+    ----------
+    weather_model_files: Sequence[Filename]
+        Raw (or already pre-processed) weather model files.
+    lat_lon_bounds: tuple[float, float, float, float]
+        SNWE bounding box to clip the weather models to.
+    cache_dir: Filename
+        (optional) directory of converted files. Default is `DEFAULT_CACHE_DIR`.
+    weather_model: TropoModel
+        weather model  (ECMWF or HRES)
+    num_workers: int
+        Number of files to convert in parallel processes. Default is 4.
+
+    Returns
+    -------
+    dict[Filename, Path]
+        Mapping from each input file to its pre-processed file.
+
+    """
+    Executor = (
+        ProcessPoolExecutor
+        if num_workers > 1 and len(weather_model_files) > 1
+        else DummyProcessPoolExecutor
+    )
+    ctx = mp.get_context("spawn")
+    with Executor(max_workers=num_workers, mp_context=ctx) as exc:
+        processed_files = exc.map(
+            get_processed_file,
+            weather_model_files,
+            [lat_lon_bounds] * len(weather_model_files),
+            [cache_dir] * len(weather_model_files),
+            [weather_model] * len(weather_model_files),
+        )
+        return dict(zip(weather_model_files, processed_files))
+
+
+def _get_cache_key(
+    weather_model_file: Filename,
+    lat_lon_bounds: tuple[float, float, float, float],
+    weather_model: TropoModel,
+) -> str:
+    h = hashlib.sha256()
+    with open(weather_model_file, "rb") as f:
+        for chunk in iter(lambda: f.read(2**20), b""):
+            h.update(chunk)
+    h.update(repr((tuple(lat_lon_bounds), weather_model.value)).encode())
+    return h.hexdigest()[:32]
+
+
 def transform_bbox(snwe_in, dest_crs=4326, src_crs=4326, margin=100.0):
     """Transform bbox to lat/lon or another CRS for use with rest of workflow.
 
@@ -254,28 +385,21 @@ def _make_shared_raw(inarr):
 
 
 def _build_cube(xpts, ypts, zpts, model_crs, pts_crs, interpolators):
-    """Iterate over interpolators and build a cube using Zenith."""
-    # Create a regular 2D grid
-    xx, yy = np.meshgrid(xpts, ypts)
-
-    # Output arrays
-    outputArrs = [
-        np.zeros((zpts.size, ypts.size, xpts.size)) for mm in range(len(interpolators))
-    ]
-
-    # Loop over heights and compute delays
-    for ii, ht in enumerate(zpts):
-        # pts is in weather model system;
-        if model_crs != pts_crs:
-            # lat / lon / height for hrrr
-            pts = transform_points(yy, xx, np.full(yy.shape, ht), pts_crs, model_crs)
-        else:
-            pts = np.stack([yy, xx, np.full(yy.shape, ht)], axis=-1)
-
-        for mm, intp in enumerate(interpolators):
-            outputArrs[mm][ii, ...] = intp(pts)
-
-    return outputArrs
+    """Iterate over interpolators and build a cube using Zenith.
+
+    All heights are transformed and interpolated in one call per interpolator.
+    """
+    # Create the regular 3D grid
+    zz, yy, xx = np.meshgrid(zpts, ypts, xpts, indexing="ij")
+
+    # pts is in weather model system;
+    if model_crs != pts_crs:
+        # lat / lon / height for hrrr
+        pts = transform_points(yy, xx, zz, pts_crs, model_crs)
+    else:
+        pts = np.stack([yy, xx, zz], axis=-1)
+
+    return [intp(pts) for intp in interpolators]
 
 
 def transform_points(
@@ -0,0 +1,105 @@
+from __future__ import annotations
+
+import logging
+from pathlib import Path
+from typing import Callable, Protocol, Sequence
+
+import numpy as np
+
+from dolphin import io
+
+logger = logging.getLogger(__name__)
+
+__all__ = ["Delays", "apply_corrections"]
+
+
+class Delays(Protocol):
+    """Delays (in meters) of a set of rasters, evaluated a block of rows at a time.
+
+    Implemented by `TroposphericDelays` and `IonosphericDelays`.
+    """
+
+    @property
+    def ifg_files(self) -> list[Path]:
+        """Rasters which have a delay."""
+        ...
+
+    def get_block_getter(self, ifg: Path) -> Callable[[slice], np.ndarray]:
+        """Get a function returning the delay of `ifg` on a block of full-width rows."""
+        ...
+
+
+def apply_corrections(
+    timeseries_paths: Sequence[Path],
+    delays: Sequence[Delays],
+    output_dir: Path,
+    wavelength: float,
+    block_rows: int = 256,
+) -> list[Path]:
+    """Subtract the atmospheric delays from each time series raster.
+
+    Each raster is read, and each delay evaluated, one block of rows at a
+    time, so no full-frame correction rasters are needed.
+
+    Parameters
+    ----------
+    timeseries_paths : Sequence[Path]
+        Time series rasters (unwrapped phase, in radians).
+    delays : Sequence[Delays]
+        Delays (in meters, positive toward the satellite) to subtract,
+        e.g. from `get_tropospheric_delays` and `get_ionospheric_delays`.
+    output_dir : Path
+        Directory for the corrected rasters, which keep the input file names.
+    wavelength : float
+        Radar wavelength (in meters), to convert the delays to phase.
+    block_rows : int
+        Number of rows to correct at a time. Default is 256.
+
+    Returns
+    -------
+    list[Path]
+        The corrected time series rasters (in radians).
+
+    """
+    output_dir.mkdir(parents=True, exist_ok=True)
+    # A delay of `d` meters (positive toward the satellite) appears in the
+    # phase as -4pi/wavelength * d, so subtracting it adds 4pi/wavelength * d
+    phase_per_meter = 4 * np.pi / wavelength
+
+    output_paths: list[Path] = []
+    writer = io.PooledBlockWriter()
+    for ts_file in timeseries_paths:
+        output_file = output_dir / Path(ts_file).name
+        output_paths.append(output_file)
+        if output_file.exists():
+            logger.info(f"{output_file} exists, skipping")
+            continue
+
+        get_blocks = [
+            d.get_block_getter(ts_file) for d in delays if ts_file in d.ifg_files
+        ]
+        if not get_blocks:
+            logger.warning(f"No corrections available for {ts_file}")
+        logger.info(f"Applying {len(get_blocks)} corrections to {ts_file}")
+
+        io.write_arr(
+            arr=None,
+            output_name=output_file,
+            like_filename=ts_file,
+            dtype=np.float32,
+            units=io.get_raster_units(ts_file),
+        )
+        nodata = io.get_raster_nodata(ts_file)
+        nrows = io.get_raster_xysize(ts_file)[1]
+        for row_start in range(0, nrows, block_rows):
+            rows = slice(row_start, min(row_start + block_rows, nrows))
+            phase = io.load_gdal(ts_file, rows=rows)
+            corrected = phase.astype(np.float32)
+            for get_block in get_blocks:
+                corrected += phase_per_meter * get_block(rows)
+            if nodata is not None:
+                corrected[phase == nodata] = nodata
+            writer.queue_write(corrected, output_file, row_start, 0)
+    writer.notify_finished()
+
+    return output_paths
@@ -3,8 +3,10 @@ from __future__ import annotations
 import datetime
 import logging
 import re
+from dataclasses import dataclass
+from functools import lru_cache
 from pathlib import Path
-from typing import Mapping, Sequence
+from typing import Callable, Mapping, Optional, Sequence, Tuple
 
 import numpy as np
 import opera_utils as oput
@@ -13,8 +15,10 @@ from opera_utils import get_dates
 from rasterio.crs import CRS
 from rasterio.warp import transform_bounds
 from scipy import interpolate
+from scipy.spatial import Delaunay
 
 from dolphin import io
+from dolphin._profiling import profile
 from dolphin._types import Bbox, Filename
 from dolphin.timeseries import ReferencePoint
 from dolphin.utils import format_date_pair
@@ -23,14 +27,25 @@ logger = logging.getLogger(__name__)
 
 ###########
 
-__all__ = ["estimate_ionospheric_delay"]
+__all__ = [
+    "IonosphericDelays",
+    "estimate_ionospheric_delay",
+    "get_ionospheric_delays",
+]
 
 # constants
 K = 40.31
 SPEED_OF_LIGHT = 299792458  # meters per second
 EARTH_RADIUS = 6371.0088e3  # km
 
+# Number of rows of each correction written at a time
+BLOCK_ROWS = 256
 
+# (IONEX file, acquisition time) of one date
+_Acquisition = Tuple[Filename, datetime.datetime]
+
+
+@profile("ionosphere", category="stage")
 def estimate_ionospheric_delay(
     ifg_file_list: Sequence[Path],
     slc_files: Mapping[tuple[datetime.datetime], Sequence[Filename]],
@@ -40,6 +55,8 @@ def estimate_ionospheric_delay(
     output_dir: Path,
     epsg: int,
     bounds: Bbox,
+    metadata: io.MetadataIndex | None = None,
+    delays: IonosphericDelays | None = None,
 ) -> list[Path]:
     """Estimate the range delay (in meters) caused by ionosphere for each interferogram.
 
@@ -63,6 +80,13 @@ def estimate_ionospheric_delay(
         the EPSG code of the input data
     bounds : Bbox
         Output bounds.
+    metadata : io.MetadataIndex, optional
+        Index of the SLC file headers, used to look up the acquisition times
+        and wavelength instead of opening each SLC file.
+    delays : IonosphericDelays, optional
+        Delays already prepared by `get_ionospheric_delays` with the same
+        parameters (e.g. to also correct the time series), which are written
+        instead of being prepared again.
 
     Returns
     -------
@@ -70,6 +94,159 @@ def estimate_ionospheric_delay(
         List of newly created ionospheric phase delay corrections.
 
     """
+    # output folder
+    output_iono = output_dir / "ionosphere"
+    output_iono.mkdir(exist_ok=True)
+
+    output_paths: dict[Path, Path] = {}
+    todo: list[Path] = []
+    for ifg in ifg_file_list:
+        ref_date, sec_date = get_dates(ifg)
+
+        name = f"{format_date_pair(ref_date, sec_date)}_ionoDelay.tif"
+        iono_delay_product_name = output_iono / name
+
+        output_paths[ifg] = iono_delay_product_name
+        if iono_delay_product_name.exists():
+            logger.info(
+                "Tropospheric correction for interferogram "
+                f"{format_date_pair(ref_date, sec_date)} already exists, skipping"
+            )
+            continue
+        todo.append(ifg)
+
+    if not todo:
+        return list(output_paths.values())
+
+    if delays is None:
+        delays = get_ionospheric_delays(
+            ifg_file_list=todo,
+            slc_files=slc_files,
+            tec_files=tec_files,
+            geom_files=geom_files,
+            reference_point=reference_point,
+            epsg=epsg,
+            bounds=bounds,
+            metadata=metadata,
+        )
+    writer = io.PooledBlockWriter()
+    for ifg in set(todo) & set(delays.ifg_files):
+        # Write 2D ionospheric correction layer to disc
+        delays.write(ifg, output_paths[ifg], writer=writer)
+    writer.notify_finished()
+
+    return list(output_paths.values())
+
+
+@dataclass
+class IonosphericDelays:
+    """Ionospheric delays (in meters) of interferograms, evaluated on demand.
+
+    The zenith TEC of each acquisition and the incidence angle mapping are
+    computed when this is created by `get_ionospheric_delays`, while the
+    full-resolution delay of an interferogram is only evaluated, a block of
+    rows at a time, when it is requested.
+    """
+
+    vtecs: dict[Path, tuple[float, float]]
+    """The (reference, secondary) zenith TEC (in TECU) of each interferogram."""
+
+    sin_iono_inc_angle: np.ndarray
+    """Sine of the incidence angle on the ionosphere shell (NaN for no data)."""
+
+    freq: float
+    """Radar carrier frequency in Hz."""
+
+    wavelength: float
+    """Radar wavelength in meters."""
+
+    reference_point: Optional[ReferencePoint] = None
+    """If passed, the delay at this (row, col) is subtracted from all pixels."""
+
+    @property
+    def ifg_files(self) -> list[Path]:
+        """Interferograms with delays."""
+        return list(self.vtecs)
+
+    def get_block_getter(self, ifg: Path) -> Callable[[slice], np.ndarray]:
+        """Get a function returning the delay of `ifg` on a block of full-width rows."""
+        reference_vtec, secondary_vtec = self.vtecs[ifg]
+
+        def get_delay(rows: slice) -> np.ndarray:
+            return _get_pair_delay(
+                reference_vtec,
+                secondary_vtec,
+                self.sin_iono_inc_angle[rows],
+                self.freq,
+                self.wavelength,
+            )
+
+        ref_value = 0.0
+        if self.reference_point is not None:
+            ref_row, ref_col = self.reference_point
+            ref_value = get_delay(slice(ref_row, ref_row + 1))[0, ref_col]
+
+        def get_block(rows: slice) -> np.ndarray:
+            return get_delay(rows) - ref_value
+
+        return get_block
+
+    def write(
+        self,
+        ifg: Path,
+        output_file: Filename,
+        writer: io.PooledBlockWriter | None = None,
+    ) -> None:
+        """Write the delay of `ifg` to `output_file`, one block of rows at a time."""
+        io.write_arr(
+            arr=None,
+            output_name=output_file,
+            like_filename=ifg,
+            dtype=np.float32,
+            units="meters",
+        )
+        get_block = self.get_block_getter(ifg)
+
+        own_writer = writer is None
+        if writer is None:
+            writer = io.PooledBlockWriter()
+        nrows = self.sin_iono_inc_angle.shape[0]
+        for row_start in range(0, nrows, BLOCK_ROWS):
+            rows = slice(row_start, min(row_start + BLOCK_ROWS, nrows))
+            writer.queue_write(get_block(rows), output_file, row_start, 0)
+        if own_writer:
+            writer.notify_finished()
+
+
+def get_ionospheric_delays(
+    ifg_file_list: Sequence[Path],
+    slc_files: Mapping[tuple[datetime.datetime], Sequence[Filename]],
+    tec_files: Mapping[tuple[datetime.datetime], Sequence[Filename]],
+    geom_files: dict[str, Path],
+    reference_point: ReferencePoint | None,
+    epsg: int,
+    bounds: Bbox,
+    metadata: io.MetadataIndex | None = None,
+) -> IonosphericDelays:
+    """Prepare the ionospheric delays of each interferogram, without writing them.
+
+    Reads the zenith TEC of each acquisition once, and computes the incidence
+    angle mapping, so that the full-resolution delays can be evaluated block
+    by block, e.g. while correcting a time series.
+    The parameters are the same as `estimate_ionospheric_delay`.
+
+    Returns
+    -------
+    IonosphericDelays
+        The lazily evaluated delays of each interferogram.
+
+    """
+    get_zero_doppler_time = (
+        metadata.get_zero_doppler_time if metadata else oput.get_zero_doppler_time
+    )
+    get_radar_wavelength = (
+        metadata.get_radar_wavelength if metadata else oput.get_radar_wavelength
+    )
     if epsg != 4326:
         left, bottom, right, top = transform_bounds(
             CRS.from_epsg(epsg), CRS.from_epsg(4326), *bounds
@@ -81,47 +258,20 @@ def estimate_ionospheric_delay(
     latc = (top + bottom) / 2
     lonc = (left + right) / 2
 
-    # Read the incidence angle
-    if "los_east" in geom_files:
-        # ISCE3 geocoded products
-        los_east = io.load_gdal(geom_files["los_east"])
-        los_north = io.load_gdal(geom_files["los_north"])
-        inc_angle = np.arccos(np.sqrt(1 - los_east**2 - los_north**2)) * 180 / np.pi
-    else:
-        # ISCE2 radar coordinate
-        inc_angle = io.load_gdal(geom_files["incidence_angle"])
-
-    iono_inc_angle = incidence_angle_ground_to_iono(inc_angle)
-
     # frequency
     for key in slc_files:
         if "compressed" not in str(slc_files[key][0]).lower():
             one_of_slcs = slc_files[key][0]
             break
 
-    wavelength = oput.get_radar_wavelength(one_of_slcs)
+    wavelength = get_radar_wavelength(one_of_slcs)
     freq = SPEED_OF_LIGHT / wavelength
 
-    # output folder
-    output_iono = output_dir / "ionosphere"
-    output_iono.mkdir(exist_ok=True)
-
-    output_paths: list[Path] = []
-
+    # (tec file, time) of the reference and secondary dates of each ifg
+    acquisitions: dict[Path, tuple[_Acquisition, _Acquisition]] = {}
     for ifg in ifg_file_list:
         ref_date, sec_date = get_dates(ifg)
 
-        name = f"{format_date_pair(ref_date, sec_date)}_ionoDelay.tif"
-        iono_delay_product_name = output_iono / name
-
-        output_paths.append(iono_delay_product_name)
-        if iono_delay_product_name.exists():
-            logger.info(
-                "Tropospheric correction for interferogram "
-                f"{format_date_pair(ref_date, sec_date)} already exists, skipping"
-            )
-            continue
-
         # The keys in slc_files do not necessarily have one date,
         # it means with the production file naming convention,
         # there will be multiple dates stored in the keys from get_dates
@@ -142,52 +292,83 @@ def estimate_ionospheric_delay(
             if sec_date in key and "compressed" not in str(slc_files[key][0]).lower()
         )
 
-        secondary_time = oput.get_zero_doppler_time(slc_files[secondary_date][0])
+        secondary_time = get_zero_doppler_time(slc_files[secondary_date][0])
         if "compressed" in str(slc_files[reference_date][0]).lower():
             # this is for when we have compressed slcs but the actual
             # reference date does not exist in the input data
             reference_time = secondary_time
         else:
-            reference_time = oput.get_zero_doppler_time(slc_files[reference_date][0])
+            reference_time = get_zero_doppler_time(slc_files[reference_date][0])
 
-        reference_vtec = read_zenith_tec(
-            time=reference_time,
-            tec_file=tec_files[(ref_date,)][0],
-            lat=latc,
-            lon=lonc,
+        acquisitions[ifg] = (
+            (tec_files[(ref_date,)][0], reference_time),
+            (tec_files[(sec_date,)][0], secondary_time),
         )
 
-        secondary_vtec = read_zenith_tec(
-            time=secondary_time,
-            tec_file=tec_files[(sec_date,)][0],
-            lat=latc,
-            lon=lonc,
-        )
+    # The zenith TEC only depends on the date, so read it once per acquisition
+    vtecs = {
+        acq: read_zenith_tec(time=acq[1], tec_file=acq[0], lat=latc, lon=lonc)
+        for acq in sorted({acq for pair in acquisitions.values() for acq in pair})
+    }
+    logger.info(f"Read the zenith TEC of {len(vtecs)} acquisitions")
+
+    return IonosphericDelays(
+        vtecs={
+            ifg: (vtecs[ref], vtecs[sec]) for ifg, (ref, sec) in acquisitions.items()
+        },
+        # The incidence angle mapping is shared by all interferograms
+        sin_iono_inc_angle=_get_sin_iono_incidence_angle(geom_files),
+        freq=freq,
+        wavelength=wavelength,
+        reference_point=reference_point,
+    )
 
-        range_delay_reference = vtec_to_range_delay(
-            reference_vtec, iono_inc_angle, freq, obs_type="phase"
-        )
-        range_delay_secondary = vtec_to_range_delay(
-            secondary_vtec, iono_inc_angle, freq, obs_type="phase"
-        )
 
-        ifg_iono_range_delay_radians = range_delay_reference - range_delay_secondary
-        # Convert to meters, where positive corresponds to motion toward the satellite
-        ifg_iono_range_delay = -wavelength / (4 * np.pi) * ifg_iono_range_delay_radians
+def _get_sin_iono_incidence_angle(geom_files: dict[str, Path]) -> np.ndarray:
+    """Get the sine of the incidence angle on the ionosphere shell.
 
-        if reference_point is not None:
-            ref_row, ref_col = reference_point
-            ifg_iono_range_delay -= ifg_iono_range_delay[ref_row, ref_col]
+    Pixels with no incidence angle (0) are NaN.
+    """
+    # Read the incidence angle
+    if "los_east" in geom_files:
+        # ISCE3 geocoded products
+        los_east = io.load_gdal(geom_files["los_east"])
+        los_north = io.load_gdal(geom_files["los_north"])
+        inc_angle = np.arccos(np.sqrt(1 - los_east**2 - los_north**2)) * 180 / np.pi
+    else:
+        # ISCE2 radar coordinate
+        inc_angle = io.load_gdal(geom_files["incidence_angle"])
 
-        # Write 2D tropospheric correction layer to disc
-        io.write_arr(
-            arr=ifg_iono_range_delay,
-            output_name=iono_delay_product_name,
-            like_filename=ifg,
-            units="meters",
-        )
+    iono_inc_angle = incidence_angle_ground_to_iono(inc_angle)
+    # ignore no-data value in inc_angle
+    iono_inc_angle[iono_inc_angle == 0] = np.nan
+    return np.sin(np.deg2rad(iono_inc_angle)).astype(np.float32)
+
+
+def _get_pair_delay(
+    reference_vtec: float,
+    secondary_vtec: float,
+    sin_iono_inc_angle: np.ndarray,
+    freq: float,
+    wavelength: float,
+) -> np.ndarray:
+    """Get the ionospheric delay (in meters) of one interferogram.
+
+    Equivalent to differencing `vtec_to_range_delay` of each date, using the
+    precomputed sine of the incidence angle on the ionosphere shell.
+    Positive values correspond to motion toward the satellite.
+    """
+    range_delays = []
+    for vtec in (reference_vtec, secondary_vtec):
+        tec_to_delay = K * vtec * 1e16 / freq**2
+        # Equation (8) in Yunjun et al. (2022, TGRS), with the group index
+        # 1 + tec_to_delay, and cos(arcsin(x)) = sqrt(1 - x**2)
+        cos_ref_angle = np.sqrt(1 - (sin_iono_inc_angle / (1 + tec_to_delay)) ** 2)
+        range_delays.append((tec_to_delay / cos_ref_angle).astype(np.float32))
 
-    return output_paths
+    ifg_iono_range_delay_radians = range_delays[0] - range_delays[1]
+    # Convert to meters, where positive corresponds to motion toward the satellite
+    return -wavelength / (4 * np.pi) * ifg_iono_range_delay_radians
 
 
 def incidence_angle_ground_to_iono(inc_angle: ArrayLike, iono_height: float = 450e3):
@@ -323,8 +504,8 @@ def get_ionex_value(
     # time info
     utc_min = utc_sec / 60.0
 
-    # read TEC file
-    mins, lats, lons, tec_maps = read_ionex(tec_file)
+    # read TEC file (parsed and triangulated once per file)
+    mins, triangulation, tec_maps = _load_ionex(Path(tec_file).resolve())
 
     # interpolate between consecutive rotated TEC maps
     # reference: equation (3) in Schaer et al. (1998)
@@ -335,18 +516,12 @@ def get_ionex_value(
     lon0 = lon + (utc_min - mins[ind0]) * 360.0 / (24.0 * 60.0)
     lon1 = lon + (utc_min - mins[ind1]) * 360.0 / (24.0 * 60.0)
 
-    tec_val0 = interpolate.griddata(
-        points=(lons.flatten(), lats.flatten()),
-        values=tec_maps[ind0, :, :].flatten(),
-        xi=(lon0, lat),
-        method="linear",
+    tec_val0 = interpolate.LinearNDInterpolator(triangulation, tec_maps[ind0])(
+        (lon0, lat)
     )
 
-    tec_val1 = interpolate.griddata(
-        points=(lons.flatten(), lats.flatten()),
-        values=tec_maps[ind1, :, :].flatten(),
-        xi=(lon1, lat),
-        method="linear",
+    tec_val1 = interpolate.LinearNDInterpolator(triangulation, tec_maps[ind1])(
+        (lon1, lat)
     )
 
     tec_val = (mins[ind1] - utc_min) / (mins[ind1] - mins[ind0]) * tec_val0
@@ -355,6 +530,18 @@ def get_ionex_value(
     return tec_val
 
 
+@lru_cache(maxsize=32)
+def _load_ionex(tec_file: Path) -> tuple[np.ndarray, Delaunay, np.ndarray]:
+    """Parse an IONEX file, and triangulate its grid for linear interpolation.
+
+    Returns the map times (in minutes), the triangulation of the (lon, lat)
+    grid points, and the TEC maps flattened to (num_map, num_points).
+    """
+    mins, lats, lons, tec_maps = read_ionex(tec_file)
+    triangulation = Delaunay(np.column_stack([lons.flatten(), lats.flatten()]))
+    return mins, triangulation, tec_maps.reshape(len(tec_maps), -1)
+
+
 def read_ionex(
     tec_file: Filename,
 ) -> tuple[np.ndarray, np.ndarray, np.ndarray, np.ndarray]:
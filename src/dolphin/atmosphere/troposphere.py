@@ -1,14 +1,19 @@
 from __future__ import annotations
 
 import datetime
+import hashlib
+import itertools
 import logging
+import multiprocessing as mp
+from concurrent.futures import ProcessPoolExecutor
 from dataclasses import dataclass
 from os import fspath
 from pathlib import Path
-from typing import Mapping, Sequence
+from typing import Callable, Iterator, Mapping, Optional, Sequence
 
 import numpy as np
 import opera_utils as oput
+from numpy.typing import ArrayLike
 from opera_utils import get_dates, group_by_date
 from osgeo import gdal
 from rasterio.crs import CRS
@@ -16,17 +21,26 @@ from rasterio.warp import transform_bounds
 from scipy.interpolate import RegularGridInterpolator
 
 from dolphin import io
+from dolphin._profiling import profile
 from dolphin._types import Bbox, Filename, TropoModel, TropoType
 from dolphin.timeseries import ReferencePoint
-from dolphin.utils import format_date_pair
+from dolphin.utils import DummyProcessPoolExecutor, format_date_pair
 
-from ._netcdf import delay_from_netcdf, group_netcdf_by_date
+from ._netcdf import (
+    delay_from_netcdf,
+    group_netcdf_by_date,
+    preprocess_netcdf_files,
+)
 
 logger = logging.getLogger(__name__)
 
 ###########
 
-__all__ = ["estimate_tropospheric_delay"]
+__all__ = [
+    "TroposphericDelays",
+    "estimate_tropospheric_delay",
+    "get_tropospheric_delays",
+]
 
 
 @dataclass
@@ -75,7 +89,76 @@ class DelayParams:
     secondary_time: datetime.datetime
     """The secondary image time."""
 
+    @property
+    def grid(self) -> DelayGrid:
+        return DelayGrid(
+            x_coordinates=self.x_coordinates,
+            y_coordinates=self.y_coordinates,
+            z_coordinates=self.z_coordinates,
+            SNWE=self.SNWE,
+            epsg=self.epsg,
+            tropo_model=self.tropo_model,
+            delay_type=self.delay_type,
+        )
+
+
+@dataclass(frozen=True)
+class DelayGrid:
+    """Output grid and delay settings shared by every acquisition's delay cube."""
+
+    x_coordinates: np.ndarray
+    """Array of X coordinates."""
+
+    y_coordinates: np.ndarray
+    """Array of Y coordinates."""
+
+    z_coordinates: np.ndarray
+    """Array of Z coordinates."""
+
+    SNWE: tuple[float, float, float, float]
+    """ Bounding box of the data in SNWE format of RAiDER/PYAPS."""
+
+    epsg: int
+    """EPSG code for the coordinate reference system."""
+
+    tropo_model: TropoModel
+    """Model used for tropospheric correction."""
 
+    delay_type: str
+    """Type of tropospheric delay."""
+
+    def get_cache_file(
+        self,
+        cache_dir: Path,
+        weather_file: Filename,
+        time: Optional[datetime.datetime] = None,
+    ) -> Path:
+        """Get the cache file for the delay cube of one weather model file.
+
+        The name includes a hash of the weather file's path, size and
+        modification time, the acquisition `time`, and the grid and delay type,
+        so a changed input never reuses a stale cube.
+        """
+        path = Path(weather_file).resolve()
+        stat = path.stat()
+        h = hashlib.sha256()
+        for part in (
+            fspath(path),
+            stat.st_size,
+            stat.st_mtime_ns,
+            time.isoformat() if time is not None else None,
+            self.SNWE,
+            self.epsg,
+            self.tropo_model.value,
+            self.delay_type,
+        ):
+            h.update(repr(part).encode())
+        for coords in (self.x_coordinates, self.y_coordinates, self.z_coordinates):
+            h.update(np.ascontiguousarray(coords, dtype=np.float64).tobytes())
+        return cache_dir / f"{path.stem}_{h.hexdigest()[:16]}.npy"
+
+
+@profile("troposphere", category="stage")
 def estimate_tropospheric_delay(
     ifg_file_list: Sequence[Path],
     slc_files: Mapping[tuple[datetime.datetime], Sequence[Filename]],
@@ -88,9 +171,17 @@ def estimate_tropospheric_delay(
     tropo_delay_type: TropoType,
     epsg: int,
     bounds: Bbox,
+    metadata: io.MetadataIndex | None = None,
+    cache_dir: Path | None = None,
+    num_workers: int = 4,
+    delays: TroposphericDelays | None = None,
 ) -> list[Path]:
     """Estimate the tropospheric delay corrections (in meters) for each interferogram.
 
+    The delay cube of each acquisition is computed once (in parallel across
+    `num_workers` processes), saved in `cache_dir`, and differenced for every
+    interferogram using that acquisition.
+
     Parameters
     ----------
     ifg_file_list : Sequence[Path]
@@ -118,6 +209,20 @@ def estimate_tropospheric_delay(
         the EPSG code of the input data
     bounds : Bbox
         Output bounds.
+    metadata : io.MetadataIndex, optional
+        Index of the SLC file headers, used to look up the acquisition times
+        instead of opening each SLC file.
+    cache_dir : Path, optional
+        Directory to save the delay cube of each acquisition, with the converted
+        netcdf weather models in its "weather_models" subdirectory.
+        Default is `output_dir / "troposphere" / "delay_cubes"`.
+    num_workers : int
+        Number of acquisitions to compute delay cubes for in parallel.
+        Default is 4.
+    delays : TroposphericDelays, optional
+        Delays already prepared by `get_tropospheric_delays` with the same
+        parameters (e.g. to also correct the time series), which are written
+        instead of being prepared again.
 
     Returns
     -------
@@ -126,6 +231,136 @@ def estimate_tropospheric_delay(
         Units are in meters.
 
     """
+    use_netcdf = str(troposphere_files[0]).endswith(".nc")
+    delay_type = _get_delay_type(tropo_delay_type, use_netcdf)
+
+    output_tropo_dir = output_dir / "troposphere"
+    output_tropo_dir.mkdir(exist_ok=True)
+    output_paths: dict[Path, Path] = {}
+    for ifg in ifg_file_list:
+        ref_date, sec_date = get_dates(ifg)[0:2]
+        date_str = format_date_pair(ref_date, sec_date)
+        name = f"{date_str}_tropoDelay_{tropo_model.value}_LOS_{delay_type}.tif"
+        output_paths[ifg] = output_tropo_dir / name
+
+    todo = [ifg for ifg, path in output_paths.items() if not path.exists()]
+    for ifg in set(ifg_file_list) - set(todo):
+        logger.info(f"{output_paths[ifg]} exists, skipping")
+    if not todo:
+        return list(output_paths.values())
+
+    if delays is None:
+        delays = get_tropospheric_delays(
+            ifg_file_list=todo,
+            slc_files=slc_files,
+            troposphere_files=troposphere_files,
+            geom_files=geom_files,
+            reference_point=reference_point,
+            output_dir=output_dir,
+            file_date_fmt=file_date_fmt,
+            tropo_model=tropo_model,
+            tropo_delay_type=tropo_delay_type,
+            epsg=epsg,
+            bounds=bounds,
+            metadata=metadata,
+            cache_dir=cache_dir,
+            num_workers=num_workers,
+        )
+    writer = io.PooledBlockWriter()
+    # Interferograms without weather models for both dates have no delay
+    for ifg in set(todo) & set(delays.ifg_files):
+        logger.info(f"Running troposphere computation for {ifg}")
+        # Write 2D tropospheric correction layer to disc
+        delays.write(ifg, output_paths[ifg], writer=writer)
+    writer.notify_finished()
+
+    return list(output_paths.values())
+
+
+@dataclass
+class TroposphericDelays:
+    """Tropospheric delays (in meters) of interferograms, projected on demand.
+
+    The delay cube of each acquisition is computed (or read from the cache)
+    when this is created by `get_tropospheric_delays`, while the
+    full-resolution delay of an interferogram is only projected, a block of
+    rows at a time, when it is requested.
+    """
+
+    projector: DelayProjector
+    """Projector of the delay cubes onto the interferogram frame."""
+
+    cube_files: dict[Path, tuple[Path, Path]]
+    """The (reference, secondary) delay cube files of each interferogram."""
+
+    reference_point: Optional[ReferencePoint] = None
+    """If passed, the delay at this (row, col) is subtracted from all pixels."""
+
+    @property
+    def ifg_files(self) -> list[Path]:
+        """Interferograms with weather models for both dates."""
+        return list(self.cube_files)
+
+    def get_block_getter(self, ifg: Path) -> Callable[[slice], np.ndarray]:
+        """Get a function returning the delay of `ifg` on a block of full-width rows."""
+        return self.projector.get_block_getter(
+            self._load_cube(ifg), self.reference_point
+        )
+
+    def write(
+        self,
+        ifg: Path,
+        output_file: Filename,
+        writer: io.PooledBlockWriter | None = None,
+    ) -> None:
+        """Write the delay of `ifg` to `output_file`, one block of rows at a time."""
+        self.projector.write(
+            self._load_cube(ifg),
+            output_file=output_file,
+            like_filename=ifg,
+            reference_point=self.reference_point,
+            writer=writer,
+        )
+
+    def _load_cube(self, ifg: Path) -> np.ndarray:
+        reference_cube_file, secondary_cube_file = self.cube_files[ifg]
+        # NaNs in the PyAPS cubes propagate to the pixels which use them
+        return np.load(secondary_cube_file) - np.load(reference_cube_file)
+
+
+def get_tropospheric_delays(
+    ifg_file_list: Sequence[Path],
+    slc_files: Mapping[tuple[datetime.datetime], Sequence[Filename]],
+    troposphere_files: Sequence[Filename],
+    geom_files: dict[str, Path],
+    reference_point: ReferencePoint | None,
+    output_dir: Path,
+    file_date_fmt: str,
+    tropo_model: TropoModel,
+    tropo_delay_type: TropoType,
+    epsg: int,
+    bounds: Bbox,
+    metadata: io.MetadataIndex | None = None,
+    cache_dir: Path | None = None,
+    num_workers: int = 4,
+) -> TroposphericDelays:
+    """Prepare the tropospheric delays of each interferogram, without writing them.
+
+    Computes (or reads from `cache_dir`) the delay cube of each acquisition,
+    so that the full-resolution delays can be evaluated block by block, e.g.
+    while correcting a time series.
+    The parameters are the same as `estimate_tropospheric_delay`.
+
+    Returns
+    -------
+    TroposphericDelays
+        The lazily projected delays of each interferogram with weather models
+        for both dates.
+
+    """
+    get_zero_doppler_time = (
+        metadata.get_zero_doppler_time if metadata else oput.get_zero_doppler_time
+    )
     # Read geogrid data
     xsize, ysize = io.get_raster_xysize(ifg_file_list[0])
     gt = io.get_raster_gt(ifg_file_list[0])
@@ -140,35 +375,34 @@ def estimate_tropospheric_delay(
 
     tropo_height_levels = np.concatenate(([-100], np.arange(0, 9000, 500)))
 
-    delay_type = tropo_delay_type.value
-
-    if str(troposphere_files[0]).endswith(".nc"):
+    use_netcdf = str(troposphere_files[0]).endswith(".nc")
+    delay_type = _get_delay_type(tropo_delay_type, use_netcdf)
+    if use_netcdf:
         tropo_files = group_netcdf_by_date(troposphere_files)
-        tropo_run = compute_tropo_delay_from_netcdf
-        if tropo_delay_type.value == "hydrostatic":
-            delay_type = "hydro"
     else:
         tropo_files = group_by_date(troposphere_files, file_date_fmt=file_date_fmt)
-        tropo_run = compute_pyaps
-        if tropo_delay_type.value == "hydrostatic":
-            delay_type = "dry"
 
     tropo_date_list = [x.date() for x in tropo_files]
 
-    output_tropo_dir = output_dir / "troposphere"
-    output_tropo_dir.mkdir(exist_ok=True)
-    output_paths: list[Path] = []
+    if cache_dir is None:
+        cache_dir = output_dir / "troposphere" / "delay_cubes"
+    cache_dir.mkdir(parents=True, exist_ok=True)
+
+    grid = DelayGrid(
+        x_coordinates=xcoord,
+        y_coordinates=ycoord,
+        z_coordinates=tropo_height_levels,
+        SNWE=(bottom, top, left, right),
+        epsg=epsg,
+        tropo_model=tropo_model,
+        delay_type=delay_type,
+    )
+
+    # First find the weather model file for each acquisition of each interferogram
+    todo: list[tuple[Path, DelayParams]] = []
     for ifg in ifg_file_list:
         ref_date, sec_date = get_dates(ifg)[0:2]
-
         date_str = format_date_pair(ref_date, sec_date)
-        name = f"{date_str}_tropoDelay_{tropo_model.value}_LOS_{delay_type}.tif"
-        tropo_delay_product_path = output_tropo_dir / name
-        output_paths.append(tropo_delay_product_path)
-
-        if tropo_delay_product_path.exists():
-            logger.info(f"{tropo_delay_product_path} exists, skipping")
-            continue
 
         reference_date = next(key for key in slc_files if ref_date in key)
         # temporary fix for compressed SLCs while the required metadata i not included
@@ -187,7 +421,7 @@ def estimate_tropospheric_delay(
             logger.warning(f"Weather-model files do not exist for {date_str}, skipping")
             continue
 
-        secondary_time = oput.get_zero_doppler_time(slc_files[secondary_date][0])
+        secondary_time = get_zero_doppler_time(slc_files[secondary_date][0])
         if "compressed" in str(slc_files[reference_date][0]).lower():
             # this is for when we have compressed slcs but the actual
             # reference date does not exist in the input data
@@ -195,9 +429,9 @@ def estimate_tropospheric_delay(
                 reference_date[0].date(), secondary_time.time()
             )
         else:
-            reference_time = oput.get_zero_doppler_time(slc_files[reference_date][0])
+            reference_time = get_zero_doppler_time(slc_files[reference_date][0])
 
-        if str(troposphere_files[0]).endswith(".nc"):
+        if use_netcdf:
             ref_date = ref_date + datetime.timedelta(hours=reference_time.hour)
             sec_date = sec_date + datetime.timedelta(hours=secondary_time.hour)
 
@@ -220,169 +454,203 @@ def estimate_tropospheric_delay(
             secondary_time=secondary_time,
             interferogram=format_date_pair(ref_date, sec_date),
         )
+        todo.append((ifg, delay_parameters))
 
-        logger.info(f"Running troposphere computation for {ref_date}, {sec_date}")
-        delay_datacube = tropo_run(delay_parameters)
+    # Compute the delay cube of each acquisition once
+    acquisitions = {
+        ifg: (
+            _get_acquisition(params.reference_file, params.reference_time, use_netcdf),
+            _get_acquisition(params.secondary_file, params.secondary_time, use_netcdf),
+        )
+        for ifg, params in todo
+    }
+    cube_files = _compute_delay_cubes(
+        grid,
+        {acq for pair in acquisitions.values() for acq in pair},
+        cache_dir,
+        num_workers,
+    )
 
-        tropo_delay_2d = compute_2d_delay(delay_parameters, delay_datacube, geom_files)
+    # The DEM, line-of-sight and interpolation weights are shared by all pairs
+    projector = DelayProjector(grid, gt, (ysize, xsize), geom_files)
+    return TroposphericDelays(
+        projector,
+        {
+            ifg: (cube_files[ref], cube_files[sec])
+            for ifg, (ref, sec) in acquisitions.items()
+        },
+        reference_point=reference_point,
+    )
 
-        if reference_point is not None:
-            ref_row, ref_col = reference_point
-            tropo_delay_2d -= tropo_delay_2d[ref_row, ref_col]
 
-        # Write 2D tropospheric correction layer to disc
-        io.write_arr(
-            arr=tropo_delay_2d,
-            output_name=tropo_delay_product_path,
-            like_filename=ifg,
-            units="meters",
+def _get_delay_type(tropo_delay_type: TropoType, use_netcdf: bool) -> str:
+    if tropo_delay_type.value == "hydrostatic":
+        return "hydro" if use_netcdf else "dry"
+    return tropo_delay_type.value
+
+
+def _get_acquisition(
+    weather_file: Filename, time: datetime.datetime, use_netcdf: bool
+) -> tuple[Filename, Optional[datetime.datetime]]:
+    # The PyAPS delays only depend on the weather model file
+    return (weather_file, time if use_netcdf else None)
+
+
+def _compute_delay_cubes(
+    grid: DelayGrid,
+    acquisitions: set[tuple[Filename, Optional[datetime.datetime]]],
+    cache_dir: Path,
+    num_workers: int,
+) -> dict[tuple[Filename, Optional[datetime.datetime]], Path]:
+    """Compute (or load from `cache_dir`) the delay cube of each acquisition."""
+    cube_files = {
+        acq: grid.get_cache_file(cache_dir, *acq) for acq in sorted(acquisitions)
+    }
+    missing = [acq for acq, f in cube_files.items() if not f.exists()]
+    logger.info(
+        f"Computing {len(missing)} tropospheric delay cubes"
+        f" ({len(cube_files) - len(missing)} cached in {cache_dir})"
+    )
+    # Convert each raw netcdf weather model once, before the cubes which use it
+    netcdf_files = sorted({f for f, time in missing if time is not None})
+    processed_files = preprocess_netcdf_files(
+        netcdf_files,
+        lat_lon_bounds=grid.SNWE,
+        cache_dir=cache_dir / "weather_models",
+        weather_model=grid.tropo_model,
+        num_workers=num_workers,
+    )
+    Executor = (
+        ProcessPoolExecutor
+        if num_workers > 1 and len(missing) > 1
+        else DummyProcessPoolExecutor
+    )
+    ctx = mp.get_context("spawn")
+    with Executor(max_workers=num_workers, mp_context=ctx) as exc:
+        list(
+            exc.map(
+                _save_delay_cube,
+                [grid] * len(missing),
+                [processed_files.get(f, f) for f, _ in missing],
+                [time for _, time in missing],
+                [cube_files[acq] for acq in missing],
+            )
         )
+    return cube_files
+
+
+def _save_delay_cube(
+    grid: DelayGrid,
+    weather_file: Filename,
+    time: Optional[datetime.datetime],
+    output_file: Path,
+) -> Path:
+    """Compute one acquisition's delay cube and save it to `output_file`."""
+    if time is None:
+        cube = compute_pyaps_cube(grid, weather_file)
+    else:
+        cube = compute_netcdf_cube(grid, weather_file, time)
+    # Write to a temporary name so an interrupted run leaves no partial cube
+    temp_file = output_file.with_suffix(".tmp.npy")
+    np.save(temp_file, cube)
+    temp_file.replace(output_file)
+    return output_file
 
-    return output_paths
 
-
-def compute_pyaps(delay_parameters: DelayParams) -> np.ndarray:
-    """Compute tropospheric delay datacube using PyAPS.
+def compute_pyaps_cube(grid: DelayGrid, weather_file: Filename) -> np.ndarray:
+    """Compute the tropospheric delay datacube of one acquisition using PyAPS.
 
     Parameters
     ----------
-    delay_parameters : DelayParams
-        delay parameters and grid information.
+    grid : DelayGrid
+        Output grid and delay type.
+    weather_file : Filename
+        Weather model file of the acquisition.
 
     Returns
     -------
     np.ndarray
-        tropospheric delay datacube.
+        Delay (in meters) at each (z, y, x) point of `grid`.
 
     """
     import pyaps3 as pa
 
     # X and y for the entire datacube
-    y_2d, x_2d = np.meshgrid(
-        delay_parameters.y_coordinates, delay_parameters.x_coordinates, indexing="ij"
-    )
+    y_2d, x_2d = np.meshgrid(grid.y_coordinates, grid.x_coordinates, indexing="ij")
 
     # Lat/lon coordinates
-    lat_datacube, lon_datacube = oput.transform_xy_to_latlon(
-        delay_parameters.epsg, x_2d, y_2d
-    )
+    lat_datacube, lon_datacube = oput.transform_xy_to_latlon(grid.epsg, x_2d, y_2d)
 
     tropo_delay_datacube_list = []
-
-    for hgt in delay_parameters.z_coordinates:
+    for hgt in grid.z_coordinates:
         dem_datacube = np.full(lat_datacube.shape, hgt)
-
-        # Delay for the reference image
-        ref_aps_estimator = pa.PyAPS(
-            fspath(delay_parameters.reference_file),
-            dem=dem_datacube,
-            inc=0.0,
-            lat=lat_datacube,
-            lon=lon_datacube,
-            grib=delay_parameters.tropo_model,
-            humidity="Q",
-            model=delay_parameters.tropo_model,
-            verb=False,
-            Del=delay_parameters.delay_type,
-        )
-
-        phs_ref = ref_aps_estimator.getdelay()
-
-        # Delay for the secondary image
-        second_aps_estimator = pa.PyAPS(
-            fspath(delay_parameters.secondary_file),
+        aps_estimator = pa.PyAPS(
+            fspath(weather_file),
             dem=dem_datacube,
             inc=0.0,
             lat=lat_datacube,
             lon=lon_datacube,
-            grib=delay_parameters.tropo_model,
+            grib=grid.tropo_model,
             humidity="Q",
-            model=delay_parameters.tropo_model,
+            model=grid.tropo_model,
             verb=False,
-            Del=delay_parameters.delay_type,
+            Del=grid.delay_type,
         )
+        tropo_delay_datacube_list.append(aps_estimator.getdelay())
 
-        phs_second = second_aps_estimator.getdelay()
-
-        # Convert the delay in meters to radians
-        relative_delay = phs_second - phs_ref
-        tropo_delay_datacube_list.append(relative_delay)
-
-    # Tropo delay datacube
-    tropo_delay_datacube = np.stack(tropo_delay_datacube_list)
-    # Create a maksed datacube that excludes the NaN values
-    return np.ma.masked_invalid(tropo_delay_datacube)
+    return np.stack(tropo_delay_datacube_list)
 
 
-def compute_tropo_delay_from_netcdf(delay_parameters: DelayParams) -> np.ndarray:
-    """Compute tropospheric delay (in meters) datacube from netcdf tropo file.
+def compute_netcdf_cube(
+    grid: DelayGrid, weather_file: Filename, time: datetime.datetime
+) -> np.ndarray:
+    """Compute the tropospheric delay datacube of one acquisition from a netcdf file.
 
     Parameters
     ----------
-    delay_parameters : DelayParams
-        delay parameters and grid information.
+    grid : DelayGrid
+        Output grid and delay type.
+    weather_file : Filename
+        Weather model file of the acquisition.
+    time : datetime.datetime
+        Time of the acquisition.
 
     Returns
     -------
     np.ndarray
-        tropospheric delay datacube.
+        Delay (in meters) at each (z, y, x) point of `grid`, with the sign
+        convention where the difference (secondary - reference) is positive
+        toward the satellite.
 
     """
-    reference_weather_model_file = delay_parameters.reference_file
-    secondary_weather_model_file = delay_parameters.secondary_file
-
-    # Troposphere delay datacube computation
-    tropo_delay_reference = delay_from_netcdf(
-        dt=delay_parameters.reference_time,
-        weather_model_file=reference_weather_model_file,
-        SNWE=delay_parameters.SNWE,
-        height_levels=delay_parameters.z_coordinates,
-        out_proj=delay_parameters.epsg,
-        weather_model=delay_parameters.tropo_model,
-    )
-
-    tropo_delay_secondary = delay_from_netcdf(
-        dt=delay_parameters.secondary_time,
-        weather_model_file=secondary_weather_model_file,
-        SNWE=delay_parameters.SNWE,
-        height_levels=delay_parameters.z_coordinates,
-        out_proj=delay_parameters.epsg,
-        weather_model=delay_parameters.tropo_model,
+    tropo_delay = delay_from_netcdf(
+        dt=time,
+        weather_model_file=weather_file,
+        SNWE=grid.SNWE,
+        height_levels=grid.z_coordinates,
+        out_proj=grid.epsg,
+        weather_model=grid.tropo_model,
     )
 
     # comb is the summation of wet and hydro components
-    if delay_parameters.delay_type == "comb":
-        tropo_delay = (
-            tropo_delay_reference["wet"]
-            + tropo_delay_reference["hydro"]
-            - tropo_delay_secondary["wet"]
-            - tropo_delay_secondary["hydro"]
-        )
+    if grid.delay_type == "comb":
+        delay = tropo_delay["wet"] + tropo_delay["hydro"]
     else:
-        tropo_delay = (
-            tropo_delay_reference[delay_parameters.delay_type]
-            - tropo_delay_secondary[delay_parameters.delay_type]
-        )
-
-    # Convert it to convention where positive means toward the satellite
-    tropo_delay_datacube = -1 * tropo_delay
-
-    # Create a masked datacube that excludes the NaN values
-    tropo_delay_datacube_masked = np.ma.masked_invalid(tropo_delay_datacube)
+        delay = tropo_delay[grid.delay_type]
 
     # Interpolate to radar grid to keep its dimension consistent with other datacubes
     tropo_delay_interpolator = RegularGridInterpolator(
-        (tropo_delay_reference.z, tropo_delay_reference.y, tropo_delay_reference.x),
-        tropo_delay_datacube_masked,
+        (tropo_delay.z, tropo_delay.y, tropo_delay.x),
+        np.ma.masked_invalid(delay),
         method="linear",
         bounds_error=False,
     )
 
     # Interpolate the troposphere delay
     hv, yv, xv = np.meshgrid(
-        delay_parameters.z_coordinates,
-        delay_parameters.y_coordinates,
-        delay_parameters.x_coordinates,
+        grid.z_coordinates,
+        grid.y_coordinates,
+        grid.x_coordinates,
         indexing="ij",
     )
 
@@ -392,50 +660,272 @@ def compute_tropo_delay_from_netcdf(delay_parameters: DelayParams) -> np.ndarray
     return tropo_delay_interpolator(pnts).reshape(hv.shape)
 
 
-def compute_2d_delay(
-    delay_parameters: DelayParams,
-    delay_datacube: np.ndarray,
-    geo_files: dict[str, Path],
-) -> np.ndarray:
-    """Compute 2D delay.
+def compute_pyaps(delay_parameters: DelayParams) -> np.ndarray:
+    """Compute tropospheric delay datacube using PyAPS.
 
     Parameters
     ----------
     delay_parameters : DelayParams
-        dataclass containing tropospheric delay data.
+        delay parameters and grid information.
 
-    delay_datacube : np.ndarray
-        delay datacube for the x,y,z coordinates in delay_parameters
+    Returns
+    -------
+    np.ndarray
+        tropospheric delay datacube.
 
-    geo_files : dict[str, Path]
-        Dictionary containing paths to geospatial files.
+    """
+    grid = delay_parameters.grid
+    phs_ref = compute_pyaps_cube(grid, delay_parameters.reference_file)
+    phs_second = compute_pyaps_cube(grid, delay_parameters.secondary_file)
+    # Create a maksed datacube that excludes the NaN values
+    return np.ma.masked_invalid(phs_second - phs_ref)
+
+
+def compute_tropo_delay_from_netcdf(delay_parameters: DelayParams) -> np.ndarray:
+    """Compute tropospheric delay (in meters) datacube from netcdf tropo file.
+
+    Parameters
+    ----------
+    delay_parameters : DelayParams
+        delay parameters and grid information.
 
     Returns
     -------
     np.ndarray
-        Computed 2D delay in meters.
+        tropospheric delay datacube.
 
     """
-    dem_file = Path(geo_files["height"])
+    grid = delay_parameters.grid
+    delay_reference = compute_netcdf_cube(
+        grid, delay_parameters.reference_file, delay_parameters.reference_time
+    )
+    delay_secondary = compute_netcdf_cube(
+        grid, delay_parameters.secondary_file, delay_parameters.secondary_time
+    )
+    # Convert it to convention where positive means toward the satellite
+    return delay_secondary - delay_reference
+
 
-    ysize, xsize = delay_parameters.shape
-    x_origin, x_res, x_, y_origin, y_, y_res = delay_parameters.geotransform
+class DelayProjector:
+    """Project (z, y, x) delay cubes onto the full-resolution frame in row blocks.
 
-    x = 0
-    y = 0
-    left = x_origin + x * x_res + y * x_
-    top = y_origin + x * y_ + y * y_res
+    The DEM, line-of-sight and interpolation indexes/weights only depend on the
+    frame, so they are prepared once here and reused for every interferogram.
+    Each projection is then a gather of the 8 surrounding cube values and a
+    weighted sum per pixel, done `block_rows` rows at a time.
 
-    x = xsize
-    y = ysize
+    Parameters
+    ----------
+    grid : DelayGrid
+        Coordinates of the delay cubes which will be projected.
+    geotransform : Sequence[float]
+        GDAL geotransform of the output frame.
+    shape : tuple[int, int]
+        (rows, cols) of the output frame.
+    geo_files : dict[str, Path]
+        Geometry files with "height", and either "los_east" and "los_north",
+        or "incidence_angle" (in degrees).
+    block_rows : int
+        Number of rows to project at a time. Default is 256.
 
-    right = x_origin + x * x_res + y * x_
-    bottom = y_origin + x * y_ + y * y_res
+    """
 
-    bounds = (left, bottom, right, top)
+    def __init__(
+        self,
+        grid: DelayGrid,
+        geotransform: Sequence[float],
+        shape: tuple[int, int],
+        geo_files: dict[str, Path],
+        block_rows: int = 256,
+    ):
+        self.shape = shape
+        self.block_rows = block_rows
+        nrows, ncols = shape
+        x_origin, x_res, _, y_origin, _, y_res = geotransform
+
+        # The interpolation tables index the cube with ascending coordinates
+        self._flip = tuple(
+            bool(len(c) > 1 and c[1] < c[0])
+            for c in (grid.z_coordinates, grid.y_coordinates, grid.x_coordinates)
+        )
+        z, y, x = (
+            np.asarray(c[::-1] if flip else c, dtype=np.float64)
+            for c, flip in zip(
+                (grid.z_coordinates, grid.y_coordinates, grid.x_coordinates),
+                self._flip,
+            )
+        )
+        self._cube_shape = (len(z), len(y), len(x))
+        self._z = z
 
-    crs = CRS.from_epsg(delay_parameters.epsg)
+        # Use the center of the pixels, while the GeoTransform is the
+        # upper left corner of the top left pixel.
+        self._iy, self._wy = _get_linear_weights(
+            y, y_origin + (np.arange(nrows) + 0.5) * y_res
+        )
+        self._ix, self._wx = _get_linear_weights(
+            x, x_origin + (np.arange(ncols) + 0.5) * x_res
+        )
 
+        self._iz = np.zeros(shape, dtype=np.uint16)
+        self._wz = np.zeros(shape, dtype=np.float32)
+        # 1 / los_up where valid, 0 where masked
+        self._scale = np.zeros(shape, dtype=np.float32)
+        dem_ds = _warp_dem(Path(geo_files["height"]), geotransform, shape, grid.epsg)
+        for rows in self._iter_row_blocks():
+            dem = dem_ds.ReadAsArray(
+                xoff=0, yoff=rows.start, xsize=ncols, ysize=rows.stop - rows.start
+            )
+            self._iz[rows], self._wz[rows] = _get_linear_weights(z, dem)
+            self._scale[rows] = _get_los_scale(geo_files, rows)
+        dem_ds = None
+
+    def _iter_row_blocks(self) -> Iterator[slice]:
+        nrows = self.shape[0]
+        for row_start in range(0, nrows, self.block_rows):
+            yield slice(row_start, min(row_start + self.block_rows, nrows))
+
+    def project_block(self, delay_datacube: np.ndarray, rows: slice) -> np.ndarray:
+        """Get the line-of-sight delay (in meters) for a block of full-width rows."""
+        return self._project_flat(self._flatten(delay_datacube), rows)
+
+    def project(self, delay_datacube: np.ndarray) -> np.ndarray:
+        """Get the line-of-sight delay (in meters) for the whole frame."""
+        get_block = self.get_block_getter(delay_datacube)
+        out = np.empty(self.shape, dtype=np.float32)
+        for rows in self._iter_row_blocks():
+            out[rows] = get_block(rows)
+        return out
+
+    def get_block_getter(
+        self,
+        delay_datacube: np.ndarray,
+        reference_point: ReferencePoint | None = None,
+    ) -> Callable[[slice], np.ndarray]:
+        """Get a function projecting `delay_datacube` onto a block of full-width rows.
+
+        Parameters
+        ----------
+        delay_datacube : np.ndarray
+            Delay (in meters) on the (z, y, x) grid.
+        reference_point : ReferencePoint, optional
+            If passed, the delay at this (row, col) is subtracted from all pixels.
+
+        Returns
+        -------
+        Callable[[slice], np.ndarray]
+            Function of the rows to project, returning the delay (in meters).
+
+        """
+        cube = self._flatten(delay_datacube)
+        ref_value = 0.0
+        if reference_point is not None:
+            ref_row, ref_col = reference_point
+            ref_rows = slice(ref_row, ref_row + 1)
+            ref_value = self._project_flat(cube, ref_rows)[0, ref_col]
+
+        def get_block(rows: slice) -> np.ndarray:
+            return self._project_flat(cube, rows) - ref_value
+
+        return get_block
+
+    def write(
+        self,
+        delay_datacube: np.ndarray,
+        output_file: Filename,
+        like_filename: Filename,
+        reference_point: ReferencePoint | None = None,
+        writer: io.PooledBlockWriter | None = None,
+    ) -> None:
+        """Project `delay_datacube` and write it block by block to `output_file`.
+
+        Parameters
+        ----------
+        delay_datacube : np.ndarray
+            Delay (in meters) on the (z, y, x) grid.
+        output_file : Filename
+            Raster to create.
+        like_filename : Filename
+            Raster to copy the size, projection and geotransform from.
+        reference_point : ReferencePoint, optional
+            If passed, the delay at this (row, col) is subtracted from all pixels.
+        writer : io.PooledBlockWriter, optional
+            Writer to queue the blocks on, which the caller is responsible for
+            finishing. Default creates one and waits for it to finish writing.
+
+        """
+        io.write_arr(
+            arr=None,
+            output_name=output_file,
+            like_filename=like_filename,
+            dtype=np.float32,
+            units="meters",
+        )
+        get_block = self.get_block_getter(delay_datacube, reference_point)
+
+        own_writer = writer is None
+        if writer is None:
+            writer = io.PooledBlockWriter()
+        for rows in self._iter_row_blocks():
+            writer.queue_write(get_block(rows), output_file, rows.start, 0)
+        if own_writer:
+            writer.notify_finished()
+
+    def _flatten(self, delay_datacube: np.ndarray) -> np.ndarray:
+        """Flatten a cube with ascending coordinates, as indexed by the tables."""
+        cube = np.ma.getdata(delay_datacube)
+        for axis, flip in enumerate(self._flip):
+            if flip:
+                cube = np.flip(cube, axis=axis)
+        return np.ascontiguousarray(cube, dtype=np.float32).ravel()
+
+    def _project_flat(self, cube: np.ndarray, rows: slice) -> np.ndarray:
+        _, ny, nx = self._cube_shape
+        iz = self._iz[rows].astype(np.int64)
+        wz = self._wz[rows]
+        iy = self._iy[rows, None]
+        wy = self._wy[rows, None]
+        ix, wx = self._ix[None, :], self._wx[None, :]
+        base = (iz * ny + iy) * nx + ix
+
+        out = np.zeros(wz.shape, dtype=np.float32)
+        for dz, dy, dx in itertools.product((0, 1), repeat=3):
+            weight = (
+                (wz if dz else 1 - wz) * (wy if dy else 1 - wy) * (wx if dx else 1 - wx)
+            )
+            out += weight * cube[base + (dz * ny + dy) * nx + dx]
+        return out * self._scale[rows]
+
+
+def _get_linear_weights(
+    coords: np.ndarray, points: ArrayLike
+) -> tuple[np.ndarray, np.ndarray]:
+    """Get the lower index and weight for linear interpolation on `coords`.
+
+    Points outside of `coords` (or NaN) get a NaN weight, so the interpolated
+    value is NaN, as with `RegularGridInterpolator(..., bounds_error=False)`.
+    """
+    points = np.asarray(points, dtype=np.float64)
+    idx = np.clip(np.searchsorted(coords, points, side="right") - 1, 0, len(coords) - 2)
+    weights = (points - coords[idx]) / (coords[idx + 1] - coords[idx])
+    outside = ~((points >= coords[0]) & (points <= coords[-1]))
+    weights[outside] = np.nan
+    return idx, weights.astype(np.float32)
+
+
+def _warp_dem(
+    dem_file: Path, geotransform: Sequence[float], shape: tuple[int, int], epsg: int
+) -> gdal.Dataset:
+    """Warp the DEM onto the output frame, as an in-memory dataset."""
+    x_origin, x_res, _, y_origin, _, y_res = geotransform
+    nrows, ncols = shape
+    bounds = (
+        x_origin,
+        y_origin + nrows * y_res,
+        x_origin + ncols * x_res,
+        y_origin,
+    )
+    crs = CRS.from_epsg(epsg)
     options = gdal.WarpOptions(
         dstSRS=crs,
         format="MEM",
@@ -445,61 +935,57 @@ def compute_2d_delay(
         outputBoundsSRS=crs,
         resampleAlg="near",
     )
-    # Use the same suffix for warping
-    target_ds = gdal.Warp(
-        "",  # Output to memory to read
-        fspath(dem_file.resolve()),
-        options=options,
-    )
+    return gdal.Warp("", fspath(dem_file.resolve()), options=options)
 
-    dem = target_ds.ReadAsArray()
 
+def _get_los_scale(geo_files: dict[str, Path], rows: slice) -> np.ndarray:
+    """Get 1 / (line-of-sight up component), or 0 where the geometry is invalid."""
     if "los_east" in geo_files:
         # ISCE3 geocoded products
-        los_east = io.load_gdal(geo_files["los_east"])
-        los_north = io.load_gdal(geo_files["los_north"])
+        los_east = io.load_gdal(geo_files["los_east"], rows=rows)
+        los_north = io.load_gdal(geo_files["los_north"], rows=rows)
         los_up = np.sqrt(1 - los_east**2 - los_north**2)
+        mask = los_east > 0
     else:
         # ISCE2 radar coordinate
-        los_up = np.cos(np.deg2rad(io.load_gdal(geo_files["incidence_angle"])))
+        incidence_angle = io.load_gdal(geo_files["incidence_angle"], rows=rows)
+        los_up = np.cos(np.deg2rad(incidence_angle))
+        mask = incidence_angle > 0
+    with np.errstate(divide="ignore", invalid="ignore"):
+        return np.where(mask, 1 / los_up, 0).astype(np.float32)
+
 
-    mask = los_east > 0
+def compute_2d_delay(
+    delay_parameters: DelayParams,
+    delay_datacube: np.ndarray,
+    geo_files: dict[str, Path],
+) -> np.ndarray:
+    """Compute 2D delay.
 
-    # Make the x/y arrays
-    # Note that these are the center of the pixels, whereas the GeoTransform
-    # is the upper left corner of the top left pixel.
-    y = np.arange(y_origin, y_origin + y_res * ysize, y_res)
-    x = np.arange(x_origin, x_origin + x_res * xsize, x_res)
+    To project many delay cubes onto the same frame, create one
+    `DelayProjector` and reuse it instead.
 
-    yv, xv = np.meshgrid(y, x, indexing="ij")
+    Parameters
+    ----------
+    delay_parameters : DelayParams
+        dataclass containing tropospheric delay data.
 
-    tropo_delay_interpolator = RegularGridInterpolator(
-        (
-            delay_parameters.z_coordinates,
-            delay_parameters.y_coordinates,
-            delay_parameters.x_coordinates,
-        ),
-        delay_datacube,
-        method="linear",
-        bounds_error=False,
-    )
+    delay_datacube : np.ndarray
+        delay datacube for the x,y,z coordinates in delay_parameters
 
-    tropo_delay_2d = np.zeros(dem.shape, dtype=np.float32)
-
-    nline = 100
-    for i in range(0, dem.shape[1], 100):
-        if i + 100 > dem.shape[0]:
-            nline = dem.shape[0] - i
-        pnts = np.stack(
-            (
-                dem[i : i + 100, :].flatten(),
-                yv[i : i + 100, :].flatten(),
-                xv[i : i + 100, :].flatten(),
-            ),
-            axis=-1,
-        )
-        tropo_delay_2d[i : i + 100, :] = tropo_delay_interpolator(pnts).reshape(
-            nline, dem.shape[1]
-        )
+    geo_files : dict[str, Path]
+        Dictionary containing paths to geospatial files.
 
-    return (tropo_delay_2d / los_up) * mask
+    Returns
+    -------
+    np.ndarray
+        Computed 2D delay in meters.
+
+    """
+    projector = DelayProjector(
+        delay_parameters.grid,
+        delay_parameters.geotransform,
+        delay_parameters.shape,
+        geo_files,
+    )
+    return projector.project(delay_datacube)
@@ -19,6 +19,7 @@ from tqdm.contrib.concurrent import thread_map
 
 from dolphin import io, utils
 from dolphin._types import DateOrDatetime, Filename, T
+from dolphin.io._utils import _unpack_3d_slices
 
 gdal.UseExceptions()
 
@@ -607,6 +608,213 @@ class Network:
         return self.ifg_list == other.ifg_list
 
 
+@dataclass
+class NetworkReader(io.StackReader):
+    """Read the interferograms of a `Network` without writing VRT files.
+
+    Each `__getitem__` call reads the block of every SLC needed by the requested
+    interferograms once, then forms all interferograms as `ref * conj(sec)`.
+    Satisfies the [`StackReader`][dolphin.io.StackReader] protocol, so it can be
+    used as the input to block-iterating functions, or as a replacement for
+    the per-pair `.vrt` files of a `Network(..., write=False)`.
+
+    Attributes
+    ----------
+    slc_reader : io.StackReader
+        Reader for the stack of (phase-linked) SLCs.
+    pairs : list[tuple[int, int]]
+        (reference index, secondary index) into `slc_reader` for each interferogram.
+    dates : list[tuple[DateOrDatetime, DateOrDatetime]], optional
+        (reference date, secondary date) for each interferogram.
+
+    """
+
+    slc_reader: io.StackReader
+    pairs: list[tuple[int, int]]
+    dates: Optional[list[tuple[DateOrDatetime, DateOrDatetime]]] = None
+
+    @classmethod
+    def from_network(
+        cls,
+        network: Network,
+        keep_open: bool = False,
+        num_threads: int = 1,
+    ) -> NetworkReader:
+        """Create a `NetworkReader` from the SLCs and pairs of a `Network`.
+
+        Parameters
+        ----------
+        network : Network
+            Network of interferograms. Create with `write=False` to skip
+            writing the `.vrt` files.
+        keep_open : bool, optional (default False)
+            If True, keep the SLC file handles open for faster reading.
+        num_threads : int, optional (default 1)
+            Number of threads to use for reading the SLCs.
+
+        Returns
+        -------
+        NetworkReader
+            The NetworkReader object.
+
+        """
+        slc_idxs = {slc: idx for idx, slc in enumerate(network.slc_list)}
+        pairs = [(slc_idxs[ref], slc_idxs[sec]) for ref, sec in network.slc_file_pairs]
+        file_list = [
+            io.format_nc_filename(slc, network._slc_to_subdataset[slc])
+            for slc in network.slc_list
+        ]
+        slc_reader = io.RasterStackReader.from_file_list(
+            file_list, keep_open=keep_open, num_threads=num_threads
+        )
+        return cls(
+            slc_reader=slc_reader,
+            pairs=pairs,
+            dates=network._get_ifg_date_pairs(),
+        )
+
+    @classmethod
+    def from_vrt_files(
+        cls,
+        ifg_files: Sequence[Filename],
+        keep_open: bool = False,
+        num_threads: int = 1,
+    ) -> NetworkReader:
+        """Create a `NetworkReader` from interferogram VRTs written by `Network`.
+
+        Parameters
+        ----------
+        ifg_files : Sequence[Filename]
+            Paths to the `.int.vrt` files of `VRTInterferogram`s.
+        keep_open : bool, optional (default False)
+            If True, keep the SLC file handles open for faster reading.
+        num_threads : int, optional (default 1)
+            Number of threads to use for reading the SLCs.
+
+        Returns
+        -------
+        NetworkReader
+            The NetworkReader object.
+
+        Raises
+        ------
+        ValueError
+            If any file is not a VRT forming `ref * conj(sec)` from two SLCs
+            with absolute paths.
+
+        """
+        slc_idxs: dict[str, int] = {}
+        pairs = []
+        for f in ifg_files:
+            if Path(f).suffix != ".vrt":
+                msg = f"{f} is not an interferogram VRT"
+                raise ValueError(msg)
+            text = Path(f).read_text()
+            if "<PixelFunctionType>cmul</PixelFunctionType>" not in text:
+                msg = f"{f} does not form `ref * conj(sec)`"
+                raise ValueError(msg)
+            if 'relativeToVRT="True"' in text or 'relativeToVRT="1"' in text:
+                msg = f"{f} uses paths relative to the VRT"
+                raise ValueError(msg)
+            ifg = VRTInterferogram.from_vrt_file(f)
+            ref_idx, sec_idx = (
+                slc_idxs.setdefault(str(slc), len(slc_idxs))
+                for slc in (ifg.ref_slc, ifg.sec_slc)
+            )
+            pairs.append((ref_idx, sec_idx))
+        slc_reader = io.RasterStackReader.from_file_list(
+            list(slc_idxs), keep_open=keep_open, num_threads=num_threads
+        )
+        return cls(
+            slc_reader=slc_reader,
+            pairs=pairs,
+            dates=[tuple(get_dates(f)[:2]) for f in ifg_files],  # type: ignore[misc]
+        )
+
+    @property
+    def shape(self):  # type: ignore[override] # noqa: D102
+        return (len(self.pairs), *self.slc_reader.shape[-2:])
+
+    @property
+    def dtype(self):  # type: ignore[override] # noqa: D102
+        return np.dtype(np.complex64)
+
+    def __len__(self) -> int:
+        return len(self.pairs)
+
+    def __getitem__(self, key, /) -> np.ndarray:
+        bands, rows, cols = _unpack_3d_slices(key)
+        if isinstance(bands, slice):
+            ifg_idxs = list(range(*bands.indices(len(self.pairs))))
+        elif isinstance(bands, int):
+            ifg_idxs = [bands]
+        else:
+            msg = "Interferogram index must be an integer or slice."
+            raise TypeError(msg)
+
+        # Read each SLC needed by these interferograms only once
+        needed = sorted({i for idx in ifg_idxs for i in self.pairs[idx]})
+        slc_blocks = np.stack(
+            [np.atleast_2d(self.slc_reader[i, rows, cols]) for i in needed]
+        )
+        pos = {slc_idx: n for n, slc_idx in enumerate(needed)}
+        ref_idxs = [pos[self.pairs[idx][0]] for idx in ifg_idxs]
+        sec_idxs = [pos[self.pairs[idx][1]] for idx in ifg_idxs]
+        out = slc_blocks[ref_idxs] * slc_blocks[sec_idxs].conj()
+        return np.squeeze(out.astype(np.complex64, copy=False))
+
+
+def write_network_ifgs(
+    reader: NetworkReader,
+    output_files: Sequence[Filename],
+    like_filename: Filename,
+    out_nodata: float = 0,
+    block_shape: tuple[int, int] = (512, 512),
+    options: Optional[Sequence[str]] = io.DEFAULT_TIFF_OPTIONS,
+) -> None:
+    """Write each interferogram of `reader` to its own raster.
+
+    Each block of every SLC is read once for all interferograms, instead of
+    once per interferogram as when copying the per-pair VRTs.
+
+    Parameters
+    ----------
+    reader : NetworkReader
+        Reader for the interferograms to write.
+    output_files : Sequence[Filename]
+        Path to write each interferogram of `reader` to.
+    like_filename : Filename
+        Raster to copy the size, geotransform and projection from.
+    out_nodata : float
+        Nodata value of the outputs, which also replaces NaNs. Default is 0.
+    block_shape : tuple[int, int]
+        (rows, cols) of the blocks to read and write at a time.
+        Default is (512, 512).
+    options : Optional[Sequence[str]]
+        Driver-specific creation options passed to GDAL.
+        Default is [dolphin.io.DEFAULT_TIFF_OPTIONS][].
+
+    """
+    if len(output_files) != len(reader):
+        msg = f"{len(output_files) = } does not match {len(reader) = }"
+        raise ValueError(msg)
+    for f in output_files:
+        io.write_arr(
+            arr=None,
+            output_name=f,
+            like_filename=like_filename,
+            dtype=np.complex64,
+            nodata=out_nodata,
+            options=options,
+        )
+    for rows, cols in io.iter_blocks(reader.shape[-2:], block_shape):
+        block = reader[:, rows, cols]
+        block = block.reshape(len(reader), *block.shape[-2:])
+        block[np.isnan(block)] = out_nodata
+        for f, arr in zip(output_files, block):
+            io.write_block(arr, f, row_start=rows.start, col_start=cols.start)
+
+
 def estimate_correlation_from_phase(
     ifg: Union[VRTInterferogram, ArrayLike], window_size: Union[int, tuple[int, int]]
 ) -> np.ndarray:
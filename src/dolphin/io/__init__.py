@@ -1,6 +1,8 @@
 from ._background import *
 from ._blocks import *
 from ._core import *
+from ._footprint import *
+from ._metadata import *
 from ._paths import *
 from ._process import *
 from ._readers import *
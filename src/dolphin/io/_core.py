@@ -82,7 +82,7 @@ DEFAULT_HDF5_OPTIONS = {
 
 
 def load_gdal(
-    filename: Filename,
+    filename: Filename | gdal.Dataset,
     *,
     band: Optional[int] = None,
     subsample_factor: Union[int, tuple[int, int]] = 1,
@@ -95,8 +95,9 @@ def load_gdal(
 
     Parameters
     ----------
-    filename : str or Path
-        Path to the file to load.
+    filename : str or Path or gdal.Dataset
+        Path to the file to load, or an already opened GDAL dataset.
+        Passing an open dataset skips reopening (and reparsing) the file.
     band : int, optional
         Band to load. If None, load all bands as 3D array.
     subsample_factor : int or tuple[int, int], optional
@@ -120,7 +121,11 @@ def load_gdal(
         where y = height // subsample_factor and x = width // subsample_factor.
 
     """
-    ds = gdal.Open(fspath(filename))
+    if isinstance(filename, gdal.Dataset):
+        ds = filename
+        filename = ds.GetDescription()
+    else:
+        ds = gdal.Open(fspath(filename))
     nrows, ncols = ds.RasterYSize, ds.RasterXSize
 
     if overview is not None:
@@ -177,7 +182,7 @@ def load_gdal(
     if not masked:
         return out
     # Get the nodata value
-    nd = get_raster_nodata(filename)
+    nd = ds.GetRasterBand(1).GetNoDataValue()
     if nd is not None and np.isnan(nd):
         return np.ma.masked_invalid(out)
     else:
@@ -712,6 +717,19 @@ def _write_gdal(
     band: int | None,
 ):
     ds = gdal.Open(fspath(filename), gdal.GA_Update)
+    _write_gdal_dataset(ds, cur_block, row_start, col_start, band)
+    ds = None
+
+
+def _write_gdal_dataset(
+    ds: gdal.Dataset,
+    cur_block: ArrayLike,
+    row_start: int,
+    col_start: int,
+    band: int | None,
+    flush: bool = True,
+):
+    """Write `cur_block` into an already opened (GA_Update) dataset."""
     if band is not None:
         bnd = ds.GetRasterBand(band)
         bnd.WriteArray(cur_block, col_start, row_start)
@@ -722,9 +740,9 @@ def _write_gdal(
             # only need offset for write:
             # https://gdal.org/api/python/osgeo.gdal.html#osgeo.gdal.Band.WriteArray
             bnd.WriteArray(cur_image, col_start, row_start)
-            bnd.FlushCache()
+            if flush:
+                bnd.FlushCache()
             bnd = None
-    ds = None
 
 
 def _write_hdf5(
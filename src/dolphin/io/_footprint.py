@@ -0,0 +1,294 @@
+"""Low-resolution index of where a raster stack contains valid data."""
+
+from __future__ import annotations
+
+import logging
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass, field
+from os import fspath
+from pathlib import Path
+from typing import TYPE_CHECKING, Optional, Sequence
+
+import numpy as np
+from osgeo import gdal
+from scipy import ndimage
+
+from dolphin._types import Filename
+from dolphin.utils import _get_path_from_gdal_str
+
+if TYPE_CHECKING:
+    from ._readers import VRTStack
+
+logger = logging.getLogger(__name__)
+
+__all__ = [
+    "FootprintIndex",
+]
+
+# Size (in bytes) of the strips read at a time while scanning a raster
+SCAN_BUFFER_BYTES = 64 * 2**20
+# Number of rasters of a stack scanned to make its index
+DEFAULT_MAX_FILES = 2
+
+
+@dataclass
+class FootprintIndex:
+    """Coarse map of which parts of a raster stack contain any valid data.
+
+    Each cell of `valid` covers `cell_shape` full-resolution pixels, and is True
+    if any raster in the stack has valid data in that cell.
+    Block iterators use the index to skip empty blocks, and to read only the
+    valid part of partially empty blocks.
+    """
+
+    valid: np.ndarray
+    """Boolean array of cells containing valid data."""
+    shape: tuple[int, int]
+    """(rows, cols) of the full-resolution rasters."""
+    cell_shape: tuple[int, int]
+    """(rows, cols) of full-resolution pixels covered by each cell."""
+    file_list: list[str] = field(default_factory=list)
+    """Rasters the index was made from. Used to check if a cached index is stale."""
+    file_stats: list[str] = field(default_factory=list)
+    """Size and modification time of each of `file_list`, when known."""
+
+    @classmethod
+    def from_files(
+        cls,
+        file_list: Sequence[Filename],
+        cell_shape: tuple[int, int] = (64, 64),
+        nodata: Optional[float] = None,
+        num_threads: int = 4,
+        max_files: Optional[int] = DEFAULT_MAX_FILES,
+    ) -> FootprintIndex:
+        """Scan a list of rasters to make the index.
+
+        Each scanned raster is read at full resolution, a strip of cells at a
+        time, and a cell is marked valid if any of its pixels is valid. Small
+        patches of valid data inside a cell are therefore never missed.
+
+        The rasters of one stack (e.g. the SLCs of one burst) share their
+        footprint, up to shifts of a few pixels between dates. So by default,
+        only `max_files` evenly spaced rasters (including the first and last)
+        are scanned, and the valid cells are grown by one cell to cover the
+        shifts of the others.
+
+        Parameters
+        ----------
+        file_list : Sequence[Filename]
+            GDAL-readable rasters, all of the same size.
+        cell_shape : tuple[int, int]
+            (rows, cols) of full-resolution pixels in each cell.
+            Default is (64, 64).
+        nodata : float, optional
+            Value of invalid pixels. NaNs are always invalid.
+            Default is None, which treats both 0 and NaN as invalid.
+        num_threads : int
+            Number of rasters to scan at once. Default is 4.
+        max_files : int, optional
+            Number of rasters to scan. Default is 2.
+            If None, all rasters are scanned, and the valid cells are not grown.
+
+        Returns
+        -------
+        FootprintIndex
+            The valid data index for the union of all rasters.
+
+        """
+        file_list = [fspath(f) for f in file_list]
+        scan_list = file_list
+        if max_files is not None and len(file_list) > max_files:
+            idxs = np.unique(np.linspace(0, len(file_list) - 1, max_files).round())
+            scan_list = [file_list[int(i)] for i in idxs]
+        ds = gdal.Open(file_list[0])
+        shape = (ds.RasterYSize, ds.RasterXSize)
+        ds = None
+        cell_rows, cell_cols = cell_shape
+        out_shape = (-(-shape[0] // cell_rows), -(-shape[1] // cell_cols))
+
+        def _scan(filename: str) -> np.ndarray:
+            ds = gdal.Open(filename)
+            bnd = ds.GetRasterBand(1)
+            row_bytes = shape[1] * gdal.GetDataTypeSize(bnd.DataType) // 8
+            strip_rows = cell_rows * max(
+                1, SCAN_BUFFER_BYTES // (row_bytes * cell_rows)
+            )
+            out = np.zeros(out_shape, dtype=bool)
+            for row_start in range(0, shape[0], strip_rows):
+                num_rows = min(strip_rows, shape[0] - row_start)
+                data = bnd.ReadAsArray(0, row_start, shape[1], num_rows)
+                invalid = np.isnan(data)
+                invalid |= data == (0 if nodata is None else nodata)
+                cell_start = row_start // cell_rows
+                out[cell_start : cell_start + -(-num_rows // cell_rows)] = _any_by_cell(
+                    ~invalid, cell_shape
+                )
+            ds = None
+            return out
+
+        logger.info(
+            f"Scanning valid data footprint of {len(scan_list)} of"
+            f" {len(file_list)} rasters"
+        )
+        valid = np.zeros(out_shape, dtype=bool)
+        with ThreadPoolExecutor(max_workers=num_threads) as executor:
+            for cur_valid in executor.map(_scan, scan_list):
+                valid |= cur_valid
+        if len(scan_list) < len(file_list):
+            valid = ndimage.binary_dilation(valid, structure=np.ones((3, 3)))
+        return cls(
+            valid=valid,
+            shape=shape,
+            cell_shape=cell_shape,
+            file_list=file_list,
+        )
+
+    @classmethod
+    def from_stack(
+        cls,
+        stack: VRTStack,
+        cell_shape: tuple[int, int] = (64, 64),
+        nodata: Optional[float] = None,
+        cache_file: Optional[Filename] = None,
+        max_files: Optional[int] = DEFAULT_MAX_FILES,
+    ) -> FootprintIndex:
+        """Get the index for a `VRTStack`, reusing a cached index if present.
+
+        Parameters
+        ----------
+        stack : VRTStack
+            Stack of rasters to index.
+        cell_shape : tuple[int, int]
+            (rows, cols) of full-resolution pixels in each cell.
+            Default is (64, 64).
+        nodata : float, optional
+            Value of invalid pixels. Default is None, which treats both 0 and NaN
+            as invalid.
+        cache_file : Filename, optional
+            Where to save the index. Default is next to the VRT file, with a
+            `.footprint.npz` suffix. The cached index is reused if it was made
+            from the same files, with the same sizes and modification times.
+        max_files : int, optional
+            Number of rasters to scan, passed to `from_files`. Default is 2.
+
+        Returns
+        -------
+        FootprintIndex
+            The valid data index for the stack.
+
+        """
+        if cache_file is None:
+            cache_file = Path(stack.outfile).with_suffix(".footprint.npz")
+        file_list = [fspath(f) for f in stack._gdal_file_strings]
+        file_stats = _get_file_stats(file_list)
+        if Path(cache_file).exists():
+            cached = cls.from_file(cache_file)
+            if (
+                cached.file_list == file_list
+                and cached.file_stats == file_stats
+                and cached.cell_shape == tuple(cell_shape)
+                and cached.shape == stack.shape[-2:]
+            ):
+                logger.info(f"Using cached valid data footprint {cache_file}")
+                return cached
+        footprint = cls.from_files(
+            file_list, cell_shape=cell_shape, nodata=nodata, max_files=max_files
+        )
+        footprint.file_stats = file_stats
+        footprint.to_file(cache_file)
+        return footprint
+
+    @classmethod
+    def from_file(cls, filename: Filename) -> FootprintIndex:
+        """Load an index saved with `to_file`."""
+        with np.load(filename) as npz:
+            return cls(
+                valid=npz["valid"],
+                shape=tuple(npz["shape"].tolist()),
+                cell_shape=tuple(npz["cell_shape"].tolist()),
+                file_list=npz["file_list"].tolist(),
+                file_stats=npz["file_stats"].tolist() if "file_stats" in npz else [],
+            )
+
+    def to_file(self, filename: Filename) -> None:
+        """Save the index to a `.npz` file."""
+        with open(filename, "wb") as f:
+            np.savez(
+                f,
+                valid=self.valid,
+                shape=np.array(self.shape),
+                cell_shape=np.array(self.cell_shape),
+                file_list=np.array(self.file_list, dtype=str),
+                file_stats=np.array(self.file_stats, dtype=str),
+            )
+
+    def _get_cells(self, rows: slice, cols: slice) -> tuple[slice, slice]:
+        r0, r1, _ = rows.indices(self.shape[0])
+        c0, c1, _ = cols.indices(self.shape[1])
+        cell_rows, cell_cols = self.cell_shape
+        return (
+            slice(r0 // cell_rows, -(-r1 // cell_rows)),
+            slice(c0 // cell_cols, -(-c1 // cell_cols)),
+        )
+
+    def is_empty(self, rows: slice, cols: slice) -> bool:
+        """Check if the block at (`rows`, `cols`) has no valid data."""
+        return not self.valid[self._get_cells(rows, cols)].any()
+
+    def valid_window(self, rows: slice, cols: slice) -> Optional[tuple[slice, slice]]:
+        """Get the part of the block at (`rows`, `cols`) containing valid data.
+
+        Parameters
+        ----------
+        rows : slice
+            Rows of the block.
+        cols : slice
+            Columns of the block.
+
+        Returns
+        -------
+        Optional[tuple[slice, slice]]
+            (rows, cols) of the smallest window inside the block which contains
+            all valid cells, or None if the block has no valid data.
+
+        """
+        cell_row_slice, cell_col_slice = self._get_cells(rows, cols)
+        cells = self.valid[cell_row_slice, cell_col_slice]
+        valid_rows = np.flatnonzero(cells.any(axis=1))
+        valid_cols = np.flatnonzero(cells.any(axis=0))
+        if valid_rows.size == 0:
+            return None
+        r0, r1, _ = rows.indices(self.shape[0])
+        c0, c1, _ = cols.indices(self.shape[1])
+        cell_rows, cell_cols = self.cell_shape
+        row_start = (cell_row_slice.start + valid_rows[0]) * cell_rows
+        row_stop = (cell_row_slice.start + valid_rows[-1] + 1) * cell_rows
+        col_start = (cell_col_slice.start + valid_cols[0]) * cell_cols
+        col_stop = (cell_col_slice.start + valid_cols[-1] + 1) * cell_cols
+        return (
+            slice(max(r0, int(row_start)), min(r1, int(row_stop))),
+            slice(max(c0, int(col_start)), min(c1, int(col_stop))),
+        )
+
+
+def _any_by_cell(mask: np.ndarray, cell_shape: tuple[int, int]) -> np.ndarray:
+    """Reduce `mask` to one value per cell, which is True if any pixel is True."""
+    cell_rows, cell_cols = cell_shape
+    nrows, ncols = mask.shape
+    out_rows, out_cols = -(-nrows // cell_rows), -(-ncols // cell_cols)
+    padded = np.zeros((out_rows * cell_rows, out_cols * cell_cols), dtype=bool)
+    padded[:nrows, :ncols] = mask
+    return padded.reshape(out_rows, cell_rows, out_cols, cell_cols).any(axis=(1, 3))
+
+
+def _get_file_stats(file_list: Sequence[str]) -> list[str]:
+    """Get the "size:mtime_ns" of each file, or "" if it's not a local file."""
+    stats = []
+    for f in file_list:
+        try:
+            st = _get_path_from_gdal_str(f).stat()
+        except OSError:
+            stats.append("")
+        else:
+            stats.append(f"{st.st_size}:{st.st_mtime_ns}")
+    return stats
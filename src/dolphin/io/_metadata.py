@@ -0,0 +1,261 @@
+"""Index of raster header metadata, read once for a large list of files."""
+
+from __future__ import annotations
+
+import datetime
+import json
+import logging
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import asdict, dataclass
+from os import fspath
+from pathlib import Path
+from typing import Any, Mapping, Optional, Sequence
+
+import h5py
+import numpy as np
+import opera_utils as oput
+from osgeo import gdal
+
+from dolphin._types import Filename
+from dolphin.utils import (
+    _get_path_from_gdal_str,
+    _resolve_gdal_path,
+    numpy_to_gdal_type,
+)
+
+from ._core import format_nc_filename
+from ._paths import S3Path
+
+logger = logging.getLogger(__name__)
+
+__all__ = [
+    "MetadataIndex",
+    "RasterHeader",
+]
+
+_HDF5_SUFFIXES = (".h5", ".hdf5", ".he5", ".nc")
+_ZERO_DOPPLER_START_DSET = "/identification/zero_doppler_start_time"
+_WAVELENGTH_DSET = "/metadata/processing_information/input_burst_metadata/wavelength"
+_TIME_FMT = "%Y-%m-%d %H:%M:%S.%f"
+
+
+@dataclass(frozen=True)
+class RasterHeader:
+    """Header information for one raster, read without loading any pixels."""
+
+    shape: tuple[int, int]
+    """(rows, cols) of the raster."""
+    dtype: str
+    """Name of the GDAL data type of the raster (e.g. "CFloat32")."""
+    block_size: tuple[int, int]
+    """(xsize, ysize) of the chunks on disk, in GDAL's order."""
+    nodata: Optional[float] = None
+    """Nodata value of the raster, if set."""
+    mtime: Optional[float] = None
+    """Modification time of the file when the header was read."""
+    zero_doppler_start_time: Optional[str] = None
+    """Zero-doppler start time of OPERA CSLC files."""
+    wavelength: Optional[float] = None
+    """Radar wavelength (in meters) of OPERA CSLC files."""
+
+    @classmethod
+    def from_dict(cls, d: Mapping[str, Any]) -> RasterHeader:
+        return cls(
+            **{
+                **d,
+                "shape": tuple(d["shape"]),
+                "block_size": tuple(d["block_size"]),
+            }
+        )
+
+
+class MetadataIndex:
+    """Header metadata for a list of rasters, read in one parallel pass.
+
+    Later steps look up the sizes, chunking, and OPERA acquisition metadata
+    here instead of reopening each file.
+    The index may be saved as a JSON sidecar file: entries are keyed by the
+    absolute path, and an entry is only reused if the file's modification time
+    has not changed.
+
+    Parameters
+    ----------
+    headers : Mapping[str, RasterHeader]
+        Mapping of file path to the header of that file.
+
+    """
+
+    def __init__(self, headers: Mapping[str, RasterHeader]):
+        self.headers = dict(headers)
+
+    @classmethod
+    def from_files(
+        cls,
+        file_list: Sequence[Filename | S3Path],
+        subdataset: Optional[str] = None,
+        cache_file: Optional[Filename] = None,
+        num_threads: int = 16,
+    ) -> MetadataIndex:
+        """Read the headers of all files in `file_list`.
+
+        Parameters
+        ----------
+        file_list : Sequence[Filename | S3Path]
+            Files to index.
+        subdataset : str, optional
+            Dataset to read from HDF5/NetCDF files.
+        cache_file : Filename, optional
+            JSON file to load previously read headers from, and to save the
+            updated index to. Default is None (no caching).
+        num_threads : int
+            Number of files to read at once. Default is 16.
+
+        Returns
+        -------
+        MetadataIndex
+            Index with one entry per file in `file_list`.
+
+        """
+        cached: dict[str, RasterHeader] = {}
+        if cache_file is not None and Path(cache_file).exists():
+            cached = cls.from_file(cache_file).headers
+
+        headers: dict[str, RasterHeader] = {}
+        to_read = []
+        for f in file_list:
+            key = _get_key(f)
+            header = cached.get(key)
+            if header is not None and header.mtime == _get_mtime(f):
+                headers[key] = header
+            else:
+                to_read.append(f)
+
+        if to_read:
+            logger.info(f"Reading metadata from {len(to_read)} files")
+            with ThreadPoolExecutor(max_workers=num_threads) as executor:
+                new_headers = executor.map(
+                    lambda f: _read_header(f, subdataset), to_read
+                )
+                for f, header in zip(to_read, new_headers):
+                    headers[_get_key(f)] = header
+
+        index = cls(headers)
+        if cache_file is not None and to_read:
+            index.to_file(cache_file)
+        return index
+
+    @classmethod
+    def from_file(cls, filename: Filename) -> MetadataIndex:
+        """Load an index saved with `to_file`."""
+        with open(filename) as f:
+            d = json.load(f)
+        return cls({k: RasterHeader.from_dict(v) for k, v in d.items()})
+
+    def to_file(self, filename: Filename) -> None:
+        """Save the index as a JSON file."""
+        with open(filename, "w") as f:
+            json.dump({k: asdict(v) for k, v in self.headers.items()}, f, indent=2)
+
+    def __getitem__(self, filename: Filename | S3Path) -> RasterHeader:
+        return self.headers[_get_key(filename)]
+
+    def __contains__(self, filename: Filename | S3Path) -> bool:
+        return _get_key(filename) in self.headers
+
+    def __len__(self) -> int:
+        return len(self.headers)
+
+    def get_zero_doppler_time(self, filename: Filename) -> datetime.datetime:
+        """Get the zero-doppler start time of an OPERA CSLC file.
+
+        Falls back to reading the file if it is not in the index.
+        """
+        if filename in self:
+            time_str = self[filename].zero_doppler_start_time
+            if time_str is not None:
+                return datetime.datetime.strptime(time_str, _TIME_FMT)
+        return oput.get_zero_doppler_time(filename)
+
+    def get_radar_wavelength(self, filename: Filename) -> float:
+        """Get the radar wavelength of an OPERA CSLC file.
+
+        Falls back to reading the file if it is not in the index.
+        """
+        if filename in self:
+            wavelength = self[filename].wavelength
+            if wavelength is not None:
+                return wavelength
+        return oput.get_radar_wavelength(filename)
+
+
+def _get_key(filename: Filename | S3Path) -> str:
+    if isinstance(filename, S3Path):
+        return str(filename)
+    return fspath(_resolve_gdal_path(filename))
+
+
+def _get_mtime(filename: Filename | S3Path) -> Optional[float]:
+    if isinstance(filename, S3Path):
+        return None
+    try:
+        return _get_path_from_gdal_str(filename).stat().st_mtime
+    except OSError:
+        # Virtual paths (e.g. /vsicurl/...)
+        return None
+
+
+def _read_header(
+    filename: Filename | S3Path, subdataset: Optional[str]
+) -> RasterHeader:
+    if (
+        not isinstance(filename, S3Path)
+        and subdataset is not None
+        and Path(filename).suffix in _HDF5_SUFFIXES
+    ):
+        return _read_hdf5_header(filename, subdataset)
+
+    if isinstance(filename, S3Path):
+        gdal_str = filename.to_gdal()
+    else:
+        gdal_str = format_nc_filename(filename, subdataset)
+    ds = gdal.Open(gdal_str)
+    bnd = ds.GetRasterBand(1)
+    header = RasterHeader(
+        shape=(ds.RasterYSize, ds.RasterXSize),
+        dtype=gdal.GetDataTypeName(bnd.DataType),
+        block_size=tuple(bnd.GetBlockSize()),
+        nodata=bnd.GetNoDataValue(),
+        mtime=_get_mtime(filename),
+    )
+    ds = bnd = None
+    return header
+
+
+def _read_hdf5_header(filename: Filename, subdataset: str) -> RasterHeader:
+    with h5py.File(filename, "r") as hf:
+        dset = hf[subdataset]
+        rows, cols = dset.shape[-2:]
+        # GDAL uses full-width, single-row blocks for contiguous datasets
+        block_size = (dset.chunks[-1], dset.chunks[-2]) if dset.chunks else (cols, 1)
+        fill_value = dset.attrs.get("_FillValue")
+        zero_doppler_time = (
+            _to_str(hf[_ZERO_DOPPLER_START_DSET][()])
+            if _ZERO_DOPPLER_START_DSET in hf
+            else None
+        )
+        wavelength = float(hf[_WAVELENGTH_DSET][()]) if _WAVELENGTH_DSET in hf else None
+        dtype = dset.dtype
+
+    return RasterHeader(
+        shape=(rows, cols),
+        dtype=gdal.GetDataTypeName(numpy_to_gdal_type(dtype)),
+        block_size=(int(block_size[0]), int(block_size[1])),
+        nodata=None if fill_value is None else float(np.real(fill_value)),
+        mtime=_get_mtime(filename),
+        zero_doppler_start_time=zero_doppler_time,
+        wavelength=wavelength,
+    )
+
+
+def _to_str(value: bytes | str) -> str:
+    return value.decode("utf-8") if isinstance(value, bytes) else str(value)
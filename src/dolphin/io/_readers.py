@@ -1,9 +1,12 @@
 from __future__ import annotations
 
+import asyncio
 import logging
 import mmap
-from concurrent.futures import ThreadPoolExecutor
-from dataclasses import dataclass
+import threading
+from collections import deque
+from concurrent.futures import Future, ThreadPoolExecutor
+from dataclasses import dataclass, field
 from os import fspath
 from pathlib import Path
 from typing import (
@@ -24,10 +27,13 @@ from osgeo import gdal
 from tqdm.auto import trange
 
 from dolphin import io, utils
+from dolphin._profiling import stage
 from dolphin._types import Filename
 from dolphin.io._blocks import iter_blocks
 
 from ._background import _DEFAULT_TIMEOUT, BackgroundReader
+from ._footprint import FootprintIndex
+from ._metadata import MetadataIndex
 from ._paths import S3Path
 from ._utils import _ensure_slices, _unpack_3d_slices
 
@@ -40,8 +46,10 @@ __all__ = [
     "EagerLoader",
     "HDF5Reader",
     "HDF5StackReader",
+    "ParallelLoader",
     "RasterReader",
     "RasterStackReader",
+    "S3StackReader",
     "StackReader",
     "VRTStack",
 ]
@@ -265,6 +273,10 @@ class HDF5Reader(DatasetReader):
         """Int : Number of array dimensions."""
         return len(self.shape)
 
+    def __len__(self) -> int:
+        # Allows a 3D dataset (e.g. from `HDF5StackWriter`) to be a `StackReader`
+        return self.shape[0]
+
     def __array__(self) -> np.ndarray:
         return self[:,]
 
@@ -404,16 +416,7 @@ def _read_3d(
     key: tuple[Index, ...], readers: Sequence[DatasetReader], num_threads: int = 1
 ):
     bands, r_slice, c_slice = _unpack_3d_slices(key)
-
-    if isinstance(bands, slice):
-        # convert the bands to -1-indexed list
-        total_num_bands = len(readers)
-        band_idxs = list(range(*bands.indices(total_num_bands)))
-    elif isinstance(bands, int):
-        band_idxs = [bands]
-    else:
-        msg = "Band index must be an integer or slice."
-        raise TypeError(msg)
+    band_idxs = _get_band_idxs(bands, len(readers))
 
     # Get only the bands we need
     if num_threads == 1:
@@ -427,6 +430,17 @@ def _read_3d(
     return np.squeeze(out)
 
 
+def _get_band_idxs(bands: Index, total_num_bands: int) -> list[int]:
+    if isinstance(bands, slice):
+        # convert the bands to -1-indexed list
+        return list(range(*bands.indices(total_num_bands)))
+    elif isinstance(bands, int):
+        return [bands]
+    else:
+        msg = "Band index must be an integer or slice."
+        raise TypeError(msg)
+
+
 @dataclass
 class BaseStackReader(StackReader):
     """Base class for stack readers."""
@@ -659,6 +673,219 @@ class RasterStackReader(BaseStackReader):
         return cls(file_list, readers, num_threads=num_threads, nodata=nodata)
 
 
+@dataclass
+class S3StackReader(BaseStackReader):
+    """A stack of cloud-hosted rasters (e.g. COGs or HDF5 files on S3).
+
+    Reads of a block request the window from all bands concurrently, using a
+    pool of `max_concurrency` threads which lives as long as the reader.
+    Each thread keeps its own open handle to every file it has read from, so
+    the files are only opened (and their headers fetched) once per thread.
+    GDAL is configured to merge requests for adjacent tiles into one range
+    request, and to keep fetched chunks in a local cache of `cache_size_mb`.
+    Call `close` (or use the reader as a context manager) to stop the threads
+    and close the files.
+
+    See Also
+    --------
+    RasterStackReader
+    VRTStack
+
+    Notes
+    -----
+    To read from an S3-compatible server (e.g. a local test server), pass the
+    endpoint options in `gdal_config`, e.g. `{"AWS_S3_ENDPOINT": "localhost:5000",
+    "AWS_HTTPS": "NO", "AWS_VIRTUAL_HOSTING": "FALSE"}`.
+
+    """
+
+    max_concurrency: int = 16
+    cache_size_mb: int = 256
+    gdal_config: dict[str, str] = field(default_factory=dict)
+
+    @classmethod
+    def from_file_list(
+        cls,
+        file_list: Sequence[Filename | S3Path],
+        bands: int | Sequence[int] = 1,
+        subdataset: Optional[str] = None,
+        max_concurrency: int = 16,
+        cache_size_mb: int = 256,
+        unsigned: bool = False,
+        nodata: Optional[float] = None,
+        gdal_config: Optional[dict[str, str]] = None,
+    ) -> S3StackReader:
+        """Create a S3StackReader from a list of S3 urls.
+
+        Parameters
+        ----------
+        file_list : Sequence[Filename | S3Path]
+            List of `s3://` urls (or `S3Path`s) of the files to read.
+        bands : int | Sequence[int]
+            Band to read from each file.
+            If a single int, will be used for all files.
+            Default = 1.
+        subdataset : str, optional
+            Subdataset to read from the files, if using HDF5/NetCDF files.
+        max_concurrency : int, optional (default 16)
+            Maximum number of concurrent band reads for each block.
+        cache_size_mb : int, optional (default 256)
+            Size (in MB) of GDAL's local cache of downloaded chunks.
+        unsigned : bool, optional (default False)
+            If True, don't sign the requests to S3 (for public buckets).
+        nodata : float, optional
+            Manually set value to use for nodata pixels, by default None
+        gdal_config : dict[str, str], optional
+            Extra GDAL configuration options to use when reading.
+
+        Returns
+        -------
+        S3StackReader
+            The S3StackReader object.
+
+        """
+        if isinstance(bands, int):
+            bands = [bands] * len(file_list)
+        config = _get_s3_gdal_config(cache_size_mb, unsigned, gdal_config)
+        gdal_strings = [
+            io.format_nc_filename(S3Path(str(f)).to_gdal(), subdataset)
+            for f in file_list
+        ]
+        with rio.Env(**config), ThreadPoolExecutor(max_concurrency) as executor:
+            readers = list(
+                executor.map(
+                    lambda fb: RasterReader.from_file(fb[0], band=fb[1], nodata=nodata),
+                    zip(gdal_strings, bands),
+                )
+            )
+        nds = {r.nodata for r in readers}
+        if len(nds) == 1:
+            nodata = nds.pop()
+        return cls(
+            file_list=list(file_list),
+            readers=readers,
+            nodata=nodata,
+            max_concurrency=max_concurrency,
+            cache_size_mb=cache_size_mb,
+            gdal_config=config,
+        )
+
+    def __post_init__(self):
+        self._handles = threading.local()
+        self._lock = threading.Lock()
+        self._executor: Optional[ThreadPoolExecutor] = None
+        self._datasets: list[rio.DatasetReader] = []
+
+    def __getstate__(self):
+        # Open files and threads can't be pickled: drop them
+        state = self.__dict__.copy()
+        for key in ("_handles", "_lock", "_executor", "_datasets"):
+            del state[key]
+        return state
+
+    def __setstate__(self, state):
+        self.__dict__.update(state)
+        self.__post_init__()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *args):
+        self.close()
+
+    def close(self) -> None:
+        """Stop the reading threads and close their open files."""
+        with self._lock:
+            if self._executor is not None:
+                self._executor.shutdown(wait=True)
+                self._executor = None
+            for ds in self._datasets:
+                ds.close()
+            self._datasets = []
+            self._handles = threading.local()
+
+    def __getitem__(self, key: tuple[Index, ...], /) -> np.ndarray:
+        bands, r_slice, c_slice = _unpack_3d_slices(key)
+        band_idxs = _get_band_idxs(bands, len(self.readers))
+        results = self._get_executor().map(
+            lambda i: self._read_band(i, r_slice, c_slice), band_idxs
+        )
+        return np.squeeze(np.stack(list(results), axis=0))
+
+    async def read_async(self, key: tuple[Index, ...]) -> np.ndarray:
+        """Read a block of all requested bands concurrently.
+
+        Use this inside an event loop to await the read without blocking
+        the loop.
+        """
+        bands, r_slice, c_slice = _unpack_3d_slices(key)
+        band_idxs = _get_band_idxs(bands, len(self.readers))
+        loop = asyncio.get_running_loop()
+        executor = self._get_executor()
+        results = await asyncio.gather(
+            *(
+                loop.run_in_executor(executor, self._read_band, i, r_slice, c_slice)
+                for i in band_idxs
+            )
+        )
+        return np.squeeze(np.stack(results, axis=0))
+
+    def _get_executor(self) -> ThreadPoolExecutor:
+        with self._lock:
+            if self._executor is None:
+                self._executor = ThreadPoolExecutor(max_workers=self.max_concurrency)
+            return self._executor
+
+    def _get_dataset(self, idx: int) -> rio.DatasetReader:
+        """Get this thread's open handle to file `idx`, opening on first use."""
+        datasets = getattr(self._handles, "datasets", None)
+        if datasets is None:
+            datasets = self._handles.datasets = {}
+        if idx not in datasets:
+            datasets[idx] = rio.open(self.readers[idx].filename)
+            with self._lock:
+                self._datasets.append(datasets[idx])
+        return datasets[idx]
+
+    def _read_band(self, idx: int, rows: slice, cols: slice) -> np.ndarray:
+        import rasterio.windows
+
+        reader = self.readers[idx]
+        window = rasterio.windows.Window.from_slices(
+            rows, cols, height=reader.shape[0], width=reader.shape[1]
+        )
+        # GDAL config options are per-thread, so set them in each worker
+        with rio.Env(**self.gdal_config):
+            out = self._get_dataset(idx).read(reader.band, window=window)
+        if reader.nodata is not None:
+            out = _mask_array(out, reader.nodata)
+        # Rasterio doesn't use the `step` of a slice
+        return out[:: rows.step or 1, :: cols.step or 1]
+
+
+def _get_s3_gdal_config(
+    cache_size_mb: int,
+    unsigned: bool = False,
+    extra: Optional[dict[str, str]] = None,
+) -> dict[str, str]:
+    config = {
+        # Skip listing the bucket "directory" when opening each file
+        "GDAL_DISABLE_READDIR_ON_OPEN": "EMPTY_DIR",
+        # Coalesce requests for adjacent tiles into fewer range requests
+        "GDAL_HTTP_MULTIRANGE": "YES",
+        "GDAL_HTTP_MERGE_CONSECUTIVE_RANGES": "YES",
+        "GDAL_HTTP_MULTIPLEX": "YES",
+        # Keep the downloaded chunks in a local cache
+        "VSI_CACHE": "TRUE",
+        "VSI_CACHE_SIZE": str(cache_size_mb * 2**20),
+        "CPL_VSIL_CURL_CACHE_SIZE": str(cache_size_mb * 2**20),
+    }
+    if unsigned:
+        config["AWS_NO_SIGN_REQUEST"] = "YES"
+    config.update(extra or {})
+    return config
+
+
 # Masked versions of each of the 2D/3D readers
 
 
@@ -686,6 +913,13 @@ class VRTStack(StackReader):
     file_date_fmt : str, optional (default = "%Y%m%d")
         Format string for parsing the dates from the filenames.
         Passed to [opera_utils.get_dates][].
+    keep_open : bool, optional (default = False)
+        Keep one open GDAL handle to the VRT per reading thread, instead of
+        reopening (and reparsing) the VRT on every block read.
+    metadata : MetadataIndex, optional
+        Index of the file headers, used instead of opening each file to check
+        sizes and chunking. If not passed, one is made with a parallel read of
+        all file headers.
 
     """
 
@@ -702,6 +936,8 @@ class VRTStack(StackReader):
         skip_size_check: bool = False,
         num_threads: int = 1,
         read_masked: bool = False,
+        keep_open: bool = False,
+        metadata: Optional[MetadataIndex] = None,
     ):
         if Path(outfile).exists() and write_file:
             if fail_on_overwrite:
@@ -733,13 +969,22 @@ class VRTStack(StackReader):
         self.dates = dates
         self.num_threads = num_threads
         self._read_masked = read_masked
+        self.keep_open = keep_open
+        self._handles = threading.local()
 
         self.outfile = Path(outfile).resolve()
         # Assumes that all files use the same subdataset (if NetCDF)
         self.subdataset = subdataset
 
+        if (write_file or not skip_size_check) and (
+            metadata is None or not all(f in metadata for f in files)
+        ):
+            metadata = MetadataIndex.from_files(files, subdataset=subdataset)
+        self._metadata = metadata
+
         if not skip_size_check:
-            _assert_images_same_size(self._gdal_file_strings)
+            assert metadata is not None
+            _assert_images_same_size(files, metadata)
 
         # Use the first file in the stack to get size, transform info
         ds = gdal.Open(fspath(self._gdal_file_strings[0]))
@@ -753,6 +998,9 @@ class VRTStack(StackReader):
         self.nodata = self.nodatavals[0]
         # Should be CFloat32
         self.gdal_dtype = gdal.GetDataTypeName(bnd1.DataType)
+        self._dtype = utils.gdal_to_numpy_type(bnd1.DataType)
+        # (xsize, ysize) of the blocks on disk of the first file
+        self.chunk_size = bnd1.GetBlockSize()
         # Save these for setting at the end
         self.gt = ds.GetGeoTransform()
         self.proj = ds.GetProjection()
@@ -774,8 +1022,13 @@ class VRTStack(StackReader):
                 f' rasterYSize="{self.ysize_sub}">\n'
             )
 
-            for idx, filename in enumerate(self._gdal_file_strings, start=1):
-                chunk_size = io.get_raster_chunk_size(filename)
+            for idx, (f, filename) in enumerate(
+                zip(self.file_list, self._gdal_file_strings), start=1
+            ):
+                if self._metadata is not None and f in self._metadata:
+                    chunk_size = list(self._metadata[f].block_size)
+                else:
+                    chunk_size = io.get_raster_chunk_size(filename)
                 # chunks in a vrt have a min of 16, max of 2**14=16384
                 # https://github.com/OSGeo/gdal/blob/2530defa1e0052827bc98696e7806037a6fec86e/frmts/vrt/vrtrasterband.cpp#L339
                 if any(b < 16 for b in chunk_size) or any(
@@ -829,6 +1082,24 @@ class VRTStack(StackReader):
         # Allows os.fspath() to work on the object, enabling rasterio.open()
         return fspath(self.outfile)
 
+    def __getstate__(self):
+        # GDAL datasets can't be pickled: drop the open handles
+        state = self.__dict__.copy()
+        del state["_handles"]
+        return state
+
+    def __setstate__(self, state):
+        self.__dict__.update(state)
+        self._handles = threading.local()
+
+    def _get_dataset(self) -> gdal.Dataset:
+        """Get this thread's open GDAL dataset for the VRT, opening on first use."""
+        ds = getattr(self._handles, "ds", None)
+        if ds is None:
+            ds = gdal.Open(fspath(self.outfile))
+            self._handles.ds = ds
+        return ds
+
     @classmethod
     def from_vrt_file(cls, vrt_file, new_outfile=None, **kwargs):
         """Create a new VRTStack using an existing VRT file."""
@@ -837,6 +1108,8 @@ class VRTStack(StackReader):
             # Point to the same, if none provided
             new_outfile = vrt_file
 
+        # The sizes were checked when the VRT was written
+        kwargs.setdefault("skip_size_check", True)
         return cls(
             file_list,
             outfile=new_outfile,
@@ -848,8 +1121,7 @@ class VRTStack(StackReader):
     @property
     def shape(self):
         """Get the 3D shape of the stack."""
-        xsize, ysize = io.get_raster_xysize(self._gdal_file_strings[0])
-        return (len(self.file_list), ysize, xsize)
+        return (len(self.file_list), self.ysize, self.xsize)
 
     def __len__(self):
         return len(self.file_list)
@@ -872,7 +1144,7 @@ class VRTStack(StackReader):
 
     @property
     def dtype(self):
-        return io.get_raster_dtype(self._gdal_file_strings[0])
+        return self._dtype
 
     def __getitem__(self, index):
         if isinstance(index, int):
@@ -927,7 +1199,7 @@ class VRTStack(StackReader):
         if masked is None:
             masked = self._read_masked
         data = io.load_gdal(
-            self.outfile,
+            self._get_dataset() if self.keep_open else self.outfile,
             band=band,
             subsample_factor=subsample_factor,
             rows=rows,
@@ -990,10 +1262,9 @@ def _parse_vrt_file(vrt_file):
     return filepaths, sds
 
 
-def _assert_images_same_size(files):
+def _assert_images_same_size(files, metadata: MetadataIndex):
     """Ensure all files are the same size."""
-    with ThreadPoolExecutor(5) as executor:
-        sizes = list(executor.map(io.get_raster_xysize, files))
+    sizes = [metadata[f].shape for f in files]
     if len(set(sizes)) > 1:
         msg = f"Not files have same raster (x, y) size:\n{set(sizes)}"
         raise ValueError(msg)
@@ -1010,6 +1281,7 @@ class EagerLoader(BackgroundReader):
         skip_empty: bool = True,
         nodata_value: Optional[float] = None,
         nodata_mask: Optional[ArrayLike] = None,
+        footprint: Optional[FootprintIndex] = None,
         queue_size: int = 1,
         timeout: float = _DEFAULT_TIMEOUT,
     ):
@@ -1025,11 +1297,15 @@ class EagerLoader(BackgroundReader):
                 overlaps=overlaps,
             )
         )
+        reader_nodata = getattr(reader, "nodata", None)
         if nodata_value is None:
-            nodata_value = getattr(reader, "nodata", None)
+            nodata_value = reader_nodata
+        # Fill for the parts of a block skipped using `footprint`
+        self._fill_value = 0 if reader_nodata is None else reader_nodata
         self._queue_size = queue_size
         self._skip_empty = skip_empty
         self._nodata_mask = nodata_mask
+        self._footprint = footprint
         self._block_shape = block_shape
         self._nodata = nodata_value
         if self._nodata is None:
@@ -1037,7 +1313,10 @@ class EagerLoader(BackgroundReader):
 
     def read(self, rows: slice, cols: slice) -> tuple[np.ndarray, tuple[slice, slice]]:
         logger.debug(f"EagerLoader reading {rows}, {cols}")
-        cur_block = self.reader[..., rows, cols]
+        with stage("read", category="block"):
+            cur_block = _read_block(
+                self.reader, rows, cols, self._footprint, self._fill_value
+            )
         return cur_block, (rows, cols)
 
     def iter_blocks(
@@ -1052,6 +1331,12 @@ class EagerLoader(BackgroundReader):
                 if self._nodata_mask[rows, cols].all():
                     logger.debug("Skipping!")
                     continue
+            if (
+                self._skip_empty
+                and self._footprint is not None
+                and self._footprint.is_empty(rows, cols)
+            ):
+                continue
             self.queue_read(rows, cols)
             queued_slices.append((rows, cols))
 
@@ -1061,18 +1346,199 @@ class EagerLoader(BackgroundReader):
             logger.debug(f"got data for {rows, cols}: {cur_block.shape}")
 
             # Otherwise look at the actual block we loaded
-            if self._skip_empty:
-                if isinstance(cur_block, np.ma.MaskedArray) and cur_block.mask.all():
-                    continue
-                if np.isnan(self._nodata):
-                    block_is_nodata = np.isnan(cur_block)
-                else:
-                    block_is_nodata = cur_block == self._nodata
-                if np.all(block_is_nodata):
-                    logger.debug(
-                        f"Skipping block {rows}, {cols} since it was all nodata"
-                    )
-                    continue
+            if self._skip_empty and _is_nodata_block(cur_block, self._nodata):
+                logger.debug(f"Skipping block {rows}, {cols} since it was all nodata")
+                continue
+            yield cur_block, (rows, cols)
+
+        self.notify_finished()
+
+
+class ParallelLoader:
+    """Pre-fetch data chunks using multiple reader threads.
+
+    Same interface as [`EagerLoader`][dolphin.io.EagerLoader], but up to
+    `num_threads` blocks are read at once, and the read-ahead depth is limited by
+    the memory used by the pre-fetched blocks instead of a fixed block count.
+    Results from `get_data` (and `iter_blocks`) are returned in the order the
+    reads were queued.
+
+    Parameters
+    ----------
+    reader : DatasetReader
+        Reader for the data. Must be safe to read from multiple threads
+        (e.g. `VRTStack`).
+    block_shape : tuple[int, int]
+        (rows, cols) of each block.
+    overlaps : tuple[int, int]
+        Overlap (rows, cols) between adjacent blocks. Default is (0, 0).
+    skip_empty : bool
+        Skip blocks which are all nodata in `iter_blocks`. Default is True.
+    nodata_value : float, optional
+        Value of nodata pixels. Default is the `nodata` of `reader`, or nan.
+    nodata_mask : ArrayLike, optional
+        Boolean mask where True means nodata: blocks entirely within the mask
+        are not read in `iter_blocks`.
+    footprint : FootprintIndex, optional
+        Low-resolution index of the valid data in `reader`. Blocks with no valid
+        data are not read in `iter_blocks`, and only the valid part of other
+        blocks is read (the rest is filled with the `nodata` of `reader`, or 0,
+        which is what the files contain there).
+    num_threads : int
+        Number of reader threads. Default is 2.
+    max_buffer_bytes : int, optional
+        Maximum memory to use for blocks which are read ahead.
+        Default is None, which reads ahead `2 * num_threads` blocks.
+
+    """
+
+    def __init__(
+        self,
+        reader: DatasetReader,
+        block_shape: tuple[int, int],
+        overlaps: tuple[int, int] = (0, 0),
+        skip_empty: bool = True,
+        nodata_value: Optional[float] = None,
+        nodata_mask: Optional[ArrayLike] = None,
+        footprint: Optional[FootprintIndex] = None,
+        num_threads: int = 2,
+        max_buffer_bytes: Optional[int] = None,
+    ):
+        self.reader = reader
+        nrows, ncols = self.reader.shape[-2:]
+        self.slices = list(
+            iter_blocks(
+                arr_shape=(nrows, ncols),
+                block_shape=block_shape,
+                overlaps=overlaps,
+            )
+        )
+        reader_nodata = getattr(reader, "nodata", None)
+        if nodata_value is None:
+            nodata_value = reader_nodata
+        self._nodata = np.nan if nodata_value is None else nodata_value
+        self._fill_value = 0 if reader_nodata is None else reader_nodata
+        self._skip_empty = skip_empty
+        self._nodata_mask = nodata_mask
+        self._footprint = footprint
+        self._block_shape = block_shape
+
+        # Number of layers read in each block
+        depth = int(np.prod(self.reader.shape[:-2], dtype=int))
+        block_rows = block_shape[0] + 2 * overlaps[0]
+        block_cols = block_shape[1] + 2 * overlaps[1]
+        block_bytes = depth * block_rows * block_cols * np.dtype(reader.dtype).itemsize
+        if max_buffer_bytes is None:
+            self.read_ahead = 2 * num_threads
+        else:
+            self.read_ahead = max(1, max_buffer_bytes // block_bytes)
+        logger.debug(
+            f"ParallelLoader using {num_threads} threads,"
+            f" reading ahead {self.read_ahead} blocks"
+        )
+
+        self._executor = ThreadPoolExecutor(
+            max_workers=num_threads, thread_name_prefix="ParallelLoader"
+        )
+        self._queued: deque[tuple[slice, slice]] = deque()
+        self._in_flight: deque[Future] = deque()
+
+    def read(self, rows: slice, cols: slice) -> tuple[np.ndarray, tuple[slice, slice]]:
+        logger.debug(f"ParallelLoader reading {rows}, {cols}")
+        with stage("read", category="block"):
+            cur_block = _read_block(
+                self.reader, rows, cols, self._footprint, self._fill_value
+            )
+        return cur_block, (rows, cols)
+
+    def queue_read(self, rows: slice, cols: slice):
+        """Add a block to be read. Reads start once there is room in the buffer."""
+        self._queued.append((rows, cols))
+        self._submit_reads()
+
+    def get_data(self) -> tuple[np.ndarray, tuple[slice, slice]]:
+        """Get the least-recently queued block, waiting until it has been read."""
+        self._submit_reads()
+        if not self._in_flight:
+            msg = "No reads have been queued"
+            raise RuntimeError(msg)
+        result = self._in_flight.popleft().result()
+        self._submit_reads()
+        return result
+
+    def _submit_reads(self):
+        while self._queued and len(self._in_flight) < self.read_ahead:
+            rows, cols = self._queued.popleft()
+            self._in_flight.append(self._executor.submit(self.read, rows, cols))
+
+    def iter_blocks(
+        self, **tqdm_kwargs
+    ) -> Generator[tuple[np.ndarray, tuple[slice, slice]], None, None]:
+        num_queued = 0
+        for rows, cols in self.slices:
+            # Skip queueing a read if all nodata
+            if self._skip_empty and (
+                (self._nodata_mask is not None and self._nodata_mask[rows, cols].all())
+                or (
+                    self._footprint is not None and self._footprint.is_empty(rows, cols)
+                )
+            ):
+                continue
+            self.queue_read(rows, cols)
+            num_queued += 1
+
+        logger.info(f"Processing {self._block_shape} sized blocks...")
+        for _ in trange(num_queued, **tqdm_kwargs):
+            cur_block, (rows, cols) = self.get_data()
+            if self._skip_empty and _is_nodata_block(cur_block, self._nodata):
+                logger.debug(f"Skipping block {rows}, {cols} since it was all nodata")
+                continue
             yield cur_block, (rows, cols)
 
         self.notify_finished()
+
+    def notify_finished(self):
+        """Cancel any reads which haven't started and stop the reader threads."""
+        self._queued.clear()
+        for fut in self._in_flight:
+            fut.cancel()
+        self._in_flight.clear()
+        self._executor.shutdown(wait=True)
+
+
+def _read_block(
+    reader: DatasetReader,
+    rows: slice,
+    cols: slice,
+    footprint: Optional[FootprintIndex],
+    fill_value: float,
+) -> np.ndarray:
+    """Read a block, skipping the parts which `footprint` marks as empty."""
+    window = None if footprint is None else footprint.valid_window(rows, cols)
+    if window is None or window == (rows, cols):
+        return reader[..., rows, cols]
+
+    valid_rows, valid_cols = window
+    data = reader[..., valid_rows, valid_cols]
+    out_shape = (*data.shape[:-2], rows.stop - rows.start, cols.stop - cols.start)
+    if np.isnan(fill_value) and not np.issubdtype(data.dtype, np.inexact):
+        fill_value = 0
+    if isinstance(data, np.ma.MaskedArray):
+        out = np.ma.masked_all(out_shape, dtype=data.dtype)
+        out.set_fill_value(fill_value)
+    else:
+        out = np.full(out_shape, fill_value, dtype=data.dtype)
+    out[
+        ...,
+        valid_rows.start - rows.start : valid_rows.stop - rows.start,
+        valid_cols.start - cols.start : valid_cols.stop - cols.start,
+    ] = data
+    return out
+
+
+def _is_nodata_block(cur_block: np.ndarray, nodata: float) -> bool:
+    if isinstance(cur_block, np.ma.MaskedArray) and cur_block.mask.all():
+        return True
+    if np.isnan(nodata):
+        return bool(np.all(np.isnan(cur_block)))
+    return bool(np.all(cur_block == nodata))
@@ -1,28 +1,37 @@
 from __future__ import annotations
 
+import logging
+import zlib
+from collections import OrderedDict
 from contextlib import AbstractContextManager
 from dataclasses import dataclass
+from os import fspath
 from pathlib import Path
 from typing import (
     TYPE_CHECKING,
     Any,
     Mapping,
+    Optional,
     Protocol,
     Sequence,
+    Tuple,
     TypeVar,
     runtime_checkable,
 )
 
+import h5py
 import numpy as np
 import rasterio
 import rasterio.errors
 from numpy.typing import ArrayLike, DTypeLike
+from osgeo import gdal
 from rasterio.windows import Window
 
+from dolphin._profiling import stage
 from dolphin._types import Filename
 
 from ._background import BackgroundWriter
-from ._utils import _unpack_3d_slices
+from ._utils import _unpack_3d_slices, round_mantissa
 
 __all__ = [
     "BackgroundBlockWriter",
@@ -30,9 +39,16 @@ __all__ = [
     "BackgroundStackWriter",
     "DatasetStackWriter",
     "DatasetWriter",
+    "HDF5StackWriter",
+    "PooledBlockWriter",
     "RasterWriter",
 ]
 
+logger = logging.getLogger(__name__)
+
+# Maximum number of layers in each chunk of an `HDF5StackWriter`
+DEFAULT_CHUNK_LAYERS = 16
+
 if TYPE_CHECKING:
     from dolphin._types import Index
 
@@ -82,6 +98,383 @@ class BackgroundBlockWriter(BackgroundWriter):
         write_block(data, filename, row_start, col_start, band=band)
 
 
+class PooledBlockWriter:
+    """Write blocks to many GDAL rasters, keeping the files open between writes.
+
+    Has the same `queue_write`/`notify_finished` interface as
+    `BackgroundBlockWriter`, but instead of opening, writing, and closing the
+    file for every block:
+
+    - Each writer thread keeps a bounded LRU pool of open `GA_Update` handles.
+    - Blocks for the same file and rows (as produced when iterating over blocks
+      row by row) are joined into full-width strips, and the strips are buffered
+      until they complete whole rows of the file's tiles. Columns which no block
+      covers (e.g. skipped empty blocks, or the margins of strided outputs) are
+      filled with the file's current contents.
+    - Files are assigned to one of `num_threads` writer threads by name, so
+      different files are written in parallel and each file is only ever
+      touched by one thread.
+
+    - Buffered rows are kept when a file's handle is closed to make room for
+      another, and written when the file is reopened.
+
+    When blocks arrive in row-major order into a file created empty, each
+    (compressed) tile is therefore written exactly once, so the outputs don't
+    need to be rewritten with [`repack_raster`][dolphin.io.repack_raster].
+    This buffers up to one row of blocks plus one row of tiles for each file,
+    i.e. (block rows + tile rows) * width * itemsize bytes per output.
+    If blocks arrive out of order (or `max_buffer_mb` is set and exceeded), a tile
+    may be written again, leaving its old copy as dead space in the file. These
+    files are listed in `rewritten_files`, so only they need repacking.
+    Pass `keep_bits` to `queue_write` to round the mantissas as blocks are written.
+
+    All buffered data is written, and all files closed, in `notify_finished`.
+
+    Parameters
+    ----------
+    num_threads : int
+        Number of background writer threads. Default is 2.
+    max_open_files : int
+        Maximum number of open file handles, shared among the threads.
+        Default is 64.
+    max_buffer_mb : float, optional
+        Maximum size (in MB) of the blocks each thread buffers before writing
+        partial rows of tiles. Default is None, which only writes the rows of
+        each file once they are complete.
+    max_queue : int
+        Number of write jobs that can be queued per thread before blocking,
+        <= 0 for unbounded. Default is 0.
+    debug : bool
+        Write synchronously in the calling thread instead. Default is False.
+
+    """
+
+    def __init__(
+        self,
+        *,
+        num_threads: int = 2,
+        max_open_files: int = 64,
+        max_buffer_mb: float | None = None,
+        max_queue: int = 0,
+        debug: bool = False,
+    ):
+        max_open_per_thread = max(1, max_open_files // num_threads)
+        max_buffer_bytes = (
+            int(max_buffer_mb * 2**20) if max_buffer_mb is not None else None
+        )
+        self._sync_pool: _GdalHandlePool | None = None
+        self._workers: list[_PooledWriterThread] = []
+        if debug:
+            self._sync_pool = _GdalHandlePool(max_open_per_thread, max_buffer_bytes)
+            return
+        self._workers = [
+            _PooledWriterThread(
+                _GdalHandlePool(max_open_per_thread, max_buffer_bytes),
+                max_queue=max_queue,
+                name=f"Writer-{i}",
+            )
+            for i in range(num_threads)
+        ]
+
+    def queue_write(
+        self,
+        data: ArrayLike,
+        filename: Filename,
+        row_start: int,
+        col_start: int,
+        band: int | None = None,
+        keep_bits: int | None = None,
+    ):
+        """Add a block to the queue of the thread responsible for `filename`.
+
+        Same interface as `BackgroundBlockWriter.write`, with the addition of
+        `keep_bits`: the number of mantissa bits to keep (see
+        [`round_mantissa`][dolphin.io.round_mantissa]). If None, the data
+        is written unchanged.
+        """
+        if self._sync_pool is not None:
+            self._sync_pool.write(data, filename, row_start, col_start, band, keep_bits)
+            return
+        idx = zlib.crc32(fspath(filename).encode()) % len(self._workers)
+        self._workers[idx].queue_write(
+            data, filename, row_start, col_start, band, keep_bits=keep_bits
+        )
+
+    @property
+    def num_queued(self) -> int:
+        """Number of items waiting in the queues to be written."""
+        return sum(w.num_queued for w in self._workers)
+
+    @property
+    def rewritten_files(self) -> list[Path]:
+        """Compressed files which had some tile written more than once.
+
+        Only complete after `notify_finished`.
+        """
+        pools = [self._sync_pool] if self._sync_pool is not None else []
+        pools.extend(w._pool for w in self._workers)
+        return sorted({Path(name) for pool in pools for name in pool.rewritten})
+
+    def notify_finished(self, timeout=None):
+        """Write all queued and buffered blocks, then close all files."""
+        if self._sync_pool is not None:
+            self._sync_pool.close()
+            return
+        for w in self._workers:
+            w.queue_close()
+        for w in self._workers:
+            w.notify_finished(timeout)
+
+
+class _PooledWriterThread(BackgroundWriter):
+    """Background thread which owns one `_GdalHandlePool`."""
+
+    def __init__(self, pool: _GdalHandlePool, max_queue: int = 0, **kwargs):
+        self._pool = pool
+        super().__init__(nq=max_queue, **kwargs)
+
+    def queue_close(self):
+        self.queue_work(_close=True)
+
+    def process(self, *args, _close: bool = False, **kw):
+        if _close:
+            self._pool.close()
+        else:
+            self.write(*args, **kw)
+
+    def write(self, data, filename, row_start, col_start, band=None, keep_bits=None):
+        self._pool.write(data, filename, row_start, col_start, band, keep_bits)
+
+
+_Key = Tuple[str, Optional[int]]
+
+
+class _GdalHandlePool:
+    """LRU pool of open GDAL datasets which coalesces block writes into tile rows.
+
+    Not thread safe: each instance must only be used by one thread.
+    """
+
+    def __init__(self, max_open_files: int, max_buffer_bytes: int | None = None):
+        self.max_open_files = max_open_files
+        self.max_buffer_bytes = max_buffer_bytes
+        self._handles: OrderedDict[str, gdal.Dataset] = OrderedDict()
+        # (filename, band) -> [row_start, list of (col_start, block)] for the
+        # row of blocks currently being joined
+        self._pending: dict[_Key, list] = {}
+        # (filename, band) -> [row_start, data] of full-width rows which
+        # don't yet fill a whole row of tiles
+        self._rows: dict[_Key, list] = {}
+        # filename -> (band, tile row, tile col) of each tile written so far,
+        # or None if the file isn't compressed
+        self._tiles: dict[str, set[tuple[int, int, int]] | None] = {}
+        self.rewritten: set[str] = set()
+
+    def write(
+        self,
+        data: ArrayLike,
+        filename: Filename,
+        row_start: int,
+        col_start: int,
+        band: int | None = None,
+        keep_bits: int | None = None,
+    ):
+        from dolphin.io import write_block
+
+        data = np.asarray(data)
+        if keep_bits is not None:
+            # Don't modify the caller's array
+            data = data.copy()
+            round_mantissa(data, keep_bits)
+        if Path(filename).suffix in (".h5", ".hdf5", ".nc"):
+            write_block(data, filename, row_start, col_start, band=band)
+            return
+        if data.ndim == 2 and band is None:
+            # Match `write_block`: write 2D data into band 1 of the file
+            data = data[np.newaxis, ...]
+
+        name = fspath(filename)
+        key = (name, band)
+        ds = self._get_handle(name)
+        row = self._pending.get(key)
+        if row is not None:
+            row_start_pending, blocks = row
+            if (
+                row_start_pending != row_start
+                or blocks[0][1].shape[:-1] != data.shape[:-1]
+            ):
+                # A new row of blocks: the pending one is complete
+                self._finish_row(key, ds)
+                row = None
+        if row is None:
+            row = self._pending[key] = [row_start, []]
+        row[1].append((col_start, data))
+
+        if (
+            self.max_buffer_bytes is not None
+            and self._buffered_bytes() > self.max_buffer_bytes
+        ):
+            self._flush_all()
+
+    def close(self):
+        """Write all buffered blocks and close all open files."""
+        self._flush_all()
+        while self._handles:
+            self._evict(next(iter(self._handles)))
+
+    def _buffered_bytes(self) -> int:
+        pending = sum(b.nbytes for row in self._pending.values() for _, b in row[1])
+        return pending + sum(rows[1].nbytes for rows in self._rows.values())
+
+    def _flush_all(self):
+        for k in list(self._pending):
+            self._finish_row(k, self._get_handle(k[0]))
+        for k in list(self._rows):
+            self._flush_rows(k)
+
+    def _get_handle(self, name: str) -> gdal.Dataset:
+        if name in self._handles:
+            self._handles.move_to_end(name)
+            return self._handles[name]
+        if len(self._handles) >= self.max_open_files:
+            self._evict(next(iter(self._handles)))
+        ds = gdal.Open(name, gdal.GA_Update)
+        self._handles[name] = ds
+        return ds
+
+    def _stage_rows(
+        self, key: _Key, row_start: int, strip: np.ndarray, ds: gdal.Dataset
+    ):
+        """Buffer a full-width strip, writing out all completed rows of tiles."""
+        staged = self._rows.pop(key, None)
+        if staged is not None:
+            staged_row, staged_data = staged
+            is_adjacent = (
+                staged_row + staged_data.shape[-2] == row_start
+                and staged_data.shape[:-2] == strip.shape[:-2]
+            )
+            if is_adjacent:
+                strip = np.concatenate([staged_data, strip], axis=-2)
+                row_start = staged_row
+            else:
+                self._write(ds, key, staged_row, 0, staged_data)
+
+        row_end = row_start + strip.shape[-2]
+        if row_end >= ds.RasterYSize:
+            split = row_end
+        else:
+            tile_rows = ds.GetRasterBand(1).GetBlockSize()[1]
+            split = max(row_start, (row_end // tile_rows) * tile_rows)
+        if split > row_start:
+            self._write(ds, key, row_start, 0, strip[..., : split - row_start, :])
+        if split < row_end:
+            self._rows[key] = [split, strip[..., split - row_start :, :]]
+
+    def _finish_row(self, key: _Key, ds: gdal.Dataset):
+        """Join a row of blocks into a full-width strip and stage it for writing."""
+        row_start, blocks = self._pending.pop(key)
+        lead_shape = blocks[0][1].shape[:-1]
+        nrows = lead_shape[-1]
+        staged = self._rows.get(key)
+        if staged is not None and (
+            staged[0] < row_start + nrows
+            and row_start < staged[0] + staged[1].shape[-2]
+        ):
+            # Write overlapping rows first, so the file has the latest data
+            self._flush_rows(key, ds)
+
+        xsize = ds.RasterXSize
+        dtype = np.result_type(*(b.dtype for _, b in blocks))
+        strip = np.empty((*lead_shape, xsize), dtype=dtype)
+        is_empty = np.ones(xsize + 2, dtype=np.int8)
+        is_empty[[0, -1]] = 0
+        for col_start, b in blocks:
+            is_empty[1 + col_start : 1 + col_start + b.shape[-1]] = 0
+        # Fill the columns no block covers with what's already in the file
+        edges = np.diff(is_empty)
+        for start, stop in zip(np.flatnonzero(edges == 1), np.flatnonzero(edges == -1)):
+            cols = slice(int(start), int(stop))
+            strip[..., cols] = self._read(ds, key, row_start, cols, strip.shape)
+        for col_start, b in blocks:
+            strip[..., col_start : col_start + b.shape[-1]] = b
+        self._stage_rows(key, row_start, strip, ds)
+
+    def _read(
+        self, ds: gdal.Dataset, key: _Key, row_start: int, cols: slice, strip_shape
+    ) -> np.ndarray:
+        """Read the current contents of the file under `cols` of a strip."""
+        band = key[1]
+        nrows, ncols = strip_shape[-2], cols.stop - cols.start
+        bands = [band] if band is not None else range(1, strip_shape[0] + 1)
+        out = np.stack(
+            [
+                ds.GetRasterBand(b).ReadAsArray(cols.start, row_start, ncols, nrows)
+                for b in bands
+            ]
+        )
+        return out.reshape(*strip_shape[:-1], ncols)
+
+    def _flush_rows(self, key: _Key, ds: gdal.Dataset | None = None):
+        row_start, data = self._rows.pop(key)
+        self._write(ds or self._get_handle(key[0]), key, row_start, 0, data)
+
+    def _write(
+        self,
+        ds: gdal.Dataset,
+        key: _Key,
+        row_start: int,
+        col_start: int,
+        data: np.ndarray,
+    ):
+        from dolphin.io._core import _write_gdal_dataset
+
+        name, band = key
+        logger.debug(f"Writing {data.shape} at ({row_start}, {col_start}) to {name}")
+        with stage("write", category="block") as stats:
+            _write_gdal_dataset(ds, data, row_start, col_start, band, flush=False)
+            stats.add(array_bytes=data.nbytes)
+        self._record_tiles(ds, key, row_start, col_start, data)
+
+    def _record_tiles(
+        self,
+        ds: gdal.Dataset,
+        key: _Key,
+        row_start: int,
+        col_start: int,
+        data: np.ndarray,
+    ):
+        """Note the file if a compressed tile in this write was written before."""
+        name, band = key
+        if name not in self._tiles:
+            is_compressed = ds.GetMetadataItem("COMPRESSION", "IMAGE_STRUCTURE")
+            self._tiles[name] = set() if is_compressed else None
+        written = self._tiles[name]
+        if written is None or name in self.rewritten:
+            return
+        tile_cols, tile_rows = ds.GetRasterBand(1).GetBlockSize()
+        nrows, ncols = data.shape[-2:]
+        bands = [band] if band is not None else range(1, data.shape[0] + 1)
+        tile_row_idxs = range(
+            row_start // tile_rows, (row_start + nrows - 1) // tile_rows + 1
+        )
+        tile_col_idxs = range(
+            col_start // tile_cols, (col_start + ncols - 1) // tile_cols + 1
+        )
+        tiles = {(b, i, j) for b in bands for i in tile_row_idxs for j in tile_col_idxs}
+        if written & tiles:
+            logger.debug(f"Rewriting tiles of {name}, which will need repacking")
+            self.rewritten.add(name)
+            self._tiles[name] = None
+            return
+        written |= tiles
+
+    def _evict(self, name: str):
+        # The buffered rows of the file stay in memory until they're complete
+        ds = self._handles.pop(name)
+        ds.FlushCache()
+        ds = None
+
+
 @runtime_checkable
 class DatasetWriter(Protocol):
     """An array-like interface for writing output datasets.
@@ -477,3 +870,201 @@ class BackgroundStackWriter(BackgroundWriter, DatasetStackWriter):
     def close(self) -> None:
         """Close the underlying dataset and stop the background thread."""
         self.notify_finished()
+
+
+class HDF5StackWriter(BackgroundWriter, DatasetStackWriter):
+    """Write a 3D stack into one chunked HDF5 dataset in a background thread.
+
+    Alternative to `BackgroundStackWriter` for intermediate stacks: all layers
+    are stored in one `(time, y, x)`-chunked dataset, so reading a spatial
+    block of the whole stack decodes a few chunks per tile instead of opening
+    one file per layer.
+    The result can be read back with [`HDF5Reader`][dolphin.io.HDF5Reader], and
+    exported to one GeoTIFF per layer with `to_geotiffs`.
+
+    Will create/overwrite `filename`. The file is kept open for writing until
+    `close` is called.
+
+    Parameters
+    ----------
+    filename : Filename
+        Path to the output HDF5 file.
+    shape : tuple[int, int, int]
+        (num layers, rows, cols) of the stack.
+    dtype : DTypeLike
+        Data type of the stack.
+    like_filename : Filename, optional
+        GDAL-readable raster to copy the geotransform and CRS from.
+    dset_name : str
+        Name of the dataset within `filename`. Default is "data".
+    chunks : tuple[int, int], optional
+        (rows, cols) of each chunk.
+        Default is `DEFAULT_TILE_SHAPE`.
+    chunk_layers : int
+        Maximum number of layers stored in each chunk, which bounds the size of
+        a chunk for long stacks. Default is `DEFAULT_CHUNK_LAYERS`.
+    compression : str, optional
+        HDF5 compression filter. Default is "lzf", which is fast to decode.
+    nodata : float, optional
+        Nodata value, saved as the `_FillValue` of the dataset.
+    max_queue : int
+        Number of write jobs that can be queued before blocking. Default is 0.
+    debug : bool
+        Write synchronously in the calling thread instead. Default is False.
+
+    """
+
+    def __init__(
+        self,
+        filename: Filename,
+        shape: tuple[int, int, int],
+        dtype: DTypeLike,
+        *,
+        like_filename: Filename | None = None,
+        dset_name: str = "data",
+        chunks: tuple[int, int] | None = None,
+        chunk_layers: int = DEFAULT_CHUNK_LAYERS,
+        compression: str | None = "lzf",
+        nodata: float | None = None,
+        max_queue: int = 0,
+        debug: bool = False,
+    ):
+        from dolphin.io import DEFAULT_TILE_SHAPE, get_raster_crs, get_raster_gt
+
+        super().__init__(nq=max_queue, name="HDF5StackWriter")
+        if debug:
+            # Stop background thread. Just synchronously write data
+            self.notify_finished()
+            self.queue_write = self.write  # type: ignore[assignment]
+
+        self.filename = Path(filename)
+        self.dset_name = dset_name
+        self.shape = tuple(shape)
+        self.dtype = np.dtype(dtype)
+        self.like_filename = like_filename
+        chunk_rows, chunk_cols = chunks or DEFAULT_TILE_SHAPE
+        self.chunks = (
+            min(chunk_layers, shape[0]),
+            min(chunk_rows, shape[1]),
+            min(chunk_cols, shape[2]),
+        )
+        # Opened by the first write (in the background thread) and kept open
+        self._hf: h5py.File | None = None
+        with h5py.File(self.filename, "w") as hf:
+            dset = hf.create_dataset(
+                dset_name,
+                shape=shape,
+                dtype=self.dtype,
+                chunks=self.chunks,
+                compression=compression,
+                shuffle=compression is not None,
+                fillvalue=nodata,
+            )
+            if nodata is not None:
+                dset.attrs["_FillValue"] = nodata
+            if like_filename is not None:
+                dset.attrs["geotransform"] = get_raster_gt(like_filename)
+                dset.attrs["crs_wkt"] = get_raster_crs(like_filename).to_wkt()
+
+    def write(self, data: ArrayLike, rows: slice, cols: slice):
+        """Write a block of all layers of the stack.
+
+        Parameters
+        ----------
+        data : ArrayLike
+            3D block of data, with all layers of the stack.
+        rows : slice
+            Rows of the stack to write.
+        cols : slice
+            Columns of the stack to write.
+
+        """
+        data = np.asarray(data)
+        if data.ndim == 2:
+            data = data[None, ...]
+        if data.shape[0] != self.shape[0]:
+            raise ValueError(f"{data.shape = }, but stack has {self.shape[0]} layers")
+        if self._hf is None:
+            self._hf = h5py.File(self.filename, "r+")
+        self._hf[self.dset_name][:, rows, cols] = data
+
+    def __setitem__(self, key, value):
+        band, rows, cols = _unpack_3d_slices(key)
+        if band not in (slice(None), slice(None, None, None), ...):
+            self.notify_finished()
+            raise NotImplementedError("Can only write to all layers at once.")
+        self.queue_write(value, rows, cols)
+
+    def to_geotiffs(
+        self, file_list: Sequence[Filename], **file_creation_kwargs
+    ) -> list[Path]:
+        """Export each layer of the stack to a GeoTIFF (e.g. for final products).
+
+        Closes the writer first, waiting for all queued writes to finish.
+        The stack is read one row of chunks at a time, so each chunk is only
+        decoded once.
+
+        Parameters
+        ----------
+        file_list : Sequence[Filename]
+            Output path for each layer.
+        **file_creation_kwargs
+            Passed to [`write_arr`][dolphin.io.write_arr].
+
+        Returns
+        -------
+        list[Path]
+            The written files.
+
+        """
+        from dolphin.io import write_arr
+
+        if len(file_list) != self.shape[0]:
+            raise ValueError(f"{len(file_list) = }, but {self.shape[0] = }")
+        self.close()
+        chunk_layers, chunk_rows, _ = self.chunks
+        writer = PooledBlockWriter(num_threads=1)
+        with h5py.File(self.filename, "r") as hf:
+            dset = hf[self.dset_name]
+            gt = dset.attrs.get("geotransform")
+            crs_wkt = dset.attrs.get("crs_wkt")
+            nodata = file_creation_kwargs.pop("nodata", dset.attrs.get("_FillValue"))
+            for fn in file_list:
+                write_arr(
+                    arr=None,
+                    output_name=fn,
+                    shape=self.shape[1:],
+                    dtype=self.dtype,
+                    geotransform=None if gt is None else list(gt),
+                    projection=crs_wkt,
+                    nodata=nodata,
+                    **file_creation_kwargs,
+                )
+            for layer_start in range(0, self.shape[0], chunk_layers):
+                layers = slice(layer_start, layer_start + chunk_layers)
+                for row_start in range(0, self.shape[1], chunk_rows):
+                    rows = slice(row_start, row_start + chunk_rows)
+                    for fn, block in zip(
+                        list(file_list)[layers], dset[layers, rows, :]
+                    ):
+                        writer.queue_write(block, fn, row_start, 0)
+        writer.notify_finished()
+        return [Path(f) for f in file_list]
+
+    @property
+    def closed(self) -> bool:
+        """bool : True if the dataset is closed."""  # noqa: D403
+        return self._thread.is_alive() is False
+
+    def close(self) -> None:
+        """Close the file after all queued writes finish."""
+        self.notify_finished()
+        if self._hf is not None:
+            self._hf.close()
+            self._hf = None
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):  # type: ignore[no-untyped-def]
+        self.close()
@@ -3,9 +3,11 @@ import warnings
 import numpy as np
 from numpy.typing import ArrayLike
 
+from dolphin._profiling import profile
 from dolphin.utils import upsample_nearest
 
 
+@profile("compression")
 def compress(
     slc_stack: ArrayLike, pl_cpx_phase: ArrayLike, slc_mean: ArrayLike | None = None
 ):
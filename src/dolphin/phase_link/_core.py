@@ -11,6 +11,7 @@ from jax import Array, jit, lax
 from jax.scipy.linalg import cho_factor, cho_solve
 from jax.typing import ArrayLike
 
+from dolphin._profiling import is_profiling, stage
 from dolphin._types import HalfWindow, Strides
 from dolphin.utils import take_looks
 
@@ -311,12 +312,16 @@ def run_cpl(
         shape = (nslc, out_rows, out_cols)
 
     """
-    C_arrays = covariance.estimate_stack_covariance(
-        slc_stack,
-        half_window,
-        strides,
-        neighbor_arrays=neighbor_arrays,
-    )
+    with stage("covariance", category="block"):
+        C_arrays = covariance.estimate_stack_covariance(
+            slc_stack,
+            half_window,
+            strides,
+            neighbor_arrays=neighbor_arrays,
+        )
+        if is_profiling():
+            # JAX dispatches asynchronously: wait for the result to time it
+            C_arrays.block_until_ready()
     ns = slc_stack.shape[0]
     if baseline_lag:
         u_rows, u_cols = jnp.triu_indices(ns, baseline_lag)
@@ -324,12 +329,15 @@ def run_cpl(
         C_arrays = C_arrays.at[:, :, u_rows, u_cols].set(0.0 + 0j)
         C_arrays = C_arrays.at[:, :, l_rows, l_cols].set(0.0 + 0j)
 
-    cpx_phase, eigenvalues, estimator = process_coherence_matrices(
-        C_arrays,
-        use_evd=use_evd,
-        beta=beta,
-        reference_idx=reference_idx,
-    )
+    with stage("eigen_solve", category="block"):
+        cpx_phase, eigenvalues, estimator = process_coherence_matrices(
+            C_arrays,
+            use_evd=use_evd,
+            beta=beta,
+            reference_idx=reference_idx,
+        )
+        if is_profiling():
+            cpx_phase.block_until_ready()
     # Get the temporal coherence
     temp_coh = metrics.estimate_temp_coh(cpx_phase, C_arrays)
 
@@ -13,8 +13,10 @@ from numpy.typing import ArrayLike
 from osgeo import gdal
 
 from dolphin import io, utils
+from dolphin._profiling import profile
 from dolphin._types import Filename
-from dolphin.io import EagerLoader, StackReader, repack_raster
+from dolphin.io import ParallelLoader, StackReader
+from dolphin.io._utils import _format_for_gdal, get_gtiff_options
 
 gdal.UseExceptions()
 
@@ -27,13 +29,14 @@ _EXTRA_COMPRESSION = {
     "keep_bits": 10,
     "predictor": 3,
 }
-REPACK_OPTIONS = {
+WRITE_OPTIONS = {
     "ps": {},
     "amp_dispersion": _EXTRA_COMPRESSION,
     "amp_mean": _EXTRA_COMPRESSION,
 }
 
 
+@profile("ps", category="stage")
 def create_ps(
     *,
     reader: StackReader,
@@ -45,8 +48,11 @@ def create_ps(
     existing_amp_mean_file: Optional[Filename] = None,
     existing_amp_dispersion_file: Optional[Filename] = None,
     nodata_mask: Optional[np.ndarray] = None,
+    footprint: Optional[io.FootprintIndex] = None,
     update_existing: bool = False,
     block_shape: tuple[int, int] = (512, 512),
+    num_read_threads: int = 2,
+    read_buffer_mb: Optional[int] = None,
     **tqdm_kwargs,
 ):
     """Create the amplitude dispersion, mean, and PS files.
@@ -72,6 +78,9 @@ def create_ps(
     nodata_mask : Optional[np.ndarray]
         If provided, skips computing PS over areas where the mask is False
         Otherwise, loads input data from everywhere and calculates.
+    footprint : Optional[io.FootprintIndex]
+        Low-resolution index of the valid data in `reader`, used to avoid reading
+        empty parts of the stack.
     update_existing : bool, optional
         If providing existing amp mean/dispersion files, combine them with the
         data from the current SLC stack.
@@ -80,6 +89,11 @@ def create_ps(
     block_shape : tuple[int, int], optional
         The 2D block size to load all bands at a time.
         Default is (512, 512)
+    num_read_threads : int, optional
+        Number of threads to read input blocks with. Default is 2.
+    read_buffer_mb : Optional[int], optional
+        Maximum memory (in MB) for input blocks which are read ahead.
+        Default is None, which reads ahead 2 blocks per thread.
     **tqdm_kwargs : optional
         Arguments to pass to `tqdm`, (e.g. `position=n` for n parallel bars)
         See https://tqdm.github.io/docs/tqdm/#tqdm-objects for all options.
@@ -101,9 +115,11 @@ def create_ps(
     # Otherwise, we need to calculate the PS files from the SLC stack
     # Initialize the output files with zeros
     file_list = [output_file, output_amp_dispersion_file, output_amp_mean_file]
-    for fn, dtype, nodata in zip(
-        file_list, FILE_DTYPES.values(), NODATA_VALUES.values()
+    for fn, dtype, nodata, opts in zip(
+        file_list, FILE_DTYPES.values(), NODATA_VALUES.values(), WRITE_OPTIONS.values()
     ):
+        # Create with the final compression options: the writer fills each tile
+        # once, so only files with rewritten tiles need repacking afterwards
         io.write_arr(
             arr=None,
             like_filename=like_filename,
@@ -111,13 +127,21 @@ def create_ps(
             nbands=1,
             dtype=dtype,
             nodata=nodata,
+            options=_get_creation_options(opts),
         )
     # Initialize the intermediate arrays for the calculation
     magnitude = np.zeros((reader.shape[0], *block_shape), dtype=np.float32)
 
-    writer = io.BackgroundBlockWriter()
+    writer = io.PooledBlockWriter()
     # Make the generator for the blocks
-    block_gen = EagerLoader(reader, block_shape=block_shape, nodata_mask=nodata_mask)
+    block_gen = ParallelLoader(
+        reader,
+        block_shape=block_shape,
+        nodata_mask=nodata_mask,
+        footprint=footprint,
+        num_threads=num_read_threads,
+        max_buffer_bytes=None if read_buffer_mb is None else read_buffer_mb * 2**20,
+    )
     for cur_data, (rows, cols) in block_gen.iter_blocks(**tqdm_kwargs):
         cur_rows, cur_cols = cur_data.shape[-2:]
 
@@ -152,20 +176,38 @@ def create_ps(
             )
 
         # Write amp dispersion and the mean blocks
-        writer.queue_write(mean, output_amp_mean_file, rows.start, cols.start)
-        writer.queue_write(amp_disp, output_amp_dispersion_file, rows.start, cols.start)
+        keep_bits = _EXTRA_COMPRESSION["keep_bits"]
+        writer.queue_write(
+            mean, output_amp_mean_file, rows.start, cols.start, keep_bits=keep_bits
+        )
+        writer.queue_write(
+            amp_disp,
+            output_amp_dispersion_file,
+            rows.start,
+            cols.start,
+            keep_bits=keep_bits,
+        )
         writer.queue_write(ps, output_file, rows.start, cols.start)
 
     logger.info(f"Waiting to write {writer.num_queued} blocks of data.")
     writer.notify_finished()
-    # Repack for better compression
-    logger.info("Repacking PS rasters for better compression")
-    for fn, opt in zip(file_list, REPACK_OPTIONS.values()):
-        # Repack to a temp, then overwrite
-        repack_raster(Path(fn), output_dir=None, **opt)
+    predictors = {
+        Path(fn): opts.get("predictor")
+        for fn, opts in zip(file_list, WRITE_OPTIONS.values())
+    }
+    for fn in writer.rewritten_files:
+        logger.info(f"Repacking {fn} with rewritten tiles")
+        # The data was already rounded by the writer, so skip `keep_bits`
+        io.repack_raster(fn, output_dir=None, predictor=predictors[fn])
     logger.info("Finished writing out PS files")
 
 
+def _get_creation_options(opts: dict) -> list[str]:
+    # Same tiling and compression as `io.repack_raster`
+    return _format_for_gdal(get_gtiff_options(predictor=opts.get("predictor")))
+
+
+@profile("ps_block")
 def calc_ps_block(
     stack_mag: ArrayLike,
     amp_dispersion_threshold: float = 0.25,
@@ -6,6 +6,7 @@ from typing import Optional
 import numpy as np
 from numpy.typing import ArrayLike
 
+from dolphin._profiling import profile
 from dolphin.workflows import ShpMethod
 
 from . import _glrt, _ks
@@ -15,6 +16,7 @@ logger = logging.getLogger(__name__)
 __all__ = ["estimate_neighbors"]
 
 
+@profile("shp")
 def estimate_neighbors(
     *,
     halfwin_rowcol: tuple[int, int],
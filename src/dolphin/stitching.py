@@ -4,9 +4,13 @@ from __future__ import annotations
 
 import logging
 import math
+import multiprocessing as mp
+import os
 import subprocess
 import tempfile
+from concurrent.futures import ProcessPoolExecutor, as_completed
 from datetime import datetime
+from functools import partial
 from os import fspath
 from pathlib import Path
 from typing import Iterable, Optional, Sequence
@@ -15,7 +19,9 @@ import numpy as np
 from numpy.typing import DTypeLike
 from opera_utils import group_by_date
 from osgeo import gdal, osr
+from pydantic import BaseModel, Field
 from rasterio.warp import transform_bounds
+from tqdm.auto import tqdm
 from tqdm.contrib.concurrent import thread_map
 
 from dolphin import io, utils
@@ -24,6 +30,10 @@ from dolphin.io import DEFAULT_DATETIME_FORMAT
 
 logger = logging.getLogger(__name__)
 
+# Smallest GDAL block cache to give each stitching process when choosing
+# the number of workers automatically
+_MIN_CACHE_MB_PER_WORKER = 256
+
 
 def merge_by_date(
     image_file_list: Iterable[Filename],
@@ -36,8 +46,11 @@ def merge_by_date(
     out_bounds: Optional[Bbox] = None,
     out_bounds_epsg: Optional[int] = None,
     options: Optional[Sequence[str]] = io.DEFAULT_TIFF_OPTIONS,
-    num_workers: int = 1,
+    num_workers: Optional[int] = 1,
     overwrite: bool = False,
+    plan_file: Optional[Filename] = None,
+    use_processes: bool = False,
+    gdal_cache_max_mb: Optional[int] = None,
 ) -> dict[tuple[datetime, ...], Path]:
     """Group images from the same datetime and merge into one image per datetime.
 
@@ -67,11 +80,24 @@ def merge_by_date(
     options : Optional[Sequence[str]]
         Driver-specific creation options passed to GDAL.
         Default is [dolphin.io.DEFAULT_TIFF_OPTIONS][].
-    num_workers : int
-        Number of dates to stitch in separate threads in parallel.
+    num_workers : Optional[int]
+        Number of dates to stitch in parallel.
+        If None, chosen using `get_num_stitching_workers`.
         Default is 1.
     overwrite : bool
         Overwrite existing files. Default is False.
+    plan_file : Optional[Filename]
+        Path to a JSON file storing the [`StitchPlan`][dolphin.stitching.StitchPlan]
+        shared by all dates. If it exists, the plan is loaded instead of recomputed.
+        If None, the plan is computed but not saved.
+    use_processes : bool
+        Stitch dates in separate processes instead of threads.
+        GDAL holds locks during warping and shares one block cache between threads,
+        so processes scale better with many dates. Default is False.
+    gdal_cache_max_mb : Optional[int]
+        Total GDAL block cache (in MB) to split between the stitching processes.
+        If None, uses the current `GDAL_CACHEMAX` of this process.
+        Only used when `use_processes` is True.
 
     Returns
     -------
@@ -84,6 +110,10 @@ def merge_by_date(
     This function is intended to be used with filenames that contain datetime pairs
     (from interferograms).
 
+    The output grid and the placement of each burst is computed once (see
+    [`StitchPlan`][dolphin.stitching.StitchPlan]) and reused for every date whose
+    images share the same footprints.
+
     """
     image_path_list = [Path(f) for f in image_file_list]
     grouped_images = group_by_date(image_path_list, file_date_fmt=file_date_fmt)
@@ -102,31 +132,120 @@ def merge_by_date(
         outfile = Path(output_dir) / (date_str + output_suffix)
         stitched_acq_times[dates] = outfile
 
-    def process_date(args):
-        cur_images, outfile = args
-        merge_images(
-            cur_images,
-            outfile=outfile,
-            driver=driver,
-            overwrite=overwrite,
-            out_nodata=out_nodata,
+    plan = None
+    first_images = next(iter(grouped_images.values()), [])
+    if len(first_images) > 1 or out_bounds is not None:
+        plan = get_stitch_plan(
+            first_images,
+            plan_file=plan_file,
             out_bounds=out_bounds,
             out_bounds_epsg=out_bounds_epsg,
-            in_nodata=in_nodata,
-            options=options,
         )
 
-    # loop over the merging in parallel
-    thread_map(
-        process_date,
-        list(zip(grouped_images.values(), stitched_acq_times.values())),
-        max_workers=num_workers,
-        desc="Merging images by date",
+    process_date = partial(
+        _merge_date,
+        driver=driver,
+        overwrite=overwrite,
+        out_nodata=out_nodata,
+        out_bounds=out_bounds,
+        out_bounds_epsg=out_bounds_epsg,
+        in_nodata=in_nodata,
+        options=options,
+        plan=plan,
     )
+    jobs = list(zip(grouped_images.values(), stitched_acq_times.values()))
+    if num_workers is None:
+        num_workers = get_num_stitching_workers(
+            len(jobs), gdal_cache_max_mb=gdal_cache_max_mb
+        )
+
+    # loop over the merging in parallel
+    if use_processes and num_workers > 1:
+        cache_mb, num_threads = _get_worker_gdal_limits(num_workers, gdal_cache_max_mb)
+        logger.info(
+            f"Stitching with {num_workers} processes, each using {cache_mb} MB of"
+            f" GDAL cache and {num_threads} GDAL threads"
+        )
+        ctx = mp.get_context("spawn")
+        with ProcessPoolExecutor(
+            max_workers=num_workers,
+            mp_context=ctx,
+            initializer=_init_gdal_worker,
+            initargs=(cache_mb, num_threads),
+        ) as exc:
+            futures = [exc.submit(process_date, job) for job in jobs]
+            for fut in tqdm(
+                as_completed(futures),
+                total=len(futures),
+                desc="Merging images by date",
+            ):
+                fut.result()
+    else:
+        thread_map(
+            process_date,
+            jobs,
+            max_workers=num_workers,
+            desc="Merging images by date",
+        )
 
     return stitched_acq_times
 
 
+def _merge_date(job: tuple[Sequence[Filename], Path], **merge_kwargs) -> None:
+    cur_images, outfile = job
+    merge_images(cur_images, outfile=outfile, **merge_kwargs)
+
+
+def get_num_stitching_workers(
+    num_jobs: int, gdal_cache_max_mb: Optional[int] = None
+) -> int:
+    """Choose the number of stitching workers from the available CPUs and memory.
+
+    Parameters
+    ----------
+    num_jobs : int
+        Number of images (dates) to stitch.
+    gdal_cache_max_mb : Optional[int]
+        Total GDAL block cache (in MB) to split between workers.
+        If None, uses the current `GDAL_CACHEMAX` of this process.
+
+    Returns
+    -------
+    int
+        Number of workers, at least 1, so that each worker gets at least
+        256 MB of GDAL cache.
+
+    """
+    total_cache_mb = _get_total_cache_mb(gdal_cache_max_mb)
+    max_by_memory = max(1, total_cache_mb // _MIN_CACHE_MB_PER_WORKER)
+    return max(1, min(num_jobs, utils.get_cpu_count(), max_by_memory))
+
+
+def _get_total_cache_mb(gdal_cache_max_mb: Optional[int]) -> int:
+    if gdal_cache_max_mb is not None:
+        return gdal_cache_max_mb
+    # `GetCacheMax` reports bytes
+    return gdal.GetCacheMax() // 2**20
+
+
+def _get_worker_gdal_limits(
+    num_workers: int, gdal_cache_max_mb: Optional[int]
+) -> tuple[int, int]:
+    """Split the GDAL cache (MB) and CPUs evenly among `num_workers` processes."""
+    cache_mb = max(1, _get_total_cache_mb(gdal_cache_max_mb) // num_workers)
+    num_threads = max(1, utils.get_cpu_count() // num_workers)
+    return cache_mb, num_threads
+
+
+def _init_gdal_worker(cache_mb: int, num_threads: int) -> None:
+    """Set the GDAL cache and thread limits in a stitching process."""
+    # Set the environment too, so that `gdal_merge.py` subprocesses inherit them
+    os.environ["GDAL_CACHEMAX"] = str(cache_mb)
+    os.environ["GDAL_NUM_THREADS"] = str(num_threads)
+    gdal.SetCacheMax(cache_mb * 2**20)
+    gdal.SetConfigOption("GDAL_NUM_THREADS", str(num_threads))
+
+
 def merge_images(
     file_list: Sequence[Filename],
     outfile: Filename,
@@ -142,6 +261,7 @@ def merge_images(
     overwrite: bool = False,
     options: Optional[Sequence[str]] = io.DEFAULT_TIFF_OPTIONS,
     create_only: bool = False,
+    plan: Optional[StitchPlan] = None,
 ) -> None:
     """Combine multiple SLC images on the same date into one image.
 
@@ -187,6 +307,11 @@ def merge_images(
         Default is [dolphin.io.DEFAULT_TIFF_OPTIONS][].
     create_only : bool
         If True, creates an empty output file, does not write data. Default is False.
+    plan : Optional[StitchPlan]
+        Precomputed output grid and burst placements to reuse.
+        If the footprints of `file_list`, or the `target_aligned_pixels`,
+        `out_bounds`, `out_bounds_epsg` and `strides`, do not match the plan,
+        it is ignored and the output grid is computed from `file_list`.
 
     """
     if strides is None:
@@ -199,6 +324,28 @@ def merge_images(
             logger.info(f"Overwrite=True: removing {outfile}")
             Path(outfile).unlink()
 
+    if plan is not None and not create_only:
+        if plan.matches(
+            file_list,
+            target_aligned_pixels=target_aligned_pixels,
+            out_bounds=out_bounds,
+            out_bounds_epsg=out_bounds_epsg,
+            strides=strides,
+        ):
+            merge_with_plan(
+                plan,
+                file_list,
+                outfile=outfile,
+                driver=driver,
+                out_nodata=out_nodata,
+                out_dtype=out_dtype,
+                in_nodata=in_nodata,
+                resample_alg=resample_alg,
+                options=options,
+            )
+            return
+        logger.debug(f"{file_list} do not match the stitching plan")
+
     if len(file_list) == 1 and out_bounds is None:
         logger.info("Only one image, no stitching needed")
         logger.info(f"Copying {file_list[0]} to {outfile} and zeroing nodata values.")
@@ -291,6 +438,508 @@ def merge_images(
     temp_dir.cleanup()
 
 
+class BurstPlacement(BaseModel):
+    """Location of one input image on the mosaic grid of a `StitchPlan`."""
+
+    xsize: int = Field(..., description="Number of columns of the input image.")
+    ysize: int = Field(..., description="Number of rows of the input image.")
+    geotransform: tuple[float, float, float, float, float, float] = Field(
+        ..., description="GDAL geotransform of the input image."
+    )
+    projection: str = Field(..., description="WKT projection of the input image.")
+    warp_bounds: Optional[tuple[float, float, float, float]] = Field(
+        None,
+        description=(
+            "If the input must be reprojected, the (left, bottom, right, top) bounds"
+            " of the warped image. None if the input is already on the plan's grid."
+        ),
+    )
+    src_window: Optional[tuple[int, int, int, int]] = Field(
+        None,
+        description=(
+            "(xoff, yoff, xsize, ysize) to read from the input (or warped input)."
+            " None if the input does not overlap the output."
+        ),
+    )
+    dst_window: Optional[tuple[int, int, int, int]] = Field(
+        None,
+        description="(xoff, yoff, xsize, ysize) to write within the mosaic grid.",
+    )
+
+    def matches(self, ds: gdal.Dataset) -> bool:
+        """Check if the open dataset `ds` has the footprint of this placement."""
+        return (
+            (ds.RasterXSize, ds.RasterYSize) == (self.xsize, self.ysize)
+            and np.allclose(ds.GetGeoTransform(), self.geotransform)
+            and ds.GetProjection() == self.projection
+        )
+
+
+class StitchPlan(BaseModel):
+    """Output grid and burst placements shared by all images in a stitched stack.
+
+    All interferograms (and the other per-burst rasters) from one stack have the
+    same burst footprints, so the output grid and the windows where each burst
+    is copied only need to be computed once.
+    The plan can be saved to JSON with `to_file` so reruns can skip planning.
+
+    Overlapping bursts use the same rule as `gdal_merge.py`: the valid pixels of
+    later images in the list overwrite earlier ones.
+    """
+
+    projection: str = Field(..., description="WKT projection of the output.")
+    resolution: tuple[float, float] = Field(
+        ..., description="(x, y) pixel size of the output, including strides."
+    )
+    bounds: tuple[float, float, float, float] = Field(
+        ..., description="(left, bottom, right, top) bounds of the output image."
+    )
+    mosaic_geotransform: tuple[float, float, float, float, float, float] = Field(
+        ...,
+        description=(
+            "GDAL geotransform of the mosaic covering all inputs, which is cropped to"
+            " `bounds` after merging."
+        ),
+    )
+    mosaic_shape: tuple[int, int] = Field(
+        ..., description="(rows, cols) of the mosaic covering all inputs."
+    )
+    strides: dict[str, int] = Field(
+        {"x": 1, "y": 1}, description="Subsample factor applied to the inputs."
+    )
+    target_aligned_pixels: bool = Field(
+        True, description="Whether the output bounds were snapped to the pixel size."
+    )
+    out_bounds: Optional[tuple[float, float, float, float]] = Field(
+        None, description="Requested (left, bottom, right, top) output bounds."
+    )
+    out_bounds_epsg: Optional[int] = Field(
+        None, description="EPSG code of the requested `out_bounds`."
+    )
+    placements: list[BurstPlacement] = Field(
+        ..., description="Placement of each input image, in order of merging."
+    )
+
+    @classmethod
+    def from_files(
+        cls,
+        file_list: Sequence[Filename],
+        target_aligned_pixels: bool = True,
+        out_bounds: Optional[Bbox] = None,
+        out_bounds_epsg: Optional[int] = None,
+        strides: Optional[dict[str, int]] = None,
+    ) -> StitchPlan:
+        """Compute the output grid and burst placements for `file_list`.
+
+        Parameters
+        ----------
+        file_list : Sequence[Filename]
+            list of raster filenames
+        target_aligned_pixels: bool
+            If True, adjust output image bounds so that pixel coordinates
+            are integer multiples of pixel size, matching the ``-tap``
+            options of GDAL utilities.
+            Default is True.
+        out_bounds: Optional[tuple[float]]
+            if provided, forces the output image bounds to
+                (left, bottom, right, top).
+            Otherwise, computes from the outside of all input images.
+        out_bounds_epsg: Optional[int]
+            EPSG code for the `out_bounds`.
+            If not provided, assumed to match the projections of `file_list`.
+        strides : dict[str, int]
+            subsample factor: {"x": x strides, "y": y strides}
+
+        Returns
+        -------
+        StitchPlan
+            The plan to pass to [`merge_with_plan`][dolphin.stitching.merge_with_plan].
+
+        """
+        strides = _normalize_strides(strides)
+        sx, sy = strides["x"], strides["y"]
+
+        projection = _get_mode_projection(file_list)
+        dx, dy = (abs(r) for r in _get_resolution(file_list))
+        res = (dx * sx, dy * sy)
+
+        # Get the grid of each input after any downsampling/reprojection
+        infos = []
+        source_gts = []
+        source_sizes = []
+        for fn in file_list:
+            ds = gdal.Open(fspath(fn))
+            gt = ds.GetGeoTransform()
+            xsize, ysize = ds.RasterXSize, ds.RasterYSize
+            proj_in = ds.GetProjection()
+            ds = None
+
+            warp_bounds = None
+            if proj_in == projection:
+                src_gt = (gt[0], gt[1] * sx, 0.0, gt[3], 0.0, gt[5] * sy)
+                src_size = (int(xsize / sx + 0.5), int(ysize / sy + 0.5))
+            else:
+                src_gt, src_size = _get_warped_grid(fn, projection, res)
+                left, top = src_gt[0], src_gt[3]
+                warp_bounds = (
+                    left,
+                    top + src_size[1] * src_gt[5],
+                    left + src_size[0] * src_gt[1],
+                    top,
+                )
+            infos.append((xsize, ysize, gt, proj_in, warp_bounds))
+            source_gts.append(src_gt)
+            source_sizes.append(src_size)
+
+        # The mosaic covers all inputs, the same way as `gdal_merge.py`
+        ulx = min(gt[0] for gt in source_gts)
+        uly = max(gt[3] for gt in source_gts)
+        lrx = max(gt[0] + sz[0] * gt[1] for gt, sz in zip(source_gts, source_sizes))
+        lry = min(gt[3] + sz[1] * gt[5] for gt, sz in zip(source_gts, source_sizes))
+        psize_x, psize_y = source_gts[0][1], source_gts[0][5]
+        mosaic_gt = (ulx, psize_x, 0.0, uly, 0.0, psize_y)
+        mosaic_shape = (
+            int((lry - uly) / psize_y + 0.5),
+            int((lrx - ulx) / psize_x + 0.5),
+        )
+
+        # Final bounds to crop the mosaic to
+        if out_bounds is not None:
+            if out_bounds_epsg is not None:
+                bounds = Bbox(
+                    *transform_bounds(
+                        f"EPSG:{out_bounds_epsg}", projection, *out_bounds
+                    )
+                )
+            else:
+                bounds = Bbox(*out_bounds)
+        else:
+            bounds = Bbox(ulx, lry, lrx, uly)
+        if target_aligned_pixels:
+            bounds = _align_bounds(bounds, res)
+
+        placements = []
+        for (xsize, ysize, gt, proj_in, warp_bounds), src_gt, src_size in zip(
+            infos, source_gts, source_sizes
+        ):
+            windows = _get_copy_windows(mosaic_gt, mosaic_shape, src_gt, src_size)
+            src_window = dst_window = None
+            if windows is not None:
+                src_window, dst_window = windows
+                if warp_bounds is None:
+                    # Read from the full resolution input, decimating on read
+                    xoff, yoff, w, h = src_window
+                    xoff, yoff = xoff * sx, yoff * sy
+                    src_window = (
+                        xoff,
+                        yoff,
+                        min(w * sx, xsize - xoff),
+                        min(h * sy, ysize - yoff),
+                    )
+            placements.append(
+                BurstPlacement(
+                    xsize=xsize,
+                    ysize=ysize,
+                    geotransform=gt,
+                    projection=proj_in,
+                    warp_bounds=warp_bounds,
+                    src_window=src_window,
+                    dst_window=dst_window,
+                )
+            )
+
+        return cls(
+            projection=projection,
+            resolution=res,
+            bounds=tuple(bounds),
+            mosaic_geotransform=mosaic_gt,
+            mosaic_shape=mosaic_shape,
+            strides=strides,
+            target_aligned_pixels=target_aligned_pixels,
+            out_bounds=None if out_bounds is None else tuple(out_bounds),
+            out_bounds_epsg=out_bounds_epsg,
+            placements=placements,
+        )
+
+    def matches(
+        self,
+        file_list: Sequence[Filename],
+        target_aligned_pixels: bool = True,
+        out_bounds: Optional[Bbox] = None,
+        out_bounds_epsg: Optional[int] = None,
+        strides: Optional[dict[str, int]] = None,
+    ) -> bool:
+        """Check that the plan was made from `file_list` with the same options.
+
+        The footprints of `file_list` must match the planned inputs, and the
+        other arguments (the same as for `from_files`) must match the ones
+        used to make the plan.
+        """
+        if (
+            target_aligned_pixels != self.target_aligned_pixels
+            or out_bounds_epsg != self.out_bounds_epsg
+            or _normalize_strides(strides) != self.strides
+        ):
+            return False
+        if (out_bounds is None) != (self.out_bounds is None):
+            return False
+        if out_bounds is not None and not np.allclose(out_bounds, self.out_bounds):
+            return False
+        if len(file_list) != len(self.placements):
+            return False
+        for fn, placement in zip(file_list, self.placements):
+            ds = gdal.Open(fspath(fn))
+            if not placement.matches(ds):
+                return False
+        return True
+
+    def to_file(self, filename: Filename) -> None:
+        """Save the plan as JSON to `filename`."""
+        Path(filename).write_text(self.model_dump_json(indent=2))
+
+    @classmethod
+    def from_file(cls, filename: Filename) -> StitchPlan:
+        """Load a plan saved with `to_file`."""
+        return cls.model_validate_json(Path(filename).read_text())
+
+
+def get_stitch_plan(
+    file_list: Sequence[Filename],
+    plan_file: Optional[Filename] = None,
+    target_aligned_pixels: bool = True,
+    out_bounds: Optional[Bbox] = None,
+    out_bounds_epsg: Optional[int] = None,
+    strides: Optional[dict[str, int]] = None,
+) -> StitchPlan:
+    """Load the stitching plan from `plan_file`, or compute it from `file_list`.
+
+    If `plan_file` exists but its footprints don't match `file_list` (or it
+    was made with different bounds or strides), the plan is recomputed and
+    `plan_file` is overwritten.
+
+    Parameters
+    ----------
+    file_list : Sequence[Filename]
+        list of raster filenames for one date.
+    plan_file : Optional[Filename]
+        JSON file to load the plan from, or to save a newly computed plan to.
+    target_aligned_pixels: bool
+        Snap the output bounds to multiples of the pixel size. Default is True.
+    out_bounds: Optional[tuple[float]]
+        if provided, forces the output image bounds to (left, bottom, right, top).
+    out_bounds_epsg: Optional[int]
+        EPSG code for the `out_bounds`.
+    strides : dict[str, int]
+        subsample factor: {"x": x strides, "y": y strides}
+
+    Returns
+    -------
+    StitchPlan
+        The loaded or newly computed plan.
+
+    """
+    if plan_file is not None and Path(plan_file).exists():
+        plan = StitchPlan.from_file(plan_file)
+        if plan.matches(
+            file_list,
+            target_aligned_pixels=target_aligned_pixels,
+            out_bounds=out_bounds,
+            out_bounds_epsg=out_bounds_epsg,
+            strides=strides,
+        ):
+            logger.info(f"Using existing stitching plan {plan_file}")
+            return plan
+        logger.info(f"{plan_file} does not match the current inputs, recomputing")
+
+    plan = StitchPlan.from_files(
+        file_list,
+        target_aligned_pixels=target_aligned_pixels,
+        out_bounds=out_bounds,
+        out_bounds_epsg=out_bounds_epsg,
+        strides=strides,
+    )
+    if plan_file is not None:
+        plan.to_file(plan_file)
+    return plan
+
+
+def merge_with_plan(
+    plan: StitchPlan,
+    file_list: Sequence[Filename],
+    outfile: Filename,
+    driver: str = "GTiff",
+    out_nodata: Optional[float] = 0,
+    out_dtype: Optional[DTypeLike] = None,
+    in_nodata: Optional[float] = None,
+    resample_alg: str = "lanczos",
+    options: Optional[Sequence[str]] = io.DEFAULT_TIFF_OPTIONS,
+) -> None:
+    """Merge `file_list` into `outfile` using the precomputed `plan`.
+
+    Parameters
+    ----------
+    plan : StitchPlan
+        Output grid and placements, e.g. from
+        [`StitchPlan.from_files`][dolphin.stitching.StitchPlan.from_files].
+    file_list : Sequence[Filename]
+        list of raster filenames. Must have the footprints used to make `plan`.
+    outfile : Filename
+        Path to output file
+    driver : str
+        GDAL driver to use for output file. Default is GTiff.
+    out_nodata : Optional[float | str]
+        Nodata value to use for output file. Default is 0.
+    out_dtype : Optional[DTypeLike]
+        Output data type. Default is None, which will use the data type
+        of the first image in the list.
+    in_nodata : Optional[float | str]
+        Override the files' `nodata` and use `in_nodata` during merging.
+    resample_alg : str, default="lanczos"
+        Method for gdal to use for reprojection.
+    options : Optional[Sequence[str]]
+        Driver-specific creation options passed to GDAL.
+        Default is [dolphin.io.DEFAULT_TIFF_OPTIONS][].
+
+    """
+    ds0 = gdal.Open(fspath(file_list[0]))
+    nbands = ds0.RasterCount
+    if out_dtype is None:
+        out_dtype = utils.gdal_to_numpy_type(ds0.GetRasterBand(1).DataType)
+    ds0 = None
+    init_value = out_nodata if out_nodata is not None else 0
+
+    with tempfile.TemporaryDirectory() as tmpdir:
+        mosaic_file = Path(tmpdir) / "merged.tif"
+        rows, cols = plan.mosaic_shape
+        io.write_arr(
+            arr=None,
+            output_name=mosaic_file,
+            shape=(rows, cols),
+            nbands=nbands,
+            dtype=out_dtype,
+            geotransform=plan.mosaic_geotransform,
+            projection=plan.projection,
+            nodata=out_nodata,
+            options=["TILED=YES", "BIGTIFF=YES"],
+        )
+        ds_out = gdal.Open(fspath(mosaic_file), gdal.GA_Update)
+        for b in range(1, nbands + 1):
+            ds_out.GetRasterBand(b).Fill(init_value)
+
+        for idx, (fn, placement) in enumerate(zip(file_list, plan.placements)):
+            if placement.src_window is None or placement.dst_window is None:
+                continue
+            if placement.warp_bounds is not None:
+                src_name = f"/vsimem/{_get_temp_filename(Path(fn), idx, '_warped')}"
+                gdal.Warp(
+                    src_name,
+                    fspath(fn),
+                    format="VRT",
+                    dstSRS=plan.projection,
+                    outputBounds=placement.warp_bounds,
+                    xRes=plan.resolution[0],
+                    yRes=plan.resolution[1],
+                    resampleAlg=resample_alg,
+                )
+            else:
+                src_name = fspath(fn)
+            ds_in = gdal.Open(src_name)
+            _copy_window(ds_in, ds_out, placement, in_nodata)
+            ds_in = None
+            if placement.warp_bounds is not None:
+                gdal.Unlink(src_name)
+        ds_out.FlushCache()
+        ds_out = None
+
+        (xmin, ymin, xmax, ymax) = plan.bounds
+        gdal.Translate(
+            destName=fspath(outfile),
+            srcDS=fspath(mosaic_file),
+            projWin=(xmin, ymax, xmax, ymin),
+            resampleAlg="bilinear",
+            format=driver,
+            creationOptions=options,
+        )
+
+
+def _copy_window(
+    ds_in: gdal.Dataset,
+    ds_out: gdal.Dataset,
+    placement: BurstPlacement,
+    in_nodata: Optional[float],
+) -> None:
+    """Copy the valid pixels of `ds_in` into `ds_out` at the planned window."""
+    assert placement.src_window is not None
+    assert placement.dst_window is not None
+    sw_xoff, sw_yoff, sw_xsize, sw_ysize = placement.src_window
+    tw_xoff, tw_yoff, tw_xsize, tw_ysize = placement.dst_window
+    for b in range(1, ds_out.RasterCount + 1):
+        bnd_in = ds_in.GetRasterBand(b)
+        bnd_out = ds_out.GetRasterBand(b)
+        nodata = in_nodata if in_nodata is not None else bnd_in.GetNoDataValue()
+        data_src = bnd_in.ReadAsArray(
+            sw_xoff,
+            sw_yoff,
+            sw_xsize,
+            sw_ysize,
+            buf_xsize=tw_xsize,
+            buf_ysize=tw_ysize,
+            resample_alg=gdal.GRIORA_NearestNeighbour,
+        )
+        if nodata is None:
+            bnd_out.WriteArray(data_src, tw_xoff, tw_yoff)
+            continue
+        data_dst = bnd_out.ReadAsArray(tw_xoff, tw_yoff, tw_xsize, tw_ysize)
+        is_nodata = np.isnan(data_src) if np.isnan(nodata) else data_src == nodata
+        bnd_out.WriteArray(np.where(is_nodata, data_dst, data_src), tw_xoff, tw_yoff)
+
+
+def _get_copy_windows(
+    dst_gt: Sequence[float],
+    dst_shape: tuple[int, int],
+    src_gt: Sequence[float],
+    src_size: tuple[int, int],
+) -> tuple[tuple[int, int, int, int], tuple[int, int, int, int]] | None:
+    """Get the (src, dst) windows where `src` overlaps `dst`.
+
+    Uses the same rounding as `gdal_merge.py` so that results are identical.
+    Windows are (xoff, yoff, xsize, ysize). Returns None if there's no overlap.
+    """
+    rows, cols = dst_shape
+    t_ulx, t_uly = dst_gt[0], dst_gt[3]
+    t_lrx = t_ulx + cols * dst_gt[1]
+    t_lry = t_uly + rows * dst_gt[5]
+    s_ulx, s_uly = src_gt[0], src_gt[3]
+    s_lrx = s_ulx + src_size[0] * src_gt[1]
+    s_lry = s_uly + src_size[1] * src_gt[5]
+
+    tgw_ulx = max(t_ulx, s_ulx)
+    tgw_lrx = min(t_lrx, s_lrx)
+    tgw_uly = min(t_uly, s_uly)
+    tgw_lry = max(t_lry, s_lry)
+    if tgw_ulx >= tgw_lrx or tgw_uly <= tgw_lry:
+        return None
+
+    tw_xoff = int((tgw_ulx - dst_gt[0]) / dst_gt[1] + 0.1)
+    tw_yoff = int((tgw_uly - dst_gt[3]) / dst_gt[5] + 0.1)
+    tw_xsize = int((tgw_lrx - dst_gt[0]) / dst_gt[1] + 0.5) - tw_xoff
+    tw_ysize = int((tgw_lry - dst_gt[3]) / dst_gt[5] + 0.5) - tw_yoff
+    if tw_xsize < 1 or tw_ysize < 1:
+        return None
+
+    sw_xoff = int((tgw_ulx - src_gt[0]) / src_gt[1])
+    sw_yoff = int((tgw_uly - src_gt[3]) / src_gt[5])
+    sw_xsize = int((tgw_lrx - src_gt[0]) / src_gt[1] + 0.5) - sw_xoff
+    sw_ysize = int((tgw_lry - src_gt[3]) / src_gt[5] + 0.5) - sw_yoff
+    if sw_xsize < 1 or sw_ysize < 1:
+        return None
+
+    return (
+        (sw_xoff, sw_yoff, sw_xsize, sw_ysize),
+        (tw_xoff, tw_yoff, tw_xsize, tw_ysize),
+    )
+
+
 def get_downsampled_vrts(
     filenames: Sequence[Filename],
     strides: dict[str, int],
@@ -523,6 +1172,41 @@ def get_combined_bounds_nodata(
     return bounds, ndv
 
 
+def _normalize_strides(strides: Optional[dict[str, int]]) -> dict[str, int]:
+    """Get the strides used to merge, matching `merge_images`.
+
+    `merge_images` only downsamples when both strides are > 1.
+    """
+    if strides is None or not (strides["x"] > 1 and strides["y"] > 1):
+        return {"x": 1, "y": 1}
+    return {"x": strides["x"], "y": strides["y"]}
+
+
+def _get_warped_grid(
+    filename: Filename, projection: str, res: tuple[float, float]
+) -> tuple[tuple[float, float, float, float, float, float], tuple[int, int]]:
+    """Get the geotransform and (xsize, ysize) of `filename` warped to `projection`.
+
+    Uses the same options as `warp_to_projection`, so the grid is the one GDAL
+    picks for the target-aligned output (without reading any pixels).
+    """
+    vrt_name = f"/vsimem/{_get_temp_filename(Path(filename), 0, '_grid')}"
+    ds = gdal.Warp(
+        vrt_name,
+        fspath(filename),
+        format="VRT",
+        dstSRS=projection,
+        targetAlignedPixels=True,
+        xRes=res[0],
+        yRes=res[1],
+    )
+    gt = ds.GetGeoTransform()
+    size = (ds.RasterXSize, ds.RasterYSize)
+    ds = None
+    gdal.Unlink(vrt_name)
+    return gt, size
+
+
 def _align_bounds(bounds: Bbox, res: tuple[float, float]) -> Bbox:
     """Align boundary with an integer multiple of the resolution."""
     left, bottom, right, top = bounds
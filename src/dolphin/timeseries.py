@@ -16,6 +16,7 @@ from scipy import ndimage
 
 from dolphin import DateOrDatetime, io, utils
 from dolphin._overviews import ImageType, create_overviews
+from dolphin._profiling import profile
 from dolphin._types import PathOrStr, ReferencePoint
 from dolphin.utils import flatten, format_dates, full_suffix
 from dolphin.workflows import CallFunc
@@ -38,6 +39,7 @@ class ReferencePointError(ValueError):
     pass
 
 
+@profile("inversion", category="stage")
 def run(
     unwrapped_paths: Sequence[PathOrStr],
     conncomp_paths: Sequence[PathOrStr],
@@ -668,6 +670,7 @@ def invert_unw_network(
     block_shape: tuple[int, int] = (256, 256),
     num_threads: int = 4,
     add_overviews: bool = True,
+    unw_stack: io.StackReader | None = None,
 ) -> list[Path]:
     """Perform pixel-wise inversion of unwrapped network to get phase per date.
 
@@ -705,6 +708,10 @@ def invert_unw_network(
     add_overviews : bool, optional
         If True, creates overviews of the new unwrapped phase rasters.
         Default is True.
+    unw_stack : io.StackReader, optional
+        Reader for the stack of `unw_file_list`, e.g. an `io.HDF5Reader` of a
+        stack written with `io.HDF5StackWriter`.
+        If None, reads `unw_file_list` through a `VRTStack`.
 
     Returns
     -------
@@ -737,10 +744,16 @@ def invert_unw_network(
 
     A = get_incidence_matrix(ifg_pairs=ifg_tuples, sar_idxs=sar_dates)
 
-    out_vrt_name = Path(output_dir) / "unw_network.vrt"
-    unw_reader = io.VRTStack(
-        file_list=unw_file_list, outfile=out_vrt_name, skip_size_check=True
-    )
+    if unw_stack is not None:
+        if len(unw_stack) != len(unw_file_list):
+            msg = f"{len(unw_stack) = }, but {len(unw_file_list) = }"
+            raise ValueError(msg)
+        unw_reader = unw_stack
+    else:
+        out_vrt_name = Path(output_dir) / "unw_network.vrt"
+        unw_reader = io.VRTStack(
+            file_list=unw_file_list, outfile=out_vrt_name, skip_size_check=True
+        )
     cor_vrt_name = Path(output_dir) / "cor_network.vrt"
 
     # Get the reference point data
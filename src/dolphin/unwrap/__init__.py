@@ -1,6 +1,8 @@
 from ._constants import *
 from ._post_process import *
+from ._scheduler import *
 from ._snaphu_py import *
 from ._tophu import *
 from ._unwrap import *
+from ._warm_start import *
 from ._whirlwind import *
@@ -1,9 +1,25 @@
+from __future__ import annotations
+
 import numpy as np
 from numba import njit, stencil
 from numpy.typing import ArrayLike
 from scipy.ndimage import gaussian_filter
 
+from dolphin import io
+from dolphin._types import Filename
+
+__all__ = [
+    "compute_phase_diffs",
+    "gaussian_filter_nan",
+    "rewrap_to_twopi",
+    "smooth_masked_areas",
+]
+
 TWOPI = 2 * np.pi
+# Number of rows (not counting the halo) to smooth at a time
+BLOCK_ROWS = 256
+# Default of `scipy.ndimage.gaussian_filter`: kernel radius, in standard deviations
+GAUSSIAN_TRUNCATE = 4.0
 
 
 @njit(nogil=True)
@@ -83,19 +99,21 @@ def gaussian_filter_nan(
         Filtered version of `image`.
 
     """
-    if np.sum(np.isnan(image)) == 0:
+    image = np.asarray(image)
+    nan_idxs = np.isnan(image)
+    if not nan_idxs.any():
         return gaussian_filter(image, sigma=sigma, mode=mode, **kwargs)
 
-    V = image.copy()
-    nan_idxs = np.isnan(image)
-    V[nan_idxs] = 0
-    V_filt = gaussian_filter(V, sigma, **kwargs)
+    # Filter the values (with NaNs as 0) and the weights in float32 buffers
+    V = np.where(nan_idxs, 0, image).astype(np.float32)
+    gaussian_filter(V, sigma, mode=mode, output=V, **kwargs)
 
-    W = np.ones(image.shape)
-    W[nan_idxs] = 0
-    W_filt = gaussian_filter(W, sigma, **kwargs)
+    W = (~nan_idxs).astype(np.float32)
+    gaussian_filter(W, sigma, mode=mode, output=W, **kwargs)
 
-    return V_filt / W_filt
+    with np.errstate(invalid="ignore", divide="ignore"):
+        V /= W
+    return V
 
 
 def _get_ambiguities(unw: ArrayLike, round_decimals: int = 4) -> np.ndarray:
@@ -107,11 +125,11 @@ def _get_ambiguities(unw: ArrayLike, round_decimals: int = 4) -> np.ndarray:
 def _fill_masked_ambiguities(
     amb_image: ArrayLike, mask: ArrayLike, filter_sigma: int = 60
 ) -> np.ndarray:
-    masked_ambs = amb_image.copy()
+    masked_ambs = np.array(amb_image, dtype=np.float32)
     masked_ambs[mask] = np.nan
-    ambs_filled = np.round(gaussian_filter_nan(amb_image, filter_sigma))
+    ambs_filled = np.round(gaussian_filter_nan(masked_ambs, filter_sigma))
 
-    out_filled = amb_image.copy()
+    out_filled = np.array(amb_image, dtype=np.float32)
     out_filled[mask] = ambs_filled[mask]
     return out_filled
 
@@ -125,3 +143,55 @@ def _smooth_masked_areas(unw, mask, filter_sigma: int = 60):
     new_amb_vec = amb_filled[mask]
     out[mask] = rewrapped_phase_vec + (new_amb_vec * TWOPI)
     return out
+
+
+def smooth_masked_areas(
+    unw_filename: Filename,
+    mask_filename: Filename,
+    filter_sigma: int = 60,
+    block_rows: int = BLOCK_ROWS,
+) -> None:
+    """Replace the ambiguities of masked pixels by those of their surroundings.
+
+    The ambiguity numbers of the unmasked pixels are smoothed with a Gaussian
+    filter (ignoring masked and `nodata` pixels), and the masked pixels are
+    re-unwrapped with the rounded result.
+    Works on blocks of rows, each read with a halo of the filter's radius, so
+    the result matches filtering the whole image at once. Only the masked
+    pixels change, so `unw_filename` is updated in place.
+
+    Parameters
+    ----------
+    unw_filename : Filename
+        Path to the unwrapped phase.
+    mask_filename : Filename
+        Binary mask where 0s are the pixels to smooth.
+    filter_sigma : int
+        Standard deviation (in pixels) of the Gaussian filter. Default is 60.
+    block_rows : int
+        Number of rows to update at a time.
+
+    """
+    halo = int(GAUSSIAN_TRUNCATE * filter_sigma + 0.5)
+    nrows = io.get_raster_xysize(unw_filename)[1]
+    for row_start in range(0, nrows, block_rows):
+        row_end = min(row_start + block_rows, nrows)
+        read_rows = slice(max(row_start - halo, 0), min(row_end + halo, nrows))
+        crop = slice(row_start - read_rows.start, row_end - read_rows.start)
+
+        unw = io.load_gdal(unw_filename, rows=read_rows, masked=True)
+        mask = io.load_gdal(mask_filename, rows=read_rows) == 0
+        if not mask[crop].any():
+            continue
+        amb = _get_ambiguities(unw.data).astype(np.float32)
+        # Don't use the ambiguities of `nodata` pixels to fill the masked ones
+        amb[np.ma.getmaskarray(unw)] = np.nan
+        amb_filled = _fill_masked_ambiguities(amb, mask, filter_sigma=filter_sigma)
+
+        out = unw.data[crop]
+        # Keep pixels with no unmasked pixels within the filter's radius
+        fill = (
+            mask[crop] & ~np.ma.getmaskarray(unw)[crop] & np.isfinite(amb_filled[crop])
+        )
+        out[fill] = rewrap_to_twopi(out[fill]) + TWOPI * amb_filled[crop][fill]
+        io.write_block(out, unw_filename, row_start=row_start, col_start=0)
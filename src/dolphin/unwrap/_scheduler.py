@@ -0,0 +1,218 @@
+"""Run unwrapping jobs in parallel under a CPU and memory budget."""
+
+from __future__ import annotations
+
+import logging
+import math
+import multiprocessing as mp
+import time
+from concurrent.futures import FIRST_COMPLETED, Future, ProcessPoolExecutor, wait
+from dataclasses import dataclass, field
+from typing import Any, Callable, Optional, Sequence
+
+from tqdm.auto import tqdm
+
+from dolphin import utils
+from dolphin.workflows import UnwrapMethod, UnwrapOptions
+from dolphin.workflows._resources import _get_total_memory_bytes
+
+logger = logging.getLogger(__name__)
+
+__all__ = ["UnwrapJob", "estimate_unwrap_bytes", "estimate_unwrap_cpus", "run_jobs"]
+
+# Approximate peak memory (in bytes per pixel) of each unwrapper's internal arrays
+# (costs, flows, and copies of the wrapped phase and correlation)
+_SNAPHU_BYTES_PER_PIXEL = 100
+_ICU_PHASS_BYTES_PER_PIXEL = 60
+_WHIRLWIND_BYTES_PER_PIXEL = 60
+# Full-frame arrays SNAPHU keeps to merge the tiles
+_SNAPHU_MERGE_BYTES_PER_PIXEL = 20
+# Interferogram, correlation, unwrapped phase, connected components and mask
+_IO_BYTES_PER_PIXEL = 8 + 4 + 4 + 4 + 1
+# The interferogram held for the ambiguity transfer, and the filtered copy
+# and workspace from Goldstein filtering or interpolation
+_FILTER_BYTES_PER_PIXEL = 48
+
+
+@dataclass(frozen=True)
+class UnwrapJob:
+    """One interferogram to unwrap, with its estimated resources."""
+
+    name: str
+    """Name used to report the job's progress."""
+    num_bytes: int
+    """Estimated peak memory (in bytes) of the job."""
+    num_cpus: int = 1
+    """Number of CPUs the job uses."""
+    kwargs: dict[str, Any] = field(default_factory=dict)
+    """Keyword arguments for the function run by the job."""
+
+
+def estimate_unwrap_bytes(shape: tuple[int, int], unwrap_options: UnwrapOptions) -> int:
+    """Estimate the peak memory used to unwrap one interferogram.
+
+    Parameters
+    ----------
+    shape : tuple[int, int]
+        Size (rows, columns) of the interferogram.
+    unwrap_options : UnwrapOptions
+        Unwrapping settings, which pick the unwrapper and its tiling.
+
+    Returns
+    -------
+    int
+        Estimated peak memory, in bytes.
+
+    """
+    rows, cols = shape
+    num_pixels = rows * cols
+    method = unwrap_options.unwrap_method
+
+    if method == UnwrapMethod.SNAPHU:
+        snaphu_opts = unwrap_options.snaphu_options
+        ny, nx = snaphu_opts.ntiles
+        if ny * nx > 1:
+            tile_pixels = (math.ceil(rows / ny) + snaphu_opts.tile_overlap[0]) * (
+                math.ceil(cols / nx) + snaphu_opts.tile_overlap[1]
+            )
+            unwrapper_bytes = (
+                estimate_unwrap_cpus(unwrap_options)
+                * tile_pixels
+                * _SNAPHU_BYTES_PER_PIXEL
+                + num_pixels * _SNAPHU_MERGE_BYTES_PER_PIXEL
+            )
+        else:
+            unwrapper_bytes = num_pixels * _SNAPHU_BYTES_PER_PIXEL
+    elif method == UnwrapMethod.WHIRLWIND:
+        unwrapper_bytes = num_pixels * _WHIRLWIND_BYTES_PER_PIXEL
+    else:
+        # `tophu` unwraps the downsampled frame, then one full-resolution tile
+        # at a time
+        tophu_opts = unwrap_options.tophu_options
+        dy, dx = tophu_opts.downsample_factor
+        ny, nx = tophu_opts.ntiles
+        coarse_pixels = math.ceil(rows / dy) * math.ceil(cols / dx)
+        tile_pixels = math.ceil(rows / ny) * math.ceil(cols / nx)
+        unwrapper_bytes = _ICU_PHASS_BYTES_PER_PIXEL * max(coarse_pixels, tile_pixels)
+
+    filter_bytes = 0
+    if unwrap_options.run_goldstein or unwrap_options.run_interpolation:
+        filter_bytes = num_pixels * _FILTER_BYTES_PER_PIXEL
+    return num_pixels * _IO_BYTES_PER_PIXEL + unwrapper_bytes + filter_bytes
+
+
+def estimate_unwrap_cpus(unwrap_options: UnwrapOptions) -> int:
+    """Get the number of CPUs used to unwrap one interferogram.
+
+    Parameters
+    ----------
+    unwrap_options : UnwrapOptions
+        Unwrapping settings, which pick the unwrapper and its tiling.
+
+    Returns
+    -------
+    int
+        Number of CPUs: the number of SNAPHU tiles unwrapped in parallel,
+        or 1 for the other unwrappers.
+
+    """
+    if unwrap_options.unwrap_method != UnwrapMethod.SNAPHU:
+        return 1
+    snaphu_opts = unwrap_options.snaphu_options
+    num_tiles = snaphu_opts.ntiles[0] * snaphu_opts.ntiles[1]
+    if num_tiles == 1:
+        return 1
+    return max(1, min(snaphu_opts.n_parallel_tiles, num_tiles))
+
+
+def run_jobs(
+    func: Callable[..., Any],
+    jobs: Sequence[UnwrapJob],
+    max_jobs: int,
+    num_cpus: Optional[int] = None,
+    total_memory_gb: Optional[float] = None,
+) -> list[Any]:
+    """Run `func` for each job in a process pool, within a CPU and memory budget.
+
+    Jobs are started largest first (so the longest jobs are not left to run
+    alone at the end), and a job is only started while the CPUs and estimated
+    memory of the running jobs leave room for it. If no job is running, the
+    next job is started even if it is over the budget.
+
+    Parameters
+    ----------
+    func : Callable[..., Any]
+        Function to run with each job's `kwargs`. Must be picklable.
+    jobs : Sequence[UnwrapJob]
+        Jobs to run.
+    max_jobs : int
+        Maximum number of jobs to run at once.
+        If 1, runs the jobs one at a time in this process.
+    num_cpus : int, optional
+        Number of CPUs available to all running jobs.
+        Default is the number available to this process.
+    total_memory_gb : float, optional
+        Memory (in GB) available to all running jobs.
+        Default is the physical memory of the machine.
+
+    Returns
+    -------
+    list[Any]
+        The results of `func`, in the order of `jobs`.
+
+    """
+    if num_cpus is None:
+        num_cpus = utils.get_cpu_count()
+    total_bytes = (
+        _get_total_memory_bytes()
+        if total_memory_gb is None
+        else total_memory_gb * 2**30
+    )
+
+    pending = sorted(range(len(jobs)), key=lambda i: jobs[i].num_bytes, reverse=True)
+    results: list[Any] = [None] * len(jobs)
+    running: dict[Future, tuple[int, float]] = {}
+
+    Executor = ProcessPoolExecutor if max_jobs > 1 else utils.DummyProcessPoolExecutor
+    ctx = mp.get_context("spawn")
+    with Executor(max_workers=max_jobs, mp_context=ctx) as exc, tqdm(
+        total=len(jobs), desc="Unwrapping"
+    ) as pbar:
+        while pending or running:
+            used_cpus = sum(jobs[i].num_cpus for i, _ in running.values())
+            used_bytes = sum(jobs[i].num_bytes for i, _ in running.values())
+            # Start the largest waiting jobs which fit in the remaining budget
+            for i in list(pending):
+                if len(running) >= max_jobs:
+                    break
+                job = jobs[i]
+                fits = (
+                    used_cpus + job.num_cpus <= num_cpus
+                    and used_bytes + job.num_bytes <= total_bytes
+                )
+                if running and not fits:
+                    continue
+                if not fits:
+                    logger.warning(
+                        f"{job.name} needs ~{job.num_bytes / 2**30:.2f} GB and"
+                        f" {job.num_cpus} CPUs, over the budget of"
+                        f" {total_bytes / 2**30:.1f} GB and {num_cpus} CPUs"
+                    )
+                logger.debug(
+                    f"Starting {job.name} (~{job.num_bytes / 2**30:.2f} GB,"
+                    f" {job.num_cpus} CPUs)"
+                )
+                pending.remove(i)
+                t0 = time.perf_counter()
+                running[exc.submit(func, **job.kwargs)] = (i, t0)
+                used_cpus += job.num_cpus
+                used_bytes += job.num_bytes
+
+            done, _ = wait(running, return_when=FIRST_COMPLETED)
+            for fut in done:
+                i, t0 = running.pop(fut)
+                results[i] = fut.result()
+                elapsed = time.perf_counter() - t0
+                logger.info(f"Finished {jobs[i].name} in {elapsed:.1f} s")
+                pbar.update()
+    return results
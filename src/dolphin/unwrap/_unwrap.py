@@ -1,18 +1,16 @@
 from __future__ import annotations
 
-import itertools
 import logging
 import shutil
-from concurrent.futures import ThreadPoolExecutor, as_completed
 from pathlib import Path
 from typing import Optional, Sequence
 
 import numpy as np
-from tqdm.auto import tqdm
+from opera_utils import get_dates
 
 from dolphin import goldstein, interpolate, io
 from dolphin._types import Filename
-from dolphin.utils import DummyProcessPoolExecutor, full_suffix
+from dolphin.utils import full_suffix
 from dolphin.workflows import UnwrapMethod, UnwrapOptions
 
 from ._constants import (
@@ -23,10 +21,27 @@ from ._constants import (
     UNW_SUFFIX,
     UNW_SUFFIX_ZEROED,
 )
+from ._scheduler import (
+    UnwrapJob,
+    estimate_unwrap_bytes,
+    estimate_unwrap_cpus,
+    run_jobs,
+)
 from ._snaphu_py import grow_conncomp_snaphu, unwrap_snaphu_py
 from ._tophu import multiscale_unwrap
 from ._unwrap_3d import unwrap_spurt
-from ._utils import create_combined_mask, set_nodata_values
+from ._utils import (
+    _zero_from_mask,
+    create_combined_mask,
+    create_combined_masks,
+    finalize_unwrapped,
+)
+from ._warm_start import (
+    BLOCK_ROWS,
+    get_prediction_paths,
+    get_spanning_pairs,
+    unwrap_from_prediction,
+)
 from ._whirlwind import unwrap_whirlwind
 
 logger = logging.getLogger(__name__)
@@ -129,68 +144,177 @@ def run(
         (output_path / Path(f).name.replace(suf, UNW_SUFFIX))
         for f, suf in zip(ifg_filenames, ifg_suffixes)
     ]
-    in_files, out_files = [], []
-    for inf, outf in zip(ifg_filenames, all_out_files):
+    todo = []
+    for i, outf in enumerate(all_out_files):
         if Path(outf).exists() and not overwrite:
             logger.info(f"{outf} exists. Skipping.")
             continue
-
-        in_files.append(inf)
-        out_files.append(outf)
-    logger.info(f"{len(out_files)} left to unwrap")
-
-    if mask_filename:
-        mask_filename = Path(mask_filename).resolve()
-
-    if delete_intermediate:
-        assert scratchdir is not None  # can't be none from the previous check
-        scratch_dirs: list[Path | None] = [
-            Path(scratchdir) / f"scratch-{Path(ifg_file).stem}" for ifg_file in in_files
-        ]
-    else:
-        scratch_dirs = itertools.repeat(scratchdir)  # type: ignore[assignment]
-    # This keeps it from spawning a new process for a single job.
-    max_jobs = unwrap_options.n_parallel_jobs
-
-    Executor = ThreadPoolExecutor if max_jobs > 1 else DummyProcessPoolExecutor
-    with Executor(max_workers=max_jobs) as exc:
-        futures = [
-            exc.submit(
-                unwrap,
-                ifg_filename=ifg_file,
-                corr_filename=cor_file,
-                unw_filename=out_file,
-                nlooks=nlooks,
-                mask_filename=mask_filename,
-                unwrap_options=unwrap_options,
-                unw_nodata=unw_nodata,
-                ccl_nodata=ccl_nodata,
-                scratchdir=cur_scratch,
-                delete_scratch=delete_intermediate,
-            )
-            for ifg_file, out_file, cor_file, cur_scratch in zip(
-                in_files, out_files, cor_filenames, scratch_dirs
-            )
-        ]
-        for fut in tqdm(as_completed(futures)):
-            # We're not passing all the unw files in, so we need to tally up below
-            _unw_path, _cc_path = fut.result()
+        todo.append(i)
+    logger.info(f"{len(todo)} left to unwrap")
 
     if unwrap_options.zero_where_masked and mask_filename is not None:
-        all_out_files = [
+        final_unw_files = [
             Path(str(outf).replace(UNW_SUFFIX, UNW_SUFFIX_ZEROED))
             for outf in all_out_files
         ]
         conncomp_files = [
             Path(str(outf).replace(UNW_SUFFIX_ZEROED, CONNCOMP_SUFFIX_ZEROED))
-            for outf in all_out_files
+            for outf in final_unw_files
         ]
     else:
+        final_unw_files = all_out_files
         conncomp_files = [
             Path(str(outf).replace(UNW_SUFFIX, CONNCOMP_SUFFIX))
             for outf in all_out_files
         ]
-    return all_out_files, conncomp_files
+
+    mask_files: dict[int, Path | None] = dict.fromkeys(todo)
+    if mask_filename:
+        mask_filename = Path(mask_filename).resolve()
+        # Share the combined mask between interferograms with the same footprint
+        combined_masks = create_combined_masks(
+            mask_filename=mask_filename,
+            image_filenames=[ifg_filenames[i] for i in todo],
+            output_dir=output_path,
+        )
+        mask_files = dict(zip(todo, combined_masks))
+
+    num_cpus = estimate_unwrap_cpus(unwrap_options)
+    jobs = {}
+    for i in todo:
+        if delete_intermediate:
+            assert scratchdir is not None  # can't be none from the previous check
+            cur_scratch: Path | None = (
+                Path(scratchdir) / f"scratch-{Path(ifg_filenames[i]).stem}"
+            )
+        else:
+            cur_scratch = None if scratchdir is None else Path(scratchdir)
+        cols, rows = io.get_raster_xysize(ifg_filenames[i])
+        kwargs = {
+            "ifg_filename": ifg_filenames[i],
+            "corr_filename": cor_filenames[i],
+            "unw_filename": all_out_files[i],
+            "nlooks": nlooks,
+            "mask_filename": mask_files[i],
+            "unwrap_options": unwrap_options,
+            "unw_nodata": unw_nodata,
+            "ccl_nodata": ccl_nodata,
+            "scratchdir": cur_scratch,
+            "delete_scratch": delete_intermediate,
+            "combine_nodata_mask": False,
+        }
+        num_bytes = estimate_unwrap_bytes((rows, cols), unwrap_options)
+        jobs[i] = UnwrapJob(Path(ifg_filenames[i]).name, num_bytes, num_cpus, kwargs)
+
+    scheduler_kwargs = {
+        "max_jobs": unwrap_options.n_parallel_jobs,
+        "num_cpus": unwrap_options.num_cpus,
+        "total_memory_gb": unwrap_options.total_memory_gb,
+    }
+    paths: dict[int, list[tuple[int, int]]] = {}
+    if unwrap_options.run_warm_start:
+        paths = _get_warm_start_paths(ifg_filenames)
+    predictable = [i for i in todo if i in paths]
+    # Unwrap the pairs which connect the dates first, since the
+    # predictions are made from them
+    run_jobs(unwrap, [jobs[i] for i in todo if i not in paths], **scheduler_kwargs)
+
+    if predictable:
+        ws_opts = unwrap_options.warm_start_options
+        prediction_jobs = []
+        for i in predictable:
+            cols, _ = io.get_raster_xysize(ifg_filenames[i])
+            kwargs = {
+                "ifg_filename": ifg_filenames[i],
+                "unw_filenames": [final_unw_files[j] for j, _ in paths[i]],
+                "conncomp_filenames": [conncomp_files[j] for j, _ in paths[i]],
+                "signs": [sign for _, sign in paths[i]],
+                "output_unw_filename": all_out_files[i],
+                "output_conncomp_filename": Path(
+                    str(all_out_files[i]).replace(UNW_SUFFIX, CONNCOMP_SUFFIX)
+                ),
+                "closure_threshold": ws_opts.closure_threshold,
+                "min_fraction": ws_opts.min_fraction,
+                "mask_filename": mask_files[i]
+                if unwrap_options.zero_where_masked
+                else None,
+                "unw_nodata": unw_nodata,
+                "ccl_nodata": ccl_nodata,
+            }
+            # A few rows of each of the summed rasters at a time
+            num_bytes = 2 * BLOCK_ROWS * cols * (16 + 8 * len(paths[i]))
+            prediction_jobs.append(
+                UnwrapJob(Path(ifg_filenames[i]).name, num_bytes, kwargs=kwargs)
+            )
+        predicted = run_jobs(_predict_unwrapped, prediction_jobs, **scheduler_kwargs)
+        failed = [i for i, ok in zip(predictable, predicted) if not ok]
+        logger.info(
+            f"Predicted {len(predictable) - len(failed)} of {len(predictable)}"
+            " interferograms from the sum of other interferograms"
+        )
+        run_jobs(unwrap, [jobs[i] for i in failed], **scheduler_kwargs)
+
+    return final_unw_files, conncomp_files
+
+
+def _get_warm_start_paths(
+    ifg_filenames: Sequence[Filename],
+) -> dict[int, list[tuple[int, int]]]:
+    """Get the unwrapped pairs to sum to predict each of `ifg_filenames`."""
+    date_pairs = []
+    for f in ifg_filenames:
+        dates = get_dates(f)
+        if len(dates) < 2:
+            logger.warning(f"Can't parse the dates of {f}: not using warm starts")
+            return {}
+        date_pairs.append((dates[0], dates[1]))
+    return get_prediction_paths(date_pairs, get_spanning_pairs(date_pairs))
+
+
+def _predict_unwrapped(
+    ifg_filename: Filename,
+    output_unw_filename: Filename,
+    output_conncomp_filename: Filename,
+    min_fraction: float,
+    mask_filename: Filename | None,
+    unw_nodata: float | None,
+    ccl_nodata: int | None,
+    **kwargs,
+) -> bool:
+    """Predict one unwrapped interferogram, and set its nodata if it passes.
+
+    The prediction is written to temporary files which are only renamed to the
+    outputs if it passes, so a failed prediction is never mistaken for a
+    finished output by later runs.
+    """
+    outputs = [Path(output_unw_filename), Path(output_conncomp_filename)]
+    tmp_unw, tmp_conncomp = (f.with_suffix(".tmp.tif") for f in outputs)
+    try:
+        fraction = unwrap_from_prediction(
+            ifg_filename=ifg_filename,
+            output_unw_filename=tmp_unw,
+            output_conncomp_filename=tmp_conncomp,
+            **kwargs,
+        )
+        if fraction < min_fraction:
+            logger.info(
+                f"Only {100 * fraction:.2f}% of {output_unw_filename} passed the"
+                " prediction checks: unwrapping"
+            )
+            return False
+        # Later runs skip the pairs whose unwrapped file exists, so it goes last
+        tmp_conncomp.replace(outputs[1])
+        tmp_unw.replace(outputs[0])
+    finally:
+        tmp_unw.unlink(missing_ok=True)
+        tmp_conncomp.unlink(missing_ok=True)
+    finalize_unwrapped(
+        [output_unw_filename, output_conncomp_filename],
+        output_nodatas=[unw_nodata, ccl_nodata],
+        like_filename=ifg_filename,
+        mask_filename=mask_filename,
+    )
+    return True
 
 
 def transfer_ambiguities(wrapped: np.ndarray, unw_est: np.ndarray) -> np.ndarray:
@@ -224,6 +348,26 @@ def transfer_ambiguities(wrapped: np.ndarray, unw_est: np.ndarray) -> np.ndarray
     return wrapped + 2 * np.pi * ambiguity
 
 
+def _transfer_ambiguities_blocks(
+    ifg_filename: Filename,
+    unw_est_filename: Filename,
+    output_filename: Filename,
+    unw_nodata: float | None,
+    block_rows: int = BLOCK_ROWS,
+) -> None:
+    """Run `transfer_ambiguities` on blocks of rows, writing to `output_filename`."""
+    nrows = io.get_raster_xysize(ifg_filename)[1]
+    for row_start in range(0, nrows, block_rows):
+        rows = slice(row_start, min(row_start + block_rows, nrows))
+        ifg = io.load_gdal(ifg_filename, rows=rows, masked=True)
+        unw_est = io.load_gdal(unw_est_filename, rows=rows, masked=True)
+        out = transfer_ambiguities(
+            np.angle(ifg.data), unw_est.filled(unw_nodata)
+        ).astype(np.float32)
+        out[np.ma.getmaskarray(ifg)] = unw_nodata
+        io.write_block(out, output_filename, row_start=row_start, col_start=0)
+
+
 def unwrap(
     ifg_filename: Filename,
     corr_filename: Filename,
@@ -236,6 +380,7 @@ def unwrap(
     ccl_nodata: int | None = DEFAULT_CCL_NODATA,
     scratchdir: Optional[Filename] = None,
     delete_scratch: bool = False,
+    combine_nodata_mask: bool = True,
 ) -> tuple[Path, Path]:
     """Unwrap a single interferogram.
 
@@ -268,11 +413,17 @@ def unwrap(
         If None, uses `tophu`'s `/tmp/...` default.
     delete_scratch : bool, default = False
         After unwrapping, delete the contents inside `scratchdir`.
+    combine_nodata_mask : bool, default = True
+        Combine `mask_filename` with the `nodata` region of `ifg_filename`.
+        Set to False if `mask_filename` already masks the nodata region
+        (e.g. a mask made once for a stack of interferograms by `run`).
 
     Returns
     -------
     unw_path : Path
         Path to output unwrapped phase file.
+        If `zero_where_masked` is set and a mask is passed, this is the
+        ".zeroed.tif" version of `unw_filename`.
     conncomp_path : Path
         Path to output connected component label file.
 
@@ -286,7 +437,11 @@ def unwrap(
         Path(scratchdir).mkdir(parents=True, exist_ok=True)
 
     # Check for a nodata mask
-    if io.get_raster_nodata(ifg_filename) is None or mask_filename is None:
+    if (
+        not combine_nodata_mask
+        or io.get_raster_nodata(ifg_filename) is None
+        or mask_filename is None
+    ):
         # With no marked `nodata`, just use the passed in mask
         combined_mask_file = mask_filename
     else:
@@ -301,7 +456,6 @@ def unwrap(
     unwrapper_unw_filename = Path(unw_filename)
     name_change = "."
 
-    ifg = io.load_gdal(ifg_filename, masked=True)
     if unwrap_options.run_goldstein:
         suf = Path(unw_filename).suffix
         if suf == ".tif":
@@ -322,7 +476,9 @@ def unwrap(
         )
 
         logger.info(f"Goldstein filtering {ifg_filename} -> {filt_ifg_filename}")
+        ifg = io.load_gdal(ifg_filename, masked=True)
         modified_ifg = goldstein(ifg.filled(0), alpha=preproc_options.alpha)
+        del ifg
         logger.info(f"Writing filtered output to {filt_ifg_filename}")
         io.write_arr(
             arr=modified_ifg,
@@ -380,19 +536,32 @@ def unwrap(
         unwrapper_ifg_filename = interp_ifg_filename
         unwrapper_unw_filename = interp_unw_filename
 
+    # The masked pixels of the outputs are zeroed along with the nodata pass at
+    # the end, so the unwrappers only need the zeroed inputs
+    zero_where_masked = (
+        unwrap_options.zero_where_masked and combined_mask_file is not None
+    )
+    unwrapper_corr_filename = Path(corr_filename)
+    if zero_where_masked:
+        assert combined_mask_file is not None
+        logger.info(f"Zeroing phase/corr of pixels masked in {combined_mask_file}")
+        unwrapper_ifg_filename, unwrapper_corr_filename = _zero_from_mask(
+            unwrapper_ifg_filename, corr_filename, combined_mask_file
+        )
+
     if unwrap_method == UnwrapMethod.SNAPHU:
         snaphu_opts = unwrap_options.snaphu_options
         # Pass everything to snaphu-py
         unw_path, conncomp_path = unwrap_snaphu_py(
             unwrapper_ifg_filename,
-            corr_filename,
+            unwrapper_corr_filename,
             unwrapper_unw_filename,
             nlooks,
             ntiles=snaphu_opts.ntiles,
             tile_overlap=snaphu_opts.tile_overlap,
             mask_file=combined_mask_file,
             nproc=snaphu_opts.n_parallel_tiles,
-            zero_where_masked=unwrap_options.zero_where_masked,
+            zero_where_masked=False,
             unw_nodata=unw_nodata,
             ccl_nodata=ccl_nodata,
             init_method=snaphu_opts.init_method,
@@ -402,11 +571,11 @@ def unwrap(
     elif unwrap_method == UnwrapMethod.WHIRLWIND:
         unw_path, conncomp_path = unwrap_whirlwind(
             unwrapper_ifg_filename,
-            corr_filename,
+            unwrapper_corr_filename,
             unwrapper_unw_filename,
             nlooks,
             mask_file=combined_mask_file,
-            zero_where_masked=unwrap_options.zero_where_masked,
+            zero_where_masked=False,
             unw_nodata=unw_nodata,
             ccl_nodata=ccl_nodata,
             scratchdir=scratchdir,
@@ -415,13 +584,13 @@ def unwrap(
         tophu_opts = unwrap_options.tophu_options
         unw_path, conncomp_path = multiscale_unwrap(
             unwrapper_ifg_filename,
-            corr_filename,
+            unwrapper_corr_filename,
             unwrapper_unw_filename,
             tophu_opts.downsample_factor,
             ntiles=tophu_opts.ntiles,
             nlooks=nlooks,
             mask_file=combined_mask_file,
-            zero_where_masked=unwrap_options.zero_where_masked,
+            zero_where_masked=False,
             unw_nodata=unw_nodata,
             ccl_nodata=ccl_nodata,
             init_method=tophu_opts.init_method,
@@ -443,19 +612,17 @@ def unwrap(
             "Transferring ambiguity numbers from filtered/interpolated"
             f" ifg {unwrapper_unw_filename}"
         )
-        unw_arr = io.load_gdal(unwrapper_unw_filename, masked=True).filled(unw_nodata)
-
-        final_arr = transfer_ambiguities(np.angle(ifg), unw_arr)
-        final_arr[ifg.mask] = unw_nodata
-
         io.write_arr(
-            arr=final_arr,
+            arr=None,
             output_name=unw_filename,
             like_filename=unwrapper_unw_filename,
             dtype=np.float32,
             driver=driver,
             options=opts,
         )
+        _transfer_ambiguities_blocks(
+            ifg_filename, unwrapper_unw_filename, unw_filename, unw_nodata
+        )
 
         # Regrow connected components after phase modification
         # TODO decide whether we want to have the
@@ -475,17 +642,17 @@ def unwrap(
             shutil.move(unwrapper_unw_filename, scratchdir)
 
     # Reset the input nodata values to be nodata in the unwrapped and CCL
-    logger.info(f"Setting nodata values of {unw_path} file")
-    set_nodata_values(
-        filename=unw_filename, output_nodata=unw_nodata, like_filename=ifg_filename
-    )
-    logger.info(f"Setting nodata values of {conncomp_path} file")
-    set_nodata_values(
-        filename=conncomp_path, output_nodata=ccl_nodata, like_filename=ifg_filename
+    # (and zero the masked pixels), reading and writing each output once
+    logger.info(f"Setting nodata values of {unw_filename}, {conncomp_path}")
+    unw_path, conncomp_path = finalize_unwrapped(
+        [unw_filename, conncomp_path],
+        output_nodatas=[unw_nodata, ccl_nodata],
+        like_filename=ifg_filename,
+        mask_filename=combined_mask_file if zero_where_masked else None,
     )
 
     if delete_scratch:
         assert scratchdir is not None
         shutil.rmtree(scratchdir)
 
-    return Path(unw_filename), conncomp_path
+    return unw_path, conncomp_path
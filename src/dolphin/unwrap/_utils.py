@@ -1,22 +1,31 @@
 from __future__ import annotations
 
+import hashlib
 import logging
+from contextlib import ExitStack
 from os import fspath
 from pathlib import Path
+from typing import Iterator, Sequence
 
+import numpy as np
 import rasterio as rio
+from rasterio.windows import Window
 
 from dolphin import io
 from dolphin._types import Filename
 
 logger = logging.getLogger(__name__)
 
+# Number of rows read and written at a time when masking rasters
+BLOCK_ROWS = 512
+
 
 def create_combined_mask(
     mask_filename: Filename,
     image_filename: Filename,
     output_filename: Filename | None = None,
     band: int = 1,
+    block_rows: int = BLOCK_ROWS,
 ) -> Path:
     """Create a combined a nodata mask from `image_filename` with `mask_filename`.
 
@@ -37,6 +46,8 @@ def create_combined_mask(
         If None, creates "combined_mask.tif" in the same directory as `mask_filename`
     band : int, default=1
         The band of the image from which to read the nodata values.
+    block_rows : int
+        Number of rows to read and write at a time.
 
     Returns
     -------
@@ -49,25 +60,104 @@ def create_combined_mask(
         If `image_filename` does not have any nodata values defined
 
     """
-    with rio.open(image_filename) as src:
+    if output_filename is None:
+        output_filename = Path(mask_filename).parent / "combined_mask.tif"
+    io.write_arr(
+        arr=None,
+        like_filename=mask_filename,
+        output_name=output_filename,
+        dtype=np.uint8,
+    )
+    with ExitStack() as stack:
+        src = stack.enter_context(rio.open(image_filename))
         if not src.nodatavals:
             msg = f"{image_filename} does not have any `nodata` values."
             raise ValueError(msg)
-        # https://rasterio.readthedocs.io/en/stable/topics/masks.html
-        # rasterio loads this where 0 means the pixel is masked, and
-        # 255 is valid.
-        # coerce to True == valid pixels
-        nd_mask = src.read_masks(band).astype(bool)
+        mask_src = stack.enter_context(rio.open(mask_filename))
+        dst = stack.enter_context(rio.open(output_filename, "r+"))
+        for window in _iter_row_windows(src.height, src.width, block_rows):
+            # https://rasterio.readthedocs.io/en/stable/topics/masks.html
+            # rasterio loads this where 0 means the pixel is masked, and
+            # 255 is valid.
+            # coerce to True == valid pixels
+            nd_mask = src.read_masks(band, window=window).astype(bool)
+            # In the existing mask, 1 should be valid, 0 invalid
+            mask = mask_src.read(1, window=window).astype(bool)
+            # A valid output has to be valid in the mask, AND not be a `nodata`
+            dst.write((mask & nd_mask).astype(np.uint8), 1, window=window)
+    return Path(output_filename)
 
-    # In the existing mask, 1 should be valid, 0 invalid
-    mask = io.load_gdal(mask_filename).astype(bool)
-    # A valid output has to be valid in the mask, AND not be a `nodata`
-    combined = mask & nd_mask
 
-    if output_filename is None:
-        output_filename = Path(mask_filename).parent / "combined_mask.tif"
-    io.write_arr(like_filename=mask_filename, arr=combined, output_name=output_filename)
-    return Path(output_filename)
+def create_combined_masks(
+    mask_filename: Filename,
+    image_filenames: Sequence[Filename],
+    output_dir: Filename,
+    band: int = 1,
+) -> list[Path]:
+    """Create the combined masks for a stack, one per distinct `nodata` footprint.
+
+    Images with the same `nodata` footprint (e.g. stitched interferograms of
+    the same frame) share one combined mask. Images without a `nodata` value
+    use `mask_filename` as is.
+
+    Parameters
+    ----------
+    mask_filename : Filename
+        The file path of the existing mask file, where 1 is valid and 0 invalid.
+    image_filenames : Sequence[Filename]
+        The images whose `nodata` values are combined with `mask_filename`.
+    output_dir : Filename
+        Directory for the "combined_mask_<hash>.tif" files.
+    band : int, default=1
+        The band of the images from which to read the nodata values.
+
+    Returns
+    -------
+    list[Path]
+        The combined mask for each of `image_filenames`.
+
+    """
+    combined_masks: dict[str, Path] = {}
+    out = []
+    for f in image_filenames:
+        footprint = _hash_nodata_footprint(f, band=band)
+        if footprint is None:
+            out.append(Path(mask_filename))
+            continue
+        if footprint not in combined_masks:
+            output_filename = Path(output_dir) / f"combined_mask_{footprint[:16]}.tif"
+            logger.debug(f"Creating {output_filename} for the footprint of {f}")
+            combined_masks[footprint] = create_combined_mask(
+                mask_filename=mask_filename,
+                image_filename=f,
+                output_filename=output_filename,
+                band=band,
+            )
+        out.append(combined_masks[footprint])
+    logger.info(
+        f"Created {len(combined_masks)} combined masks for"
+        f" {len(image_filenames)} images"
+    )
+    return out
+
+
+def _hash_nodata_footprint(
+    filename: Filename, band: int = 1, block_rows: int = BLOCK_ROWS
+) -> str | None:
+    """Hash the full-resolution `nodata` mask of `filename`, in blocks of rows.
+
+    Images get the same hash only if their footprints match at every pixel.
+    Returns None if `filename` has no `nodata` value.
+    """
+    with rio.open(filename) as src:
+        if not src.nodatavals or src.nodatavals[band - 1] is None:
+            return None
+        h = hashlib.sha256()
+        h.update(repr((src.height, src.width, src.transform, src.crs)).encode())
+        for window in _iter_row_windows(src.height, src.width, block_rows):
+            footprint = src.read_masks(band, window=window)
+            h.update(footprint.astype(bool).tobytes())
+    return h.hexdigest()
 
 
 def set_nodata_values(
@@ -98,37 +188,114 @@ def set_nodata_values(
         If `like_filename` doesn't have `nodata`.
 
     """
-    with rio.open(like_filename) as src:
-        if not src.nodatavals:
+    finalize_unwrapped(
+        [filename], output_nodatas=[output_nodata], like_filename=like_filename
+    )
+
+
+def finalize_unwrapped(
+    filenames: Sequence[Filename],
+    output_nodatas: Sequence[float | None],
+    like_filename: Filename,
+    mask_filename: Filename | None = None,
+    block_rows: int = BLOCK_ROWS,
+) -> list[Path]:
+    """Zero masked pixels and set nodata of unwrapping outputs in one pass.
+
+    For each block of rows, `like_filename`'s nodata (and `mask_filename`)
+    are read once and applied to all of `filenames`, so the outputs of one
+    interferogram (e.g. the unwrapped phase and connected components) are
+    each read and written once.
+
+    Parameters
+    ----------
+    filenames : Sequence[Filename]
+        Rasters to update.
+    output_nodatas : Sequence[float | None]
+        Nodata value for each of `filenames`. If None, keeps the nodata value
+        currently in that file.
+    like_filename : Filename
+        Raster whose nodata values will be used to mask out `filenames`.
+        Must have a `nodata` value set.
+    mask_filename : Filename, optional
+        Binary mask where 0s are invalid pixels, which are set to 0 before
+        applying the nodata values.
+        If passed, `filenames` are not modified, and the results are written to
+        ".zeroed.tif" copies (as with `_zero_from_mask`).
+        If None, `filenames` are updated in place.
+    block_rows : int
+        Number of rows to read and write at a time.
+
+    Returns
+    -------
+    list[Path]
+        The updated rasters.
+
+    Raises
+    ------
+    ValueError
+        If `like_filename` doesn't have `nodata`, or if an output nodata value
+        is not given for a file with no `nodata`.
+
+    """
+    in_place = mask_filename is None
+    output_filenames = [
+        Path(f) if in_place else Path(f).with_suffix(".zeroed.tif") for f in filenames
+    ]
+    with ExitStack() as stack:
+        like = stack.enter_context(rio.open(like_filename))
+        if not like.nodatavals:
             msg = f"{like_filename} does not have any `nodata` values."
             raise ValueError(msg)
-        # https://rasterio.readthedocs.io/en/stable/topics/masks.html
-        # rasterio loads this where 0 means the pixel is masked
-        # Reform to be like a numpy mask
-        bad_like = ~(src.read_masks(1).astype(bool))
-
-    with rio.open(filename, "r+") as dst:
-        # We also want to keep the currently-nodata-pixels as nodata,
-        # so we combine the `like_filename`'s nodata and this mask
-        arr = dst.read(1)
-        bad_cur_nodata = ~(dst.read_masks(1).astype(bool))
-        if output_nodata is None:
-            if dst.nodata is None:
-                raise ValueError(
-                    f"output_nodata not given, but {filename} has no `nodata` set."
-                )
-            output_nodata = dst.nodata
-
-        # set the raster's nodata metadata
-        dst.nodata = output_nodata
-
-        combined_mask = bad_cur_nodata | bad_like
-        arr[combined_mask] = output_nodata
-        dst.write(arr, 1)
+        mask_src = None if in_place else stack.enter_context(rio.open(mask_filename))
+
+        srcs, dsts, input_nodatas, nodatas = [], [], [], []
+        for f, out_f, out_nodata in zip(filenames, output_filenames, output_nodatas):
+            src = stack.enter_context(rio.open(f, "r+" if in_place else "r"))
+            # We also want to keep the currently-nodata-pixels as nodata
+            input_nodatas.append(src.nodata)
+            if out_nodata is not None:
+                output_nodata = out_nodata
+            elif src.nodata is not None:
+                output_nodata = src.nodata
+            else:
+                msg = f"output_nodata not given, but {f} has no `nodata` set."
+                raise ValueError(msg)
+            if in_place:
+                # set the raster's nodata metadata
+                src.nodata = output_nodata
+                dst = src
+            else:
+                profile = {**src.profile, "nodata": output_nodata}
+                dst = stack.enter_context(rio.open(out_f, "w", **profile))
+            srcs.append(src)
+            dsts.append(dst)
+            nodatas.append(output_nodata)
+
+        for window in _iter_row_windows(like.height, like.width, block_rows):
+            # https://rasterio.readthedocs.io/en/stable/topics/masks.html
+            # rasterio loads this where 0 means the pixel is masked
+            # Reform to be like a numpy mask
+            bad_like = ~(like.read_masks(1, window=window).astype(bool))
+            if mask_src is not None:
+                masked = mask_src.read(1, window=window) == 0
+            for src, dst, input_nodata, nodata in zip(
+                srcs, dsts, input_nodatas, nodatas
+            ):
+                arr = src.read(1, window=window)
+                bad = bad_like | _is_nodata(arr, input_nodata)
+                if mask_src is not None:
+                    arr[masked] = 0
+                arr[bad] = nodata
+                dst.write(arr, 1, window=window)
+    return output_filenames
 
 
 def _zero_from_mask(
-    ifg_filename: Filename, corr_filename: Filename, mask_filename: Filename
+    ifg_filename: Filename,
+    corr_filename: Filename,
+    mask_filename: Filename,
+    block_rows: int = BLOCK_ROWS,
 ) -> tuple[Path, Path]:
     zeroed_ifg_file = Path(ifg_filename).with_suffix(".zeroed.tif")
     zeroed_corr_file = Path(corr_filename).with_suffix(".zeroed.tif")
@@ -137,21 +304,44 @@ def _zero_from_mask(
         msg = f"Mask {mask_filename} and {ifg_filename} shapes don't match"
         raise ValueError(msg)
 
-    mask = io.load_gdal(mask_filename)
-    for in_f, out_f in zip(
-        [ifg_filename, corr_filename], [zeroed_ifg_file, zeroed_corr_file]
-    ):
-        arr = io.load_gdal(in_f)
-        arr[mask == 0] = 0
-        logger.debug(f"Size: {arr.size}, {(arr != 0).sum()} non-zero pixels")
+    in_files = [ifg_filename, corr_filename]
+    out_files = [zeroed_ifg_file, zeroed_corr_file]
+    for in_f, out_f in zip(in_files, out_files):
         io.write_arr(
-            arr=arr,
+            arr=None,
             output_name=out_f,
             like_filename=corr_filename,
+            dtype=io.get_raster_dtype(in_f),
         )
+
+    # Read each block of the mask once for both files
+    ncols, nrows = io.get_raster_xysize(mask_filename)
+    num_nonzero = 0
+    for window in _iter_row_windows(nrows, ncols, block_rows):
+        rows = slice(window.row_off, window.row_off + window.height)
+        mask = io.load_gdal(mask_filename, rows=rows)
+        for in_f, out_f in zip(in_files, out_files):
+            arr = io.load_gdal(in_f, rows=rows)
+            arr[mask == 0] = 0
+            io.write_block(arr, out_f, row_start=rows.start, col_start=0)
+        num_nonzero += int((mask != 0).sum())
+    logger.debug(f"Size: {nrows * ncols}, {num_nonzero} unmasked pixels")
     return zeroed_ifg_file, zeroed_corr_file
 
 
+def _iter_row_windows(nrows: int, ncols: int, block_rows: int) -> Iterator[Window]:
+    for row_start in range(0, nrows, block_rows):
+        yield Window(0, row_start, ncols, min(block_rows, nrows - row_start))
+
+
+def _is_nodata(arr: np.ndarray, nodata: float | None) -> np.ndarray:
+    if nodata is None:
+        return np.zeros(arr.shape, dtype=bool)
+    if np.isnan(nodata):
+        return np.isnan(arr)
+    return arr == nodata
+
+
 def _redirect_unwrapping_log(unw_filename: Filename, method: str):
     import journal
 
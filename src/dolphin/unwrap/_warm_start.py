@@ -0,0 +1,390 @@
+"""Predict unwrapped interferograms from the sum of already unwrapped ones."""
+
+from __future__ import annotations
+
+import logging
+from collections import deque
+from pathlib import Path
+from typing import Optional, Sequence
+
+import numpy as np
+from scipy import ndimage
+
+from dolphin import io
+from dolphin._types import DateOrDatetime, Filename
+
+from ._constants import UINT16_MAX
+
+logger = logging.getLogger(__name__)
+
+__all__ = ["get_prediction_paths", "get_spanning_pairs", "unwrap_from_prediction"]
+
+# Number of rows read and written at a time
+BLOCK_ROWS = 256
+
+
+def get_spanning_pairs(
+    date_pairs: Sequence[tuple[DateOrDatetime, DateOrDatetime]],
+) -> list[int]:
+    """Pick the shortest pairs which connect all dates of a network.
+
+    The pairs form a spanning forest of the network (one tree for each group
+    of connected dates), chosen shortest-first like Kruskal's algorithm.
+
+    Parameters
+    ----------
+    date_pairs : Sequence[tuple[DateOrDatetime, DateOrDatetime]]
+        (reference, secondary) dates of each interferogram.
+
+    Returns
+    -------
+    list[int]
+        Indexes of the spanning pairs in `date_pairs`.
+
+    """
+    parent: dict[DateOrDatetime, DateOrDatetime] = {}
+
+    def _find(d):
+        parent.setdefault(d, d)
+        while parent[d] != d:
+            parent[d] = parent[parent[d]]
+            d = parent[d]
+        return d
+
+    spanning = []
+    by_length = sorted(
+        range(len(date_pairs)),
+        key=lambda i: (date_pairs[i][1] - date_pairs[i][0], date_pairs[i]),
+    )
+    for i in by_length:
+        root_ref, root_sec = (_find(d) for d in date_pairs[i])
+        if root_ref != root_sec:
+            parent[root_ref] = root_sec
+            spanning.append(i)
+    return sorted(spanning)
+
+
+def get_prediction_paths(
+    date_pairs: Sequence[tuple[DateOrDatetime, DateOrDatetime]], spanning: Sequence[int]
+) -> dict[int, list[tuple[int, int]]]:
+    """Find the spanning pairs which sum to each of the other pairs.
+
+    Parameters
+    ----------
+    date_pairs : Sequence[tuple[DateOrDatetime, DateOrDatetime]]
+        (reference, secondary) dates of each interferogram.
+    spanning : Sequence[int]
+        Indexes of the spanning pairs, from `get_spanning_pairs`.
+
+    Returns
+    -------
+    dict[int, list[tuple[int, int]]]
+        For each pair not in `spanning`, the (index, sign) of the spanning
+        pairs whose (signed) sum goes from its reference to its secondary date.
+
+    """
+    neighbors: dict[DateOrDatetime, list[tuple[DateOrDatetime, int, int]]] = {}
+    for i in spanning:
+        ref, sec = date_pairs[i]
+        neighbors.setdefault(ref, []).append((sec, i, 1))
+        neighbors.setdefault(sec, []).append((ref, i, -1))
+
+    paths = {}
+    spanning_set = set(spanning)
+    for i, (ref, sec) in enumerate(date_pairs):
+        if i in spanning_set:
+            continue
+        # Breadth-first search through the tree from `ref` to `sec`
+        previous: dict[DateOrDatetime, Optional[tuple[DateOrDatetime, int, int]]] = {
+            ref: None
+        }
+        queue = deque([ref])
+        while queue and sec not in previous:
+            d = queue.popleft()
+            for other, j, sign in neighbors.get(d, []):
+                if other not in previous:
+                    previous[other] = (d, j, sign)
+                    queue.append(other)
+        if sec not in previous:
+            continue
+        path = []
+        d = sec
+        while (step := previous[d]) is not None:
+            d, j, sign = step
+            path.append((j, sign))
+        paths[i] = path[::-1]
+    return paths
+
+
+def unwrap_from_prediction(
+    ifg_filename: Filename,
+    unw_filenames: Sequence[Filename],
+    conncomp_filenames: Sequence[Filename],
+    signs: Sequence[int],
+    output_unw_filename: Filename,
+    output_conncomp_filename: Filename,
+    closure_threshold: float = 0.5,
+    block_rows: int = BLOCK_ROWS,
+) -> float:
+    """Unwrap an interferogram using the sum of other unwrapped interferograms.
+
+    The (signed) sum of `unw_filenames` predicts the unwrapped phase, and its
+    ambiguity numbers are transferred onto the wrapped phase of `ifg_filename`.
+    A pixel passes the checks if:
+
+    - it is in a nonzero connected component of all `conncomp_filenames`,
+    - the prediction is within `closure_threshold` of the wrapped phase
+      (modulo 2pi), and
+    - the result differs from its four neighbors by less than pi, so it adds
+      no phase jumps (e.g. around residues of the wrapped phase).
+
+    The passing pixels are then grouped into (4-connected) regions with the
+    same input labels. Only the largest region of each combination of input
+    labels is kept: the others are cut off from it by phase jumps, so they may
+    be off by a multiple of 2pi (e.g. the inside of an unwrapping error in one
+    of the summed interferograms).
+
+    The pixels which are not kept are given a connected component of 0, and
+    they count against the returned fraction if they are valid in all inputs.
+
+    Parameters
+    ----------
+    ifg_filename : Filename
+        Path to the wrapped interferogram.
+    unw_filenames : Sequence[Filename]
+        Paths to the unwrapped interferograms to sum.
+    conncomp_filenames : Sequence[Filename]
+        Paths to the connected component labels of `unw_filenames`.
+    signs : Sequence[int]
+        Sign (1 or -1) to apply to each of `unw_filenames` in the sum.
+    output_unw_filename : Filename
+        Path to the output unwrapped phase.
+    output_conncomp_filename : Filename
+        Path to the output connected component labels.
+        Each combination of the input labels is given a new label.
+    closure_threshold : float
+        Largest difference (in radians) between the prediction and the wrapped
+        phase. Default is 0.5.
+    block_rows : int
+        Number of rows to process at a time.
+
+    Returns
+    -------
+    float
+        Fraction of the predicted pixels which were kept.
+
+    """
+    _, nrows = io.get_raster_xysize(ifg_filename)
+    input_nodatas = [io.get_raster_nodata(f) for f in unw_filenames]
+    ccl_nodatas = [io.get_raster_nodata(f) for f in conncomp_filenames]
+    io.write_arr(
+        arr=None,
+        output_name=output_unw_filename,
+        like_filename=ifg_filename,
+        dtype=np.float32,
+        nodata=np.nan,
+        units="radians",
+    )
+    io.write_arr(
+        arr=None,
+        output_name=output_conncomp_filename,
+        like_filename=ifg_filename,
+        dtype=np.uint16,
+        nodata=UINT16_MAX,
+        units="unitless",
+    )
+    # The region of each pixel is only known once all blocks are read, so the
+    # region ids of the first pass are saved for the relabeling pass
+    regions_filename = Path(output_conncomp_filename).with_suffix(".regions.tif")
+    io.write_arr(
+        arr=None,
+        output_name=regions_filename,
+        like_filename=ifg_filename,
+        dtype=np.uint32,
+    )
+
+    # New labels for each combination of the input labels
+    labels: dict[tuple[int, ...], int] = {}
+    regions = _Regions()
+    prev_ids = prev_labels = None
+    num_valid = 0
+    try:
+        for row_start in range(0, nrows, block_rows):
+            row_end = min(row_start + block_rows, nrows)
+            # Read one more row above and below to check the vertical phase jumps
+            read_rows = slice(max(row_start - 1, 0), min(row_end + 1, nrows))
+            crop = slice(row_start - read_rows.start, row_end - read_rows.start)
+
+            wrapped = np.angle(io.load_gdal(ifg_filename, rows=read_rows))
+            predicted = np.zeros(wrapped.shape, dtype=np.float32)
+            has_data = np.ones(wrapped.shape, dtype=bool)
+            input_labels = []
+            valid = np.ones(wrapped.shape, dtype=bool)
+            for f, cc_f, sign, nodata, ccl_nodata in zip(
+                unw_filenames, conncomp_filenames, signs, input_nodatas, ccl_nodatas
+            ):
+                unw = io.load_gdal(f, rows=read_rows)
+                if nodata is not None:
+                    has_data &= ~(np.isnan(unw) if np.isnan(nodata) else unw == nodata)
+                predicted += sign * unw
+                cc = io.load_gdal(cc_f, rows=read_rows)
+                valid &= cc != 0
+                if ccl_nodata is not None:
+                    valid &= cc != ccl_nodata
+                input_labels.append(cc)
+            valid &= has_data
+
+            # Same as `transfer_ambiguities`
+            ambiguity = np.round((predicted - wrapped) / (2 * np.pi))
+            unwrapped = (wrapped + 2 * np.pi * ambiguity).astype(np.float32)
+            good = valid & (np.abs(predicted - unwrapped) <= closure_threshold)
+            _mark_phase_jumps(unwrapped, valid, good)
+
+            out_labels = _relabel(np.stack(input_labels), good, labels)[crop]
+            ids = regions.add_block(out_labels)
+            if prev_ids is not None:
+                regions.merge(prev_ids, prev_labels, ids[0], out_labels[0])
+            prev_ids, prev_labels = ids[-1], out_labels[-1]
+
+            unwrapped[~has_data] = np.nan
+            ids[~has_data[crop]] = _NODATA_REGION
+            io.write_block(unwrapped[crop], output_unw_filename, row_start, 0)
+            io.write_block(ids, regions_filename, row_start, 0)
+            num_valid += int(valid[crop].sum())
+
+        lookup, num_good = regions.keep_largest()
+        for row_start in range(0, nrows, block_rows):
+            rows = slice(row_start, min(row_start + block_rows, nrows))
+            ids = io.load_gdal(regions_filename, rows=rows)
+            nodata_mask = ids == _NODATA_REGION
+            ids[nodata_mask] = 0
+            out_labels = lookup[ids]
+            out_labels[nodata_mask] = UINT16_MAX
+            io.write_block(out_labels, output_conncomp_filename, row_start, 0)
+    finally:
+        regions_filename.unlink(missing_ok=True)
+
+    fraction = num_good / num_valid if num_valid else 0.0
+    logger.info(f"{100 * fraction:.2f}% of {output_unw_filename} was predicted")
+    return fraction
+
+
+# Region id of the pixels without data in the saved region ids
+_NODATA_REGION = np.iinfo(np.uint32).max
+
+
+class _Regions:
+    """Connected regions of the new labels, merged across blocks of rows.
+
+    Region 0 is the background (pixels which failed the checks).
+    """
+
+    def __init__(self):
+        self.parent = np.zeros(1, dtype=np.int64)
+        self.labels = np.zeros(1, dtype=np.uint16)
+        self.sizes = np.zeros(1, dtype=np.int64)
+
+    def add_block(self, out_labels: np.ndarray) -> np.ndarray:
+        """Give each connected region of equal `out_labels` in a block a new id."""
+        ids = np.zeros(out_labels.shape, dtype=np.uint32)
+        start = num_ids = len(self.parent)
+        new_labels = []
+        for label in np.unique(out_labels[out_labels != 0]).tolist():
+            region_ids, num_regions = ndimage.label(out_labels == label)
+            in_region = region_ids != 0
+            ids[in_region] = region_ids[in_region] + (num_ids - 1)
+            num_ids += num_regions
+            new_labels.extend([label] * num_regions)
+
+        self.parent = np.concatenate([self.parent, np.arange(start, num_ids)])
+        self.labels = np.concatenate(
+            [self.labels, np.array(new_labels, dtype=np.uint16)]
+        )
+        sizes = np.bincount(ids.ravel(), minlength=num_ids)[start:]
+        self.sizes = np.concatenate([self.sizes, sizes])
+        return ids
+
+    def merge(
+        self,
+        ids_above: np.ndarray,
+        labels_above: np.ndarray,
+        ids_below: np.ndarray,
+        labels_below: np.ndarray,
+    ):
+        """Join the regions which touch across the edge between two blocks."""
+        touching = (labels_above != 0) & (labels_above == labels_below)
+        pairs = np.unique(
+            np.stack([ids_above[touching], ids_below[touching]], axis=1), axis=0
+        )
+        for a, b in pairs.tolist():
+            root_a, root_b = self._find(a), self._find(b)
+            if root_a != root_b:
+                self.parent[root_b] = root_a
+
+    def keep_largest(self) -> tuple[np.ndarray, int]:
+        """Keep the largest region of each label.
+
+        Returns
+        -------
+        lookup : np.ndarray
+            Output label of each region id: its label if it is part of the
+            largest region with that label, otherwise 0.
+        num_kept : int
+            Number of pixels in the kept regions.
+
+        """
+        roots = self.parent
+        while not np.array_equal(roots[roots], roots):
+            roots = roots[roots]
+        root_sizes = np.bincount(roots, weights=self.sizes, minlength=len(roots))
+
+        largest: dict[int, int] = {}
+        for root in np.unique(roots[1:]).tolist():
+            label = int(self.labels[root])
+            if root_sizes[root] > root_sizes[largest.get(label, 0)]:
+                largest[label] = root
+        root_labels = np.zeros(len(roots), dtype=np.uint16)
+        for label, root in largest.items():
+            root_labels[root] = label
+        num_kept = int(sum(root_sizes[root] for root in largest.values()))
+        return root_labels[roots], num_kept
+
+    def _find(self, i: int) -> int:
+        while self.parent[i] != i:
+            self.parent[i] = self.parent[self.parent[i]]
+            i = int(self.parent[i])
+        return i
+
+
+def _mark_phase_jumps(unwrapped: np.ndarray, valid: np.ndarray, good: np.ndarray):
+    """Unmark pixels of `good` which jump by pi or more from a valid neighbor."""
+    for axis in (0, 1):
+        jumps = np.abs(np.diff(unwrapped, axis=axis)) >= np.pi
+        both_valid = np.logical_and(
+            np.delete(valid, 0, axis=axis), np.delete(valid, -1, axis=axis)
+        )
+        jumps &= both_valid
+        before = [slice(None), slice(None)]
+        after = [slice(None), slice(None)]
+        before[axis] = slice(None, -1)
+        after[axis] = slice(1, None)
+        good[tuple(before)] &= ~jumps
+        good[tuple(after)] &= ~jumps
+
+
+def _relabel(
+    input_labels: np.ndarray, good: np.ndarray, labels: dict[tuple[int, ...], int]
+) -> np.ndarray:
+    """Give each combination of the input labels (of `good` pixels) a new label."""
+    out = np.zeros(good.shape, dtype=np.uint16)
+    if not good.any():
+        return out
+    combos, inverse = np.unique(input_labels[:, good].T, axis=0, return_inverse=True)
+    lookup = np.zeros(len(combos), dtype=np.uint16)
+    for k, combo in enumerate(map(tuple, combos.tolist())):
+        if combo not in labels:
+            # Leave room for the default nodata value
+            labels[combo] = min(len(labels) + 1, UINT16_MAX - 1)
+        lookup[k] = labels[combo]
+    out[good] = lookup[inverse.ravel()]
+    return out
@@ -0,0 +1,251 @@
+"""Choose block sizes and parallelism to fit a memory budget."""
+
+from __future__ import annotations
+
+import logging
+import os
+from dataclasses import dataclass
+from typing import Optional
+
+from dolphin import utils
+from dolphin._types import HalfWindow, Strides
+
+from .config import ShpMethod
+
+logger = logging.getLogger(__name__)
+
+# Bytes per element of the arrays used in phase linking
+_COMPLEX_BYTES = 8  # complex64
+_FLOAT_BYTES = 4  # float32
+_BOOL_BYTES = 1
+
+# Smallest and largest block sizes (per side) to consider
+_MIN_BLOCK_SIZE = 64
+_MAX_BLOCK_SIZE = 4096
+# Largest fraction of a worker's memory to use for blocks which are read ahead
+_MAX_READ_BUFFER_FRACTION = 0.25
+
+
+@dataclass(frozen=True)
+class ResourcePlan:
+    """Block shape and parallelism chosen to fit a memory budget."""
+
+    block_shape: tuple[int, int]
+    """Size (rows, columns) of the blocks of data to load at a time."""
+    n_parallel_bursts: int
+    """Number of bursts to run wrapped-phase-estimation on at once."""
+    threads_per_worker: int
+    """Number of threads for each burst's worker process."""
+    block_bytes: int
+    """Estimated peak memory (in bytes) used while processing one block."""
+    read_buffer_mb: int
+    """Memory (in MB) for blocks read ahead, limited to part of the worker budget."""
+
+
+def estimate_block_bytes(
+    block_shape: tuple[int, int],
+    nslc: int,
+    half_window: HalfWindow,
+    strides: Strides,
+    shp_method: ShpMethod = ShpMethod.GLRT,
+) -> int:
+    """Estimate the peak memory used to phase link one block.
+
+    The estimate adds up the arrays alive at the peak of
+    `single.run_wrapped_phase_single`:
+
+    - the padded SLC block, its complex64 copy, and (during compression) the
+      upsampled phase and the product used to form the compressed SLC,
+    - the amplitude statistics and the boolean neighbor arrays from SHP finding,
+    - the covariance matrices (`C_arrays`), with room for a copy and the
+      eigen-solver's workspace,
+    - the phase linking outputs at the strided resolution.
+
+    Parameters
+    ----------
+    block_shape : tuple[int, int]
+        Size (rows, columns) of the output block, at full resolution.
+    nslc : int
+        Number of SLCs (including compressed SLCs) in each ministack.
+    half_window : HalfWindow
+        Half window size (y, x) for phase linking.
+    strides : Strides
+        Decimation factor (y, x) of the phase linking outputs.
+    shp_method : ShpMethod
+        Method used to find SHPs. Default is `ShpMethod.GLRT`.
+
+    Returns
+    -------
+    int
+        Estimated peak memory, in bytes.
+
+    """
+    # Same padding as `StridedBlockManager`
+    pad_rows = strides.y * round(half_window.y / strides.y)
+    pad_cols = strides.x * round(half_window.x / strides.x)
+    in_pixels = (block_shape[0] + 2 * pad_rows) * (block_shape[1] + 2 * pad_cols)
+    out_pixels = (block_shape[0] // strides.y) * (block_shape[1] // strides.x)
+
+    slc_bytes = nslc * in_pixels * _COMPLEX_BYTES
+    # The block as read, and the complex64 copy used for phase linking
+    base = 2 * slc_bytes
+
+    window_size = (2 * half_window.y + 1) * (2 * half_window.x + 1)
+    if shp_method == ShpMethod.KS:
+        # Full amplitude stack for the KS test
+        shp_bytes = nslc * in_pixels * _FLOAT_BYTES
+    elif shp_method == ShpMethod.GLRT:
+        # Mean and variance of the amplitude
+        shp_bytes = 2 * in_pixels * _FLOAT_BYTES
+    else:
+        shp_bytes = 0
+    shp_bytes += out_pixels * window_size * _BOOL_BYTES
+
+    cov_bytes = out_pixels * nslc**2 * _COMPLEX_BYTES
+    # Covariance matrices, a copy, and solver workspace
+    linking = shp_bytes + 3 * cov_bytes + 2 * nslc * out_pixels * _COMPLEX_BYTES
+    # Upsampled phase and the product used to compress the ministack
+    compression = 2 * slc_bytes
+    # Temporal coherence, SHP counts, eigenvalues, compressed SLC, ...
+    outputs = 8 * out_pixels * _FLOAT_BYTES + in_pixels * _COMPLEX_BYTES
+    return base + max(linking, compression) + outputs
+
+
+def plan_resources(
+    worker_memory_gb: float,
+    nslc: int,
+    half_window: HalfWindow,
+    strides: Strides,
+    shp_method: ShpMethod = ShpMethod.GLRT,
+    num_bursts: int = 1,
+    arr_shape: Optional[tuple[int, int]] = None,
+    total_memory_gb: Optional[float] = None,
+    read_buffer_mb: Optional[float] = None,
+    num_cpus: Optional[int] = None,
+) -> ResourcePlan:
+    """Choose the block shape and number of parallel bursts for a memory budget.
+
+    Parameters
+    ----------
+    worker_memory_gb : float
+        Memory (in GB) available to each wrapped-phase worker.
+    nslc : int
+        Number of SLCs (including compressed SLCs) in each ministack.
+    half_window : HalfWindow
+        Half window size (y, x) for phase linking.
+    strides : Strides
+        Decimation factor (y, x) of the phase linking outputs.
+    shp_method : ShpMethod
+        Method used to find SHPs. Default is `ShpMethod.GLRT`.
+    num_bursts : int
+        Number of bursts to process. Default is 1.
+    arr_shape : tuple[int, int], optional
+        Size (rows, columns) of the input rasters. If passed, the block shape
+        is no larger than the rasters.
+    total_memory_gb : float, optional
+        Memory (in GB) available to all workers together.
+        Default is the physical memory of the machine.
+    read_buffer_mb : float, optional
+        Memory (in MB) each worker uses for blocks read ahead of the current
+        block, which is subtracted from the block budget. It is limited to
+        a quarter of `worker_memory_gb`, so the rest is left for the
+        block being processed. Default is None, which uses that quarter.
+    num_cpus : int, optional
+        Number of CPUs to divide among the workers.
+        Default is the number available to this process.
+
+    Returns
+    -------
+    ResourcePlan
+        The chosen block shape, burst parallelism, and threads per worker.
+
+    Raises
+    ------
+    ValueError
+        If the smallest block does not fit in `worker_memory_gb`.
+
+    """
+    worker_bytes = worker_memory_gb * 2**30
+    total_bytes = (
+        _get_total_memory_bytes()
+        if total_memory_gb is None
+        else total_memory_gb * 2**30
+    )
+    if num_cpus is None:
+        num_cpus = utils.get_cpu_count()
+
+    max_workers = max(1, int(total_bytes // worker_bytes))
+    n_parallel_bursts = max(1, min(num_bursts, num_cpus, max_workers))
+    threads_per_worker = max(1, num_cpus // n_parallel_bursts)
+
+    def _get_bytes(size: int) -> int:
+        return estimate_block_bytes(
+            _clip_shape((size, size), strides, arr_shape),
+            nslc=nslc,
+            half_window=half_window,
+            strides=strides,
+            shp_method=shp_method,
+        )
+
+    max_read_buffer_mb = _MAX_READ_BUFFER_FRACTION * worker_bytes / 2**20
+    if read_buffer_mb is None:
+        read_buffer_mb = max(1, int(max_read_buffer_mb))
+    elif read_buffer_mb > max_read_buffer_mb:
+        logger.info(
+            f"Reducing the read buffer from {read_buffer_mb} MB to"
+            f" {int(max_read_buffer_mb)} MB to fit {worker_memory_gb} GB per worker"
+        )
+        read_buffer_mb = max(1, int(max_read_buffer_mb))
+    block_budget = worker_bytes - read_buffer_mb * 2**20
+    # Use the largest square block (in multiples of the minimum size) that fits
+    size = _MIN_BLOCK_SIZE
+    while size < _MAX_BLOCK_SIZE and _get_bytes(size * 2) <= block_budget:
+        size *= 2
+    while size + _MIN_BLOCK_SIZE <= _MAX_BLOCK_SIZE and (
+        _get_bytes(size + _MIN_BLOCK_SIZE) <= block_budget
+    ):
+        size += _MIN_BLOCK_SIZE
+
+    block_bytes = _get_bytes(size)
+    if block_bytes > block_budget:
+        msg = (
+            f"Estimated {block_bytes / 2**30:.2f} GB for the smallest block"
+            f" ({size}, {size}) with a {read_buffer_mb} MB read buffer, which is"
+            f" over the {worker_memory_gb} GB worker budget. Increase"
+            " `worker_memory_gb`, or use fewer SLCs per ministack."
+        )
+        raise ValueError(msg)
+    plan = ResourcePlan(
+        block_shape=_clip_shape((size, size), strides, arr_shape),
+        n_parallel_bursts=n_parallel_bursts,
+        threads_per_worker=threads_per_worker,
+        block_bytes=block_bytes,
+        read_buffer_mb=int(read_buffer_mb),
+    )
+    logger.info(
+        f"Using block_shape={plan.block_shape} (~{block_bytes / 2**30:.2f} GB per"
+        f" block), n_parallel_bursts={n_parallel_bursts},"
+        f" threads_per_worker={threads_per_worker} for {worker_memory_gb} GB per"
+        f" worker and {total_bytes / 2**30:.1f} GB total"
+    )
+    return plan
+
+
+def _clip_shape(
+    block_shape: tuple[int, int],
+    strides: Strides,
+    arr_shape: Optional[tuple[int, int]],
+) -> tuple[int, int]:
+    """Round a block shape to a multiple of the strides, and clip to the array."""
+    rows, cols = block_shape
+    if arr_shape is not None:
+        rows, cols = min(rows, arr_shape[0]), min(cols, arr_shape[1])
+    return (
+        max(strides.y, rows - rows % strides.y),
+        max(strides.x, cols - cols % strides.x),
+    )
+
+
+def _get_total_memory_bytes() -> int:
+    """Get the physical memory of the machine, in bytes."""
+    return os.sysconf("SC_PAGE_SIZE") * os.sysconf("SC_PHYS_PAGES")
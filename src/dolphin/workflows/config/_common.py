@@ -245,6 +245,79 @@ class WorkerSettings(BaseModel, extra="forbid"):
         (512, 512),
         description="Size (rows, columns) of blocks of data to load at a time.",
     )
+    worker_memory_gb: Optional[float] = Field(
+        None,
+        gt=0,
+        description=(
+            "Memory budget (in GB) for each wrapped-phase worker. If set,"
+            " `block_shape`, `n_parallel_bursts` and `threads_per_worker` are chosen"
+            " from the estimated peak memory of each block."
+        ),
+    )
+    total_memory_gb: Optional[float] = Field(
+        None,
+        gt=0,
+        description=(
+            "Memory (in GB) available to all parallel workers when choosing"
+            " `n_parallel_bursts` from `worker_memory_gb`. If None, uses the physical"
+            " memory of the machine."
+        ),
+    )
+    n_read_threads: int = Field(
+        2,
+        ge=1,
+        description="Number of threads to read (and decompress) input blocks with.",
+    )
+    read_buffer_mb: Optional[int] = Field(
+        None,
+        ge=1,
+        description=(
+            "Maximum memory (in MB) to use for input blocks which are read ahead of"
+            " the current block. If `worker_memory_gb` is set, limited to a quarter"
+            " of it. If None, reads ahead two blocks per read thread, or uses a"
+            " quarter of `worker_memory_gb` if it is set."
+        ),
+    )
+    n_stitching_workers: Optional[int] = Field(
+        3,
+        ge=1,
+        description=(
+            "Number of interferograms to stitch in parallel. If None, chosen from the"
+            " number of available CPUs and `gdal_cache_max_mb`."
+        ),
+    )
+    stitching_use_processes: bool = Field(
+        False,
+        description=(
+            "Stitch interferograms in separate processes instead of threads, which"
+            " avoids contention for GDAL's locks and block cache."
+        ),
+    )
+    gdal_cache_max_mb: Optional[int] = Field(
+        None,
+        ge=1,
+        description=(
+            "Total GDAL block cache (in MB) to divide among the stitching processes."
+            " If None, uses the current `GDAL_CACHEMAX`."
+        ),
+    )
+    n_troposphere_workers: int = Field(
+        4,
+        ge=1,
+        description=(
+            "Number of acquisitions to compute tropospheric delay cubes for in"
+            " parallel, each in its own process."
+        ),
+    )
+    enable_profiling: bool = Field(
+        False,
+        description=(
+            "Record the wall time, CPU time, I/O, peak memory and block counts of each"
+            " processing stage. Stage statistics are logged, and a Chrome trace"
+            " (viewable in Perfetto) is saved to `profile_trace.json` in the work"
+            " directory."
+        ),
+    )
 
 
 class InputOptions(BaseModel, extra="forbid"):
@@ -72,6 +72,15 @@ class CorrectionOptions(BaseModel, extra="forbid"):
         ),
     )
 
+    tropo_cache_dir: Optional[Path] = Field(
+        None,
+        description=(
+            "Directory to cache the tropospheric delay cube of each acquisition in,"
+            " which may be shared between runs. If None, uses"
+            " `atmosphere/troposphere/delay_cubes` in the work directory."
+        ),
+    )
+
     ionosphere_files: list[Path] = Field(
         default_factory=list,
         description=(
@@ -91,6 +100,21 @@ class CorrectionOptions(BaseModel, extra="forbid"):
         None,
         description="DEM file for tropospheric/ topographic phase corrections.",
     )
+    apply_to_timeseries: bool = Field(
+        False,
+        description=(
+            "Subtract the corrections from the inverted time series, writing the"
+            " corrected rasters to `timeseries/corrected`. The corrections are"
+            " evaluated block by block while reading the time series."
+        ),
+    )
+    write_correction_rasters: bool = Field(
+        True,
+        description=(
+            "Write the full-frame correction raster of each time series date. May"
+            " be turned off when `apply_to_timeseries` is set."
+        ),
+    )
 
     @field_validator(
         "troposphere_files", "ionosphere_files", "geometry_files", mode="before"
@@ -1,8 +1,9 @@
 from __future__ import annotations
 
 import logging
+import math
 from pathlib import Path
-from typing import Literal
+from typing import Literal, Optional
 
 from pydantic import (
     BaseModel,
@@ -21,6 +22,7 @@ __all__ = [
     "SpurtOptions",
     "TophuOptions",
     "UnwrapOptions",
+    "WarmStartOptions",
 ]
 
 
@@ -78,6 +80,28 @@ class PreprocessOptions(BaseModel, extra="forbid"):
     )
 
 
+class WarmStartOptions(BaseModel, extra="forbid"):
+    closure_threshold: float = Field(
+        0.5,
+        gt=0.0,
+        le=math.pi,
+        description=(
+            "Largest difference (in radians, modulo 2pi) between the predicted"
+            " unwrapped phase and the wrapped phase for a pixel to keep the"
+            " prediction."
+        ),
+    )
+    min_fraction: float = Field(
+        0.99,
+        ge=0.0,
+        le=1.0,
+        description=(
+            "Fraction of the predicted pixels which must pass the consistency checks"
+            " to skip the unwrapper. Otherwise, the interferogram is unwrapped."
+        ),
+    )
+
+
 class SnaphuOptions(BaseModel, extra="forbid"):
     ntiles: tuple[int, int] = Field(
         (1, 1),
@@ -261,11 +285,39 @@ class UnwrapOptions(BaseModel, extra="forbid"):
         False,
         description="Whether to run interpolation step on wrapped interferogram.",
     )
+    run_warm_start: bool = Field(
+        False,
+        description=(
+            "Whether to predict the unwrapped phase of interferograms from the sum of"
+            " already unwrapped interferograms (along the shortest-baseline pairs"
+            " connecting its dates), and skip the unwrapper when the prediction is"
+            " consistent with the wrapped phase."
+        ),
+    )
     _directory: Path = PrivateAttr(Path("unwrapped"))
     unwrap_method: UnwrapMethod = UnwrapMethod.SNAPHU
     n_parallel_jobs: int = Field(
         1, description="Number of interferograms to unwrap in parallel."
     )
+    num_cpus: Optional[int] = Field(
+        None,
+        ge=1,
+        description=(
+            "Number of CPUs available to all parallel unwrapping jobs, counting the"
+            " tiles each job unwraps in parallel. Jobs are only started while their"
+            " CPUs fit. If None, uses the number available to this process."
+        ),
+    )
+    total_memory_gb: Optional[float] = Field(
+        None,
+        gt=0,
+        description=(
+            "Memory (in GB) available to all parallel unwrapping jobs. Jobs are only"
+            " started while their estimated memory (from the raster size and the"
+            " unwrapper's tiling) fits. If None, uses the physical memory of the"
+            " machine."
+        ),
+    )
     zero_where_masked: bool = Field(
         False,
         description=(
@@ -273,6 +325,7 @@ class UnwrapOptions(BaseModel, extra="forbid"):
         ),
     )
     preprocess_options: PreprocessOptions = Field(default_factory=PreprocessOptions)
+    warm_start_options: WarmStartOptions = Field(default_factory=WarmStartOptions)
     snaphu_options: SnaphuOptions = Field(default_factory=SnaphuOptions)
     tophu_options: TophuOptions = Field(default_factory=TophuOptions)
     spurt_options: SpurtOptions = Field(default_factory=SpurtOptions)
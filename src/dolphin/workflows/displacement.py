@@ -15,12 +15,14 @@ from typing import Mapping, NamedTuple, Sequence
 from opera_utils import group_by_burst, group_by_date  # , get_dates
 from tqdm.auto import tqdm
 
-from dolphin import __version__, io, timeseries, utils
+from dolphin import __version__, _profiling, io, timeseries, utils
 from dolphin._log import log_runtime, setup_logging
+from dolphin._types import HalfWindow, Strides
 from dolphin.timeseries import ReferencePoint
 from dolphin.workflows import CallFunc
 
 from . import stitching_bursts, unwrapping, wrapped_phase
+from ._resources import plan_resources
 from ._utils import _create_burst_cfg, _remove_dir_if_empty
 from .config import DisplacementWorkflow  # , TimeseriesOptions
 
@@ -43,6 +45,7 @@ class OutputPaths(NamedTuple):
     tropospheric_corrections: list[Path] | None
     ionospheric_corrections: list[Path] | None
     reference_point: ReferencePoint | None
+    corrected_timeseries_paths: list[Path] | None = None
 
 
 @log_runtime
@@ -65,12 +68,14 @@ def run(
         cfg.log_file = cfg.work_directory / "dolphin.log"
     # Set the logging level for all `dolphin.` modules
     setup_logging(debug=debug, filename=cfg.log_file)
+    if cfg.worker_settings.enable_profiling:
+        # Don't mix in the events of an earlier run in this process
+        _profiling.enable_profiling(reset=True)
     # TODO: need to pass the cfg filename for the logger
     logger.debug(cfg.model_dump())
 
     if not cfg.worker_settings.gpu_enabled:
         utils.disable_gpu()
-    utils.set_num_threads(cfg.worker_settings.threads_per_worker)
 
     try:
         grouped_slc_files = group_by_burst(cfg.cslc_file_list)
@@ -81,6 +86,10 @@ def run(
         # Otherwise, we have SLC files which are not OPERA burst files
         grouped_slc_files = {"": cfg.cslc_file_list}
 
+    if cfg.worker_settings.worker_memory_gb is not None:
+        _apply_resource_plan(cfg, grouped_slc_files)
+    utils.set_num_threads(cfg.worker_settings.threads_per_worker)
+
     if cfg.amplitude_dispersion_files:
         grouped_amp_dispersion_files = group_by_burst(cfg.amplitude_dispersion_files)
     else:
@@ -204,6 +213,9 @@ def run(
         output_options=cfg.output_options,
         file_date_fmt=cfg.input_options.cslc_date_fmt,
         corr_window_size=corr_window_size,
+        num_workers=cfg.worker_settings.n_stitching_workers,
+        use_processes=cfg.worker_settings.stitching_use_processes,
+        gdal_cache_max_mb=cfg.worker_settings.gdal_cache_max_mb,
     )
 
     # ###################################
@@ -276,10 +288,17 @@ def run(
     # ##############################################
     tropo_paths: list[Path] | None = None
     iono_paths: list[Path] | None = None
+    corrected_timeseries_paths: list[Path] | None = None
     if len(cfg.correction_options.geometry_files) > 0:
         out_dir = cfg.work_directory / cfg.correction_options._atm_directory
         out_dir.mkdir(exist_ok=True)
         grouped_slc_files = group_by_date(cfg.cslc_file_list)
+        # Read the SLC acquisition metadata once for all corrections
+        slc_metadata = io.MetadataIndex.from_files(
+            cfg.cslc_file_list,
+            subdataset=cfg.input_options.subdataset,
+            cache_file=cfg.work_directory / "slc_metadata.json",
+        )
 
         # Prepare frame geometry files
         geometry_dir = out_dir / "geometry"
@@ -298,6 +317,8 @@ def run(
             strides=cfg.output_options.strides,
         )
 
+        # Corrections to subtract from the time series, evaluated block by block
+        delays: list = []
         # Troposphere
         if "height" not in frame_geometry_files:
             logger.warning(
@@ -305,51 +326,90 @@ def run(
             )
         else:
             if cfg.correction_options.troposphere_files:
-                from dolphin.atmosphere import estimate_tropospheric_delay
+                from dolphin.atmosphere import (
+                    estimate_tropospheric_delay,
+                    get_tropospheric_delays,
+                )
 
                 assert timeseries_paths is not None
                 logger.info(
                     "Calculating tropospheric corrections for %s files.",
                     len(timeseries_paths),
                 )
-                tropo_paths = estimate_tropospheric_delay(
-                    ifg_file_list=timeseries_paths,
-                    troposphere_files=cfg.correction_options.troposphere_files,
-                    file_date_fmt=cfg.correction_options.tropo_date_fmt,
-                    slc_files=grouped_slc_files,
-                    geom_files=frame_geometry_files,
-                    reference_point=reference_point,
-                    output_dir=out_dir,
-                    tropo_model=cfg.correction_options.tropo_model,
-                    tropo_delay_type=cfg.correction_options.tropo_delay_type,
-                    epsg=epsg,
-                    bounds=out_bounds,
-                )
+                tropo_kwargs = {
+                    "ifg_file_list": timeseries_paths,
+                    "troposphere_files": cfg.correction_options.troposphere_files,
+                    "file_date_fmt": cfg.correction_options.tropo_date_fmt,
+                    "slc_files": grouped_slc_files,
+                    "geom_files": frame_geometry_files,
+                    "reference_point": reference_point,
+                    "output_dir": out_dir,
+                    "tropo_model": cfg.correction_options.tropo_model,
+                    "tropo_delay_type": cfg.correction_options.tropo_delay_type,
+                    "epsg": epsg,
+                    "bounds": out_bounds,
+                    "metadata": slc_metadata,
+                    "cache_dir": cfg.correction_options.tropo_cache_dir,
+                    "num_workers": cfg.worker_settings.n_troposphere_workers,
+                }
+                # Prepare the delays once for both the rasters and the time series
+                tropo_delays = None
+                if cfg.correction_options.apply_to_timeseries:
+                    tropo_delays = get_tropospheric_delays(**tropo_kwargs)
+                    delays.append(tropo_delays)
+                if cfg.correction_options.write_correction_rasters:
+                    tropo_paths = estimate_tropospheric_delay(
+                        **tropo_kwargs, delays=tropo_delays
+                    )
             else:
                 logger.info("No weather model, skip tropospheric correction.")
 
         # Ionosphere
         if grouped_iono_files:
-            from dolphin.atmosphere import estimate_ionospheric_delay
+            from dolphin.atmosphere import (
+                estimate_ionospheric_delay,
+                get_ionospheric_delays,
+            )
 
             logger.info(
                 "Calculating ionospheric corrections for %s files",
                 len(timeseries_paths),
             )
             assert timeseries_paths is not None
-            iono_paths = estimate_ionospheric_delay(
-                ifg_file_list=timeseries_paths,
-                slc_files=grouped_slc_files,
-                tec_files=grouped_iono_files,
-                geom_files=frame_geometry_files,
-                reference_point=reference_point,
-                output_dir=out_dir,
-                epsg=epsg,
-                bounds=out_bounds,
-            )
+            iono_kwargs = {
+                "ifg_file_list": timeseries_paths,
+                "slc_files": grouped_slc_files,
+                "tec_files": grouped_iono_files,
+                "geom_files": frame_geometry_files,
+                "reference_point": reference_point,
+                "epsg": epsg,
+                "bounds": out_bounds,
+                "metadata": slc_metadata,
+            }
+            iono_delays = None
+            if cfg.correction_options.apply_to_timeseries:
+                iono_delays = get_ionospheric_delays(**iono_kwargs)
+                delays.append(iono_delays)
+            if cfg.correction_options.write_correction_rasters:
+                iono_paths = estimate_ionospheric_delay(
+                    **iono_kwargs, output_dir=out_dir, delays=iono_delays
+                )
         else:
             logger.info("No TEC files, skip ionospheric correction.")
 
+        if delays:
+            from dolphin.atmosphere import apply_corrections
+
+            one_of_slcs = next(
+                f for f in cfg.cslc_file_list if "compressed" not in str(f).lower()
+            )
+            corrected_timeseries_paths = apply_corrections(
+                timeseries_paths,
+                delays,
+                output_dir=ts_opts._directory / "corrected",
+                wavelength=slc_metadata.get_radar_wavelength(one_of_slcs),
+            )
+
     # Print the maximum memory usage for each worker
     _print_summary(cfg)
     return OutputPaths(
@@ -371,6 +431,7 @@ def run(
         tropospheric_corrections=tropo_paths,
         ionospheric_corrections=iono_paths,
         reference_point=reference_point,
+        corrected_timeseries_paths=corrected_timeseries_paths,
     )
 
 
@@ -380,3 +441,36 @@ def _print_summary(cfg):
     logger.info(f"Maximum memory usage: {max_mem:.2f} GB")
     logger.info(f"Config file dolphin version: {cfg._dolphin_version}")
     logger.info(f"Current running dolphin version: {__version__}")
+    if _profiling.is_profiling():
+        _profiling.log_summary()
+        _profiling.write_trace(cfg.work_directory / "profile_trace.json")
+
+
+def _apply_resource_plan(
+    cfg: DisplacementWorkflow, grouped_slc_files: Mapping[str, Sequence]
+) -> None:
+    """Set the block shape and parallelism from `worker_settings.worker_memory_gb`."""
+    ws = cfg.worker_settings
+    pl = cfg.phase_linking
+    strides = cfg.output_options.strides
+    max_files = max(len(files) for files in grouped_slc_files.values())
+    nslc = min(pl.ministack_size + pl.max_num_compressed, max_files)
+    first_file = io.format_nc_filename(
+        cfg.cslc_file_list[0], cfg.input_options.subdataset
+    )
+    xsize, ysize = io.get_raster_xysize(first_file)
+    plan = plan_resources(
+        ws.worker_memory_gb,
+        nslc=nslc,
+        half_window=HalfWindow(y=pl.half_window.y, x=pl.half_window.x),
+        strides=Strides(y=strides["y"], x=strides["x"]),
+        shp_method=pl.shp_method,
+        num_bursts=len(grouped_slc_files),
+        arr_shape=(ysize, xsize),
+        total_memory_gb=ws.total_memory_gb,
+        read_buffer_mb=ws.read_buffer_mb,
+    )
+    ws.block_shape = plan.block_shape
+    ws.read_buffer_mb = plan.read_buffer_mb
+    ws.n_parallel_bursts = plan.n_parallel_bursts
+    ws.threads_per_worker = plan.threads_per_worker
@@ -7,9 +7,9 @@ from pprint import pformat
 import opera_utils
 
 import dolphin.ps
-from dolphin import __version__
+from dolphin import __version__, _profiling
 from dolphin._log import log_runtime, setup_logging
-from dolphin.io import VRTStack
+from dolphin.io import FootprintIndex, MetadataIndex, VRTStack
 from dolphin.utils import get_max_memory_usage
 
 from .config import PsWorkflow
@@ -38,6 +38,9 @@ def run(
     """
     # Set the logging level for all `dolphin.` modules
     setup_logging(debug=debug, filename=cfg.log_file)
+    if cfg.worker_settings.enable_profiling:
+        # Start fresh, unless called from a workflow which is already profiling
+        _profiling.enable_profiling(reset=not _profiling.is_profiling())
     logger.debug(pformat(cfg.model_dump()))
 
     output_file_list = [
@@ -74,10 +77,16 @@ def run(
     # Make a VRT pointing to the input SLC files
     # #############################################
     subdataset = cfg.input_options.subdataset
+    metadata = MetadataIndex.from_files(
+        input_file_list,
+        subdataset=subdataset,
+        cache_file=cfg.work_directory / "slc_metadata.json",
+    )
     vrt_stack = VRTStack(
         input_file_list,
         subdataset=subdataset,
         outfile=cfg.work_directory / "slc_stack.vrt",
+        metadata=metadata,
     )
 
     # Make the nodata mask from the polygons, if we're using OPERA CSLCs
@@ -98,7 +107,10 @@ def run(
         output_amp_dispersion_file=output_file_list[2],
         like_filename=vrt_stack.outfile,
         amp_dispersion_threshold=cfg.ps_options.amp_dispersion_threshold,
+        footprint=FootprintIndex.from_stack(vrt_stack),
         block_shape=cfg.worker_settings.block_shape,
+        num_read_threads=cfg.worker_settings.n_read_threads,
+        read_buffer_mb=cfg.worker_settings.read_buffer_mb,
     )
     # Save a looked version of the PS mask too
     strides = cfg.output_options.strides
@@ -116,5 +128,8 @@ def run(
     logger.info(f"Maximum memory usage: {max_mem:.2f} GB")
     logger.info(f"Config file dolphin version: {cfg._dolphin_version}")
     logger.info(f"Current running dolphin version: {__version__}")
+    if _profiling.is_profiling():
+        _profiling.log_summary()
+        _profiling.write_trace(cfg.work_directory / "profile_trace.json")
 
     return output_file_list
@@ -14,6 +14,7 @@ from typing import Optional
 from osgeo_utils import gdal_calc
 
 from dolphin import io
+from dolphin._profiling import profile
 from dolphin._types import Filename
 from dolphin.io import VRTStack
 from dolphin.stack import MiniStackPlanner
@@ -26,6 +27,7 @@ logger = logging.getLogger(__name__)
 __all__ = ["run_wrapped_phase_sequential"]
 
 
+@profile("phase_linking", category="stage")
 def run_wrapped_phase_sequential(
     *,
     slc_vrt_file: Filename,
@@ -34,6 +36,7 @@ def run_wrapped_phase_sequential(
     half_window: dict,
     strides: Optional[dict] = None,
     mask_file: Optional[Filename] = None,
+    footprint: Optional[io.FootprintIndex] = None,
     ps_mask_file: Optional[Filename] = None,
     amp_mean_file: Optional[Filename] = None,
     amp_dispersion_file: Optional[Filename] = None,
@@ -43,6 +46,8 @@ def run_wrapped_phase_sequential(
     use_evd: bool = False,
     beta: float = 0.00,
     block_shape: tuple[int, int] = (512, 512),
+    num_read_threads: int = 2,
+    read_buffer_mb: Optional[int] = None,
     baseline_lag: Optional[int] = None,
     **tqdm_kwargs,
 ) -> tuple[list[Path], list[Path], Path, Path]:
@@ -105,6 +110,7 @@ def run_wrapped_phase_sequential(
                 use_evd=use_evd,
                 beta=beta,
                 mask_file=mask_file,
+                footprint=footprint,
                 ps_mask_file=ps_mask_file,
                 amp_mean_file=amp_mean_file,
                 amp_dispersion_file=amp_dispersion_file,
@@ -112,6 +118,8 @@ def run_wrapped_phase_sequential(
                 shp_alpha=shp_alpha,
                 shp_nslc=shp_nslc,
                 block_shape=block_shape,
+                num_read_threads=num_read_threads,
+                read_buffer_mb=read_buffer_mb,
                 baseline_lag=baseline_lag,
                 **tqdm_kwargs,
             )
@@ -5,7 +5,7 @@ from __future__ import annotations
 import logging
 from dataclasses import dataclass
 from pathlib import Path
-from typing import Optional
+from typing import Optional, Sequence
 
 import numpy as np
 from numpy.typing import DTypeLike
@@ -14,7 +14,8 @@ from tqdm.auto import tqdm
 from dolphin import io, shp
 from dolphin._decorators import atomic_output
 from dolphin._types import Filename, HalfWindow, Strides
-from dolphin.io import EagerLoader, StridedBlockManager, VRTStack
+from dolphin.io import ParallelLoader, StridedBlockManager, VRTStack
+from dolphin.io._utils import _format_for_gdal, get_gtiff_options
 from dolphin.masking import load_mask_as_numpy
 from dolphin.phase_link import PhaseLinkRuntimeError, compress, run_phase_linking
 from dolphin.ps import calc_ps_block
@@ -26,6 +27,12 @@ logger = logging.getLogger(__name__)
 
 __all__ = ["run_wrapped_phase_single"]
 
+# Mantissa bits kept in the phase-linked and compressed SLCs
+_KEEP_BITS = 12
+# Creation options of the phase-linked and compressed SLCs: the 256x256 tiles
+# used by `repack_raster`
+_SLC_OPTIONS = _format_for_gdal(get_gtiff_options())
+
 
 @dataclass
 class OutputFile:
@@ -47,6 +54,7 @@ def run_wrapped_phase_single(
     beta: float = 0.00,
     use_evd: bool = False,
     mask_file: Optional[Filename] = None,
+    footprint: Optional[io.FootprintIndex] = None,
     ps_mask_file: Optional[Filename] = None,
     amp_mean_file: Optional[Filename] = None,
     amp_dispersion_file: Optional[Filename] = None,
@@ -54,6 +62,8 @@ def run_wrapped_phase_single(
     shp_alpha: float = 0.05,
     shp_nslc: Optional[int] = None,
     block_shape: tuple[int, int] = (1024, 1024),
+    num_read_threads: int = 2,
+    read_buffer_mb: Optional[int] = None,
     baseline_lag: Optional[int] = None,
     **tqdm_kwargs,
 ):
@@ -67,7 +77,7 @@ def run_wrapped_phase_single(
     strides_tup = Strides(y=strides["y"], x=strides["x"])
     half_window_tup = HalfWindow(y=half_window["y"], x=half_window["x"])
     output_folder = Path(output_folder)
-    vrt = VRTStack.from_vrt_file(slc_vrt_file)
+    vrt = VRTStack.from_vrt_file(slc_vrt_file, keep_open=True)
     input_slc_files = ministack.file_list
     assert len(input_slc_files) == vrt.shape[0]
 
@@ -99,7 +109,7 @@ def run_wrapped_phase_single(
     logger.info(msg)
 
     # Create the background writer for this ministack
-    writer = io.BackgroundBlockWriter()
+    writer = io.PooledBlockWriter()
 
     logger.info(f"Total stack size (in pixels): {vrt.shape}")
     # Set up the output folder with empty files to write into
@@ -110,6 +120,7 @@ def run_wrapped_phase_single(
         output_folder=output_folder,
         like_filename=vrt.outfile,
         nodata=0,
+        options=_SLC_OPTIONS,
     )
 
     comp_slc_info = ministack.get_compressed_slc_info()
@@ -137,6 +148,7 @@ def run_wrapped_phase_single(
             strides=op.strides,
             nbands=op.nbands,
             nodata=0,
+            options=_SLC_OPTIONS if op.strides is None else None,
         )
 
     # Iterate over the output grid
@@ -147,7 +159,13 @@ def run_wrapped_phase_single(
         half_window=half_window_tup,
     )
     # Set up the background loader
-    loader = EagerLoader(reader=vrt, block_shape=block_shape)
+    loader = ParallelLoader(
+        reader=vrt,
+        block_shape=block_shape,
+        footprint=footprint,
+        num_threads=num_read_threads,
+        max_buffer_bytes=None if read_buffer_mb is None else read_buffer_mb * 2**20,
+    )
     # Queue all input slices, skip ones that are all nodata
     blocks = []
     # Queue all input slices, skip ones that are all nodata
@@ -155,6 +173,8 @@ def run_wrapped_phase_single(
         in_rows, in_cols = b[2]
         if nodata_mask[in_rows, in_cols].all():
             continue
+        if footprint is not None and footprint.is_empty(in_rows, in_cols):
+            continue
         loader.queue_read(in_rows, in_cols)
         blocks.append(b)
 
@@ -233,7 +253,9 @@ def run_wrapped_phase_single(
             pl_output.cpx_phase[first_real_slc_idx:, out_trim_rows, out_trim_cols],
             phase_linked_slc_files,
         ):
-            writer.queue_write(img, f, out_rows.start, out_cols.start)
+            writer.queue_write(
+                img, f, out_rows.start, out_cols.start, keep_bits=_KEEP_BITS
+            )
 
         # Compress the ministack using only the non-compressed SLCs
         # Get the mean to set as pixel magnitudes
@@ -256,6 +278,7 @@ def run_wrapped_phase_single(
             in_no_pad_rows.start,
             in_no_pad_cols.start,
             band=1,
+            keep_bits=_KEEP_BITS,
         )
         # Save the amplitude dispersion of the real SLC data
         writer.queue_write(
@@ -264,6 +287,7 @@ def run_wrapped_phase_single(
             in_no_pad_rows.start,
             in_no_pad_cols.start,
             band=2,
+            keep_bits=_KEEP_BITS,
         )
 
         # All other outputs are strided (smaller in size)
@@ -290,12 +314,13 @@ def run_wrapped_phase_single(
     writer.notify_finished()
     logger.info(f"Finished ministack of size {vrt.shape}.")
 
-    logger.info("Repacking for more compression")
-    io.repack_rasters(phase_linked_slc_files, keep_bits=12)
-
+    # The writer rounds the mantissas and writes each tile once, so the outputs
+    # only need repacking if some tiles had to be written more than once
+    rewritten = writer.rewritten_files
+    if rewritten:
+        logger.info(f"Repacking {len(rewritten)} files with rewritten tiles")
+        io.repack_rasters(rewritten)
     written_comp_slc = output_files[0]
-
-    io.repack_raster(written_comp_slc.filename, keep_bits=12)
     ccslc_info = ministack.get_compressed_slc_info()
     ccslc_info.write_metadata(output_file=written_comp_slc.filename)
     # TODO: Does it make sense to return anything from this?
@@ -349,6 +374,7 @@ def setup_output_folder(
     strides: Optional[dict[str, int]] = None,
     nodata: Optional[float] = 0,
     output_folder: Optional[Path] = None,
+    options: Optional[Sequence[str]] = None,
 ) -> list[Path]:
     """Create empty output files for each band after `start_idx` in `vrt_stack`.
 
@@ -375,6 +401,9 @@ def setup_output_folder(
     output_folder : Path, optional
         Path to output folder, by default None
         If None, will use the same folder as the first SLC in `vrt_stack`
+    options : Sequence[str], optional
+        GDAL creation options for the files.
+        Default is [dolphin.io.DEFAULT_TIFF_OPTIONS][].
 
     Returns
     -------
@@ -408,6 +437,7 @@ def setup_output_folder(
             dtype=dtype,
             strides=strides,
             nodata=nodata,
+            options=options,
         )
 
         phase_linked_slc_files.append(output_path)
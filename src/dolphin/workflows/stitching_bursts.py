@@ -4,13 +4,20 @@ from __future__ import annotations
 
 import logging
 from pathlib import Path
-from typing import Sequence
+from typing import Optional, Sequence
 
-from dolphin import stitching
+from opera_utils import group_by_date
+
+from dolphin import stitching, utils
 from dolphin._log import log_runtime
 from dolphin._overviews import ImageType, create_image_overviews, create_overviews
+from dolphin._profiling import profile
 from dolphin._types import Bbox
-from dolphin.interferogram import estimate_interferometric_correlations
+from dolphin.interferogram import (
+    NetworkReader,
+    estimate_interferometric_correlations,
+    write_network_ifgs,
+)
 from dolphin.io._utils import repack_raster
 
 from .config import OutputOptions
@@ -19,6 +26,7 @@ logger = logging.getLogger(__name__)
 
 
 @log_runtime
+@profile("stitching", category="stage")
 def run(
     ifg_file_list: Sequence[Path],
     temp_coh_file_list: Sequence[Path],
@@ -29,7 +37,9 @@ def run(
     output_options: OutputOptions,
     file_date_fmt: str = "%Y%m%d",
     corr_window_size: tuple[int, int] = (11, 11),
-    num_workers: int = 3,
+    num_workers: Optional[int] = 3,
+    use_processes: bool = False,
+    gdal_cache_max_mb: Optional[int] = None,
 ) -> tuple[list[Path], list[Path], Path, Path, Path, Path]:
     """Run the displacement workflow on a stack of SLCs.
 
@@ -56,9 +66,16 @@ def run(
     corr_window_size : tuple[int, int]
         Size of moving window (rows, cols) to use for estimating correlation.
         Default = (11, 11)
-    num_workers : int
-        Number of threads to use for stitching in parallel.
+    num_workers : Optional[int]
+        Number of threads (or processes) to use for stitching in parallel.
+        If None, chosen from the number of CPUs and `gdal_cache_max_mb`.
         Default = 3
+    use_processes : bool
+        Stitch the interferograms in separate processes instead of threads.
+        Default = False
+    gdal_cache_max_mb : Optional[int]
+        Total GDAL block cache (in MB) to split between stitching processes.
+        Default = None, which uses the current `GDAL_CACHEMAX`.
 
     Returns
     -------
@@ -80,17 +97,33 @@ def run(
     # Also preps for snaphu, which needs binary format with no nans
     logger.info("Stitching interferograms by date.")
     out_bounds = Bbox(*output_options.bounds) if output_options.bounds else None
-    date_to_ifg_path = stitching.merge_by_date(
-        image_file_list=ifg_file_list,
-        file_date_fmt=file_date_fmt,
-        output_dir=stitched_ifg_dir,
-        output_suffix=".int.tif",
-        driver="GTiff",
-        out_bounds=out_bounds,
-        out_bounds_epsg=output_options.bounds_epsg,
-        num_workers=num_workers,
-    )
+    # The burst footprints are the same for every raster, so plan the grid once
+    plan_file = stitched_ifg_dir / "stitch_plan.json"
+    date_to_ifg_path = None
+    if out_bounds is None:
+        date_to_ifg_path = _write_single_burst_ifgs(
+            ifg_file_list, stitched_ifg_dir, file_date_fmt
+        )
+    if date_to_ifg_path is None:
+        date_to_ifg_path = stitching.merge_by_date(
+            image_file_list=ifg_file_list,
+            file_date_fmt=file_date_fmt,
+            output_dir=stitched_ifg_dir,
+            output_suffix=".int.tif",
+            driver="GTiff",
+            out_bounds=out_bounds,
+            out_bounds_epsg=output_options.bounds_epsg,
+            num_workers=num_workers,
+            plan_file=plan_file,
+            use_processes=use_processes,
+            gdal_cache_max_mb=gdal_cache_max_mb,
+        )
     stitched_ifg_paths = list(date_to_ifg_path.values())
+    plan = stitching.StitchPlan.from_file(plan_file) if plan_file.exists() else None
+    if num_workers is None:
+        num_workers = stitching.get_num_stitching_workers(
+            len(stitched_ifg_paths), gdal_cache_max_mb=gdal_cache_max_mb
+        )
 
     # Estimate the interferometric correlation from the stitched interferogram
     interferometric_corr_paths = estimate_interferometric_correlations(
@@ -108,6 +141,7 @@ def run(
             driver="GTiff",
             out_bounds=out_bounds,
             out_bounds_epsg=output_options.bounds_epsg,
+            plan=plan,
         )
         repack_raster(stitched_temp_coh_file, keep_bits=10)
 
@@ -122,6 +156,7 @@ def run(
             resample_alg="nearest",
             out_bounds=out_bounds,
             out_bounds_epsg=output_options.bounds_epsg,
+            plan=plan,
         )
 
     # Stitch the amp dispersion files
@@ -133,6 +168,7 @@ def run(
             driver="GTiff",
             out_bounds=out_bounds,
             out_bounds_epsg=output_options.bounds_epsg,
+            plan=plan,
         )
         repack_raster(stitched_temp_coh_file, keep_bits=10)
 
@@ -143,6 +179,7 @@ def run(
         driver="GTiff",
         out_bounds=out_bounds,
         out_bounds_epsg=output_options.bounds_epsg,
+        plan=plan,
     )
 
     if output_options.add_overviews:
@@ -162,3 +199,41 @@ def run(
         stitched_amp_disp_file,
         stitched_shp_count_file,
     )
+
+
+def _write_single_burst_ifgs(
+    ifg_file_list: Sequence[Path], output_dir: Path, file_date_fmt: str
+) -> Optional[dict[tuple, Path]]:
+    """Form the interferograms of one burst directly into the stitched outputs.
+
+    With a single burst there is nothing to stitch, and copying each
+    interferogram VRT reads both of its SLCs. A `NetworkReader` instead reads
+    each SLC block once for all interferograms.
+
+    Returns None (so the interferograms are merged by date as usual) if there
+    is more than one burst, or the inputs are not VRTs written by `Network`.
+    """
+    grouped = group_by_date(ifg_file_list, file_date_fmt=file_date_fmt)
+    if any(len(dates) != 2 or len(files) != 1 for dates, files in grouped.items()):
+        return None
+    date_to_ifg_path = {
+        dates: output_dir / (utils.format_date_pair(*dates) + ".int.tif")
+        for dates in grouped
+    }
+    todo = [dates for dates, path in date_to_ifg_path.items() if not path.exists()]
+    if not todo:
+        return date_to_ifg_path
+    try:
+        reader = NetworkReader.from_vrt_files(
+            [grouped[dates][0] for dates in todo], keep_open=True
+        )
+    except ValueError as e:
+        logger.debug(f"Not forming interferograms from the SLCs: {e}")
+        return None
+    logger.info(f"Forming {len(todo)} interferograms of one burst from the SLCs")
+    write_network_ifgs(
+        reader,
+        [date_to_ifg_path[dates] for dates in todo],
+        like_filename=grouped[todo[0]][0],
+    )
+    return date_to_ifg_path
@@ -10,6 +10,7 @@ from typing import Sequence
 from dolphin import io, stitching, unwrap
 from dolphin._log import log_runtime
 from dolphin._overviews import ImageType, create_overviews
+from dolphin._profiling import profile
 from dolphin._types import PathOrStr
 
 from .config import UnwrapOptions
@@ -18,6 +19,7 @@ logger = logging.getLogger(__name__)
 
 
 @log_runtime
+@profile("unwrapping", category="stage")
 def run(
     ifg_file_list: Sequence[Path],
     cor_file_list: Sequence[Path],
@@ -9,9 +9,9 @@ from typing import Optional, Sequence, cast
 import numpy as np
 from opera_utils import get_dates, make_nodata_mask
 
-from dolphin import Bbox, Filename, interferogram, masking, ps, stack
+from dolphin import Bbox, Filename, _profiling, interferogram, masking, ps, stack
 from dolphin._log import log_runtime, setup_logging
-from dolphin.io import VRTStack
+from dolphin.io import FootprintIndex, MetadataIndex, VRTStack
 
 from . import InterferogramNetwork, sequential
 from .config import DisplacementWorkflow
@@ -56,6 +56,9 @@ def run(
     """
     t0 = time.perf_counter()
     setup_logging(debug=debug, filename=cfg.log_file)
+    if cfg.worker_settings.enable_profiling:
+        # Start fresh, unless called from a workflow which is already profiling
+        _profiling.enable_profiling(reset=not _profiling.is_profiling())
     if tqdm_kwargs is None:
         tqdm_kwargs = {}
     work_dir = cfg.work_directory
@@ -67,10 +70,16 @@ def run(
     # Make a VRT pointing to the input SLC files
     # #############################################
     subdataset = cfg.input_options.subdataset
+    metadata = MetadataIndex.from_files(
+        input_file_list,
+        subdataset=subdataset,
+        cache_file=cfg.work_directory / "slc_metadata.json",
+    )
     vrt_stack = VRTStack(
         input_file_list,
         subdataset=subdataset,
         outfile=cfg.work_directory / "slc_stack.vrt",
+        metadata=metadata,
     )
 
     # Mark any files beginning with "compressed" as compressed
@@ -96,6 +105,8 @@ def run(
     )
 
     nodata_mask = masking.load_mask_as_numpy(mask_filename) if mask_filename else None
+    # Low resolution index of the valid data, so empty blocks are never read
+    footprint = FootprintIndex.from_stack(vrt_stack)
     # ###############
     # PS selection
     # ###############
@@ -121,8 +132,11 @@ def run(
             amp_dispersion_threshold=cfg.ps_options.amp_dispersion_threshold,
             existing_amp_dispersion_file=existing_disp,
             nodata_mask=nodata_mask,
+            footprint=footprint,
             existing_amp_mean_file=existing_amp,
             block_shape=cfg.worker_settings.block_shape,
+            num_read_threads=cfg.worker_settings.n_read_threads,
+            read_buffer_mb=cfg.worker_settings.read_buffer_mb,
             **kwargs,
         )
 
@@ -174,6 +188,7 @@ def run(
                 use_evd=cfg.phase_linking.use_evd,
                 beta=cfg.phase_linking.beta,
                 mask_file=mask_filename,
+                footprint=footprint,
                 ps_mask_file=ps_output,
                 amp_mean_file=cfg.ps_options._amp_mean_file,
                 amp_dispersion_file=cfg.ps_options._amp_dispersion_file,
@@ -181,6 +196,8 @@ def run(
                 shp_alpha=cfg.phase_linking.shp_alpha,
                 shp_nslc=shp_nslc,
                 block_shape=cfg.worker_settings.block_shape,
+                num_read_threads=cfg.worker_settings.n_read_threads,
+                read_buffer_mb=cfg.worker_settings.read_buffer_mb,
                 baseline_lag=cfg.phase_linking.baseline_lag,
                 **kwargs,
             )
@@ -193,6 +210,8 @@ def run(
             "phase_linking_options": cfg.phase_linking.model_dump(mode="json"),
         },
     )
+    if _profiling.is_profiling():
+        _profiling.write_trace(work_dir / "profile_trace.json")
 
     # ###################################################
     # Form interferograms from estimated wrapped phase
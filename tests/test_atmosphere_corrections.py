@@ -0,0 +1,92 @@
+from dataclasses import dataclass
+from pathlib import Path
+
+import numpy as np
+import numpy.testing as npt
+import pytest
+
+from dolphin import io
+from dolphin.atmosphere import apply_corrections
+
+SHAPE = (50, 30)
+WAVELENGTH = 0.05546576
+NODATA = -9999.0
+
+
+@dataclass
+class ConstantDelays:
+    """Delays (in meters) which are the same for every pixel of a raster."""
+
+    values: dict[Path, float]
+
+    @property
+    def ifg_files(self) -> list[Path]:
+        return list(self.values)
+
+    def get_block_getter(self, ifg):
+        def get_block(rows: slice) -> np.ndarray:
+            nrows = rows.stop - rows.start
+            return np.full((nrows, SHAPE[1]), self.values[ifg], dtype=np.float32)
+
+        return get_block
+
+
+@pytest.fixture
+def truth():
+    rng = np.random.default_rng(0)
+    return rng.uniform(-10, 10, size=(2, *SHAPE)).astype(np.float32)
+
+
+def _write_timeseries(tmp_path, phases):
+    ts_dir = tmp_path / "timeseries"
+    ts_dir.mkdir()
+    paths = []
+    for name, phase in zip(["20200101_20200113.tif", "20200101_20200125.tif"], phases):
+        paths.append(ts_dir / name)
+        io.write_arr(arr=phase, output_name=paths[-1], nodata=NODATA)
+    return paths
+
+
+def test_apply_corrections_constant(tmp_path, truth):
+    tropo = [0.03, -0.01]
+    iono = 0.002
+    # A delay of `d` meters shortens the measured phase by 4pi/wavelength * d
+    phase_per_meter = 4 * np.pi / WAVELENGTH
+    phases = truth - phase_per_meter * np.array(tropo, dtype=np.float32)[:, None, None]
+    phases[0] -= phase_per_meter * iono
+    phases[:, 0, :3] = NODATA
+    ts_paths = _write_timeseries(tmp_path, phases)
+
+    delays = [
+        ConstantDelays(dict(zip(ts_paths, tropo))),
+        # Only the first date has this delay
+        ConstantDelays({ts_paths[0]: iono}),
+    ]
+    out_paths = apply_corrections(
+        ts_paths,
+        delays,
+        output_dir=tmp_path / "corrected",
+        wavelength=WAVELENGTH,
+        block_rows=16,
+    )
+    assert [p.name for p in out_paths] == [p.name for p in ts_paths]
+    for out_path, expected in zip(out_paths, truth):
+        corrected = io.load_gdal(out_path)
+        npt.assert_allclose(corrected[1:], expected[1:], atol=1e-4)
+        npt.assert_allclose(corrected[0, 3:], expected[0, 3:], atol=1e-4)
+        # The nodata pixels are kept
+        npt.assert_array_equal(corrected[0, :3], NODATA)
+        assert io.get_raster_nodata(out_path) == NODATA
+
+
+def test_apply_corrections_no_delay(tmp_path, truth):
+    ts_paths = _write_timeseries(tmp_path, truth)
+    out_paths = apply_corrections(
+        ts_paths,
+        [ConstantDelays({ts_paths[0]: 0.01})],
+        output_dir=tmp_path / "corrected",
+        wavelength=WAVELENGTH,
+    )
+    # Rasters without a delay are copied unchanged
+    npt.assert_array_equal(io.load_gdal(out_paths[1]), truth[1])
+    assert not np.allclose(io.load_gdal(out_paths[0]), truth[0])
@@ -8,9 +8,11 @@ import pytest
 from dolphin import io, utils
 from dolphin.interferogram import (
     Network,
+    NetworkReader,
     VRTInterferogram,
     _create_vrt_conj,
     estimate_correlation_from_phase,
+    write_network_ifgs,
 )
 
 
@@ -366,3 +368,39 @@ def test_network_from_ifgs():
     assert n.ifg_list[0].path.name == "20210107_20210108.int.vrt"
     assert n.ifg_list[1].path.name == "20210107_20210109.int.vrt"
     assert n.ifg_list[2].path.name == "20210108_20210109.int.vrt"
+
+
+def test_network_reader(slc_file_list):
+    n = Network(slc_file_list[:4], max_bandwidth=2, write=False)
+    reader = NetworkReader.from_network(n)
+    arr0 = io.load_gdal(slc_file_list[0])
+    assert reader.shape == (len(n), *arr0.shape)
+    assert reader.dates == n._get_ifg_date_pairs()
+
+    block = reader[:, 2:10, 5:15]
+    assert block.shape == (len(n), 8, 10)
+    for idx, ifg in enumerate(n.ifg_list):
+        expected = io.load_gdal(ifg.ref_slc) * io.load_gdal(ifg.sec_slc).conj()
+        npt.assert_allclose(block[idx], expected[2:10, 5:15], rtol=1e-6)
+
+    npt.assert_allclose(reader[1, 2:10, 5:15], block[1], rtol=1e-6)
+
+
+def test_network_reader_from_vrt_files(tmp_path, slc_file_list):
+    n = Network(slc_file_list[:4], max_bandwidth=2, outdir=tmp_path)
+    ifg_files = [ifg.path for ifg in n.ifg_list]
+    reader = NetworkReader.from_vrt_files(ifg_files)
+    assert reader.shape == (len(n), *io.load_gdal(slc_file_list[0]).shape)
+    assert reader.dates == n._get_ifg_date_pairs()
+
+    out_files = [tmp_path / f"{p.name.split('.')[0]}.int.tif" for p in ifg_files]
+    write_network_ifgs(
+        reader, out_files, like_filename=ifg_files[0], block_shape=(7, 9)
+    )
+    for ifg_file, out_file in zip(ifg_files, out_files):
+        npt.assert_allclose(io.load_gdal(out_file), io.load_gdal(ifg_file), rtol=1e-6)
+        assert io.get_raster_nodata(out_file) == 0
+
+    # Only the interferogram VRTs can be read
+    with pytest.raises(ValueError):
+        NetworkReader.from_vrt_files(out_files)
@@ -1,3 +1,6 @@
+import asyncio
+import pickle
+from os import fspath
 from pathlib import Path
 
 import numpy as np
@@ -6,14 +9,19 @@ import pytest
 import rasterio as rio
 from osgeo import gdal
 
+from dolphin import io
+from dolphin.io._footprint import FootprintIndex
+from dolphin.io._metadata import MetadataIndex
 from dolphin.io._readers import (
     BinaryReader,
     BinaryStackReader,
     EagerLoader,
     HDF5Reader,
     HDF5StackReader,
+    ParallelLoader,
     RasterReader,
     RasterStackReader,
+    S3StackReader,
     VRTStack,
     _parse_vrt_file,
 )
@@ -298,6 +306,22 @@ def test_read_stack(vrt_stack, slc_stack):
     assert data.shape == vrt_stack.shape
 
 
+def test_read_stack_keep_open(tmp_path, slc_file_list, slc_stack):
+    vrt_file = tmp_path / "test_keep_open.vrt"
+    v = VRTStack(slc_file_list, outfile=vrt_file, keep_open=True)
+    assert v.shape == slc_stack.shape
+    assert v.dtype == slc_stack.dtype
+    npt.assert_array_almost_equal(v[:, 1:5, 2:8], slc_stack[:, 1:5, 2:8])
+    # The same handle is reused for later reads in this thread
+    ds = v._get_dataset()
+    npt.assert_array_almost_equal(v[2, :, :], slc_stack[2])
+    assert v._get_dataset() is ds
+
+    # The open handles are dropped when pickling
+    v2 = pickle.loads(pickle.dumps(v))
+    npt.assert_array_almost_equal(v2[:, 1:5, 2:8], slc_stack[:, 1:5, 2:8])
+
+
 def test_read_stack_nc(vrt_stack_nc, slc_stack):
     ds = gdal.Open(str(vrt_stack_nc.outfile))
     loaded = ds.ReadAsArray()
@@ -329,6 +353,30 @@ def test_sort_order(tmp_path, slc_file_list):
     assert vrt_stack2.file_list == random_order
 
 
+def test_metadata_index(tmp_path, slc_stack, slc_file_list, slc_file_list_nc):
+    cache_file = tmp_path / "slc_metadata.json"
+    metadata = MetadataIndex.from_files(slc_file_list, cache_file=cache_file)
+    assert len(metadata) == len(slc_file_list)
+    for f in slc_file_list:
+        assert metadata[f].shape == slc_stack.shape[-2:]
+        assert metadata[f].dtype == "CFloat32"
+        assert list(metadata[f].block_size) == io.get_raster_chunk_size(f)
+
+    # Reloading from the sidecar gives the same headers
+    assert cache_file.exists()
+    assert MetadataIndex.from_file(cache_file).headers == metadata.headers
+
+    # The HDF5 headers are read with h5py
+    metadata_nc = MetadataIndex.from_files(slc_file_list_nc, subdataset="data")
+    for f in slc_file_list_nc:
+        assert metadata_nc[f].shape == slc_stack.shape[-2:]
+        assert metadata_nc[f].dtype == "CFloat32"
+
+    s = VRTStack(slc_file_list, outfile=tmp_path / "stack.vrt", metadata=metadata)
+    assert s.shape == slc_stack.shape
+    npt.assert_array_almost_equal(s[:, :, :], slc_stack)
+
+
 def test_dates(vrt_stack, vrt_stack_nc_subdataset):
     dates = vrt_stack.dates
     assert len(dates) == len(vrt_stack)
@@ -389,6 +437,27 @@ def test_tiled_iter_blocks(tmp_path, tiled_file_list):
     assert len(blocks) == len(slices) == 4
 
 
+@pytest.mark.parametrize("max_buffer_bytes", [None, 1])
+def test_parallel_loader(tmp_path, tiled_file_list, max_buffer_bytes):
+    outfile = tmp_path / "stack.vrt"
+    vrt_stack = VRTStack(tiled_file_list, outfile=outfile, keep_open=True)
+    loader = EagerLoader(reader=vrt_stack, block_shape=(32, 32))
+    expected_blocks, expected_slices = zip(*list(loader.iter_blocks()))
+
+    loader = ParallelLoader(
+        reader=vrt_stack,
+        block_shape=(32, 32),
+        num_threads=3,
+        max_buffer_bytes=max_buffer_bytes,
+    )
+    blocks, slices = zip(*list(loader.iter_blocks()))
+    # Blocks come back in the same order as the single-threaded loader
+    assert slices == expected_slices
+    for b, expected in zip(blocks, expected_blocks):
+        npt.assert_array_equal(b, expected)
+    loader.notify_finished()
+
+
 @pytest.fixture()
 def test_vrt():
     return """<VRTDataset rasterXSize="128" rasterYSize="128">
@@ -540,3 +609,184 @@ class TestEagerLoader:
         blocks, slices = zip(*list(loader.iter_blocks()))
         loader.notify_finished()
         assert len(blocks) == expected_num_blocks - 1
+
+
+@pytest.fixture()
+def s3_slc_urls(monkeypatch, slc_file_list):
+    """Upload the SLC files to a local moto S3 server."""
+    pytest.importorskip("moto")
+    boto3 = pytest.importorskip("boto3")
+    from moto.server import ThreadedMotoServer
+
+    for key in ("AWS_ACCESS_KEY_ID", "AWS_SECRET_ACCESS_KEY"):
+        monkeypatch.setenv(key, "testing")
+    monkeypatch.setenv("AWS_DEFAULT_REGION", "us-east-1")
+
+    server = ThreadedMotoServer(port=0)
+    server.start()
+    host, port = server.get_host_and_port()
+    endpoint = f"{host}:{port}"
+    client = boto3.client("s3", endpoint_url=f"http://{endpoint}")
+    client.create_bucket(Bucket="test-bucket")
+    urls = []
+    for f in slc_file_list:
+        client.upload_file(str(f), "test-bucket", f"slcs/{f.name}")
+        urls.append(f"s3://test-bucket/slcs/{f.name}")
+    yield urls, endpoint
+    server.stop()
+
+
+@pytest.mark.filterwarnings("ignore::rasterio.errors.NotGeoreferencedWarning")
+def test_s3_stack_reader(s3_slc_urls, slc_stack):
+    urls, endpoint = s3_slc_urls
+    gdal_config = {
+        "AWS_S3_ENDPOINT": endpoint,
+        "AWS_HTTPS": "NO",
+        "AWS_VIRTUAL_HOSTING": "FALSE",
+    }
+    reader = S3StackReader.from_file_list(
+        urls, max_concurrency=4, gdal_config=gdal_config
+    )
+    assert reader.shape == slc_stack.shape
+    assert reader.dtype == slc_stack.dtype
+    npt.assert_array_equal(reader[:, 1:5, 2:8], slc_stack[:, 1:5, 2:8])
+    npt.assert_array_equal(reader[2, :, :], slc_stack[2])
+
+
+@pytest.mark.filterwarnings("ignore::rasterio.errors.NotGeoreferencedWarning")
+def test_s3_stack_reader_local_files(monkeypatch, slc_file_list, slc_stack):
+    # The reading doesn't depend on S3, so test it on local files
+    readers = [RasterReader.from_file(f) for f in slc_file_list]
+    reader = S3StackReader(file_list=slc_file_list, readers=readers, max_concurrency=2)
+
+    num_opens = 0
+    rio_open = rio.open
+
+    def counting_open(*args, **kwargs):
+        nonlocal num_opens
+        num_opens += 1
+        return rio_open(*args, **kwargs)
+
+    monkeypatch.setattr(rio, "open", counting_open)
+    with reader:
+        npt.assert_array_equal(reader[:, 1:5, 2:8], slc_stack[:, 1:5, 2:8])
+        executor = reader._executor
+        npt.assert_array_equal(reader[:, 5:9, 2:8], slc_stack[:, 5:9, 2:8])
+        npt.assert_array_equal(reader[2, ::2, :], slc_stack[2, ::2])
+        # One thread pool for all reads, and each file is opened once per thread
+        assert reader._executor is executor
+        assert num_opens <= 2 * len(slc_file_list)
+
+        # Reading works inside a running event loop
+        async def _read():
+            return reader[:, 1:5, 2:8], await reader.read_async(
+                (1, slice(2, 4), slice(None))
+            )
+
+        block, band = asyncio.run(_read())
+        npt.assert_array_equal(block, slc_stack[:, 1:5, 2:8])
+        npt.assert_array_equal(band, slc_stack[1, 2:4])
+    assert reader._executor is None
+
+    # The reader can be pickled and reused
+    reader2 = pickle.loads(pickle.dumps(reader))
+    npt.assert_array_equal(reader2[0, :, :], slc_stack[0])
+    reader2.close()
+
+
+@pytest.fixture()
+def partly_empty_file_list(tmp_path):
+    """Stack of (100, 200) rasters with valid data only in the bottom-right."""
+    shape = (100, 200)
+    driver = gdal.GetDriverByName("GTiff")
+    file_list = []
+    for i in range(3):
+        data = np.full(shape, np.nan, dtype=np.float32)
+        data[60:, 120:] = np.random.rand(40, 80)
+        fname = tmp_path / f"2022010{i + 1}.tif"
+        ds = driver.Create(fspath(fname), shape[1], shape[0], 1, gdal.GDT_Float32)
+        ds.GetRasterBand(1).WriteArray(data)
+        ds.GetRasterBand(1).SetNoDataValue(np.nan)
+        ds = None
+        file_list.append(fname)
+    return file_list
+
+
+def test_footprint_index(tmp_path, partly_empty_file_list):
+    vrt_stack = VRTStack(partly_empty_file_list, outfile=tmp_path / "stack.vrt")
+    footprint = FootprintIndex.from_stack(
+        vrt_stack, cell_shape=(10, 10), max_files=None
+    )
+    assert footprint.valid.shape == (10, 20)
+    assert footprint.valid_window(slice(0, 100), slice(0, 200)) == (
+        slice(60, 100),
+        slice(120, 200),
+    )
+    assert footprint.is_empty(slice(0, 40), slice(0, 100))
+    assert not footprint.is_empty(slice(32, 64), slice(96, 128))
+
+    cache_file = tmp_path / "stack.footprint.npz"
+    assert cache_file.exists()
+    cached = FootprintIndex.from_file(cache_file)
+    npt.assert_array_equal(cached.valid, footprint.valid)
+    assert cached.file_list == footprint.file_list
+    assert len(cached.file_stats) == len(cached.file_list)
+
+    loader = EagerLoader(reader=vrt_stack, block_shape=(32, 32))
+    expected_blocks, expected_slices = zip(*list(loader.iter_blocks()))
+    loader = ParallelLoader(reader=vrt_stack, block_shape=(32, 32), footprint=footprint)
+    blocks, slices = zip(*list(loader.iter_blocks()))
+    assert slices == expected_slices
+    for b, expected in zip(blocks, expected_blocks):
+        npt.assert_array_equal(b, expected)
+
+
+def test_footprint_index_max_files(tmp_path, partly_empty_file_list):
+    vrt_stack = VRTStack(partly_empty_file_list, outfile=tmp_path / "stack.vrt")
+    cache_file = tmp_path / "stack.footprint.npz"
+    # Only the first and last rasters are scanned, and the cells are grown by one
+    footprint = FootprintIndex.from_stack(vrt_stack, cell_shape=(10, 10), max_files=2)
+    assert footprint.valid_window(slice(0, 100), slice(0, 200)) == (
+        slice(50, 100),
+        slice(110, 200),
+    )
+
+    # A replaced input raster is rescanned instead of using the cached index
+    data = np.full((100, 200), np.nan, dtype=np.float32)
+    data[:10, :10] = 1
+    io.write_arr(arr=data, output_name=partly_empty_file_list[-1], nodata=np.nan)
+    footprint = FootprintIndex.from_stack(
+        vrt_stack, cell_shape=(10, 10), cache_file=cache_file, max_files=2
+    )
+    assert not footprint.is_empty(slice(0, 10), slice(0, 10))
+
+
+def test_footprint_index_small_patch(tmp_path):
+    # Files with no nodata value, zeros outside a 3x3 valid patch inside one cell
+    shape = (200, 300)
+    file_list = []
+    for i in range(2):
+        data = np.zeros(shape, dtype=np.complex64)
+        data[70:73, 150:153] = 1 + 1j
+        fname = tmp_path / f"2022010{i + 1}.tif"
+        io.write_arr(arr=data, output_name=fname)
+        file_list.append(fname)
+    vrt_stack = VRTStack(file_list, outfile=tmp_path / "stack.vrt")
+    footprint = FootprintIndex.from_stack(vrt_stack, cell_shape=(64, 64))
+    # Only the cell with the patch is valid
+    assert footprint.valid.sum() == 1
+    assert footprint.valid[1, 2]
+
+    loader = ParallelLoader(reader=vrt_stack, block_shape=(128, 128))
+    expected = [
+        (b, rc) for b, rc in loader.iter_blocks() if not footprint.is_empty(*rc)
+    ]
+    loader = ParallelLoader(
+        reader=vrt_stack, block_shape=(128, 128), footprint=footprint
+    )
+    blocks = list(loader.iter_blocks())
+    assert len(blocks) == len(expected) == 1
+    (block, slices), (expected_block, expected_slices) = blocks[0], expected[0]
+    assert slices == expected_slices
+    # The skipped part of the block is filled with zeros, like the files
+    npt.assert_array_equal(block, expected_block)
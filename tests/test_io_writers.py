@@ -2,6 +2,7 @@ import warnings
 from pathlib import Path
 
 import numpy as np
+import numpy.testing as npt
 import pytest
 import rasterio as rio
 from rasterio.errors import NotGeoreferencedWarning
@@ -11,6 +12,8 @@ from dolphin.io._writers import (
     BackgroundBlockWriter,
     BackgroundRasterWriter,
     BackgroundStackWriter,
+    HDF5StackWriter,
+    PooledBlockWriter,
     RasterWriter,
 )
 
@@ -55,6 +58,28 @@ def test_background_block_writer(output_file_list, slc_file_list):
     assert np.allclose(load_gdal(output_file_list[0], rows=rows, cols=cols), data)
 
 
+@pytest.mark.parametrize("debug", [False, True])
+def test_pooled_block_writer(output_file_list, slc_file_list, slc_stack, debug):
+    from dolphin.io import write_arr
+
+    for f in output_file_list:
+        write_arr(arr=None, output_name=f, like_filename=slc_file_list[0])
+    # Only allow 1 open file per thread to check that evicted files get written
+    w = PooledBlockWriter(num_threads=2, max_open_files=2, debug=debug)
+    nrows, ncols = slc_stack.shape[-2:]
+    block_rows, block_cols = 7, 9
+    for row in range(0, nrows, block_rows):
+        for col in range(0, ncols, block_cols):
+            rows = slice(row, row + block_rows)
+            cols = slice(col, col + block_cols)
+            for f, slc in zip(output_file_list, slc_stack):
+                w.queue_write(slc[rows, cols], f, row, col)
+    w.notify_finished()
+
+    for f, slc in zip(output_file_list, slc_stack):
+        npt.assert_array_equal(load_gdal(f), slc)
+
+
 # #### RasterReader Tests ####
 class TestRasterWriter:
     def raster_init(self, slc_file_list, slc_stack):
@@ -150,3 +175,131 @@ class TestBackgroundStackWriter:
             assert np.allclose(
                 load_gdal(output_file_list[i], rows=rows, cols=cols), data[i]
             )
+
+
+def test_pooled_block_writer_keep_bits(tmp_path):
+    from dolphin.io import DEFAULT_TIFF_OPTIONS, round_mantissa, write_arr
+
+    shape = (300, 200)
+    data = np.random.randn(*shape).astype(np.float32)
+    out_file = tmp_path / "out.tif"
+    write_arr(
+        arr=None,
+        output_name=out_file,
+        shape=shape,
+        dtype=np.float32,
+        options=DEFAULT_TIFF_OPTIONS,
+    )
+    w = PooledBlockWriter(num_threads=1)
+    # Blocks which don't line up with the 128x128 tiles
+    for row in range(0, shape[0], 50):
+        for col in range(0, shape[1], 60):
+            block = data[row : row + 50, col : col + 60]
+            w.queue_write(block, out_file, row, col, keep_bits=8)
+    w.notify_finished()
+
+    expected = data.copy()
+    round_mantissa(expected, keep_bits=8)
+    npt.assert_array_equal(load_gdal(out_file), expected)
+    # The caller's data is not modified
+    assert not np.array_equal(data, expected)
+
+
+def test_pooled_block_writer_skipped_blocks(tmp_path):
+    from dolphin.io import repack_raster, write_arr
+    from dolphin.io._utils import _format_for_gdal, get_gtiff_options
+
+    shape = (600, 500)
+    data = np.random.randn(*shape).astype(np.float32)
+    out_file = tmp_path / "out.tif"
+    write_arr(
+        arr=None,
+        output_name=out_file,
+        shape=shape,
+        dtype=np.float32,
+        options=_format_for_gdal(get_gtiff_options()),
+    )
+    expected = np.zeros(shape, dtype=np.float32)
+    w = PooledBlockWriter(num_threads=1)
+    # Blocks start after a margin (like the strided phase linking outputs),
+    # and one block is skipped (like the blocks outside the nodata mask)
+    block_rows, block_cols, margin = 70, 110, 5
+    for row in range(margin, shape[0] - margin, block_rows):
+        for col in range(margin, shape[1] - margin, block_cols):
+            if (row, col) == (margin + block_rows, margin + block_cols):
+                continue
+            rows = slice(row, min(row + block_rows, shape[0] - margin))
+            cols = slice(col, min(col + block_cols, shape[1] - margin))
+            expected[rows, cols] = data[rows, cols]
+            w.queue_write(data[rows, cols], out_file, row, col)
+    w.notify_finished()
+
+    npt.assert_array_equal(load_gdal(out_file), expected)
+    # Each tile was written once, so the file has no dead space to repack
+    assert w.rewritten_files == []
+    repacked = repack_raster(out_file, output_dir=tmp_path / "repacked")
+    assert out_file.stat().st_size <= repacked.stat().st_size
+
+
+def test_pooled_block_writer_many_wide_outputs(tmp_path):
+    from dolphin.io import write_arr
+    from dolphin.io._utils import _format_for_gdal, get_gtiff_options
+
+    shape, num_outputs = (700, 3000), 24
+    out_files = [tmp_path / f"out_{i}.tif" for i in range(num_outputs)]
+    for f in out_files:
+        write_arr(
+            arr=None,
+            output_name=f,
+            shape=shape,
+            dtype=np.float32,
+            options=_format_for_gdal(get_gtiff_options()),
+        )
+    rng = np.random.default_rng(0)
+    expected = np.zeros((num_outputs, *shape), dtype=np.float32)
+    # Fewer open files than outputs, so handles are closed between rows
+    w = PooledBlockWriter(num_threads=2, max_open_files=4)
+    block_rows, block_cols, margin = 200, 512, 5
+    for row in range(margin, shape[0] - margin, block_rows):
+        for col in range(margin, shape[1] - margin, block_cols):
+            rows = slice(row, min(row + block_rows, shape[0] - margin))
+            cols = slice(col, min(col + block_cols, shape[1] - margin))
+            # Like phase linking, each block is written to every output
+            for f, out in zip(out_files, expected):
+                out[rows, cols] = rng.random(out[rows, cols].shape)
+                w.queue_write(out[rows, cols], f, row, col)
+    w.notify_finished()
+
+    assert w.rewritten_files == []
+    for f, out in zip(out_files, expected):
+        npt.assert_array_equal(load_gdal(f), out)
+
+
+def test_hdf5_stack_writer(tmp_path, slc_file_list, slc_stack):
+    from dolphin.io import HDF5Reader, StackReader
+
+    out_file = tmp_path / "stack.h5"
+    w = HDF5StackWriter(
+        out_file,
+        shape=slc_stack.shape,
+        dtype=slc_stack.dtype,
+        like_filename=slc_file_list[0],
+        chunks=(8, 8),
+        chunk_layers=4,
+    )
+    rows, cols = slice(0, 5), slice(3, 10)
+    w[..., rows, cols] = slc_stack[:, rows, cols]
+    w[:, 5:, :] = slc_stack[:, 5:, :]
+    w.close()
+
+    reader = HDF5Reader(out_file, dset_name="data")
+    assert isinstance(reader, StackReader)
+    # Each chunk holds a bounded number of layers
+    assert reader.chunks == (4, 8, 8)
+    npt.assert_array_equal(reader[:, rows, cols], slc_stack[:, rows, cols])
+    npt.assert_array_equal(reader[:, 5:, :], slc_stack[:, 5:, :])
+
+    out_files = w.to_geotiffs([tmp_path / f"layer_{i}.tif" for i in range(w.shape[0])])
+    assert len(out_files) == len(slc_stack)
+    npt.assert_array_equal(load_gdal(out_files[2])[5:], slc_stack[2, 5:])
+    npt.assert_array_equal(load_gdal(out_files[-1])[:5, 3:10], slc_stack[-1, :5, 3:10])
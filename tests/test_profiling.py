@@ -0,0 +1,71 @@
+import json
+
+import pytest
+
+from dolphin import _profiling
+
+
+@pytest.fixture()
+def profiler(monkeypatch):
+    monkeypatch.setattr(_profiling, "_PROFILER", _profiling._Profiler())
+    _profiling.enable_profiling()
+    return _profiling._PROFILER
+
+
+@_profiling.profile("add")
+def _add_block(a, b):
+    return a + b
+
+
+def test_profile_disabled(monkeypatch):
+    monkeypatch.setattr(_profiling, "_PROFILER", _profiling._Profiler())
+    assert not _profiling.is_profiling()
+    assert _add_block(1, 2) == 3
+    with _profiling.stage("nothing") as stats:
+        pass
+    assert stats.wall_seconds == 0
+    assert _profiling._PROFILER._events == []
+
+
+def test_stage_records_blocks(tmp_path, profiler):
+    with _profiling.stage("outer") as stats:
+        assert _add_block(1, 2) == 3
+        assert _add_block(3, 4) == 7
+        stats.add(pixels=10)
+        stats.add(pixels=5)
+
+    assert stats.blocks == 2
+    assert stats.counts == {"pixels": 15}
+    assert stats.wall_seconds > 0
+    assert stats.peak_rss_mb > 0
+
+    trace_file = _profiling.write_trace(tmp_path / "trace.json")
+    with open(trace_file) as f:
+        events = json.load(f)["traceEvents"]
+    assert [e["name"] for e in events] == ["add", "add", "outer"]
+    assert all(e["ph"] == "X" for e in events)
+    assert events[-1]["args"]["blocks"] == 2
+    assert profiler._totals[("block", "add")]["calls"] == 2
+
+    # Should log without errors
+    _profiling.log_summary()
+
+
+def test_enable_profiling_reset(profiler):
+    with _profiling.stage("first"):
+        _add_block(1, 2)
+    assert profiler.num_blocks == 1
+
+    # Enabling again keeps the events, unless starting a new run
+    _profiling.enable_profiling()
+    assert len(profiler._events) == 2
+    _profiling.enable_profiling(reset=True)
+    assert profiler._events == []
+    assert profiler._totals == {}
+    assert profiler.num_blocks == 0
+
+    with _profiling.stage("second") as stats:
+        _add_block(1, 2)
+    assert stats.blocks == 1
+    assert [e["name"] for e in profiler._events] == ["add", "second"]
+    assert 0 <= stats.peak_rss_increase_mb <= stats.peak_rss_mb
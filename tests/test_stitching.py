@@ -1,5 +1,7 @@
 from pathlib import Path
 
+import numpy as np
+import numpy.testing as npt
 import pytest
 from make_netcdf import create_test_nc
 from pyproj import CRS
@@ -194,3 +196,104 @@ def test_merge_images_one_image_out_bounds_specified(
 
     b = io.get_raster_bounds(outfile2)
     assert b == buffered_bounds
+
+
+def test_stitch_plan_same_as_merge_images(tmp_path, shifted_slc_files):
+    outfile = tmp_path / "stitched.tif"
+    stitching.merge_images(shifted_slc_files, outfile)
+
+    plan = stitching.StitchPlan.from_files(shifted_slc_files)
+    outfile_plan = tmp_path / "stitched_plan.tif"
+    stitching.merge_images(shifted_slc_files, outfile_plan, plan=plan)
+
+    assert io.get_raster_bounds(outfile_plan) == io.get_raster_bounds(outfile)
+    npt.assert_array_equal(io.load_gdal(outfile_plan), io.load_gdal(outfile))
+
+
+def test_stitch_plan_file(tmp_path, shifted_slc_files):
+    plan_file = tmp_path / "stitch_plan.json"
+    plan = stitching.get_stitch_plan(shifted_slc_files, plan_file=plan_file)
+    assert plan_file.exists()
+    assert stitching.StitchPlan.from_file(plan_file) == plan
+
+    assert plan.matches(shifted_slc_files)
+    assert not plan.matches(shifted_slc_files[:-1])
+    assert not plan.matches(shifted_slc_files[::-1])
+
+    # Different output options need a new plan
+    assert not plan.matches(shifted_slc_files, target_aligned_pixels=False)
+    assert not plan.matches(shifted_slc_files, out_bounds=(-5, -4, 8, 9))
+    assert not plan.matches(shifted_slc_files, strides={"x": 2, "y": 2})
+    # Strides are only used when both are > 1
+    assert plan.matches(shifted_slc_files, strides={"x": 2, "y": 1})
+
+    bounds = Bbox(-5, -4, 8, 9)
+    plan2 = stitching.get_stitch_plan(
+        shifted_slc_files, plan_file=plan_file, out_bounds=bounds
+    )
+    assert plan2 != plan
+    assert plan2.matches(shifted_slc_files, out_bounds=bounds)
+    assert stitching.StitchPlan.from_file(plan_file) == plan2
+
+
+@pytest.fixture()
+def reprojected_files(tmp_path):
+    """Make two UTM zone 11 bursts, and one overlapping burst in zone 10."""
+    from pyproj import Transformer
+
+    rows, cols = np.mgrid[:50, :60]
+    data = (1 + rows + cols).astype(np.float32)
+    file_list = []
+    for i, ulx in enumerate([230_000, 231_200]):
+        fname = tmp_path / f"utm11_{i}.tif"
+        io.write_arr(
+            arr=data,
+            output_name=fname,
+            geotransform=(ulx, 30.0, 0.0, 3_800_000, 0.0, -30.0),
+            projection=32611,
+            nodata=0,
+        )
+        file_list.append(fname)
+
+    x10, y10 = Transformer.from_crs(32611, 32610, always_xy=True).transform(
+        230_600, 3_799_400
+    )
+    fname = tmp_path / "utm10.tif"
+    io.write_arr(
+        arr=data,
+        output_name=fname,
+        geotransform=(x10, 30.0, 0.0, y10, 0.0, -30.0),
+        projection=32610,
+        nodata=0,
+    )
+    file_list.append(fname)
+    return file_list
+
+
+def test_stitch_plan_reprojected(tmp_path, reprojected_files):
+    plan = stitching.StitchPlan.from_files(reprojected_files)
+    # The warped grid is the same as the one from `gdal.Warp(targetAlignedPixels)`
+    projection = stitching._get_mode_projection(reprojected_files)
+    warped = stitching.warp_to_projection(
+        reprojected_files, dirname=tmp_path, projection=projection
+    )
+    assert plan.placements[0].warp_bounds is None
+    npt.assert_allclose(
+        plan.placements[-1].warp_bounds, io.get_raster_bounds(warped[-1])
+    )
+
+    outfile = tmp_path / "stitched.tif"
+    stitching.merge_images(reprojected_files, outfile)
+    outfile_plan = tmp_path / "stitched_plan.tif"
+    stitching.merge_images(reprojected_files, outfile_plan, plan=plan)
+    npt.assert_allclose(
+        io.get_raster_bounds(outfile_plan), io.get_raster_bounds(outfile)
+    )
+    npt.assert_allclose(io.load_gdal(outfile_plan), io.load_gdal(outfile))
+
+
+def test_get_num_stitching_workers():
+    assert stitching.get_num_stitching_workers(1, gdal_cache_max_mb=10_000) == 1
+    # Too little cache to run more than one worker
+    assert stitching.get_num_stitching_workers(8, gdal_cache_max_mb=100) == 1
+    assert stitching.get_num_stitching_workers(8, gdal_cache_max_mb=512) <= 2
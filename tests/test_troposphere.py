@@ -0,0 +1,162 @@
+import os
+from dataclasses import replace
+
+import numpy as np
+import numpy.testing as npt
+import pytest
+from scipy.interpolate import RegularGridInterpolator
+
+from dolphin import io
+from dolphin._types import TropoModel
+from dolphin.atmosphere.troposphere import DelayGrid, DelayProjector
+
+
+@pytest.fixture
+def grid():
+    return DelayGrid(
+        x_coordinates=np.linspace(500_000, 510_000, 11),
+        y_coordinates=np.linspace(4_010_000, 4_000_000, 11),
+        z_coordinates=np.array([0.0, 1000.0, 2000.0]),
+        SNWE=(36.1, 36.2, -117.1, -117.0),
+        epsg=32611,
+        tropo_model=TropoModel.ERA5,
+        delay_type="comb",
+    )
+
+
+@pytest.fixture
+def weather_file(tmp_path):
+    fname = tmp_path / "ERA5_2020-01-01.nc"
+    fname.write_bytes(b"weather model")
+    return fname
+
+
+def test_cache_file_reused(grid, weather_file, tmp_path):
+    cache_file = grid.get_cache_file(tmp_path, weather_file)
+    assert cache_file.parent == tmp_path
+    assert cache_file == grid.get_cache_file(tmp_path, weather_file)
+    # A new (but equal) grid reuses the cube
+    same_grid = replace(grid, x_coordinates=grid.x_coordinates.copy())
+    assert cache_file == same_grid.get_cache_file(tmp_path, weather_file)
+
+
+def test_cache_file_changed_inputs(grid, weather_file, tmp_path):
+    cache_file = grid.get_cache_file(tmp_path, weather_file)
+    new_grids = [
+        replace(grid, delay_type="wet"),
+        replace(grid, x_coordinates=grid.x_coordinates + 100),
+        replace(grid, z_coordinates=np.array([0.0, 500.0, 1000.0, 2000.0])),
+        replace(grid, SNWE=(36.0, 36.2, -117.1, -117.0)),
+        replace(grid, tropo_model=TropoModel.HRRR),
+    ]
+    for new_grid in new_grids:
+        assert new_grid.get_cache_file(tmp_path, weather_file) != cache_file
+
+    # An updated weather model file is not matched to the old cube
+    mtime_ns = weather_file.stat().st_mtime_ns
+    os.utime(weather_file, ns=(mtime_ns, mtime_ns + 10**9))
+    assert grid.get_cache_file(tmp_path, weather_file) != cache_file
+
+
+class TestDelayProjector:
+    # (rows, cols) of the frame, with 100 m pixels in UTM zone 11N
+    shape = (40, 50)
+    geotransform = (500_000.0, 100.0, 0.0, 4_010_000.0, 0.0, -100.0)
+    epsg = 32611
+
+    @pytest.fixture
+    def cube_grid(self, grid):
+        # Coordinates are spaced unevenly, and the y axis is descending
+        return replace(
+            grid,
+            x_coordinates=np.array([499_000.0, 501_500.0, 503_000.0, 506_000.0]),
+            y_coordinates=np.array([4_011_000.0, 4_008_000.0, 4_007_000.0, 4_005_000]),
+            z_coordinates=np.array([0.0, 500.0, 1000.0, 2000.0]),
+        )
+
+    @pytest.fixture
+    def geo_files(self, tmp_path):
+        rng = np.random.default_rng(1234)
+        dem = rng.uniform(0, 1500, size=self.shape).astype(np.float32)
+        # Heights above and below the delay cube
+        dem[3, 4] = 3000
+        dem[20, 30] = -50
+        incidence_angle = np.full(self.shape, 30, dtype=np.float32)
+        # Invalid geometry is masked
+        incidence_angle[10, :5] = 0
+
+        geo_files = {}
+        for name, arr in [("height", dem), ("incidence_angle", incidence_angle)]:
+            geo_files[name] = tmp_path / f"{name}.tif"
+            io.write_arr(
+                arr=arr,
+                output_name=geo_files[name],
+                geotransform=self.geotransform,
+                projection=self.epsg,
+            )
+        return geo_files
+
+    @pytest.fixture
+    def delay_cube(self, cube_grid):
+        rng = np.random.default_rng(0)
+        shape = tuple(
+            len(c)
+            for c in (
+                cube_grid.z_coordinates,
+                cube_grid.y_coordinates,
+                cube_grid.x_coordinates,
+            )
+        )
+        return rng.uniform(1.0, 2.5, size=shape).astype(np.float32)
+
+    def _get_expected(self, cube_grid, delay_cube, geo_files):
+        interp = RegularGridInterpolator(
+            (
+                cube_grid.z_coordinates,
+                cube_grid.y_coordinates[::-1],
+                cube_grid.x_coordinates,
+            ),
+            delay_cube[:, ::-1, :],
+            bounds_error=False,
+            fill_value=np.nan,
+        )
+        x_origin, x_res, _, y_origin, _, y_res = self.geotransform
+        nrows, ncols = self.shape
+        yy, xx = np.meshgrid(
+            y_origin + (np.arange(nrows) + 0.5) * y_res,
+            x_origin + (np.arange(ncols) + 0.5) * x_res,
+            indexing="ij",
+        )
+        dem = io.load_gdal(geo_files["height"])
+        incidence_angle = io.load_gdal(geo_files["incidence_angle"])
+        scale = np.where(incidence_angle > 0, 1 / np.cos(np.deg2rad(30)), 0)
+        return interp(np.stack([dem, yy, xx], axis=-1)) * scale
+
+    def test_project(self, cube_grid, delay_cube, geo_files):
+        projector = DelayProjector(
+            cube_grid, self.geotransform, self.shape, geo_files, block_rows=16
+        )
+        expected = self._get_expected(cube_grid, delay_cube, geo_files)
+        out = projector.project(delay_cube)
+        assert out.shape == self.shape
+        npt.assert_allclose(out, expected, rtol=1e-5, atol=1e-6)
+
+        # Heights outside of the cube have no delay
+        outside = np.zeros(self.shape, dtype=bool)
+        outside[3, 4] = outside[20, 30] = True
+        assert np.isnan(out[outside]).all()
+        assert np.isfinite(out[~outside]).all()
+        npt.assert_array_equal(out[10, :5], 0)
+
+    def test_reference_point(self, cube_grid, delay_cube, geo_files):
+        projector = DelayProjector(
+            cube_grid, self.geotransform, self.shape, geo_files, block_rows=16
+        )
+        expected = self._get_expected(cube_grid, delay_cube, geo_files)
+        get_block = projector.get_block_getter(delay_cube, reference_point=(25, 12))
+        rows = slice(16, 32)
+        block = get_block(rows)
+        assert block[25 - 16, 12] == 0
+        npt.assert_allclose(
+            block, expected[rows] - expected[25, 12], rtol=1e-5, atol=1e-5
+        )
@@ -0,0 +1,77 @@
+import pytest
+
+from dolphin.unwrap import (
+    UnwrapJob,
+    estimate_unwrap_bytes,
+    estimate_unwrap_cpus,
+    run_jobs,
+)
+from dolphin.workflows import UnwrapMethod, UnwrapOptions
+
+
+def test_estimate_unwrap_bytes():
+    opts = UnwrapOptions()
+    small = estimate_unwrap_bytes((1000, 1000), opts)
+    large = estimate_unwrap_bytes((2000, 2000), opts)
+    assert large == 4 * small
+
+    # Tiling only holds the tiles being unwrapped in memory
+    tiled = UnwrapOptions(snaphu_options={"ntiles": (2, 2), "n_parallel_tiles": 1})
+    assert estimate_unwrap_bytes((2000, 2000), tiled) < large
+    parallel = UnwrapOptions(snaphu_options={"ntiles": (2, 2), "n_parallel_tiles": 4})
+    assert estimate_unwrap_bytes((2000, 2000), parallel) > large
+
+    # Filtering keeps extra copies of the interferogram
+    filtered = UnwrapOptions(run_goldstein=True)
+    assert estimate_unwrap_bytes((1000, 1000), filtered) > small
+
+    # Downsampling shrinks the coarse unwrapping
+    phass = UnwrapOptions(unwrap_method=UnwrapMethod.PHASS)
+    phass_downsampled = UnwrapOptions(
+        unwrap_method=UnwrapMethod.PHASS,
+        tophu_options={"ntiles": (2, 2), "downsample_factor": (3, 3)},
+    )
+    assert estimate_unwrap_bytes((1000, 1000), phass_downsampled) < (
+        estimate_unwrap_bytes((1000, 1000), phass)
+    )
+
+
+@pytest.mark.parametrize(
+    ("snaphu_options", "expected"),
+    [
+        ({}, 1),
+        ({"n_parallel_tiles": 4}, 1),
+        ({"ntiles": (2, 2), "n_parallel_tiles": 4}, 4),
+        ({"ntiles": (2, 1), "n_parallel_tiles": 4}, 2),
+    ],
+)
+def test_estimate_unwrap_cpus(snaphu_options, expected):
+    opts = UnwrapOptions(snaphu_options=snaphu_options)
+    assert estimate_unwrap_cpus(opts) == expected
+
+
+def test_run_jobs_largest_first():
+    started = []
+
+    def func(name):
+        started.append(name)
+        return name
+
+    jobs = [
+        UnwrapJob(name, num_bytes, kwargs={"name": name})
+        for name, num_bytes in [("a", 1), ("b", 3), ("c", 2)]
+    ]
+    results = run_jobs(func, jobs, max_jobs=1, num_cpus=1, total_memory_gb=1)
+    assert started == ["b", "c", "a"]
+    # The results are in the order of the jobs
+    assert results == ["a", "b", "c"]
+
+
+def test_run_jobs_process_pool():
+    jobs = [
+        UnwrapJob(str(i), num_bytes=2**30, num_cpus=2, kwargs={"value": i})
+        for i in range(4)
+    ]
+    # Each job is over the memory budget, so they run one at a time
+    results = run_jobs(dict, jobs, max_jobs=2, num_cpus=2, total_memory_gb=0.5)
+    assert results == [{"value": i} for i in range(4)]
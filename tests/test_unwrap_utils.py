@@ -4,7 +4,7 @@ import numpy as np
 import pytest
 
 from dolphin import io
-from dolphin.unwrap import _utils
+from dolphin.unwrap import _post_process, _utils
 
 # Dataset has no geotransform, gcps, or rpcs. The identity matrix will be returned.
 pytestmark = pytest.mark.filterwarnings(
@@ -95,3 +95,55 @@ def test_set_nodata_values(corr_raster):
         a = src.read(1)
         assert np.all(a[:20] == -2)
         assert np.all(a[:, :20] == -2)
+
+
+def test_smooth_masked_areas(tmp_path):
+    rows, cols = np.mgrid[:300, :200]
+    # No ambiguities outside the masked area
+    unw = (0.005 * (rows + cols) - 1).astype(np.float32)
+    mask = np.ones(unw.shape, dtype=np.uint8)
+    mask[100:140, 50:90] = 0
+    # Add unwrapping errors in the masked area
+    bad_unw = unw.copy()
+    bad_unw[mask == 0] += 2 * np.pi * np.random.default_rng(0).integers(-2, 3, 1600)
+
+    unw_file = tmp_path / "test.unw.tif"
+    mask_file = tmp_path / "mask.tif"
+    io.write_arr(arr=bad_unw, output_name=unw_file)
+    io.write_arr(arr=mask, output_name=mask_file)
+    _post_process.smooth_masked_areas(
+        unw_file, mask_file, filter_sigma=5, block_rows=32
+    )
+    out = io.load_gdal(unw_file)
+    np.testing.assert_allclose(out, unw, atol=1e-5)
+
+    # The blocks match smoothing the whole image at once
+    expected = _post_process._smooth_masked_areas(bad_unw, mask == 0, filter_sigma=5)
+    np.testing.assert_allclose(out, expected)
+
+
+def test_create_combined_masks(tmp_path, mask_raster):
+    def _write(name, num_nodata_rows):
+        arr = np.ones((100, 200), dtype="float32")
+        arr[:num_nodata_rows] = np.nan
+        filename = tmp_path / name
+        io.write_arr(arr=arr, output_name=filename, nodata=np.nan)
+        return filename
+
+    image_files = [_write("a.tif", 20), _write("b.tif", 20), _write("c.tif", 50)]
+    # A footprint which differs from "a.tif" by one pixel
+    arr = io.load_gdal(image_files[0])
+    arr[60, 150] = np.nan
+    image_files.append(tmp_path / "d.tif")
+    io.write_arr(arr=arr, output_name=image_files[-1], nodata=np.nan)
+
+    out_files = _utils.create_combined_masks(mask_raster, image_files, tmp_path)
+    # Images with the same footprint share a mask
+    assert out_files[0] == out_files[1]
+    assert out_files[0] != out_files[2]
+    assert out_files[0] != out_files[3]
+    assert len(set(tmp_path.glob("combined_mask_*.tif"))) == 3
+    assert io.load_gdal(out_files[3])[60, 150] == 0
+    assert (io.load_gdal(out_files[0])[:20] == 0).all()
+    assert (io.load_gdal(out_files[2])[:50] == 0).all()
+    assert (io.load_gdal(out_files[2])[50:, 20:] == 1).all()
@@ -0,0 +1,124 @@
+from datetime import date
+
+import numpy as np
+import pytest
+
+from dolphin import io
+from dolphin.unwrap import (
+    get_prediction_paths,
+    get_spanning_pairs,
+    unwrap_from_prediction,
+)
+from dolphin.unwrap._unwrap import _predict_unwrapped
+from dolphin.workflows import UnwrapOptions
+
+DATES = [date(2022, 1, 1 + 12 * i) for i in range(3)]
+# Nearest-neighbor pairs, then the pair spanning both
+PAIRS = [(DATES[0], DATES[1]), (DATES[1], DATES[2]), (DATES[0], DATES[2])]
+
+
+def test_get_spanning_pairs():
+    assert get_spanning_pairs(PAIRS) == [0, 1]
+    # Disconnected dates each get their own tree
+    other = (date(2023, 1, 1), date(2023, 1, 13))
+    assert get_spanning_pairs([*PAIRS, other]) == [0, 1, 3]
+
+
+def test_get_prediction_paths():
+    assert get_prediction_paths(PAIRS, [0, 1]) == {2: [(0, 1), (1, 1)]}
+    # The pairs are summed with a sign to go from reference to secondary
+    assert get_prediction_paths(PAIRS, [0, 2]) == {1: [(0, -1), (2, 1)]}
+
+
+@pytest.fixture()
+def unwrapped_pairs(tmp_path):
+    rows, cols = np.mgrid[:100, :200]
+    ramp = 0.05 * (rows + cols)
+    phases = [0 * ramp, ramp, 2.5 * ramp]
+    rng = np.random.default_rng(1234)
+
+    files = []
+    for k, (i, j) in enumerate([(0, 1), (1, 2), (0, 2)]):
+        unw = (phases[j] - phases[i]).astype(np.float32)
+        noise = rng.normal(scale=0.05, size=unw.shape)
+        ifg_file = tmp_path / f"{k}.int.tif"
+        io.write_arr(
+            arr=np.exp(1j * (unw + noise)).astype(np.complex64), output_name=ifg_file
+        )
+        unw_file = tmp_path / f"{k}.unw.tif"
+        io.write_arr(arr=unw, output_name=unw_file)
+        cc_file = tmp_path / f"{k}.unw.conncomp.tif"
+        io.write_arr(arr=np.ones(unw.shape, dtype=np.uint16), output_name=cc_file)
+        files.append((ifg_file, unw_file, cc_file))
+    return files
+
+
+def test_unwrap_from_prediction(tmp_path, unwrapped_pairs):
+    (_, unw0, cc0), (_, unw1, cc1), (ifg, expected_file, _) = unwrapped_pairs
+    out_unw = tmp_path / "out.unw.tif"
+    out_cc = tmp_path / "out.unw.conncomp.tif"
+    fraction = unwrap_from_prediction(
+        ifg,
+        [unw0, unw1],
+        [cc0, cc1],
+        [1, 1],
+        out_unw,
+        out_cc,
+        block_rows=32,
+    )
+    assert fraction == 1
+    # Only the noise of the wrapped phase is left
+    expected = io.load_gdal(expected_file)
+    np.testing.assert_allclose(io.load_gdal(out_unw), expected, atol=0.5)
+    assert (io.load_gdal(out_cc) == 1).all()
+
+
+@pytest.fixture()
+def bad_unw0(tmp_path, unwrapped_pairs):
+    # An unwrapping error in one of the summed pairs
+    (_, unw0, _), _, _ = unwrapped_pairs
+    bad_unw0 = tmp_path / "bad.unw.tif"
+    arr = io.load_gdal(unw0)
+    arr[40:60, 50:100] += 2 * np.pi
+    io.write_arr(arr=arr, output_name=bad_unw0)
+    return bad_unw0
+
+
+def test_unwrap_from_prediction_unwrapping_error(tmp_path, unwrapped_pairs, bad_unw0):
+    (_, _, cc0), (_, unw1, cc1), (ifg, _, _) = unwrapped_pairs
+    out_cc = tmp_path / "out.unw.conncomp.tif"
+    fraction = unwrap_from_prediction(
+        ifg, [bad_unw0, unw1], [cc0, cc1], [1, 1], tmp_path / "out.unw.tif", out_cc
+    )
+    assert fraction < 0.99
+    # The error is cut off from the rest by its edges, so all of it is unreliable
+    cc = io.load_gdal(out_cc)
+    assert (cc[40:60, 50:100] == 0).all()
+    assert (cc[:30] == 1).all()
+
+
+@pytest.mark.parametrize("has_error", [False, True])
+def test_predict_unwrapped(tmp_path, unwrapped_pairs, bad_unw0, has_error):
+    (_, unw0, cc0), (_, unw1, cc1), (ifg, _, _) = unwrapped_pairs
+    ws_opts = UnwrapOptions().warm_start_options
+    out_unw = tmp_path / "out.unw.tif"
+    out_cc = tmp_path / "out.unw.conncomp.tif"
+    ok = _predict_unwrapped(
+        ifg,
+        out_unw,
+        out_cc,
+        min_fraction=ws_opts.min_fraction,
+        mask_filename=None,
+        unw_nodata=0,
+        ccl_nodata=0,
+        unw_filenames=[bad_unw0 if has_error else unw0, unw1],
+        conncomp_filenames=[cc0, cc1],
+        signs=[1, 1],
+        closure_threshold=ws_opts.closure_threshold,
+    )
+    # A pair with an error is sent back to the unwrapper, and leaves no output
+    # which a later run would skip
+    assert ok is not has_error
+    assert out_unw.exists() is not has_error
+    assert out_cc.exists() is not has_error
+    assert not list(tmp_path.glob("*.tmp.*"))
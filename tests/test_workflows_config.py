@@ -111,6 +111,7 @@ def test_worker_settings_defaults():
     assert ws.gpu_enabled is False
     assert ws.threads_per_worker == 1
     assert ws.block_shape == (512, 512)
+    assert ws.n_troposphere_workers == 4
 
 
 @pytest.fixture()
@@ -137,6 +138,22 @@ def dir_with_2_slcs(tmp_path, slc_file_list_nc):
     return p
 
 
+def test_correction_options_flags():
+    opts = config.CorrectionOptions()
+    # By default, only the correction rasters are written
+    assert opts.write_correction_rasters is True
+    assert opts.apply_to_timeseries is False
+    assert opts.tropo_cache_dir is None
+
+    opts = config.CorrectionOptions(
+        apply_to_timeseries=True, write_correction_rasters=False
+    )
+    assert opts.apply_to_timeseries is True
+    assert opts.write_correction_rasters is False
+    with pytest.raises(pydantic.ValidationError):
+        config.CorrectionOptions(apply_corrections=True)
+
+
 def test_inputs_defaults(dir_with_1_slc):
     # make a dummy file
     opts = config.DisplacementWorkflow(
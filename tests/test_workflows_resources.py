@@ -0,0 +1,78 @@
+import pytest
+
+from dolphin._types import HalfWindow, Strides
+from dolphin.workflows._resources import estimate_block_bytes, plan_resources
+from dolphin.workflows.config import ShpMethod, WorkerSettings
+
+HALF_WINDOW = HalfWindow(y=5, x=11)
+STRIDES = Strides(y=2, x=6)
+
+
+def test_estimate_block_bytes():
+    small = estimate_block_bytes((256, 256), 20, HALF_WINDOW, STRIDES)
+    large = estimate_block_bytes((512, 512), 20, HALF_WINDOW, STRIDES)
+    assert 3 * small < large
+    # Covariance matrices grow with nslc**2
+    more_slcs = estimate_block_bytes((256, 256), 40, HALF_WINDOW, STRIDES)
+    assert more_slcs > 2 * small
+    # KS keeps the whole amplitude stack
+    ks = estimate_block_bytes(
+        (256, 256), 20, HALF_WINDOW, STRIDES, shp_method=ShpMethod.KS
+    )
+    assert ks > small
+
+
+@pytest.mark.parametrize("worker_memory_gb", [0.5, 2, 8])
+def test_plan_resources_fits_budget(worker_memory_gb):
+    plan = plan_resources(
+        worker_memory_gb,
+        nslc=25,
+        half_window=HALF_WINDOW,
+        strides=STRIDES,
+        num_bursts=10,
+        total_memory_gb=16,
+        num_cpus=8,
+    )
+    assert plan.block_bytes <= worker_memory_gb * 2**30
+    assert plan.block_shape[0] % STRIDES.y == 0
+    assert plan.block_shape[1] % STRIDES.x == 0
+    assert plan.n_parallel_bursts == min(8, int(16 // worker_memory_gb))
+    assert plan.threads_per_worker == max(1, 8 // plan.n_parallel_bursts)
+
+
+def test_plan_resources_larger_budget():
+    kwargs = {"nslc": 25, "half_window": HALF_WINDOW, "strides": STRIDES}
+    small = plan_resources(1, **kwargs)
+    large = plan_resources(4, **kwargs)
+    assert large.block_shape[0] > small.block_shape[0]
+
+    # Blocks are no bigger than the input rasters
+    plan = plan_resources(16, arr_shape=(300, 1000), **kwargs)
+    assert plan.block_shape[0] <= 300
+    assert plan.block_shape[1] <= 1000
+
+
+@pytest.mark.parametrize("worker_memory_gb", [0.5, 1])
+def test_plan_resources_read_buffer(worker_memory_gb):
+    kwargs = {"nslc": 25, "half_window": HALF_WINDOW, "strides": STRIDES}
+    worker_bytes = worker_memory_gb * 2**30
+    # By default, a quarter of the budget is left for reading ahead
+    assert WorkerSettings().read_buffer_mb is None
+    plan = plan_resources(worker_memory_gb, **kwargs)
+    assert plan.read_buffer_mb == int(worker_memory_gb * 1024 / 4)
+    assert plan.block_bytes + plan.read_buffer_mb * 2**20 <= worker_bytes
+
+    # A larger read buffer is limited to the same quarter
+    plan = plan_resources(worker_memory_gb, read_buffer_mb=4096, **kwargs)
+    assert plan.read_buffer_mb == int(worker_memory_gb * 1024 / 4)
+    assert plan.block_bytes + plan.read_buffer_mb * 2**20 <= worker_bytes
+
+    # A smaller one is kept, leaving more for the blocks
+    small = plan_resources(worker_memory_gb, read_buffer_mb=16, **kwargs)
+    assert small.read_buffer_mb == 16
+    assert small.block_bytes >= plan.block_bytes
+
+
+def test_plan_resources_too_small():
+    with pytest.raises(ValueError, match="worker budget"):
+        plan_resources(0.01, nslc=200, half_window=HALF_WINDOW, strides=STRIDES)